@@ -0,0 +1,225 @@
+"""
+Configuración dependiente del entorno para el proyecto bitacora.
+
+settings.py llama a estas funciones para construir los diccionarios de Django
+a partir de variables de entorno, de modo que el mismo código sirva en
+desarrollo, pruebas y producción sin editar el archivo de settings.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+def entorno(nombre, defecto=None):
+    """Lee una variable de entorno con prefijo BITACORA_."""
+    return os.environ.get(f'BITACORA_{nombre}', defecto)
+
+
+def entorno_entero(nombre, defecto):
+    valor = entorno(nombre)
+    if valor in (None, ''):
+        return defecto
+    try:
+        return int(valor)
+    except ValueError:
+        raise ImproperlyConfigured(f'BITACORA_{nombre} debe ser un número entero (recibido: {valor!r})')
+
+
+def entorno_booleano(nombre, defecto=False):
+    valor = entorno(nombre)
+    if valor in (None, ''):
+        return defecto
+    return valor.strip().lower() in ('1', 'true', 'si', 'sí', 'yes', 'on')
+
+
+# ===== CACHÉ =====
+
+def cache_desde_entorno(base_dir):
+    """
+    Construye CACHES según BITACORA_CACHE:
+
+    - file (por defecto): caché en disco compartida por todos los workers del servidor.
+    - locmem: memoria del proceso (solo desarrollo, cada worker tiene su copia; la
+      instantánea de análisis se lee entonces siempre de la base de datos).
+    - redis: servidor Redis en BITACORA_REDIS_URL.
+    - fakeredis: Redis simulado en memoria para pruebas (requiere el paquete fakeredis).
+    """
+    backend = (entorno('CACHE', 'file') or 'file').lower()
+    timeout = entorno_entero('CACHE_TIMEOUT', 300)
+
+    if backend == 'locmem':
+        default = {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'bitacora',
+        }
+    elif backend == 'file':
+        default = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': entorno('CACHE_DIR', str(base_dir / 'var' / 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': entorno_entero('CACHE_MAX_ENTRADAS', 5000)},
+        }
+    elif backend == 'redis':
+        default = {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': entorno('REDIS_URL', 'redis://127.0.0.1:6379/1'),
+        }
+    elif backend == 'fakeredis':
+        default = {
+            'BACKEND': 'registros.cache_backends.FakeRedisCache',
+            'LOCATION': 'redis://fakeredis:6379/1',
+        }
+    else:
+        raise ImproperlyConfigured(
+            f'BITACORA_CACHE={backend!r} no es válido (opciones: file, locmem, redis, fakeredis)'
+        )
+
+    default['TIMEOUT'] = timeout
+    default['KEY_PREFIX'] = 'bitacora'
+    return {'default': default}
+
+
+# ===== BASE DE DATOS =====
+
+MYSQL_DEFECTO = {
+    'NAME': 'bitacorafrijol_bd',
+    'USER': 'root',
+    'PASSWORD': '',
+    'HOST': '127.0.0.1',
+    'PORT': '3306',
+}
+
+def _mysql_desde_entorno(prefijo, defectos):
+    """
+    Parámetros de conexión MySQL; `prefijo` distingue la réplica (DB_REPLICA_)
+    y `defectos` da los valores cuando la variable no está definida.
+    """
+    config = {
+        'ENGINE': 'django.db.backends.mysql',
+        'NAME': entorno(f'{prefijo}NAME', defectos['NAME']),
+        'USER': entorno(f'{prefijo}USER', defectos['USER']),
+        'PASSWORD': entorno(f'{prefijo}PASSWORD', defectos['PASSWORD']),
+        'HOST': entorno(f'{prefijo}HOST', defectos['HOST']),
+        'PORT': entorno(f'{prefijo}PORT', defectos['PORT']),
+        'OPTIONS': {
+            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
+        },
+        # Conexiones persistentes: se reutilizan entre peticiones del mismo worker
+        'CONN_MAX_AGE': entorno_entero('DB_CONN_MAX_AGE', 60),
+        # Verifica la conexión reutilizada al inicio de cada petición
+        'CONN_HEALTH_CHECKS': entorno_booleano('DB_HEALTH_CHECKS', True),
+    }
+
+    tamano_pool = entorno_entero('DB_POOL', 0)
+    if tamano_pool > 0:
+        # Con pool, Django "cierra" al terminar cada petición y la conexión
+        # vuelve al pool compartido por todos los hilos del proceso.
+        config['ENGINE'] = 'bitacora.db_backends.mysql_pool'
+        config['CONN_MAX_AGE'] = 0
+        config['POOL'] = {'TAMANO': tamano_pool}
+    return config
+
+
+def _sqlite_desde_entorno(nombre):
+    return {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': nombre,
+    }
+
+
+def bases_de_datos_desde_entorno(base_dir):
+    """
+    Construye DATABASES según BITACORA_DB_MOTOR:
+
+    - mysql (por defecto): servidor MySQL con conexiones persistentes
+      (BITACORA_DB_CONN_MAX_AGE) y pool opcional (BITACORA_DB_POOL=<tamaño>).
+    - sqlite: archivo local para desarrollo y benchmarks (BITACORA_DB_NAME).
+
+    Si se define BITACORA_DB_REPLICA_HOST (MySQL) o BITACORA_DB_REPLICA_NAME
+    (SQLite) se agrega el alias 'replica' para lecturas (ver registros.routers).
+    """
+    motor = (entorno('DB_MOTOR', 'mysql') or 'mysql').lower()
+
+    if motor == 'mysql':
+        bases = {'default': _mysql_desde_entorno('DB_', MYSQL_DEFECTO)}
+        if entorno('DB_REPLICA_HOST'):
+            # La réplica hereda nombre, usuario y contraseña del primario salvo que se indiquen
+            bases['replica'] = _mysql_desde_entorno('DB_REPLICA_', bases['default'])
+    elif motor == 'sqlite':
+        nombre = entorno('DB_NAME')
+        if not nombre:
+            (base_dir / 'var').mkdir(exist_ok=True)
+            nombre = str(base_dir / 'var' / 'bitacora.sqlite3')
+        bases = {'default': _sqlite_desde_entorno(nombre)}
+        if entorno('DB_REPLICA_NAME'):
+            bases['replica'] = _sqlite_desde_entorno(entorno('DB_REPLICA_NAME'))
+    else:
+        raise ImproperlyConfigured(f'BITACORA_DB_MOTOR={motor!r} no es válido (opciones: mysql, sqlite)')
+
+    if 'replica' in bases:
+        # En las pruebas la réplica apunta a la misma base de datos de prueba
+        bases['replica']['TEST'] = {'MIRROR': 'default'}
+    return bases
+
+
+# ===== SESIONES =====
+
+MOTORES_SESION = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+def motor_sesiones_desde_entorno():
+    """
+    SESSION_ENGINE según BITACORA_SESIONES:
+
+    - cached_db (por defecto): las lecturas salen de la caché y django_session
+      solo se escribe cuando la sesión cambia (login, logout).
+    - cookies: la sesión viaja firmada en la cookie, sin tabla ni caché. Un
+      logout no invalida copias anteriores de la cookie hasta que expiran.
+    - db: solo base de datos (el comportamiento original de Django).
+
+    Con BITACORA_CACHE=locmem cada proceso tiene su propia caché y un logout
+    no se vería en los demás: el valor por defecto pasa a ser db.
+    """
+    defecto = 'db' if (entorno('CACHE', 'file') or 'file').lower() == 'locmem' else 'cached_db'
+    motor = (entorno('SESIONES', defecto) or defecto).lower()
+    if motor not in MOTORES_SESION:
+        raise ImproperlyConfigured(
+            f'BITACORA_SESIONES={motor!r} no es válido (opciones: {", ".join(MOTORES_SESION)})'
+        )
+    return MOTORES_SESION[motor]
+
+
+# ===== CONTRASEÑAS =====
+
+HASHERS_DJANGO = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
+
+def hashers_desde_entorno():
+    """
+    PASSWORD_HASHERS según BITACORA_HASHER:
+
+    - pbkdf2 (por defecto): la lista de Django.
+    - argon2: registros.hashers.Argon2Ajustado primero (requiere el paquete
+      argon2-cffi), con los parámetros de BITACORA_ARGON2_*.
+
+    Los demás hashers se conservan para verificar las contraseñas existentes.
+    """
+    perfil = (entorno('HASHER', 'pbkdf2') or 'pbkdf2').lower()
+    if perfil == 'pbkdf2':
+        return list(HASHERS_DJANGO)
+    if perfil == 'argon2':
+        try:
+            import argon2  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured('BITACORA_HASHER=argon2 requiere el paquete argon2-cffi')
+        return ['registros.hashers.Argon2Ajustado', *HASHERS_DJANGO]
+    raise ImproperlyConfigured(f'BITACORA_HASHER={perfil!r} no es válido (opciones: pbkdf2, argon2)')
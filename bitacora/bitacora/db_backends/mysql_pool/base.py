@@ -0,0 +1,80 @@
+"""
+Backend MySQL con pool de conexiones por proceso.
+
+Django no trae pool para MySQL: con CONN_MAX_AGE cada hilo conserva su propia
+conexión, y con CONN_MAX_AGE=0 cada petición paga el handshake completo. Este
+backend guarda las conexiones cerradas por Django en un pool compartido por todos
+los hilos del proceso y las valida con ping() antes de volver a entregarlas.
+
+Configuración (ver bitacora/configuracion.py):
+
+    'ENGINE': 'bitacora.db_backends.mysql_pool',
+    'POOL': {'TAMANO': 10},
+"""
+import queue
+import threading
+
+from django.db.backends.mysql import base as mysql_base
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolConexiones:
+    """Pila LIFO de conexiones libres (la más reciente es la que menos probable esté caída)."""
+
+    def __init__(self, tamano):
+        self._libres = queue.LifoQueue(maxsize=tamano)
+
+    def obtener(self, crear):
+        while True:
+            try:
+                conexion = self._libres.get_nowait()
+            except queue.Empty:
+                return crear()
+            try:
+                conexion.ping()
+                return conexion
+            except Exception:
+                # Conexión caída (timeout del servidor, reinicio): se descarta
+                _cerrar_silenciosamente(conexion)
+
+    def devolver(self, conexion):
+        try:
+            self._libres.put_nowait(conexion)
+        except queue.Full:
+            _cerrar_silenciosamente(conexion)
+
+
+def _cerrar_silenciosamente(conexion):
+    try:
+        conexion.close()
+    except Exception:
+        pass
+
+
+def obtener_pool(alias, tamano):
+    with _pools_lock:
+        if alias not in _pools:
+            _pools[alias] = PoolConexiones(tamano)
+        return _pools[alias]
+
+
+class DatabaseWrapper(mysql_base.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        return obtener_pool(self.alias, self.settings_dict.get('POOL', {}).get('TAMANO', 10))
+
+    def get_new_connection(self, conn_params):
+        crear = super().get_new_connection
+        return self.pool.obtener(lambda: crear(conn_params))
+
+    def _close(self):
+        if self.connection is None:
+            return
+        if self.errors_occurred or not self.get_autocommit():
+            # No se devuelve al pool una conexión con errores o en mitad de una transacción
+            with self.wrap_database_errors:
+                return self.connection.close()
+        self.pool.devolver(self.connection)
@@ -12,6 +12,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from .configuracion import (
+    bases_de_datos_desde_entorno, cache_desde_entorno, entorno, entorno_booleano, entorno_entero,
+    hashers_desde_entorno, motor_sesiones_desde_entorno,
+)
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,10 +47,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'registros.middleware.EstaticosMiddleware',
+    # Comprime HTML/CSV/JSON (también las respuestas en streaming) y responde 304
+    # a las páginas sin ETag propia comparando el hash del contenido
+    'django.middleware.gzip.GZipMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'registros.middleware.FijarPrimarioMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -73,20 +84,76 @@ WSGI_APPLICATION = 'bitacora.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'bitacorafrijol_bd',
-        'USER': 'root',
-        'PASSWORD': '',
-        'HOST': '127.0.0.1',
-        'PORT': '3306',
-        'OPTIONS': {
-            'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        },
-    }
+# Motor, conexiones persistentes, pool y réplica se configuran con variables
+# BITACORA_DB_* (ver bitacora/configuracion.py). Sin variables se usa MySQL local.
+
+DATABASES = bases_de_datos_desde_entorno(BASE_DIR)
+
+DATABASE_ROUTERS = ['registros.routers.ReplicaRouter']
+
+# Segundos que las lecturas de un usuario van al primario después de que escribe
+REPLICA_FIJAR_PRIMARIO_SEGUNDOS = entorno_entero('DB_REPLICA_FIJAR_SEGUNDOS', 5)
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Backend seleccionable con BITACORA_CACHE (file, locmem, redis, fakeredis)
+
+CACHES = cache_desde_entorno(BASE_DIR)
+
+
+# Sessions and messages
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/#configuring-the-session-engine
+# Motor seleccionable con BITACORA_SESIONES (cached_db, cookies, db). Los
+# mensajes flash viajan en una cookie firmada: no leen ni escriben la sesión.
+# Las sesiones vencidas las borra el worker de tareas (purgar_sesiones).
+
+SESSION_ENGINE = motor_sesiones_desde_entorno()
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+
+# Tareas en segundo plano (registros/tareas.py)
+# Las ejecuta `python manage.py procesar_tareas`, también en desarrollo. Con
+# BITACORA_TAREAS_INMEDIATAS=1 se ejecutan en el mismo proceso al terminar la
+# transacción, sin worker: solo para pruebas, porque la petición espera a
+# tareas largas como los reportes de grupo o la creación de cuentas.
+
+REGISTROS_TAREAS_INMEDIATAS = entorno_booleano('TAREAS_INMEDIATAS', False)
+
+# GET condicional de las páginas de análisis y listados (registros/condicional.py).
+# Forma parte de las ETags: cada despliegue con plantillas nuevas debe cambiarlo
+# (p. ej. el hash del commit). Vacío: se usa la hora de arranque del proceso.
+
+REGISTROS_VERSION_DESPLIEGUE = entorno('VERSION_DESPLIEGUE', '')
+
+# Dashboard en vivo (registros/eventos.py): requiere servidor ASGI. Con el bus
+# "local" los eventos no salen del proceso; con varios procesos usar "redis".
+
+REGISTROS_BUS_EVENTOS = entorno('EVENTOS', 'local')
+REGISTROS_REDIS_EVENTOS_URL = entorno('REDIS_URL', 'redis://127.0.0.1:6379/1')
+
+
+# Password hashing
+# https://docs.djangoproject.com/en/5.2/topics/auth/passwords/
+# Perfil seleccionable con BITACORA_HASHER (pbkdf2, argon2); ver registros/hashers.py
+
+PASSWORD_HASHERS = hashers_desde_entorno()
+REGISTROS_ARGON2 = {
+    'tiempo': entorno_entero('ARGON2_TIEMPO', 2),
+    'memoria_kib': entorno_entero('ARGON2_MEMORIA_KIB', 19 * 1024),
+    'paralelismo': entorno_entero('ARGON2_PARALELISMO', 1),
 }
 
+# Límite de intentos fallidos de inicio de sesión (registros/acceso.py): se
+# rechazan antes de verificar la contraseña. El límite por IP (0 = desactivado)
+# es opcional porque un salón entero sale a internet por la misma dirección;
+# detrás de un proxy, LOGIN_CABECERA_IP es la cabecera con la IP del cliente
+# que escribe ese proxy (p. ej. X-Real-IP o X-Forwarded-For).
+REGISTROS_LOGIN_VENTANA = entorno_entero('LOGIN_VENTANA_SEGUNDOS', 300)
+REGISTROS_LOGIN_FALLOS_USUARIO = entorno_entero('LOGIN_FALLOS_USUARIO', 5)
+REGISTROS_LOGIN_FALLOS_IP = entorno_entero('LOGIN_FALLOS_IP', 0)
+REGISTROS_LOGIN_CABECERA_IP = entorno('LOGIN_CABECERA_IP', '')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -126,10 +193,34 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = []  # Directorios adicionales para archivos estáticos
 STATIC_ROOT = BASE_DIR / 'staticfiles'  # Directorio para collectstatic en producción
 
+# collectstatic minifica, agrega el hash del contenido al nombre y precomprime
+# (.gz y, con el paquete brotli, .br); ver registros/estaticos.py. En
+# producción EstaticosMiddleware sirve STATIC_ROOT con caché inmutable.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'registros.estaticos.AlmacenEstaticos'},
+}
+REGISTROS_SERVIR_ESTATICOS = entorno_booleano('SERVIR_ESTATICOS', not DEBUG)
+
 # Media files (uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Archivos de cierre de semestre de los grupos purgados (registros/eliminacion.py)
+REGISTROS_DIRECTORIO_ARCHIVO = Path(entorno('DIRECTORIO_ARCHIVO', str(BASE_DIR / 'var' / 'archivo')))
+
+# Instantánea columnar de las mediciones para los análisis (registros/instantanea.py).
+# Debe estar en un disco local compartido por todos los procesos del servidor
+# (web y workers de tareas, que publican las generaciones nuevas).
+REGISTROS_DIRECTORIO_INSTANTANEA = Path(entorno('DIRECTORIO_INSTANTANEA', str(BASE_DIR / 'var' / 'instantanea')))
+
+# Subidas de fotografías por partes en curso (registros/subidas.py). Compartido
+# por los procesos web y los workers de tareas, que adjuntan las terminadas.
+REGISTROS_DIRECTORIO_SUBIDAS = Path(entorno('DIRECTORIO_SUBIDAS', str(BASE_DIR / 'var' / 'subidas')))
+
+# Reportes de grupo generados desde el admin (registros/reportes.py)
+REGISTROS_DIRECTORIO_REPORTES = Path(entorno('DIRECTORIO_REPORTES', str(BASE_DIR / 'var' / 'reportes')))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
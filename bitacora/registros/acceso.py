@@ -0,0 +1,77 @@
+"""
+Límite de intentos fallidos de inicio de sesión.
+
+Cada fallo incrementa un contador en la caché por nombre de usuario (y otro
+por IP, si REGISTROS_LOGIN_FALLOS_IP lo activa), que vence al terminar la
+ventana (REGISTROS_LOGIN_VENTANA). Mientras alguno esté en su límite,
+login_view rechaza el intento sin llamar a authenticate: la fuerza bruta no
+consume el CPU del cifrado de contraseñas que necesitan los estudiantes que
+entran a clase. Un inicio de sesión correcto borra el contador de su usuario.
+
+El límite por IP está desactivado por defecto: un salón entero sale a internet
+por la misma dirección (NAT) y detrás de un proxy REMOTE_ADDR es la del proxy,
+así que unos pocos estudiantes que se equivocan dejarían fuera a todos. Si se
+activa detrás de un proxy, REGISTROS_LOGIN_CABECERA_IP indica la cabecera con
+la IP del cliente que ese proxy escribe.
+"""
+import hashlib
+
+from django.conf import settings
+
+from .cache import PREFIJO, obtener_cache
+
+
+def _ventana():
+    return getattr(settings, 'REGISTROS_LOGIN_VENTANA', 300)
+
+
+def _clave(tipo, valor):
+    # El nombre de usuario llega sin validar: se resume para que sea una clave válida
+    return f'{PREFIJO}:login:{tipo}:{hashlib.sha256(valor.encode()).hexdigest()[:32]}'
+
+
+def _clave_usuario(nombre_usuario):
+    return _clave('usuario', (nombre_usuario or '').strip().lower())
+
+
+def ip_cliente(request):
+    """IP del cliente: la de la cabecera del proxy de confianza si está configurada, si no REMOTE_ADDR."""
+    cabecera = getattr(settings, 'REGISTROS_LOGIN_CABECERA_IP', '')
+    if not cabecera:
+        return request.META.get('REMOTE_ADDR', '')
+    # En X-Forwarded-For la última dirección es la que agregó el proxy; las anteriores las envía el cliente
+    valor = request.META.get('HTTP_' + cabecera.upper().replace('-', '_'), '')
+    return valor.split(',')[-1].strip()
+
+
+def _limites(request, nombre_usuario):
+    """{clave del contador: fallos permitidos} que aplican a este intento."""
+    limites = {_clave_usuario(nombre_usuario): getattr(settings, 'REGISTROS_LOGIN_FALLOS_USUARIO', 5)}
+    fallos_ip = getattr(settings, 'REGISTROS_LOGIN_FALLOS_IP', 0)
+    ip = ip_cliente(request) if fallos_ip else ''
+    if ip:
+        limites[_clave('ip', ip)] = fallos_ip
+    return limites
+
+
+def bloqueado(request, nombre_usuario):
+    """True si el usuario o la IP ya agotaron sus intentos en la ventana actual."""
+    limites = _limites(request, nombre_usuario)
+    fallos = obtener_cache().get_many(list(limites))
+    return any(fallos.get(clave, 0) >= limite for clave, limite in limites.items())
+
+
+def registrar_fallo(request, nombre_usuario):
+    cache = obtener_cache()
+    for clave in _limites(request, nombre_usuario):
+        # El primer fallo abre la ventana; los siguientes solo suman
+        if not cache.add(clave, 1, timeout=_ventana()):
+            try:
+                cache.incr(clave)
+            except ValueError:
+                # Venció entre add e incr
+                cache.add(clave, 1, timeout=_ventana())
+
+
+def registrar_exito(nombre_usuario):
+    obtener_cache().delete(_clave_usuario(nombre_usuario))
@@ -1,14 +1,74 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections, router
+from django.utils.functional import cached_property
+from django.template.defaultfilters import filesizeformat
+from django.urls import reverse
 from django.utils.html import format_html
-from .models import Estudiante, MedicionPlantas, RegistroFotografico
+from django.utils import timezone
+from .models import ArchivoGrupo, Estudiante, MedicionPlantas, RegistroFotografico, ReporteGrupo, Tarea
+from .reportes import solicitar_reporte
+
+# Por debajo de esto la estimación del motor es poco fiable y COUNT(*) es barato
+MIN_FILAS_ESTIMACION = 10000
+
+
+def filas_estimadas(modelo):
+    """Filas de la tabla según las estadísticas del motor (sin recorrerla), o None si no se sabe."""
+    db = router.db_for_read(modelo)
+    conexion = connections[db]
+    if conexion.vendor == 'mysql':
+        sql = 'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+    elif conexion.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)'
+    else:
+        return None
+    with conexion.cursor() as cursor:
+        cursor.execute(sql, [modelo._meta.db_table])
+        fila = cursor.fetchone()
+    return fila[0] if fila and fila[0] is not None and fila[0] >= 0 else None
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginador para tablas grandes: sin filtros usa el número de filas estimado
+    por el motor en lugar de COUNT(*), que en InnoDB recorre toda la tabla.
+    Con filtros (o tablas pequeñas) cuenta de forma exacta.
+    """
+
+    @cached_property
+    def count(self):
+        consulta = getattr(self.object_list, 'query', None)
+        if consulta is not None and not consulta.has_filters():
+            estimado = filas_estimadas(self.object_list.model)
+            if estimado is not None and estimado >= MIN_FILAS_ESTIMACION:
+                return estimado
+        return super().count
+
+
+class FiltroUsuarioAsociado(admin.SimpleListFilter):
+    """Sí/No en lugar de una entrada por cada cuenta de usuario."""
+    title = 'usuario asociado'
+    parameter_name = 'con_usuario'
+
+    def lookups(self, request, model_admin):
+        return (('si', 'Con usuario'), ('no', 'Sin usuario'))
+
+    def queryset(self, request, queryset):
+        if self.value() in ('si', 'no'):
+            return queryset.filter(usuario__isnull=self.value() == 'no')
+        return queryset
 
 
 @admin.register(Estudiante)
 class EstudianteAdmin(admin.ModelAdmin):
-    list_display = ('nombre', 'correo_institucional', 'grupo', 'usuario_asociado', 'estado_usuario')
-    list_filter = ('grupo', 'usuario')
+    list_display = ('nombre', 'correo_institucional', 'grupo', 'num_mediciones', 'usuario_asociado', 'estado_usuario')
+    list_filter = ('grupo', FiltroUsuarioAsociado)
+    list_select_related = ('usuario', 'resumen')
     search_fields = ('nombre', 'correo_institucional', 'usuario__username')
+    autocomplete_fields = ('usuario',)
     readonly_fields = ('estado_asociacion',)
+    actions = ['generar_reporte_grupo']
     
     fieldsets = (
         ('Información del Estudiante', {
@@ -21,6 +81,15 @@ class EstudianteAdmin(admin.ModelAdmin):
         }),
     )
     
+    def num_mediciones(self, obj):
+        """Número de mediciones según el resumen materializado del estudiante"""
+        try:
+            return obj.resumen.n
+        except Estudiante.resumen.RelatedObjectDoesNotExist:
+            return 0
+    num_mediciones.short_description = 'Mediciones'
+    num_mediciones.admin_order_field = 'resumen__n'
+    
     def usuario_asociado(self, obj):
         """Muestra el nombre de usuario asociado"""
         if obj.usuario:
@@ -65,18 +134,117 @@ class EstudianteAdmin(admin.ModelAdmin):
         )
     estado_asociacion.short_description = 'Estado de Asociación'
 
+    @admin.action(description='Generar reporte de los grupos seleccionados (ZIP con PDF)')
+    def generar_reporte_grupo(self, request, queryset):
+        grupos = sorted(set(queryset.values_list('grupo', flat=True)))
+        nuevos = [grupo for grupo in grupos if solicitar_reporte(grupo, request.user)[1]]
+        if nuevos:
+            self.message_user(request, (
+                f'Reporte en preparación para los grupos {", ".join(map(str, nuevos))}. '
+                'Descárgalo desde Reportes de Grupos cuando esté listo.'
+            ))
+        repetidos = sorted(set(grupos) - set(nuevos))
+        if repetidos:
+            self.message_user(
+                request, f'Los grupos {", ".join(map(str, repetidos))} ya tenían un reporte en preparación.',
+                level=messages.WARNING,
+            )
+
 
 @admin.register(MedicionPlantas)
 class MedicionPlantasAdmin(admin.ModelAdmin):
-    list_display = ('estudiante', 'dia', 'altura', 'fecha_registro')
-    list_filter = ('dia', 'fecha_registro', 'estudiante')
+    list_display = ('estudiante', 'dia', 'altura', 'atipica', 'fecha_registro')
+    list_filter = ('atipica', 'dia', 'fecha_registro', 'estudiante__grupo')
     search_fields = ('estudiante__nombre',)
+    autocomplete_fields = ('estudiante',)
     date_hierarchy = 'fecha_registro'
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # También en las páginas de edición y borrado, que muestran str(medicion)
+        return super().get_queryset(request).select_related('estudiante')
 
 
 @admin.register(RegistroFotografico)
 class RegistroFotograficoAdmin(admin.ModelAdmin):
-    list_display = ('estudiante', 'imagen', 'fecha', 'comentario')
-    list_filter = ('fecha', 'estudiante')
+    list_display = ('vista_miniatura', 'estudiante', 'dia_medicion', 'fecha', 'comentario')
+    list_filter = ('fecha', 'estudiante__grupo')
     search_fields = ('estudiante__nombre', 'comentario')
+    autocomplete_fields = ('estudiante',)
+    raw_id_fields = ('medicion',)
+    readonly_fields = ('vista_miniatura',)
     date_hierarchy = 'fecha'
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('estudiante', 'medicion')
+
+    @admin.display(description='Miniatura')
+    def vista_miniatura(self, obj):
+        # La miniatura la genera la tarea generar_miniatura poco después de subir la foto
+        if obj.miniatura:
+            return format_html(
+                '<img src="{}" alt="" loading="lazy" style="max-height: 60px; border-radius: 4px;">',
+                obj.miniatura.url,
+            )
+        return '-'
+
+    @admin.display(description='Día', ordering='medicion__dia')
+    def dia_medicion(self, obj):
+        return obj.medicion.dia if obj.medicion else '-'
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'nombre', 'estado', 'intentos', 'max_intentos', 'usuario', 'creada', 'terminada')
+    list_filter = ('estado', 'nombre')
+    search_fields = ('nombre', 'clave')
+    readonly_fields = ('creada', 'iniciada', 'terminada', 'resultado', 'error')
+    actions = ['reintentar']
+
+    @admin.action(description='Reintentar las tareas seleccionadas')
+    def reintentar(self, request, queryset):
+        actualizadas = queryset.filter(estado=Tarea.FALLIDA).update(
+            estado=Tarea.PENDIENTE, intentos=0, ejecutar_despues=timezone.now(), terminada=None,
+        )
+        self.message_user(request, f'{actualizadas} tareas devueltas a la cola.')
+
+
+@admin.register(ArchivoGrupo)
+class ArchivoGrupoAdmin(admin.ModelAdmin):
+    list_display = ('semestre', 'grupo', 'num_estudiantes', 'num_mediciones', 'num_fotos', 'formato', 'creado')
+    list_filter = ('semestre', 'formato')
+    search_fields = ('ruta',)
+
+    # Los archivos se crean con el comando archivar_grupo y no se modifican
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReporteGrupo)
+class ReporteGrupoAdmin(admin.ModelAdmin):
+    list_display = ('grupo', 'estado', 'num_estudiantes', 'tamano_legible', 'solicitado_por', 'creado', 'terminado', 'descarga')
+    list_filter = ('estado', 'grupo')
+    readonly_fields = ('error',)
+
+    # Se solicitan con la acción de Estudiantes y no se modifican
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Tamaño', ordering='tamano')
+    def tamano_legible(self, obj):
+        return filesizeformat(obj.tamano) if obj.tamano else '-'
+
+    @admin.display(description='Archivo')
+    def descarga(self, obj):
+        if obj.estado != ReporteGrupo.LISTO:
+            return '-'
+        return format_html('<a href="{}">Descargar ZIP</a>', reverse('reporte_descargar', args=[obj.pk]))
@@ -0,0 +1,264 @@
+"""
+Cálculos de análisis de regresión para el experimento de crecimiento.
+
+Las vistas y el comando warm_cache comparten estas funciones, de modo que los
+resultados que se precalculan son exactamente los que luego se muestran.
+"""
+import base64
+import io
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Backend sin interfaz gráfica para servidor
+import matplotlib.pyplot as plt
+
+from .cache import (
+    TIMEOUT_DATOS, construir_clave, espacio_estudiante, obtener_cache,
+    obtener_o_calcular, versiones,
+)
+from .instantanea import alturas_cm, obtener_instantanea
+from .modelos_crecimiento import ajuste_seleccionado, predecir, seleccionar_modelo
+
+
+# ===== FUNCIONES DE ANÁLISIS DE REGRESIÓN =====
+
+def MinCuad(x, y):
+    """
+    Calcula la regresión lineal por el método de mínimos cuadrados.
+
+    Args:
+        x: array de valores independientes (días)
+        y: array de valores dependientes (alturas)
+
+    Returns:
+        tuple: (a0, a1) donde y = a0 + a1*x
+    """
+    sumx = 0
+    sumy = 0
+    sumxy = 0
+    sumxx = 0
+    n = len(x)
+
+    for i in range(len(x)):
+        sumxy += x[i] * y[i]
+        sumxx += x[i] ** 2
+        sumx += x[i]
+        sumy += y[i]
+
+    a1 = (n * sumxy - sumx * sumy) / (n * sumxx - sumx ** 2)
+    a0 = (sumy - a1 * sumx) / n
+
+    return a0, a1
+
+
+def calcular_coeficiente_correlacion(x, y, a0, a1):
+    """
+    Calcula el coeficiente de correlación r y r²
+
+    Args:
+        x: array de valores independientes
+        y: array de valores dependientes
+        a0, a1: coeficientes de la regresión
+
+    Returns:
+        tuple: (r, r2)
+    """
+    media_y = np.mean(y)
+    y_est = a0 + a1 * x
+
+    # Coeficiente de correlación
+    num = np.sum((y_est - media_y) ** 2)
+    den = np.sum((y - media_y) ** 2)
+    r = np.sqrt(num / den) if den != 0 else 0
+
+    # Coeficiente de determinación
+    r2 = 1 - np.sum((y - y_est) ** 2) / den if den != 0 else 0
+
+    return r, r2
+
+
+def clasificar_ajuste(r2):
+    """Clasifica la calidad del ajuste según r²"""
+    if r2 > 0.9:
+        return 'excelente'
+    elif r2 > 0.7:
+        return 'bueno'
+    elif r2 > 0.5:
+        return 'moderado'
+    return 'debil'
+
+
+# ===== RESÚMENES POR ESTUDIANTE =====
+
+def calcular_resumen(dias, alturas):
+    """
+    Resumen que muestra el dashboard para un estudiante.
+    `dias` y `alturas` deben venir ordenados por día.
+    """
+    num_mediciones = len(dias)
+    if num_mediciones < 2:
+        return {
+            'num_mediciones': num_mediciones,
+            'puede_analizar': False,
+            'motivo': 'Necesita al menos 2 mediciones',
+        }
+
+    dias = np.asarray(dias, dtype=float)
+    alturas = np.asarray(alturas, dtype=float)
+    a0, a1 = MinCuad(dias, alturas)
+    r, r2 = calcular_coeficiente_correlacion(dias, alturas, a0, a1)
+
+    # La calidad del ajuste se clasifica con el modelo de crecimiento elegido
+    ajuste = ajuste_seleccionado(seleccionar_modelo(dias, alturas))
+
+    return {
+        'num_mediciones': num_mediciones,
+        'dias_registrados': f"{int(dias.min())} - {int(dias.max())}",
+        'dias_transcurridos': int(dias.max()),
+        'altura_inicial': float(alturas[0]),
+        'altura_final': float(alturas[-1]),
+        'crecimiento_total': float(alturas[-1] - alturas[0]),
+        'r2': round(float(r2), 3),
+        'modelo': ajuste['modelo'],
+        'modelo_nombre': ajuste['nombre'],
+        'r2_modelo': round(ajuste['r2'], 3),
+        'tiene_buen_ajuste': bool(ajuste['r2'] > 0.7),
+        'calidad_ajuste': clasificar_ajuste(ajuste['r2']),
+        'puede_analizar': True,
+    }
+
+
+def calcular_resumenes(estudiante_ids):
+    """Calcula los resúmenes de varios estudiantes cortando sus series de la instantánea."""
+    instantanea = obtener_instantanea()
+    resumenes = {estudiante_id: calcular_resumen([], []) for estudiante_id in estudiante_ids}
+    for estudiante_id, dias, alturas in instantanea.series(estudiante_ids):
+        resumenes[estudiante_id] = calcular_resumen(dias, alturas_cm(alturas))
+    return resumenes
+
+
+def _claves_resumen(estudiante_ids):
+    espacios = {espacio_estudiante(pk): pk for pk in estudiante_ids}
+    return {
+        construir_clave(espacio, version_espacio, 'resumen'): espacios[espacio]
+        for espacio, version_espacio in versiones(list(espacios)).items()
+    }
+
+
+def obtener_resumenes(estudiante_ids):
+    """
+    Retorna {estudiante_id: resumen} leyendo de la caché y calculando
+    en bloque solo los estudiantes que falten.
+    """
+    estudiante_ids = list(estudiante_ids)
+    if not estudiante_ids:
+        return {}
+
+    cache = obtener_cache()
+    claves = _claves_resumen(estudiante_ids)
+    encontrados = cache.get_many(list(claves))
+    resumenes = {claves[clave]: valor for clave, valor in encontrados.items()}
+
+    faltantes = [pk for pk in estudiante_ids if pk not in resumenes]
+    if faltantes:
+        calculados = calcular_resumenes(faltantes)
+        resumenes.update(calculados)
+        por_id = {pk: clave for clave, pk in claves.items()}
+        cache.set_many({por_id[pk]: valor for pk, valor in calculados.items()}, TIMEOUT_DATOS)
+    return resumenes
+
+
+def precalcular_resumenes(estudiante_ids):
+    """Recalcula y guarda en caché los resúmenes (usado por warm_cache)."""
+    calculados = calcular_resumenes(list(estudiante_ids))
+    por_id = {pk: clave for clave, pk in _claves_resumen(list(calculados)).items()}
+    obtener_cache().set_many({por_id[pk]: valor for pk, valor in calculados.items()}, TIMEOUT_DATOS)
+    return calculados
+
+
+# ===== DATOS DE REGRESIÓN =====
+
+def calcular_regresion(estudiante_id):
+    """Series y coeficientes que usa la vista de análisis de regresión."""
+    dias, alturas = obtener_instantanea().serie(estudiante_id)
+    x = np.asarray(dias, dtype=float)
+    y = alturas_cm(alturas)
+    datos = {'dias': x.tolist(), 'alturas': y.tolist(), 'num_mediciones': len(x)}
+
+    if len(x) >= 2:
+        a0, a1 = MinCuad(x, y)
+        r, r2 = calcular_coeficiente_correlacion(x, y, a0, a1)
+        datos.update({'a0': float(a0), 'a1': float(a1), 'r': float(r), 'r2': float(r2)})
+        # Parámetros de todos los modelos candidatos, cacheados junto con la regresión
+        datos['modelos'] = seleccionar_modelo(x, y)
+    return datos
+
+
+def obtener_regresion(estudiante_id):
+    return obtener_o_calcular(
+        espacio_estudiante(estudiante_id), 'regresion',
+        lambda: calcular_regresion(estudiante_id),
+    )
+
+
+def generar_grafica(nombre, dias, alturas, a0, a1, dia_prediccion=None, altura_prediccion=None, ajuste=None):
+    """
+    Genera la gráfica de regresión y la retorna como PNG en base64.
+    Si se pasa `ajuste` (un modelo de crecimiento no lineal) se dibuja su curva.
+    """
+    image_png = generar_grafica_png(nombre, dias, alturas, a0, a1, dia_prediccion, altura_prediccion, ajuste)
+    return base64.b64encode(image_png).decode('utf-8')
+
+
+def generar_grafica_png(nombre, dias, alturas, a0, a1, dia_prediccion=None, altura_prediccion=None, ajuste=None):
+    """La gráfica de generar_grafica como bytes PNG (para archivos, p. ej. los reportes de grupo)."""
+    dias = np.asarray(dias, dtype=float)
+    alturas = np.asarray(alturas, dtype=float)
+
+    # Generar puntos para la línea de regresión
+    dias_linea = np.linspace(dias.min(), dias.max(), 100)
+    alturas_linea = a0 + a1 * dias_linea
+
+    # Crear gráfica
+    plt.figure(figsize=(10, 6))
+    plt.scatter(dias, alturas, color='blue', s=100, alpha=0.6, edgecolors='black', label='Datos medidos', zorder=3)
+    plt.plot(dias_linea, alturas_linea, color='red', linewidth=2, label=f'Regresión: y = {a0:.2f} + {a1:.2f}x', zorder=2)
+
+    if ajuste and ajuste['modelo'] != 'lineal':
+        plt.plot(dias_linea, predecir(ajuste['modelo'], ajuste['parametros'], dias_linea), color='darkorange',
+                 linewidth=2, label=f"Modelo {ajuste['nombre']}: {ajuste['ecuacion']}", zorder=2)
+
+    # Si hay predicción, extender la línea y mostrarla en la gráfica
+    if dia_prediccion and altura_prediccion:
+        dias_linea_ext = np.linspace(dias.min(), dia_prediccion, 100)
+        alturas_linea_ext = a0 + a1 * dias_linea_ext
+        plt.plot(dias_linea_ext, alturas_linea_ext, color='red', linewidth=2, linestyle='--', alpha=0.5, zorder=1)
+        plt.scatter([dia_prediccion], [altura_prediccion], color='green', s=150, alpha=0.8,
+                   edgecolors='black', marker='*', label=f'Predicción día {dia_prediccion}', zorder=4)
+
+    plt.xlabel('Día', fontsize=12)
+    plt.ylabel('Altura (cm)', fontsize=12)
+    plt.title(f'Análisis de Crecimiento - {nombre}', fontsize=14, fontweight='bold')
+    plt.grid(True, alpha=0.3)
+    plt.legend(fontsize=10)
+
+    # Convertir gráfica a imagen PNG
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+    buffer.seek(0)
+    image_png = buffer.getvalue()
+    buffer.close()
+    plt.close()
+
+    return image_png
+
+
+def obtener_grafica(estudiante, datos):
+    """Gráfica sin predicción, cacheada hasta que cambien los datos del estudiante."""
+    return obtener_o_calcular(
+        espacio_estudiante(estudiante.pk), 'grafica',
+        lambda: generar_grafica(
+            estudiante.nombre, datos['dias'], datos['alturas'], datos['a0'], datos['a1'],
+            ajuste=ajuste_seleccionado(datos['modelos']),
+        ),
+    )
@@ -0,0 +1,109 @@
+"""
+Detección de mediciones atípicas.
+
+Al registrar una medición se compara con la recta del estudiante usando las
+estadísticas suficientes de ResumenEstudiante (O(1), sin leer mediciones): si
+el residuo estandarizado supera UMBRAL_Z se pide confirmación antes de guardar.
+El comando auditar_mediciones revisa toda la tabla con residuos studentizados
+calculados de forma vectorizada.
+"""
+import numpy as np
+
+from .models import ResumenEstudiante
+from .prediccion import coeficientes, sumas_centradas, suma_cuadrados_residual
+
+UMBRAL_Z = 4.0
+
+# Con menos mediciones la varianza residual no es fiable para juzgar un valor nuevo
+MIN_MEDICIONES_VALIDACION = 4
+
+# Error de medición mínimo (cm): evita marcar diferencias pequeñas cuando la recta es casi perfecta
+DESVIACION_MINIMA = 0.5
+
+
+def _sin_medicion(resumen, dia, altura):
+    """Copia del resumen sin la medición indicada (para validar una edición)."""
+    x = float(dia)
+    y = float(altura)
+    return ResumenEstudiante(
+        n=resumen.n - 1,
+        suma_x=resumen.suma_x - x,
+        suma_y=resumen.suma_y - y,
+        suma_xx=resumen.suma_xx - x * x,
+        suma_xy=resumen.suma_xy - x * y,
+        suma_yy=resumen.suma_yy - y * y,
+    )
+
+
+def evaluar_medicion(resumen, dia, altura, anterior=None):
+    """
+    Compara una medición nueva con la recta actual del estudiante.
+
+    Args:
+        resumen: ResumenEstudiante del estudiante (o None)
+        dia, altura: valores a validar
+        anterior: (dia, altura) que la medición tenía antes, si es una edición
+
+    Returns:
+        dict con 'altura_esperada', 'z' y 'es_atipica', o None si aún no hay
+        mediciones suficientes para juzgar
+    """
+    if resumen is None:
+        return None
+    if anterior is not None:
+        resumen = _sin_medicion(resumen, *anterior)
+    if resumen.n < MIN_MEDICIONES_VALIDACION or coeficientes(resumen) is None:
+        return None
+
+    a0, a1 = coeficientes(resumen)
+    x = float(dia)
+    sxx, _, _ = sumas_centradas(resumen)
+    s = max((suma_cuadrados_residual(resumen) / (resumen.n - 2)) ** 0.5, DESVIACION_MINIMA)
+    # Error estándar de predicción de una observación nueva en x
+    error = s * (1 + 1 / resumen.n + (x - resumen.suma_x / resumen.n) ** 2 / sxx) ** 0.5
+
+    esperada = a0 + a1 * x
+    z = (float(altura) - esperada) / error
+    return {
+        'altura_esperada': round(esperada, 2),
+        'z': round(z, 2),
+        'es_atipica': abs(z) > UMBRAL_Z,
+    }
+
+
+def puntuaciones_z(estudiantes, dias, alturas):
+    """
+    Residuos studentizados externamente (leave-one-out) de cada medición
+    respecto a la recta de su estudiante, sin bucles de Python.
+
+    Cada punto se juzga con la varianza de los demás, así un error grande
+    no infla la escala con la que se le mide. Retorna NaN para estudiantes
+    con menos de MIN_MEDICIONES_VALIDACION mediciones.
+    """
+    estudiantes = np.asarray(estudiantes, dtype=np.int64)
+    x = np.asarray(dias, dtype=np.float64)
+    y = np.asarray(alturas, dtype=np.float64)
+    if y.size == 0:
+        return np.array([], dtype=np.float64)
+
+    _, indice = np.unique(estudiantes, return_inverse=True)
+    n = np.bincount(indice).astype(np.float64)
+    media_x = np.bincount(indice, x) / n
+    media_y = np.bincount(indice, y) / n
+    dx = x - media_x[indice]
+    dy = y - media_y[indice]
+    sxx = np.bincount(indice, dx * dx)
+    sxy = np.bincount(indice, dx * dy)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pendiente = sxy / sxx
+        residuo = dy - pendiente[indice] * dx
+        sse = np.bincount(indice, residuo * residuo)
+        palanca = 1 / n[indice] + dx * dx / sxx[indice]
+        gl = n[indice] - 3
+        s2_sin_punto = (sse[indice] - residuo ** 2 / (1 - palanca)) / gl
+        s = np.sqrt(np.maximum(s2_sin_punto, DESVIACION_MINIMA ** 2))
+        z = residuo / (s * np.sqrt(1 - palanca))
+
+    z[(n[indice] < MIN_MEDICIONES_VALIDACION) | ~np.isfinite(z)] = np.nan
+    return z
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class RegistrosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'registros'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registra las invalidaciones)
+        from . import tareas  # noqa: F401  (registra las tareas en segundo plano)
+        from . import cache, eventos
+        cache.conectar_senales()
+        # Después de las invalidaciones: los eventos publican el resumen ya recalculado
+        eventos.conectar_senales()
@@ -0,0 +1,308 @@
+"""
+Archivo histórico (nivel frío) de los grupos de semestres terminados.
+
+Cada grupo archivado es un directorio dentro de REGISTROS_DIRECTORIO_ARCHIVO
+con dos tablas en formato columnar comprimido:
+
+- mediciones: estudiante, dia, altura, atipica (ordenadas por estudiante y día)
+- estudiantes: id, nombre, correo, inicio (posición de su primera medición),
+  las estadísticas suficientes de ResumenEstudiante y la recta ajustada (a0, a1, r2)
+
+Se escribe en Parquet si pyarrow está instalado y en NPZ comprimido si no.
+Para leer, las columnas se abren con memoria mapeada: un NPZ se descomprime
+una vez a archivos .npy sueltos (``columnas/``) que se cargan con
+``mmap_mode='r'``; Parquet se lee con ``memory_map=True``. Así el navegador
+del archivo solo toca las páginas de la serie que muestra.
+"""
+import os
+import shutil
+import tempfile
+import zipfile
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import obtener_o_calcular
+from .eliminacion import eliminar_estudiantes
+from .grupos import CAMPOS_ESTADISTICAS, _filas_resumen, calcular_estadisticas, generar_grafica_grupos
+from .models import ArchivoGrupo, Estudiante, MedicionPlantas, RegistroFotografico, ResumenEstudiante
+from .numerico import altura_centesimas, centimetros, columnas_enteras
+from .prediccion import coeficiente_determinacion, coeficientes
+
+COLUMNAS_MEDICIONES = ('estudiante', 'dia', 'altura', 'atipica')
+COLUMNAS_SUMAS = ('n', 'suma_x', 'suma_y', 'suma_xx', 'suma_xy', 'suma_yy')
+COLUMNAS_ESTUDIANTES = ('id', 'nombre', 'correo', 'inicio', *COLUMNAS_SUMAS, 'a0', 'a1', 'r2')
+
+ARCHIVO_NPZ = 'datos.npz'
+ARCHIVO_FOTOS = 'fotos.zip'
+DIRECTORIO_COLUMNAS = 'columnas'
+
+
+def directorio_archivo():
+    directorio = Path(settings.REGISTROS_DIRECTORIO_ARCHIVO)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def pyarrow_disponible():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def semestre_actual():
+    """Etiqueta del semestre en curso: '2026-1' (enero-junio) o '2026-2'."""
+    hoy = timezone.localdate()
+    return f'{hoy.year}-{1 if hoy.month <= 6 else 2}'
+
+
+def _valor(valor):
+    # Escalares de NumPy a tipos de Python (las cadenas de Parquet ya lo son); NaN = sin dato
+    valor = valor.item() if hasattr(valor, 'item') else valor
+    return None if isinstance(valor, float) and valor != valor else valor
+
+
+def tamano_directorio(ruta):
+    return sum(archivo.stat().st_size for archivo in Path(ruta).rglob('*') if archivo.is_file())
+
+
+# ===== EXPORTACIÓN =====
+
+def _columnas_grupo(grupo):
+    """Las dos tablas del grupo como dicts de arrays, con una consulta por tabla."""
+    estudiantes = list(
+        Estudiante.objects.filter(grupo=grupo).order_by('pk').values_list('pk', 'nombre', 'correo_institucional')
+    )
+    ids = [pk for pk, _, _ in estudiantes]
+    filas = columnas_enteras(
+        MedicionPlantas.objects.filter(estudiante_id__in=ids).order_by('estudiante_id', 'dia'),
+        'estudiante_id', 'dia', altura_centesimas(), 'atipica',
+    )
+    mediciones = {
+        'estudiante': filas[:, 0],
+        'dia': filas[:, 1].astype(np.int32),
+        'altura': centimetros(filas[:, 2]),
+        'atipica': filas[:, 3].astype(bool),
+    }
+
+    resumenes = ResumenEstudiante.objects.in_bulk(ids)
+    columnas = {campo: np.zeros(len(ids)) for campo in COLUMNAS_SUMAS}
+    columnas.update({campo: np.full(len(ids), np.nan) for campo in ('a0', 'a1', 'r2')})
+    for i, pk in enumerate(ids):
+        resumen = resumenes.get(pk)
+        if resumen is None:
+            continue
+        for campo in COLUMNAS_SUMAS:
+            columnas[campo][i] = getattr(resumen, campo)
+        recta = coeficientes(resumen)
+        if recta:
+            columnas['a0'][i], columnas['a1'][i] = recta
+            columnas['r2'][i] = coeficiente_determinacion(resumen)
+
+    estudiantes_cols = {
+        'id': np.array(ids, dtype=np.int64),
+        'nombre': np.array([nombre for _, nombre, _ in estudiantes], dtype=str),
+        'correo': np.array([correo for _, _, correo in estudiantes], dtype=str),
+        # Las mediciones están ordenadas por estudiante: su serie es [inicio, inicio + n)
+        'inicio': np.searchsorted(mediciones['estudiante'], np.array(ids, dtype=np.int64)),
+        **columnas,
+    }
+    estudiantes_cols['n'] = estudiantes_cols['n'].astype(np.int64)
+    return estudiantes_cols, mediciones
+
+
+def _escribir_parquet(directorio, estudiantes, mediciones):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    for nombre, columnas in (('estudiantes', estudiantes), ('mediciones', mediciones)):
+        pq.write_table(pa.table(columnas), directorio / f'{nombre}.parquet', compression='zstd')
+
+
+def _escribir_npz(directorio, estudiantes, mediciones):
+    np.savez_compressed(
+        directorio / ARCHIVO_NPZ,
+        **{f'estudiantes_{campo}': valores for campo, valores in estudiantes.items()},
+        **{f'mediciones_{campo}': valores for campo, valores in mediciones.items()},
+    )
+
+
+def _fotos(**filtros):
+    return list(RegistroFotografico.objects.filter(**filtros).values_list('pk', 'estudiante_id', 'imagen'))
+
+
+def _escribir_fotos(directorio, fotos, agregar=False):
+    """Copia las imágenes (pk, estudiante_id, imagen) al ZIP; retorna cuántas había en el disco."""
+    num_fotos = 0
+    with zipfile.ZipFile(directorio / ARCHIVO_FOTOS, 'a' if agregar else 'w') as archivo:
+        for _, estudiante_id, imagen in fotos:
+            if imagen and default_storage.exists(imagen):
+                # Las imágenes ya están comprimidas: se guardan tal cual (ZIP_STORED)
+                with default_storage.open(imagen) as origen, \
+                        archivo.open(f'{estudiante_id}/{Path(imagen).name}', 'w') as destino:
+                    shutil.copyfileobj(origen, destino)
+                num_fotos += 1
+    return num_fotos
+
+
+def archivar_y_purgar_grupo(grupo, semestre=None, incluir_fotos=True, desactivar_usuarios=True, formato=None):
+    """
+    Cierre de semestre: exporta el grupo al archivo, registra un ArchivoGrupo
+    y elimina al grupo de las tablas activas, todo en una transacción (las
+    fotografías se copian antes, sin el grupo bloqueado).
+
+    Las cuentas de usuario se conservan (desactivadas) para no perder el
+    historial de acceso. Retorna (archivo, resultado de eliminar_estudiantes).
+    """
+    semestre = semestre or semestre_actual()
+    formato = formato or (ArchivoGrupo.PARQUET if pyarrow_disponible() else ArchivoGrupo.NPZ)
+    ruta = f'grupo_{grupo}_{semestre}_{timezone.now():%Y%m%d%H%M%S}'
+    directorio = directorio_archivo() / ruta
+
+    directorio.mkdir(parents=True)
+    try:
+        num_fotos, copiadas = 0, set()
+        if incluir_fotos:
+            # Copiar las imágenes es lo más lento del cierre: se hace antes de bloquear el grupo
+            fotos = _fotos(estudiante__grupo=grupo)
+            num_fotos = _escribir_fotos(directorio, fotos)
+            copiadas = {pk for pk, _, _ in fotos}
+        with transaction.atomic():
+            # Bloquea el grupo: nada nuevo entra entre la exportación y el borrado
+            ids = list(Estudiante.objects.select_for_update().filter(grupo=grupo).values_list('pk', flat=True))
+            usuario_ids = list(
+                Estudiante.objects.filter(pk__in=ids, usuario__isnull=False).values_list('usuario_id', flat=True)
+            )
+            estudiantes, mediciones = _columnas_grupo(grupo)
+            if formato == ArchivoGrupo.PARQUET:
+                _escribir_parquet(directorio, estudiantes, mediciones)
+            else:
+                _escribir_npz(directorio, estudiantes, mediciones)
+            if incluir_fotos:
+                # Bajo el bloqueo solo se agregan las fotos subidas desde la copia (normalmente ninguna)
+                nuevas = [foto for foto in _fotos(estudiante_id__in=ids) if foto[0] not in copiadas]
+                if nuevas:
+                    num_fotos += _escribir_fotos(directorio, nuevas, agregar=True)
+
+            archivo = ArchivoGrupo.objects.create(
+                grupo=grupo,
+                semestre=semestre,
+                formato=formato,
+                ruta=ruta,
+                num_estudiantes=len(ids),
+                num_mediciones=len(mediciones['dia']),
+                num_fotos=num_fotos,
+                tamano=tamano_directorio(directorio),
+            )
+            resultado = eliminar_estudiantes(ids)
+            if desactivar_usuarios and usuario_ids:
+                from django.contrib.auth.models import User
+                resultado['usuarios_desactivados'] = User.objects.filter(pk__in=usuario_ids).update(is_active=False)
+    except BaseException:
+        # Sin transacción confirmada no debe quedar un archivo a medias
+        shutil.rmtree(directorio, ignore_errors=True)
+        raise
+    return archivo, resultado
+
+
+# ===== LECTURA =====
+
+def _extraer_columnas(directorio):
+    """Descomprime el NPZ a archivos .npy sueltos (una sola vez) para poder mapearlos."""
+    destino = directorio / DIRECTORIO_COLUMNAS
+    if destino.is_dir():
+        return destino
+    temporal = Path(tempfile.mkdtemp(dir=directorio, prefix='.columnas-'))
+    try:
+        with zipfile.ZipFile(directorio / ARCHIVO_NPZ) as archivo:
+            archivo.extractall(temporal)
+        # El renombrado es atómico: otro proceso ve el directorio completo o ninguno
+        os.rename(temporal, destino)
+    except OSError:
+        shutil.rmtree(temporal, ignore_errors=True)
+        if not destino.is_dir():
+            raise
+    return destino
+
+
+@lru_cache(maxsize=32)
+def _cargar(ruta, formato):
+    directorio = directorio_archivo() / ruta
+    if formato == ArchivoGrupo.PARQUET:
+        import pyarrow.parquet as pq
+
+        tablas = {}
+        for nombre in ('estudiantes', 'mediciones'):
+            tabla = pq.read_table(directorio / f'{nombre}.parquet', memory_map=True)
+            tablas[nombre] = {
+                campo: tabla.column(campo).to_numpy(zero_copy_only=False) for campo in tabla.column_names
+            }
+        return tablas['estudiantes'], tablas['mediciones']
+
+    columnas = _extraer_columnas(directorio)
+    return tuple(
+        {campo: np.load(columnas / f'{tabla}_{campo}.npy', mmap_mode='r') for campo in nombres}
+        for tabla, nombres in (('estudiantes', COLUMNAS_ESTUDIANTES), ('mediciones', COLUMNAS_MEDICIONES))
+    )
+
+
+def cargar_archivo(archivo):
+    """Retorna (estudiantes, mediciones): dicts de arrays de solo lectura del ArchivoGrupo."""
+    return _cargar(archivo.ruta, archivo.formato)
+
+
+def serie_estudiante(archivo, estudiante_id):
+    """
+    Serie (dias, alturas) y fila de resumen de un estudiante archivado, o None.
+    Solo lee el tramo [inicio, inicio + n) de las columnas mapeadas.
+    """
+    estudiantes, mediciones = cargar_archivo(archivo)
+    i = int(np.searchsorted(estudiantes['id'], estudiante_id))
+    if i >= len(estudiantes['id']) or estudiantes['id'][i] != estudiante_id:
+        return None
+    inicio, n = int(estudiantes['inicio'][i]), int(estudiantes['n'][i])
+    fila = {campo: _valor(estudiantes[campo][i]) for campo in COLUMNAS_ESTUDIANTES}
+    return (
+        np.asarray(mediciones['dia'][inicio:inicio + n]),
+        np.asarray(mediciones['altura'][inicio:inicio + n]),
+        fila,
+    )
+
+
+def filas_estudiantes(archivo):
+    """Una fila (dict) por estudiante archivado, para el navegador."""
+    estudiantes, _ = cargar_archivo(archivo)
+    return [
+        {campo: _valor(estudiantes[campo][i]) for campo in COLUMNAS_ESTUDIANTES}
+        for i in range(len(estudiantes['id']))
+    ]
+
+
+def obtener_curva_archivo(archivo):
+    """
+    Estadísticas por día del grupo archivado (mismo formato que las curvas
+    de obtener_curvas_grupos). El archivo no cambia: se cachea sin invalidación.
+    """
+    def calcular():
+        _, mediciones = cargar_archivo(archivo)
+        dias = np.asarray(mediciones['dia'])
+        estadisticas = calcular_estadisticas(np.zeros(len(dias)), dias, mediciones['altura'])
+        return [
+            {'dia': fila.dia, **{campo: getattr(fila, campo) for campo in CAMPOS_ESTADISTICAS}}
+            for fila in _filas_resumen(estadisticas)
+        ]
+    return obtener_o_calcular(f'archivo:{archivo.pk}', 'curva', calcular)
+
+
+def obtener_grafica_archivo(archivo):
+    return obtener_o_calcular(
+        f'archivo:{archivo.pk}', 'grafica',
+        lambda: generar_grafica_grupos({archivo.grupo: obtener_curva_archivo(archivo)}, {archivo.grupo: str(archivo)}),
+    )
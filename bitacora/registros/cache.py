@@ -0,0 +1,135 @@
+"""
+Caché de datos de la app registros.
+
+Las claves se agrupan en espacios de nombres versionados ("dashboard",
+"estudiante:15", ...). Invalidar un espacio solo incrementa su contador de
+versión: las entradas anteriores dejan de ser alcanzables y expiran solas, sin
+necesidad de borrar por patrón (algo que ningún backend soporta de forma portable).
+
+Las invalidaciones se declaran con el decorador ``invalida(Modelo)`` y se
+disparan desde las señales post_save/post_delete (ver signals.py).
+"""
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+PREFIJO = 'registros'
+
+# Tiempo de vida de los datos calculados (los contadores de versión no expiran)
+TIMEOUT_DATOS = getattr(settings, 'REGISTROS_CACHE_TIMEOUT', 60 * 60 * 24)
+
+_invalidaciones = defaultdict(list)
+
+
+def obtener_cache():
+    return caches[getattr(settings, 'REGISTROS_CACHE_ALIAS', 'default')]
+
+
+def _clave_version(espacio):
+    return f'{PREFIJO}:version:{espacio}'
+
+
+def _version_inicial():
+    # Basada en el reloj: si el contador se pierde (reinicio, desalojo) la nueva
+    # versión no coincide con ninguna anterior y no se sirven datos obsoletos.
+    return int(time.time() * 1000)
+
+
+def versiones(espacios):
+    """Retorna {espacio: versión} consultando la caché una sola vez."""
+    cache = obtener_cache()
+    claves = {_clave_version(espacio): espacio for espacio in espacios}
+    encontradas = cache.get_many(list(claves))
+    resultado = {claves[clave]: valor for clave, valor in encontradas.items()}
+
+    for espacio in espacios:
+        if espacio not in resultado:
+            clave = _clave_version(espacio)
+            cache.add(clave, _version_inicial(), timeout=None)
+            resultado[espacio] = cache.get(clave)
+    return resultado
+
+
+def version(espacio):
+    """Versión actual de un espacio de nombres (sirve como sello de los datos)."""
+    return versiones([espacio])[espacio]
+
+
+def construir_clave(espacio, version_espacio, *partes):
+    return ':'.join([PREFIJO, espacio, f'v{version_espacio}', *map(str, partes)])
+
+
+def clave(espacio, *partes):
+    """Clave namespaced y versionada, p. ej. registros:estudiante:3:v17:resumen"""
+    return construir_clave(espacio, version(espacio), *partes)
+
+
+def siguiente_version(espacio):
+    """Incrementa la versión de un espacio y retorna la nueva."""
+    cache = obtener_cache()
+    clave_version = _clave_version(espacio)
+    try:
+        return cache.incr(clave_version)
+    except ValueError:
+        # El contador no existía: cualquier valor nuevo invalida lo anterior
+        cache.add(clave_version, _version_inicial(), timeout=None)
+        return cache.get(clave_version)
+
+
+def invalidar(*espacios):
+    """Incrementa la versión de los espacios indicados."""
+    for espacio in espacios:
+        siguiente_version(espacio)
+
+
+def obtener_o_calcular(espacio, nombre, calcular, timeout=TIMEOUT_DATOS):
+    """Retorna el valor cacheado de ``nombre`` en ``espacio`` o lo calcula y guarda."""
+    cache = obtener_cache()
+    clave_valor = clave(espacio, nombre)
+    valor = cache.get(clave_valor)
+    if valor is None:
+        valor = calcular()
+        cache.set(clave_valor, valor, timeout)
+    return valor
+
+
+def espacio_estudiante(estudiante_id):
+    return f'estudiante:{estudiante_id}'
+
+
+# ===== REGISTRO DE INVALIDACIONES =====
+
+def invalida(modelo):
+    """
+    Decorador que registra una función ``func(instancia) -> [espacios]``.
+    Cuando una instancia de ``modelo`` se guarda o elimina, los espacios
+    retornados se invalidan al confirmar la transacción.
+    """
+    def decorador(func):
+        _invalidaciones[modelo].append(func)
+        return func
+    return decorador
+
+
+def espacios_afectados(modelo, instancia):
+    espacios = set()
+    for func in _invalidaciones.get(modelo, []):
+        espacios.update(func(instancia))
+    return espacios
+
+
+def _al_cambiar(sender, instance, **kwargs):
+    espacios = espacios_afectados(sender, instance)
+    if espacios:
+        # Tras el commit: así ninguna lectura concurrente vuelve a cachear datos viejos
+        transaction.on_commit(lambda: invalidar(*espacios))
+
+
+def conectar_senales():
+    for modelo in _invalidaciones:
+        post_save.connect(_al_cambiar, sender=modelo, dispatch_uid=f'cache_{modelo._meta.label}_save')
+        post_delete.connect(_al_cambiar, sender=modelo, dispatch_uid=f'cache_{modelo._meta.label}_delete')
@@ -0,0 +1,18 @@
+from django.core.cache.backends.redis import RedisCache
+
+
+class FakeRedisCache(RedisCache):
+    """
+    RedisCache que habla con un servidor Redis simulado en memoria (fakeredis).
+
+    Permite ejecutar pruebas con la misma semántica que producción (incr atómico,
+    expiración, get_many) sin levantar un servidor Redis. Todas las conexiones del
+    proceso comparten el mismo servidor simulado.
+    """
+
+    def __init__(self, server, params):
+        import fakeredis
+
+        opciones = dict(params.get('OPTIONS', {}))
+        opciones.setdefault('connection_class', fakeredis.FakeConnection)
+        super().__init__(server, {**params, 'OPTIONS': opciones})
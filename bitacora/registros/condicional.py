@@ -0,0 +1,123 @@
+"""
+GET condicional para las vistas que solo leen datos.
+
+La ETag de una página se calcula sin ejecutar la vista, con los sellos de
+versión de la caché (cache.versiones): cada escritura incrementa la versión de
+los espacios que afecta, así que mientras ninguna cambie la página es la misma.
+Si el navegador envía esa ETag en If-None-Match se responde 304 sin consultar
+las mediciones ni renderizar (ni generar la gráfica en base64 del análisis).
+
+La ETag incluye además todo lo que cambia el HTML sin cambiar los datos: la
+URL completa (filtros, día a predecir), el usuario, la cookie CSRF (el token
+de los formularios) y la versión del despliegue (plantillas). Con mensajes
+pendientes no hay GET condicional: la página debe mostrarlos.
+
+Last-Modified sale de MedicionPlantas.fecha_registro y RegistroFotografico.fecha.
+Ambas son fechas de creación, así que solo es informativo: la ETag manda
+(RFC 9110: If-None-Match tiene prioridad sobre If-Modified-Since). Se calcula
+una vez por ETag y se guarda en la caché.
+
+GZipMiddleware marca la ETag como débil (W/"...") cuando comprime; If-None-Match
+usa comparación débil, así que la revalidación funciona igual.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.db.models import Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .cache import PREFIJO, TIMEOUT_DATOS, obtener_cache, versiones
+
+# Sin REGISTROS_VERSION_DESPLIEGUE cada proceso usa su hora de arranque: tras un
+# despliegue ninguna ETag anterior coincide (aunque los procesos no compartan ETags)
+_ARRANQUE = str(int(time.time()))
+
+# Marca en la caché de "sin fecha" (None es un fallo de caché)
+_SIN_FECHA = 0
+
+
+def _version_despliegue():
+    return getattr(settings, 'REGISTROS_VERSION_DESPLIEGUE', '') or _ARRANQUE
+
+
+def calcular_etag(request, espacios):
+    """ETag fuerte (entre comillas) de la página pedida dados sus espacios de caché."""
+    usuario = request.user
+    partes = [
+        _version_despliegue(),
+        request.get_full_path(),
+        # Lo que la barra de navegación muestra del usuario
+        f'{usuario.pk}:{usuario.get_username()}:{usuario.get_full_name()}',
+        f'{usuario.is_staff}:{usuario.is_superuser}',
+        request.META.get('CSRF_COOKIE', ''),
+    ]
+    partes.extend(f'{espacio}={valor}' for espacio, valor in sorted(versiones(espacios).items()))
+    return '"%s"' % hashlib.sha256('\n'.join(partes).encode()).hexdigest()[:32]
+
+
+def ultima_fecha(mediciones=None, fotos=None):
+    """Fecha más reciente entre las mediciones y fotografías dadas (querysets), o None."""
+    fechas = []
+    if mediciones is not None:
+        fechas.append(mediciones.aggregate(ultima=Max('fecha_registro'))['ultima'])
+    if fotos is not None:
+        fechas.append(fotos.aggregate(ultima=Max('fecha'))['ultima'])
+    return max((fecha for fecha in fechas if fecha), default=None)
+
+
+def _marca_ultima_modificacion(etag, calcular):
+    cache = obtener_cache()
+    clave = '%s:condicional:%s:ultima_modificacion' % (PREFIJO, etag.strip('"'))
+    marca = cache.get(clave)
+    if marca is None:
+        fecha = calcular()
+        marca = int(fecha.timestamp()) if fecha else _SIN_FECHA
+        cache.set(clave, marca, TIMEOUT_DATOS)
+    return marca or None
+
+
+def condicional(espacios, ultima_modificacion=None):
+    """
+    Decorador de GET condicional para vistas de solo lectura.
+
+    ``espacios`` es la lista de espacios de caché de los que depende la página,
+    o una función ``(request, *args, **kwargs) -> lista | None``; None desactiva
+    el GET condicional para esa solicitud (p. ej. sin permiso: la vista decide).
+    ``ultima_modificacion(request, *args, **kwargs) -> datetime | None`` da el
+    Last-Modified.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or len(get_messages(request)):
+                return vista(request, *args, **kwargs)
+            lista = espacios(request, *args, **kwargs) if callable(espacios) else espacios
+            if lista is None:
+                return vista(request, *args, **kwargs)
+
+            etag = calcular_etag(request, lista)
+            marca = None
+            if ultima_modificacion is not None:
+                marca = _marca_ultima_modificacion(
+                    etag, lambda: ultima_modificacion(request, *args, **kwargs),
+                )
+
+            respuesta = get_conditional_response(request, etag=etag, last_modified=marca)
+            if respuesta is None:
+                respuesta = vista(request, *args, **kwargs)
+                # Redirecciones (sin permiso, sin datos suficientes) y errores no se validan
+                if respuesta.status_code != 200:
+                    return respuesta
+            # También en el 304, para que el navegador conserve los validadores
+            respuesta.headers.setdefault('ETag', etag)
+            if marca and not respuesta.has_header('Last-Modified'):
+                respuesta.headers['Last-Modified'] = http_date(marca)
+            # Páginas por usuario: que ningún proxy las comparta y el navegador siempre revalide
+            patch_cache_control(respuesta, private=True, no_cache=True)
+            return respuesta
+        return envoltura
+    return decorador
@@ -0,0 +1,199 @@
+"""
+Creación y asociación de cuentas de usuario para estudiantes.
+
+Lo usan los comandos de gestión de cuentas y la tarea
+crear_usuarios_estudiantes (ver registros/tareas.py).
+
+Todo se resuelve por conjuntos: una consulta para los nombres de usuario o
+correos existentes, colisiones resueltas en memoria, contraseñas cifradas en
+un pool de procesos y escrituras con bulk_create/bulk_update.
+"""
+import secrets
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .cache import invalidar
+from .models import Estudiante
+
+TAMANO_LOTE = 500
+
+# Por debajo de este número de contraseñas no compensa arrancar procesos
+MIN_CONTRASENAS_POOL = 8
+
+
+def _inicializar_proceso():
+    # Con el método "spawn" (macOS, Windows) el proceso hijo arranca sin Django configurado
+    if not apps.ready:
+        django.setup()
+
+
+def cifrar_contrasenas(contrasenas, procesos=None):
+    """
+    Retorna {contraseña: hash}. Cada contraseña distinta se cifra una vez;
+    si son muchas se reparten entre varios procesos (el hash es CPU puro).
+    """
+    distintas = list(dict.fromkeys(contrasenas))
+    if len(distintas) < MIN_CONTRASENAS_POOL or procesos == 1:
+        return {contrasena: make_password(contrasena) for contrasena in distintas}
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso) as pool:
+        hashes = pool.map(make_password, distintas, chunksize=max(1, len(distintas) // 64))
+        return dict(zip(distintas, hashes))
+
+
+def generar_contrasena():
+    return secrets.token_urlsafe(9)
+
+
+def _nombre_usuario_base(nombre):
+    return nombre.lower().replace(' ', '_')[:140]
+
+
+def _clave_colision(username):
+    """
+    Nombre de usuario tal como lo compara el índice único de la base de datos.
+    Con la intercalación por defecto de MySQL (utf8mb4_0900_ai_ci) no importan
+    mayúsculas ni acentos: 'maría_lópez' choca con 'Maria_Lopez'.
+    """
+    descompuesto = unicodedata.normalize('NFKD', username)
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).casefold()
+
+
+def _separar_nombre(nombre):
+    partes = nombre.split()
+    first_name = partes[0] if partes else nombre
+    last_name = ' '.join(partes[1:])
+    return first_name[:150], last_name[:150]
+
+
+def crear_usuarios_para_estudiantes(password=None, password_hash=None, aleatorias=False, procesos=None):
+    """
+    Crea y asocia un usuario para cada estudiante sin usuario.
+
+    Args:
+        password: contraseña común en claro
+        password_hash: contraseña común ya cifrada (la que usa la tarea en
+                       segundo plano para no guardar la contraseña en la cola)
+        aleatorias: genera una contraseña distinta para cada estudiante
+        procesos: procesos para cifrar contraseñas (por defecto, uno por CPU)
+
+    Returns:
+        dict con 'creados' ([username, nombre, contraseña o None]) y
+        'errores' ([nombre, mensaje])
+    """
+    estudiantes = list(
+        Estudiante.objects.filter(usuario__isnull=True).order_by('pk')
+        .only('pk', 'nombre', 'correo_institucional')
+    )
+    creados = []
+    errores = []
+    if not estudiantes:
+        return {'creados': creados, 'errores': errores}
+
+    # Una sola consulta: todos los nombres de usuario ocupados, comparados como la base de datos
+    ocupados = {_clave_colision(username) for username in User.objects.values_list('username', flat=True)}
+
+    nuevos = []
+    for estudiante in estudiantes:
+        nombre_base = _nombre_usuario_base(estudiante.nombre)
+        if not nombre_base:
+            errores.append([estudiante.nombre, 'El nombre está vacío'])
+            continue
+        # Si el username ya existe, agregar número
+        username = nombre_base
+        contador = 1
+        while _clave_colision(username) in ocupados:
+            username = f"{nombre_base}{contador}"
+            contador += 1
+        ocupados.add(_clave_colision(username))
+        contrasena = generar_contrasena() if aleatorias else password
+        nuevos.append((estudiante, username, contrasena))
+
+    if password_hash and not aleatorias:
+        hashes = {None: password_hash}
+        nuevos = [(estudiante, username, None) for estudiante, username, _ in nuevos]
+    else:
+        hashes = cifrar_contrasenas([contrasena for _, _, contrasena in nuevos], procesos)
+
+    usuarios = []
+    for estudiante, username, contrasena in nuevos:
+        first_name, last_name = _separar_nombre(estudiante.nombre)
+        usuarios.append(User(
+            username=username,
+            email=estudiante.correo_institucional,
+            password=hashes[contrasena],
+            first_name=first_name,
+            last_name=last_name,
+        ))
+
+    with transaction.atomic():
+        User.objects.bulk_create(usuarios, batch_size=TAMANO_LOTE)
+        # MySQL no retorna los ids de bulk_create: se leen con una consulta
+        ids = dict(
+            User.objects.filter(username__in=[usuario.username for usuario in usuarios])
+            .values_list('username', 'id')
+        )
+        for estudiante, username, _ in nuevos:
+            estudiante.usuario_id = ids[username]
+        Estudiante.objects.bulk_update([estudiante for estudiante, _, _ in nuevos], ['usuario'], batch_size=TAMANO_LOTE)
+        # bulk_update no envía señales: se invalida la caché a mano
+        transaction.on_commit(lambda: invalidar('dashboard'))
+
+    for estudiante, username, contrasena in nuevos:
+        creados.append([username, estudiante.nombre, contrasena if aleatorias else None])
+    return {'creados': creados, 'errores': errores}
+
+
+def asociar_por_correo():
+    """
+    Asocia cada estudiante sin usuario con el usuario libre que tenga su mismo
+    correo, con una consulta de lectura y una actualización en bloque.
+
+    Returns:
+        dict con 'asociados' ([nombre, username]), 'no_encontrados'
+        ([nombre, correo]) y 'ambiguos' ([nombre, correo])
+    """
+    estudiantes = list(
+        Estudiante.objects.filter(usuario__isnull=True).order_by('pk')
+        .only('pk', 'nombre', 'correo_institucional')
+    )
+    resultado = {'asociados': [], 'no_encontrados': [], 'ambiguos': []}
+    if not estudiantes:
+        return resultado
+
+    # Usuarios con alguno de los correos y que aún no están asociados a otro estudiante
+    por_correo = {}
+    candidatos = (
+        User.objects
+        .filter(email__in={estudiante.correo_institucional for estudiante in estudiantes}, estudiante__isnull=True)
+        .values_list('email', 'id', 'username')
+    )
+    for email, usuario_id, username in candidatos:
+        por_correo.setdefault(email.lower(), []).append((usuario_id, username))
+
+    asociados = []
+    usados = set()
+    for estudiante in estudiantes:
+        correo = estudiante.correo_institucional
+        usuarios = por_correo.get(correo.lower(), [])
+        if not usuarios:
+            resultado['no_encontrados'].append([estudiante.nombre, correo])
+        elif len(usuarios) > 1 or usuarios[0][0] in usados:
+            resultado['ambiguos'].append([estudiante.nombre, correo])
+        else:
+            usuario_id, username = usuarios[0]
+            usados.add(usuario_id)
+            estudiante.usuario_id = usuario_id
+            asociados.append(estudiante)
+            resultado['asociados'].append([estudiante.nombre, username])
+
+    with transaction.atomic():
+        Estudiante.objects.bulk_update(asociados, ['usuario'], batch_size=TAMANO_LOTE)
+        transaction.on_commit(lambda: invalidar('dashboard'))
+    return resultado
@@ -0,0 +1,133 @@
+"""
+Servicio de eliminación de estudiantes, mediciones y registros fotográficos.
+
+En lugar del recolector del ORM (que carga en memoria cada fila relacionada
+para enviar señales), borra en cascada con DELETE por lotes de claves
+primarias, recoge las rutas de las imágenes (y de sus miniaturas) y encola su borrado del disco en
+la misma transacción: los archivos solo se eliminan si el borrado se confirma.
+Después deja al día los resúmenes materializados y la caché.
+"""
+from django.db import router, transaction
+
+from .cache import espacio_estudiante, invalidar
+from .eventos import publicar_resumenes
+from .grupos import reconstruir_resumen_grupos
+from .instantanea import registrar_cambios
+from .models import Estudiante, MedicionPlantas, RegistroFotografico, ResumenEstudiante
+from .prediccion import reconstruir_resumenes
+from .tareas import encolar
+
+TAMANO_LOTE = 1000
+
+# Archivos por tarea de borrado
+ARCHIVOS_POR_TAREA = 500
+
+
+def _borrar_por_lotes(queryset, tamano=TAMANO_LOTE):
+    """DELETE ... WHERE pk IN (...) en lotes, sin cargar instancias ni enviar señales."""
+    modelo = queryset.model
+    db = router.db_for_write(modelo)
+    queryset = queryset.using(db)
+    total = 0
+    while True:
+        pks = list(queryset.values_list('pk', flat=True)[:tamano])
+        if not pks:
+            return total
+        total += modelo.objects.using(db).filter(pk__in=pks)._raw_delete(db)
+
+
+def _archivos_de(fotos):
+    """Rutas de las imágenes y miniaturas de los registros fotográficos."""
+    return [nombre for fila in fotos.values_list('imagen', 'miniatura') for nombre in fila]
+
+
+def _encolar_borrado_archivos(nombres):
+    """Encola (dentro de la transacción actual) el borrado de los archivos del disco."""
+    nombres = [nombre for nombre in nombres if nombre]
+    for inicio in range(0, len(nombres), ARCHIVOS_POR_TAREA):
+        encolar('eliminar_archivos', {'nombres': nombres[inicio:inicio + ARCHIVOS_POR_TAREA]})
+    return len(nombres)
+
+
+def sincronizar_al_confirmar(estudiante_ids, grupos, dashboard=True, series=True, extra=()):
+    """Deja al día instantánea, resumen por grupo y caché al confirmar escrituras hechas sin señales."""
+    if series:
+        registrar_cambios(estudiante_ids)
+    espacios = [espacio_estudiante(pk) for pk in estudiante_ids]
+    if dashboard:
+        espacios.append('dashboard')
+    espacios.extend(extra)
+    grupos = sorted(set(grupos))
+
+    def sincronizar():
+        if grupos:
+            reconstruir_resumen_grupos(grupos)
+        invalidar(*espacios)
+        publicar_resumenes(estudiante_ids)
+    transaction.on_commit(sincronizar)
+
+
+# ===== OPERACIONES =====
+
+def eliminar_estudiantes(estudiante_ids):
+    """
+    Elimina estudiantes con sus mediciones, fotografías y resúmenes.
+    Retorna un dict con el número de filas y archivos eliminados.
+    """
+    estudiante_ids = list(estudiante_ids)
+    with transaction.atomic():
+        # Bloquea los estudiantes para que no entren mediciones nuevas mientras se borran
+        grupos = list(
+            Estudiante.objects.select_for_update()
+            .filter(pk__in=estudiante_ids).values_list('grupo', flat=True)
+        )
+        fotos = RegistroFotografico.objects.filter(estudiante_id__in=estudiante_ids)
+        archivos = _archivos_de(fotos)
+
+        resultado = {
+            'registros_fotograficos': _borrar_por_lotes(fotos),
+            'mediciones': _borrar_por_lotes(MedicionPlantas.objects.filter(estudiante_id__in=estudiante_ids)),
+        }
+        _borrar_por_lotes(ResumenEstudiante.objects.filter(estudiante_id__in=estudiante_ids))
+        resultado['estudiantes'] = _borrar_por_lotes(Estudiante.objects.filter(pk__in=estudiante_ids))
+        resultado['archivos'] = _encolar_borrado_archivos(archivos)
+        # 'estudiantes': opciones de los selectores de los formularios
+        sincronizar_al_confirmar(estudiante_ids, grupos, extra=['estudiantes', 'fotos'])
+    return resultado
+
+
+def eliminar_mediciones(medicion_ids):
+    """Elimina mediciones (y sus fotografías) actualizando los resúmenes afectados."""
+    medicion_ids = list(medicion_ids)
+    with transaction.atomic():
+        mediciones = MedicionPlantas.objects.filter(pk__in=medicion_ids)
+        afectados = list(mediciones.values_list('estudiante_id', 'estudiante__grupo').distinct())
+        fotos = RegistroFotografico.objects.filter(medicion_id__in=medicion_ids)
+        archivos = _archivos_de(fotos)
+
+        resultado = {
+            'registros_fotograficos': _borrar_por_lotes(fotos),
+            'mediciones': _borrar_por_lotes(mediciones),
+            'archivos': _encolar_borrado_archivos(archivos),
+        }
+        estudiante_ids = [estudiante_id for estudiante_id, _ in afectados]
+        reconstruir_resumenes(estudiante_ids)
+        sincronizar_al_confirmar(estudiante_ids, [grupo for _, grupo in afectados], extra=['fotos'])
+    return resultado
+
+
+def eliminar_registros_fotograficos(registro_ids):
+    """Elimina registros fotográficos y encola el borrado de sus imágenes."""
+    registro_ids = list(registro_ids)
+    with transaction.atomic():
+        fotos = RegistroFotografico.objects.filter(pk__in=registro_ids)
+        estudiante_ids = sorted(set(fotos.values_list('estudiante_id', flat=True)))
+        archivos = _archivos_de(fotos)
+
+        resultado = {
+            'registros_fotograficos': _borrar_por_lotes(fotos),
+            'archivos': _encolar_borrado_archivos(archivos),
+        }
+        reconstruir_resumenes(estudiante_ids)
+        sincronizar_al_confirmar(estudiante_ids, [], dashboard=False, series=False, extra=['fotos'])
+    return resultado
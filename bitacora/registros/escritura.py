@@ -0,0 +1,336 @@
+"""
+Escritura segura de mediciones frente a reintentos y ediciones concurrentes.
+
+- Idempotencia: cada formulario lleva una clave (UUID) que se guarda en
+  SolicitudIdempotente dentro de la misma transacción que la medición. Un
+  reenvío con la misma clave (doble clic, el navegador reintenta tras un corte
+  de red) se reconoce con una consulta por índice único y no vuelve a escribir
+  ni la medición ni la fotografía. Si los dos envíos llegan a la vez, el
+  segundo espera en el índice único de la clave hasta que el primero confirma.
+- Bloqueo optimista: MedicionPlantas.version se incrementa en cada edición; al
+  guardar un formulario de edición se compara con la versión que se mostró y,
+  si otra persona guardó antes, se rechaza en lugar de sobrescribir.
+- Upsert: si otra solicitud registró el mismo estudiante y día entre la
+  validación y el INSERT, la medición se actualiza con una sola sentencia
+  (INSERT ... ON DUPLICATE KEY UPDATE en MySQL, ON CONFLICT DO UPDATE en
+  PostgreSQL y SQLite) en lugar de terminar en un error 500.
+- Sincronización: las mediciones guardadas sin conexión por scripts.js llegan
+  en lotes, cada una con su clave, y se aplican con el mismo upsert.
+- Subidas por partes: si la fotografía llegó antes en fragmentos
+  (registros/subidas.py), la tarea que la adjunta se encola en la misma
+  transacción que la medición.
+"""
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, connections, router, transaction
+from django.utils import timezone
+
+from .eliminacion import sincronizar_al_confirmar
+from .models import Estudiante, MedicionPlantas, RegistroFotografico, SolicitudIdempotente
+from .prediccion import reconstruir_resumenes
+from .tareas import encolar
+
+CREADA = 'creada'
+ACTUALIZADA = 'actualizada'
+REPETIDA = 'repetida'
+
+# Filas por sentencia en upsert_mediciones
+TAMANO_LOTE_UPSERT = 500
+
+# Un reintento llega en segundos o minutos; las claves más viejas ya no sirven
+ANTIGUEDAD_SOLICITUDES = timedelta(days=2)
+
+_CAMPOS_UPSERT = ('estudiante', 'dia', 'altura', 'atipica', 'version', 'fecha_registro')
+
+
+class ConflictoVersion(Exception):
+    """La medición cambió desde que se abrió el formulario de edición."""
+
+    def __init__(self, version_actual):
+        super().__init__(f'La medición ya va en la versión {version_actual}')
+        self.version_actual = version_actual
+
+
+# ===== CLAVES DE IDEMPOTENCIA =====
+
+def nueva_clave():
+    return uuid.uuid4()
+
+
+def clave_de(datos, campo='clave_idempotencia'):
+    """Clave enviada en ``datos`` (request.POST), o None si falta o no es un UUID."""
+    try:
+        return uuid.UUID(str(datos.get(campo, '')))
+    except ValueError:
+        return None
+
+
+def solicitud_procesada(clave):
+    """SolicitudIdempotente ya confirmada con esta clave, o None."""
+    if clave is None:
+        return None
+    return SolicitudIdempotente.objects.filter(clave=clave).first()
+
+
+def _reservar(clave, usuario):
+    """
+    Inserta la clave (dentro de la transacción en curso). Retorna None si ya
+    existe: otra solicitud con la misma clave se procesó o se está procesando.
+    """
+    if clave is None:
+        return SolicitudIdempotente(usuario=usuario)
+    try:
+        with transaction.atomic():
+            return SolicitudIdempotente.objects.create(clave=clave, usuario=usuario)
+    except IntegrityError:
+        return None
+
+
+def _completar(solicitud, medicion):
+    if solicitud.pk is not None:
+        SolicitudIdempotente.objects.filter(pk=solicitud.pk).update(medicion=medicion)
+
+
+def purgar_solicitudes(antiguedad=ANTIGUEDAD_SOLICITUDES):
+    """Borra las claves de idempotencia más viejas que ``antiguedad``."""
+    limite = timezone.now() - antiguedad
+    return SolicitudIdempotente.objects.filter(creada__lt=limite).delete()[0]
+
+
+# ===== UPSERT =====
+
+def _sql_upsert(conexion, num_filas):
+    q = conexion.ops.quote_name
+    meta = MedicionPlantas._meta
+    tabla = q(meta.db_table)
+    columnas = {campo: q(meta.get_field(campo).column) for campo in _CAMPOS_UPSERT}
+    marcadores = ', '.join(['(' + ', '.join(['%s'] * len(columnas)) + ')'] * num_filas)
+    insertar = f'INSERT INTO {tabla} ({", ".join(columnas.values())}) VALUES {marcadores}'
+    altura, atipica, version = columnas['altura'], columnas['atipica'], columnas['version']
+
+    if conexion.vendor == 'mysql':
+        if not conexion.mysql_is_mariadb and conexion.mysql_version >= (8, 0, 19):
+            # VALUES() en ON DUPLICATE KEY UPDATE está obsoleto desde MySQL 8.0.20: alias de fila
+            return (
+                f'{insertar} AS nueva ON DUPLICATE KEY UPDATE {altura} = nueva.{altura}, '
+                f'{atipica} = nueva.{atipica}, {version} = {tabla}.{version} + 1'
+            )
+        # MariaDB y MySQL anteriores no aceptan el alias
+        return (
+            f'{insertar} ON DUPLICATE KEY UPDATE {altura} = VALUES({altura}), '
+            f'{atipica} = VALUES({atipica}), {version} = {version} + 1'
+        )
+    return (
+        f'{insertar} ON CONFLICT ({columnas["estudiante"]}, {columnas["dia"]}) DO UPDATE SET '
+        f'{altura} = EXCLUDED.{altura}, {atipica} = EXCLUDED.{atipica}, {version} = {tabla}.{version} + 1'
+    )
+
+
+def upsert_mediciones(mediciones):
+    """
+    Inserta o actualiza por (estudiante, día) las mediciones dadas (instancias
+    sin guardar) en sentencias de hasta TAMANO_LOTE_UPSERT filas. No envía
+    señales: los resúmenes, la instantánea y la caché se actualizan aquí.
+    Retorna {(estudiante_id, dia): pk}.
+    """
+    # Una misma clave dos veces en una sentencia falla en PostgreSQL: gana la última
+    filas = {(m.estudiante_id, m.dia): m for m in mediciones}
+    if not filas:
+        return {}
+
+    db = router.db_for_write(MedicionPlantas)
+    conexion = connections[db]
+    campos = [MedicionPlantas._meta.get_field(campo) for campo in _CAMPOS_UPSERT]
+    ahora = timezone.now()
+
+    with transaction.atomic(using=db):
+        lista = list(filas.values())
+        with conexion.cursor() as cursor:
+            for inicio in range(0, len(lista), TAMANO_LOTE_UPSERT):
+                lote = lista[inicio:inicio + TAMANO_LOTE_UPSERT]
+                parametros = []
+                for medicion in lote:
+                    medicion.version = 1
+                    medicion.fecha_registro = medicion.fecha_registro or ahora
+                    parametros.extend(
+                        campo.get_db_prep_save(getattr(medicion, campo.attname), conexion) for campo in campos
+                    )
+                cursor.execute(_sql_upsert(conexion, len(lote)), parametros)
+
+        estudiante_ids = sorted({estudiante_id for estudiante_id, _ in filas})
+        pks = {
+            (estudiante_id, dia): pk
+            for estudiante_id, dia, pk in MedicionPlantas.objects.using(db)
+            .filter(estudiante_id__in=estudiante_ids, dia__in={dia for _, dia in filas})
+            .values_list('estudiante_id', 'dia', 'pk')
+            if (estudiante_id, dia) in filas
+        }
+        reconstruir_resumenes(estudiante_ids)
+        grupos = Estudiante.objects.using(db).filter(pk__in=estudiante_ids).values_list('grupo', flat=True)
+        sincronizar_al_confirmar(estudiante_ids, list(grupos))
+    return pks
+
+
+# ===== OPERACIONES =====
+
+def guardar_foto(medicion, imagen, comentario, registro=None):
+    """
+    Crea o actualiza la fotografía de la medición. La imagen reemplazada se
+    borra del disco en segundo plano. Retorna el registro, o None si no hay.
+    """
+    if registro is None:
+        if not imagen:
+            return None
+        return RegistroFotografico.objects.create(
+            medicion=medicion, estudiante_id=medicion.estudiante_id, imagen=imagen, comentario=comentario,
+        )
+    imagen_anterior = None
+    if imagen:
+        imagen_anterior = registro.imagen.name
+        registro.imagen = imagen
+    registro.comentario = comentario
+    registro.save()
+    if imagen_anterior:
+        encolar('eliminar_archivos', {'nombres': [imagen_anterior]})
+    return registro
+
+
+def programar_adjunto(subida, usuario=None, medicion=None, estudiante_id=None, comentario=''):
+    """
+    Encola la tarea adjuntar_subida para una subida por partes terminada
+    (``subida`` es la información que deja SubidaPorPartesMixin en
+    cleaned_data): a la fotografía de ``medicion`` o, sin medición, como
+    registro fotográfico nuevo de ``estudiante_id``. Con ``subida`` None no
+    hace nada.
+    """
+    if not subida:
+        return None
+    argumentos = {'subida': subida['id'], 'comentario': comentario or ''}
+    if medicion is not None:
+        argumentos['medicion_id'] = medicion.pk
+    else:
+        argumentos['estudiante_id'] = estudiante_id
+    return encolar('adjuntar_subida', argumentos, clave=f'subida:{subida["id"]}', usuario=usuario)
+
+
+def guardar_nueva(form, clave=None, usuario=None):
+    """
+    Guarda un MedicionPlantasForm de registro ya validado, con su fotografía.
+    Retorna (medicion, estado) con estado CREADA, ACTUALIZADA (otra solicitud
+    había registrado ese día: se aplicó el upsert) o REPETIDA (la clave ya se
+    había procesado; medicion es None).
+    """
+    imagen = form.cleaned_data.get('imagen')
+    comentario = form.cleaned_data.get('comentario', '')
+    with transaction.atomic():
+        solicitud = _reservar(clave, usuario)
+        if solicitud is None:
+            return None, REPETIDA
+        try:
+            with transaction.atomic():
+                medicion = form.save()
+            estado, registro = CREADA, None
+        except IntegrityError:
+            # El estudiante y día se registraron después de validar el formulario
+            nueva = form.instance
+            pk = upsert_mediciones([nueva])[(nueva.estudiante_id, nueva.dia)]
+            medicion = MedicionPlantas.objects.select_related('foto').get(pk=pk)
+            estado, registro = ACTUALIZADA, getattr(medicion, 'foto', None)
+        guardar_foto(medicion, imagen, comentario, registro)
+        programar_adjunto(form.cleaned_data.get('subida'), usuario, medicion=medicion, comentario=comentario)
+        _completar(solicitud, medicion)
+    return medicion, estado
+
+
+def guardar_edicion(form, version, clave=None, usuario=None, registro=None):
+    """
+    Guarda un MedicionPlantasForm de edición ya validado, con su fotografía.
+    Si ``version`` (la que se mostró en el formulario) ya no es la actual, o
+    falta (formulario viejo o manipulado), lanza ConflictoVersion sin escribir
+    nada. Retorna (medicion, estado) con estado ACTUALIZADA o REPETIDA.
+    """
+    imagen = form.cleaned_data.get('imagen')
+    comentario = form.cleaned_data.get('comentario', '')
+    with transaction.atomic():
+        solicitud = _reservar(clave, usuario)
+        if solicitud is None:
+            return None, REPETIDA
+        # La fila queda bloqueada hasta confirmar: nadie guarda entre la comparación y el UPDATE
+        actual = (
+            MedicionPlantas.objects.select_for_update()
+            .filter(pk=form.instance.pk).values_list('version', flat=True).first()
+        )
+        if actual is None or actual != version:
+            raise ConflictoVersion(actual)
+        form.instance.version = actual
+        medicion = form.save()
+        guardar_foto(medicion, imagen, comentario, registro)
+        programar_adjunto(form.cleaned_data.get('subida'), usuario, medicion=medicion, comentario=comentario)
+        _completar(solicitud, medicion)
+    return medicion, ACTUALIZADA
+
+
+def sincronizar_lote(entradas, usuario=None):
+    """
+    Aplica un lote de mediciones guardadas sin conexión. ``entradas`` son
+    dicts ya validados con clave, estudiante_id, dia, altura, atipica, imagen
+    y comentario. Las claves ya procesadas no se vuelven a escribir; las demás
+    se reservan primero (antes de guardar fotografías) y las mediciones se
+    escriben con upsert_mediciones en una sola sentencia por lote.
+    Retorna {clave: (medicion_id, estado)}.
+    """
+    # Una clave repetida dentro del lote cuenta una vez
+    entradas = list({entrada['clave']: entrada for entrada in entradas}.values())
+    for intento in range(2):
+        try:
+            return _sincronizar(entradas, usuario)
+        except IntegrityError:
+            # Otra solicitud con alguna de estas claves confirmó primero: al repetir, ya figuran como procesadas
+            if intento:
+                raise
+
+
+def _sincronizar(entradas, usuario):
+    with transaction.atomic():
+        procesadas = dict(
+            SolicitudIdempotente.objects.filter(clave__in=[e['clave'] for e in entradas])
+            .values_list('clave', 'medicion_id')
+        )
+        resultado = {clave: (medicion_id, REPETIDA) for clave, medicion_id in procesadas.items()}
+        nuevas = [e for e in entradas if e['clave'] not in procesadas]
+        if not nuevas:
+            return resultado
+
+        SolicitudIdempotente.objects.bulk_create(
+            [SolicitudIdempotente(clave=e['clave'], usuario=usuario) for e in nuevas]
+        )
+        dias = {e['dia'] for e in nuevas}
+        existentes = set(
+            MedicionPlantas.objects.filter(estudiante_id__in={e['estudiante_id'] for e in nuevas}, dia__in=dias)
+            .values_list('estudiante_id', 'dia')
+        )
+        pks = upsert_mediciones([
+            MedicionPlantas(estudiante_id=e['estudiante_id'], dia=e['dia'], altura=e['altura'], atipica=e['atipica'])
+            for e in nuevas
+        ])
+
+        fotos = {
+            registro.medicion_id: registro
+            for registro in RegistroFotografico.objects.filter(medicion_id__in=pks.values())
+        }
+        for entrada in nuevas:
+            pk = pks[(entrada['estudiante_id'], entrada['dia'])]
+            registro = fotos.get(pk)
+            # Sin imagen nueva solo se actualiza el comentario de una fotografía que ya exista
+            if entrada['imagen'] or (registro and entrada['comentario']):
+                medicion = MedicionPlantas(pk=pk, estudiante_id=entrada['estudiante_id'])
+                fotos[pk] = guardar_foto(medicion, entrada['imagen'], entrada['comentario'], registro)
+            estado = ACTUALIZADA if (entrada['estudiante_id'], entrada['dia']) in existentes else CREADA
+            resultado[entrada['clave']] = (pk, estado)
+
+        reservas = list(SolicitudIdempotente.objects.filter(clave__in=[e['clave'] for e in nuevas]))
+        for reserva in reservas:
+            reserva.medicion_id = resultado[reserva.clave][0]
+        SolicitudIdempotente.objects.bulk_update(reservas, ['medicion'], batch_size=TAMANO_LOTE_UPSERT)
+    return resultado
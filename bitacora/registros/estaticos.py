@@ -0,0 +1,216 @@
+"""
+Canal de archivos estáticos para producción.
+
+``collectstatic`` con AlmacenEstaticos:
+
+1. Minifica CSS y JS (con rcssmin/rjsmin si están instalados; si no, con un
+   minificador conservador que solo quita comentarios y espacios).
+2. Nombra cada archivo con el hash de su contenido (ManifestStaticFilesStorage):
+   ``custom.css`` pasa a ``custom.3f2a9c1e.css`` y las plantillas lo obtienen
+   con ``{% static %}``. Un cambio de contenido es un nombre nuevo, así que ya
+   no hace falta ``?v=`` para forzar la recarga.
+3. Guarda junto a cada archivo comprimible sus variantes ``.gz`` y, si está
+   instalado el paquete brotli, ``.br``.
+
+EstaticosMiddleware (registros/middleware.py) sirve después STATIC_ROOT desde
+el propio proceso, como WhiteNoise: elige la variante comprimida según
+Accept-Encoding y marca los archivos con hash como inmutables durante un año,
+así las visitas repetidas no vuelven a pedirlos.
+"""
+import gzip
+import json
+import mimetypes
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.utils.http import http_date
+
+# Extensiones que ya vienen comprimidas: no se gana nada con gzip/brotli
+SIN_COMPRIMIR = {
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.avif', '.ico',
+    '.woff', '.woff2', '.zip', '.gz', '.br', '.mp4', '.webm',
+}
+
+# Una variante comprimida solo se guarda si ahorra al menos este porcentaje
+AHORRO_MINIMO = 0.05
+
+VARIANTES = (('br', '.br'), ('gzip', '.gz'))
+
+
+# ===== MINIFICACIÓN =====
+
+_CADENA_CSS = r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\''
+_COMENTARIO_CSS = re.compile(rf'({_CADENA_CSS})|/\*.*?\*/', re.S)
+# Cada cadena se consume entera antes de probar las otras alternativas: los espacios y los
+# ; de content: " ; } " o url("a b.png") no se tocan
+_ESPACIO_CSS = re.compile(rf'({_CADENA_CSS})|\s*;?\s*(}})\s*|\s*([{{;,>])\s*|\s+', re.S)
+
+
+def _compactar_css(coincidencia):
+    cadena, cierre, separador = coincidencia.groups()
+    return cadena or cierre or separador or ' '
+
+
+def minificar_css(texto):
+    try:
+        import rcssmin
+    except ImportError:
+        # Conserva las cadenas; los comentarios /*! ... */ también se van
+        texto = _COMENTARIO_CSS.sub(lambda m: m.group(1) or '', texto)
+        return _ESPACIO_CSS.sub(_compactar_css, texto).strip()
+    return rcssmin.cssmin(texto)
+
+
+def minificar_js(texto):
+    try:
+        import rjsmin
+    except ImportError:
+        pass
+    else:
+        return rjsmin.jsmin(texto)
+
+    # Conservador: quita sangrías, líneas vacías y líneas que son solo un comentario //,
+    # sin tocar el interior de las plantillas `...` de varias líneas
+    lineas = []
+    en_plantilla = False
+    for linea in texto.splitlines():
+        if en_plantilla:
+            lineas.append(linea)
+        else:
+            limpia = linea.strip()
+            if limpia and not limpia.startswith('//'):
+                lineas.append(limpia)
+        if len(re.findall(r'(?<!\\)`', linea)) % 2:
+            en_plantilla = not en_plantilla
+    return '\n'.join(lineas) + '\n'
+
+
+MINIFICADORES = {'.css': minificar_css, '.js': minificar_js}
+
+
+# ===== COMPRESIÓN =====
+
+def _comprimir_brotli(datos):
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(datos, quality=11)
+
+
+def _comprimir_gzip(datos):
+    # mtime=0: el mismo contenido produce siempre los mismos bytes
+    return gzip.compress(datos, compresslevel=9, mtime=0)
+
+
+def comprimir_archivo(ruta):
+    """Escribe ruta.gz (y ruta.br) si valen la pena. Retorna las extensiones escritas."""
+    ruta = Path(ruta)
+    if ruta.suffix.lower() in SIN_COMPRIMIR:
+        return []
+    datos = ruta.read_bytes()
+    escritas = []
+    for extension, comprimir in (('.br', _comprimir_brotli), ('.gz', _comprimir_gzip)):
+        variante = ruta.with_name(ruta.name + extension)
+        comprimido = comprimir(datos)
+        if comprimido is not None and len(comprimido) < len(datos) * (1 - AHORRO_MINIMO):
+            variante.write_bytes(comprimido)
+            escritas.append(extension)
+        elif variante.exists():
+            variante.unlink()
+    return escritas
+
+
+# ===== ALMACENAMIENTO =====
+
+class AlmacenEstaticos(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage que además minifica y precomprime (ver el docstring del módulo)."""
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            # Antes de calcular los hashes, para que el nombre refleje el contenido servido.
+            # El hash se calcula leyendo ``paths``: se apunta a las copias ya minificadas.
+            for nombre in paths:
+                self._minificar(nombre)
+            paths = {nombre: (self, nombre) for nombre in paths}
+
+        generados = set()
+        for original, hasheado, procesado in super().post_process(paths, dry_run, **options):
+            if hasheado and not isinstance(procesado, Exception):
+                generados.update((original, hasheado))
+            yield original, hasheado, procesado
+
+        if not dry_run:
+            for nombre in sorted(generados):
+                comprimir_archivo(self.path(nombre))
+
+    def _minificar(self, nombre):
+        minificar = MINIFICADORES.get(Path(nombre).suffix.lower())
+        if minificar is None or nombre.endswith(('.min.css', '.min.js')):
+            return
+        ruta = Path(self.path(nombre))
+        texto = ruta.read_text(encoding='utf-8')
+        minificado = minificar(texto)
+        if len(minificado) < len(texto):
+            ruta.write_text(minificado, encoding='utf-8')
+
+
+# ===== ÍNDICE PARA SERVIR =====
+
+@dataclass
+class ArchivoEstatico:
+    ruta: str
+    tipo: str
+    inmutable: bool
+    # {'br': (ruta, tamaño), 'gzip': (...), 'identity': (...)}
+    variantes: dict = field(default_factory=dict)
+    etag: str = ''
+    ultima_modificacion: str = ''
+
+
+def _nombres_con_hash(raiz):
+    """Nombres con hash registrados en el manifiesto de collectstatic."""
+    try:
+        manifiesto = json.loads((raiz / ManifestStaticFilesStorage.manifest_name).read_text())
+    except (FileNotFoundError, ValueError):
+        return set()
+    return set(manifiesto.get('paths', {}).values())
+
+
+def indexar_estaticos(raiz, prefijo):
+    """
+    Recorre STATIC_ROOT una vez y retorna {url: ArchivoEstatico}, con las
+    variantes comprimidas disponibles de cada archivo.
+    """
+    raiz = Path(raiz)
+    if not raiz.is_dir():
+        return {}
+    con_hash = _nombres_con_hash(raiz)
+    archivos = {}
+    for directorio, _, nombres in os.walk(raiz):
+        for nombre in nombres:
+            ruta = Path(directorio) / nombre
+            relativa = ruta.relative_to(raiz).as_posix()
+            if ruta.suffix in ('.gz', '.br') and ruta.with_suffix('').exists():
+                continue
+            estado = ruta.stat()
+            tipo, _ = mimetypes.guess_type(nombre)
+            if tipo and (tipo.startswith('text/') or tipo in ('application/javascript', 'application/json')):
+                tipo += '; charset=utf-8'
+            archivo = ArchivoEstatico(
+                ruta=str(ruta),
+                tipo=tipo or 'application/octet-stream',
+                inmutable=relativa in con_hash,
+                etag=f'{estado.st_size:x}-{int(estado.st_mtime):x}',
+                ultima_modificacion=http_date(estado.st_mtime),
+            )
+            for codificacion, extension in VARIANTES:
+                variante = ruta.with_name(nombre + extension)
+                if variante.exists():
+                    archivo.variantes[codificacion] = (str(variante), variante.stat().st_size)
+            archivo.variantes['identity'] = (str(ruta), estado.st_size)
+            archivos[prefijo + relativa] = archivo
+    return archivos
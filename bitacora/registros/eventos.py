@@ -0,0 +1,244 @@
+"""
+Eventos en vivo para el dashboard de análisis (Server-Sent Events).
+
+Al confirmarse una escritura se publican deltas pequeños en un bus:
+
+- medicion: una medición nueva (estudiante, grupo, día y altura)
+- foto:     una fotografía nueva
+- resumen:  el resumen actualizado de un estudiante (número de mediciones,
+            r² del modelo, crecimiento...), el mismo que muestra cada tarjeta
+
+La vista eventos_dashboard (solo con servidor ASGI) mantiene abierta una
+conexión por navegador y reenvía los eventos que le tocan a ese usuario;
+scripts.js actualiza las tarjetas en su lugar, sin volver a renderizar.
+
+Buses (REGISTROS_BUS_EVENTOS):
+
+- local (por defecto): colas asyncio dentro del proceso. No necesita Redis,
+  pero solo llegan los eventos publicados en el mismo proceso: sirve con un
+  único proceso ASGI que atienda también las escrituras.
+- redis: pub/sub de Redis (REGISTROS_REDIS_EVENTOS_URL), para varios procesos.
+
+Los receptores se conectan después de las invalidaciones de caché (ver
+apps.py): cuando se calcula el resumen que se publica, la caché ya no tiene
+el anterior.
+"""
+import asyncio
+import json
+import logging
+import threading
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import Estudiante, MedicionPlantas, RegistroFotografico
+
+logger = logging.getLogger(__name__)
+
+CANAL = 'bitacora:eventos'
+
+# Eventos pendientes por conexión; si un navegador no los consume a tiempo se
+# descartan y se le pide recargar la página
+MAX_PENDIENTES = 100
+
+# Campos del resumen que viajan en los eventos (los que muestran las tarjetas)
+CAMPOS_RESUMEN = (
+    'num_mediciones', 'puede_analizar', 'r2_modelo', 'calidad_ajuste', 'modelo_nombre',
+    'dias_transcurridos', 'crecimiento_total', 'altura_inicial', 'altura_final',
+)
+
+
+# ===== BUSES =====
+
+def _entregar(cola, evento):
+    try:
+        cola.put_nowait(evento)
+    except asyncio.QueueFull:
+        # Mejor una recarga que un dashboard con huecos silenciosos
+        while not cola.empty():
+            cola.get_nowait()
+        cola.put_nowait({'tipo': 'recargar'})
+
+
+class BusLocal:
+    """Pub/sub dentro del proceso: una cola asyncio por suscriptor."""
+
+    def __init__(self):
+        self._suscriptores = set()
+        self._cerrojo = threading.Lock()
+
+    def hay_suscriptores(self):
+        return bool(self._suscriptores)
+
+    def publicar(self, evento):
+        """Seguro desde cualquier hilo (las vistas síncronas corren en otro hilo)."""
+        with self._cerrojo:
+            suscriptores = list(self._suscriptores)
+        for bucle, cola in suscriptores:
+            try:
+                bucle.call_soon_threadsafe(_entregar, cola, evento)
+            except RuntimeError:
+                # El bucle de esa conexión ya se cerró
+                with self._cerrojo:
+                    self._suscriptores.discard((bucle, cola))
+
+    @asynccontextmanager
+    async def suscribir(self):
+        suscriptor = (asyncio.get_running_loop(), asyncio.Queue(MAX_PENDIENTES))
+        with self._cerrojo:
+            self._suscriptores.add(suscriptor)
+        try:
+            yield suscriptor[1]
+        finally:
+            with self._cerrojo:
+                self._suscriptores.discard(suscriptor)
+
+
+class BusRedis:
+    """Pub/sub de Redis: los eventos llegan a todos los procesos."""
+
+    def __init__(self, url):
+        self.url = url
+        self._cliente = None
+
+    def hay_suscriptores(self):
+        # Los suscriptores están en otros procesos: no se puede saber sin preguntar
+        return True
+
+    def publicar(self, evento):
+        import redis
+
+        if self._cliente is None:
+            self._cliente = redis.Redis.from_url(self.url)
+        self._cliente.publish(CANAL, json.dumps(evento))
+
+    @asynccontextmanager
+    async def suscribir(self):
+        import redis.asyncio
+
+        cliente = redis.asyncio.Redis.from_url(self.url)
+        pubsub = cliente.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(CANAL)
+        cola = asyncio.Queue(MAX_PENDIENTES)
+
+        async def leer():
+            async for mensaje in pubsub.listen():
+                _entregar(cola, json.loads(mensaje['data']))
+
+        lector = asyncio.create_task(leer())
+        try:
+            yield cola
+        finally:
+            lector.cancel()
+            await pubsub.aclose()
+            await cliente.aclose()
+
+
+_bus = None
+_cerrojo_bus = threading.Lock()
+
+
+def obtener_bus():
+    global _bus
+    with _cerrojo_bus:
+        if _bus is None:
+            if getattr(settings, 'REGISTROS_BUS_EVENTOS', 'local') == 'redis':
+                _bus = BusRedis(settings.REGISTROS_REDIS_EVENTOS_URL)
+            else:
+                _bus = BusLocal()
+        return _bus
+
+
+# ===== PUBLICACIÓN =====
+
+def publicar(evento):
+    """Publica un evento; un fallo del bus nunca afecta a la escritura que lo originó."""
+    try:
+        obtener_bus().publicar(evento)
+    except Exception:
+        logger.exception('No se pudo publicar el evento %s', evento.get('tipo'))
+
+
+def publicar_al_confirmar(construir):
+    """Al confirmar la transacción, publica los eventos que retorne ``construir()`` (si alguien escucha)."""
+    def publicar_todos():
+        if obtener_bus().hay_suscriptores():
+            for evento in construir():
+                publicar(evento)
+    transaction.on_commit(publicar_todos)
+
+
+def eventos_resumen(estudiante_ids):
+    """Eventos 'resumen' con el estado actual de cada estudiante (leído de la caché)."""
+    from .analisis import obtener_resumenes
+
+    grupos = dict(Estudiante.objects.filter(pk__in=estudiante_ids).values_list('pk', 'grupo'))
+    return [
+        {
+            'tipo': 'resumen',
+            'estudiante_id': pk,
+            'grupo': grupos.get(pk),
+            **{campo: resumen[campo] for campo in CAMPOS_RESUMEN if campo in resumen},
+        }
+        for pk, resumen in obtener_resumenes(sorted(estudiante_ids)).items()
+    ]
+
+
+def publicar_resumenes(estudiante_ids):
+    """Para escrituras sin señales (upsert, eliminaciones): llamar después de invalidar la caché."""
+    estudiante_ids = list(estudiante_ids)
+    if estudiante_ids and obtener_bus().hay_suscriptores():
+        for evento in eventos_resumen(estudiante_ids):
+            publicar(evento)
+
+
+# ===== SEÑALES =====
+
+def _al_guardar_medicion(sender, instance, created, **kwargs):
+    estudiante_id = instance.estudiante_id
+
+    def construir():
+        eventos = eventos_resumen([estudiante_id])
+        if created:
+            nombre = Estudiante.objects.filter(pk=estudiante_id).values_list('nombre', flat=True).first()
+            eventos.insert(0, {
+                'tipo': 'medicion',
+                'estudiante_id': estudiante_id,
+                'estudiante': nombre,
+                'grupo': eventos[0]['grupo'] if eventos else None,
+                'medicion_id': instance.pk,
+                'dia': instance.dia,
+                'altura': str(instance.altura),
+            })
+        return eventos
+    publicar_al_confirmar(construir)
+
+
+def _al_eliminar_medicion(sender, instance, **kwargs):
+    estudiante_id = instance.estudiante_id
+    publicar_al_confirmar(lambda: eventos_resumen([estudiante_id]))
+
+
+def _al_guardar_foto(sender, instance, created, **kwargs):
+    if not created or not instance.medicion_id:
+        return
+    estudiante_id, medicion_id = instance.estudiante_id, instance.medicion_id
+
+    def construir():
+        fila = Estudiante.objects.filter(pk=estudiante_id).values_list('nombre', 'grupo').first()
+        if fila is None:
+            return []
+        dia = MedicionPlantas.objects.filter(pk=medicion_id).values_list('dia', flat=True).first()
+        return [{
+            'tipo': 'foto', 'estudiante_id': estudiante_id, 'estudiante': fila[0], 'grupo': fila[1],
+            'medicion_id': medicion_id, 'dia': dia,
+        }]
+    publicar_al_confirmar(construir)
+
+
+def conectar_senales():
+    post_save.connect(_al_guardar_medicion, sender=MedicionPlantas, dispatch_uid='eventos_medicion_save')
+    post_delete.connect(_al_eliminar_medicion, sender=MedicionPlantas, dispatch_uid='eventos_medicion_delete')
+    post_save.connect(_al_guardar_foto, sender=RegistroFotografico, dispatch_uid='eventos_foto_save')
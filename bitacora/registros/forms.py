@@ -1,7 +1,11 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
 from django.contrib.auth.models import User
-from .models import Estudiante, MedicionPlantas, RegistroFotografico
+from .models import Estudiante, MedicionPlantas, RegistroFotografico, ResumenEstudiante, relacion_cargada
+from .anomalias import evaluar_medicion
+from .cache import obtener_o_calcular
+from .escritura import nueva_clave
+from .subidas import es_imagen, obtener_subida
 
 
 # ===== FORMULARIOS DE AUTENTICACIÓN =====
@@ -91,6 +95,88 @@ class LoginForm(AuthenticationForm):
     )
 
 
+# ===== SELECCIÓN DE ESTUDIANTE POR ROL =====
+
+# Con más estudiantes que esto, el <select> de los administradores solo trae la
+# opción elegida y el resto se busca al escribir (api_estudiantes)
+MAX_OPCIONES_ESTUDIANTE = 200
+
+
+def opciones_estudiantes():
+    """
+    Opciones (pk, etiqueta) de todos los estudiantes, en caché hasta que alguno
+    cambie. None si son más de MAX_OPCIONES_ESTUDIANTE.
+    """
+    def calcular():
+        estudiantes = list(Estudiante.objects.only('nombre', 'grupo')[:MAX_OPCIONES_ESTUDIANTE + 1])
+        if len(estudiantes) > MAX_OPCIONES_ESTUDIANTE:
+            return {'completas': False, 'opciones': []}
+        return {'completas': True, 'opciones': [(e.pk, str(e)) for e in estudiantes]}
+    datos = obtener_o_calcular('estudiantes', 'opciones', calcular)
+    return datos['opciones'] if datos['completas'] else None
+
+
+class CampoEstudiante(forms.ModelChoiceField):
+    """
+    Campo estudiante acotado por EstudiantePorRolMixin. Las plantillas dibujan
+    ``opciones`` en lugar de recorrer el queryset y, si ``parcial``, activan la
+    búsqueda AJAX. Con ``fijo`` (un estudiante con sesión) validar no consulta.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fijo = None
+        self.opciones = []
+        self.parcial = False
+
+    def to_python(self, value):
+        if self.fijo is not None and str(value) == str(self.fijo.pk):
+            return self.fijo
+        return super().to_python(value)
+
+
+class EstudiantePorRolMixin:
+    """
+    Acota el campo ``estudiante`` según ``usuario``: un estudiante solo puede
+    elegirse a sí mismo; un administrador (o sin usuario) elige entre todos,
+    con las opciones en caché o, si son demasiadas, solo la seleccionada.
+    Así la página del formulario hace las mismas consultas con 10 o 10.000
+    estudiantes.
+    """
+
+    def __init__(self, *args, usuario=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        campo = self.fields['estudiante']
+        if usuario is not None and not (usuario.is_superuser or usuario.is_staff):
+            self._acotar_a_estudiante(campo, getattr(usuario, 'estudiante', None))
+        else:
+            self._opciones_administrador(campo)
+
+    def _acotar_a_estudiante(self, campo, estudiante):
+        if estudiante is None:
+            campo.queryset = Estudiante.objects.none()
+            return
+        campo.queryset = Estudiante.objects.filter(pk=estudiante.pk)
+        campo.fijo = estudiante
+        campo.opciones = [(estudiante.pk, str(estudiante))]
+        if not self.is_bound and not self.instance.pk:
+            self.initial['estudiante'] = estudiante.pk
+
+    def _opciones_administrador(self, campo):
+        opciones = opciones_estudiantes()
+        if opciones is None:
+            campo.parcial = True
+            opciones = []
+            valor = str(self['estudiante'].value() or '')
+            if valor.isdigit():
+                actual = relacion_cargada(self.instance, 'estudiante')
+                if actual is None or str(actual.pk) != valor:
+                    actual = Estudiante.objects.filter(pk=valor).first()
+                if actual is not None:
+                    opciones = [(actual.pk, str(actual))]
+        campo.opciones = opciones
+
+
 # ===== FORMULARIOS EXISTENTES =====
 
 
@@ -115,7 +201,41 @@ class EstudianteForm(forms.ModelForm):
         }
 
 
-class MedicionPlantasForm(forms.ModelForm):
+class SubidaPorPartesMixin:
+    """
+    Campo oculto ``subida``: la fotografía ya llegó por partes
+    (registros/subidas.py) y el formulario trae solo su id. Si es válida,
+    ``cleaned_data['subida']`` es la información de la subida y la imagen se
+    adjunta después con la tarea adjuntar_subida. Un archivo en ``imagen``
+    tiene prioridad.
+    """
+
+    def __init__(self, *args, usuario=None, **kwargs):
+        super().__init__(*args, usuario=usuario, **kwargs)
+        self.fields['subida'] = forms.UUIDField(required=False, widget=forms.HiddenInput)
+        self._usuario_subida = usuario
+        if self.is_bound and self.data.get('subida'):
+            self.fields['imagen'].required = False
+
+    def clean_subida(self):
+        subida = self.cleaned_data.get('subida')
+        if subida is None or self.cleaned_data.get('imagen'):
+            return None
+        usuario = self._usuario_subida
+        info = obtener_subida(subida, usuario.pk if usuario is not None else None)
+        # Los errores se muestran junto al campo de la imagen (el de la subida está oculto)
+        if info is None:
+            self.add_error('imagen', 'La fotografía subida ya no está disponible. Vuelve a seleccionarla.')
+        elif not info['completa']:
+            self.add_error('imagen', 'La fotografía aún no termina de subirse.')
+        elif not es_imagen(info):
+            self.add_error('imagen', 'El archivo subido no es una imagen válida.')
+        else:
+            return info
+        return None
+
+
+class MedicionPlantasForm(SubidaPorPartesMixin, EstudiantePorRolMixin, forms.ModelForm):
     # Campos adicionales para el registro fotográfico
     imagen = forms.ImageField(
         required=False,
@@ -134,10 +254,22 @@ class MedicionPlantasForm(forms.ModelForm):
         }),
         label='Comentario (opcional)'
     )
+    confirmar_atipica = forms.BooleanField(
+        required=False,
+        widget=forms.CheckboxInput(attrs={
+            'class': 'form-check-input'
+        }),
+        label='Confirmo que la altura es correcta aunque se aleje de la tendencia'
+    )
+    # Reenvíos del mismo formulario (doble clic, reintentos) se reconocen por esta clave
+    clave_idempotencia = forms.UUIDField(required=False, widget=forms.HiddenInput)
+    # Versión de la medición que se está editando (bloqueo optimista)
+    version = forms.IntegerField(required=False, widget=forms.HiddenInput)
     
     class Meta:
         model = MedicionPlantas
         fields = ['estudiante', 'dia', 'altura']
+        field_classes = {'estudiante': CampoEstudiante}
         widgets = {
             'estudiante': forms.Select(attrs={
                 'class': 'form-control'
@@ -155,11 +287,73 @@ class MedicionPlantasForm(forms.ModelForm):
             }),
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requiere_confirmacion = False
+        self.evaluacion_atipica = None
+        if not self.is_bound:
+            self.fields['clave_idempotencia'].initial = nueva_clave()
+            if self.instance.pk:
+                self.fields['version'].initial = self.instance.version
+
+    def clean(self):
+        """
+        Compara la altura con la recta actual del estudiante (una consulta por
+        clave primaria a ResumenEstudiante). Si se aleja demasiado se pide
+        confirmación, para atrapar errores como 155 en lugar de 15.5.
+        """
+        cleaned_data = super().clean()
+        estudiante = cleaned_data.get('estudiante')
+        dia = cleaned_data.get('dia')
+        altura = cleaned_data.get('altura')
+        if estudiante is None or dia is None or altura is None:
+            return cleaned_data
+
+        anterior = None
+        cargados = getattr(self.instance, '_valores_cargados', None)
+        if self.instance.pk and cargados and cargados['estudiante_id'] == estudiante.pk:
+            # Edición: la medición original no debe contar en la recta con la que se compara
+            anterior = (cargados['dia'], cargados['altura'])
+
+        resumen = ResumenEstudiante.objects.filter(pk=estudiante.pk).first()
+        evaluacion = evaluar_medicion(resumen, dia, altura, anterior=anterior)
+        self.evaluacion_atipica = evaluacion
+        es_atipica = bool(evaluacion and evaluacion['es_atipica'])
+        # Una altura atípica ya confirmada no se vuelve a preguntar si no cambia
+        confirmada = cleaned_data.get('confirmar_atipica') or (
+            self.instance.atipica and anterior is not None and anterior[1] == altura
+        )
+
+        if es_atipica and not confirmada:
+            self.requiere_confirmacion = True
+            self.add_error('altura', (
+                f'La altura {altura} cm se aleja mucho de la esperada para el día {dia} '
+                f'(≈ {evaluacion["altura_esperada"]} cm según las mediciones anteriores). '
+                'Revisa el valor o marca la casilla de confirmación si es correcto.'
+            ))
+        self.instance.atipica = es_atipica
+        return cleaned_data
+
+
+class MedicionSincronizadaForm(forms.Form):
+    """
+    Una medición guardada sin conexión (ver api_sincronizar_mediciones). Los
+    permisos sobre el estudiante se comprueban para todo el lote en la vista.
+    """
+    clave = forms.UUIDField()
+    estudiante = forms.IntegerField(min_value=1)
+    # formfield() no copia los validadores del modelo y el upsert no llama a full_clean
+    dia = MedicionPlantas._meta.get_field('dia').formfield(min_value=1)
+    altura = MedicionPlantas._meta.get_field('altura').formfield(min_value=0)
+    comentario = forms.CharField(required=False)
+    imagen = forms.ImageField(required=False)
+
 
-class RegistroFotograficoForm(forms.ModelForm):
+class RegistroFotograficoForm(SubidaPorPartesMixin, EstudiantePorRolMixin, forms.ModelForm):
     class Meta:
         model = RegistroFotografico
         fields = ['estudiante', 'imagen', 'comentario']
+        field_classes = {'estudiante': CampoEstudiante}
         widgets = {
             'estudiante': forms.Select(attrs={
                 'class': 'form-control'
@@ -0,0 +1,192 @@
+"""
+Analítica de crecimiento por grupo.
+
+Las estadísticas de altura por (grupo, día) se calculan con una sola consulta
+agrupada y operaciones vectorizadas de NumPy, y se guardan en ResumenGrupo.
+Cada cambio de una medición recalcula solo la celda (grupo, día) afectada.
+"""
+import base64
+import io
+
+import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Backend sin interfaz gráfica para servidor
+import matplotlib.pyplot as plt
+from django.db import transaction
+
+from .cache import invalidar, obtener_o_calcular
+from .instantanea import alturas_cm, obtener_instantanea
+from .models import MedicionPlantas, ResumenGrupo
+from .numerico import altura_centesimas, centimetros, columnas_enteras
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+CAMPOS_ESTADISTICAS = (
+    'num_mediciones', 'media', 'mediana', 'desviacion',
+    'percentil_10', 'percentil_25', 'percentil_75', 'percentil_90',
+)
+
+
+def calcular_estadisticas(grupos, dias, alturas):
+    """
+    Estadísticas por celda (grupo, día) sin bucles de Python.
+
+    Args:
+        grupos, dias, alturas: arrays paralelos con una fila por medición
+
+    Returns:
+        dict de arrays, uno por celda: grupo, dia, num_mediciones, media,
+        desviacion y un array por percentil (mediana = percentil 50)
+    """
+    grupos = np.asarray(grupos, dtype=np.int64)
+    dias = np.asarray(dias, dtype=np.int64)
+    alturas = np.asarray(alturas, dtype=np.float64)
+    if alturas.size == 0:
+        vacio = np.array([], dtype=np.float64)
+        return {'grupo': vacio, 'dia': vacio, 'num_mediciones': vacio, 'media': vacio,
+                'desviacion': vacio, **{f'p{p}': vacio for p in PERCENTILES}}
+
+    # Ordenar por grupo, día y altura: cada celda queda contigua y ya ordenada
+    orden = np.lexsort((alturas, dias, grupos))
+    grupos, dias, alturas = grupos[orden], dias[orden], alturas[orden]
+
+    cambio = np.empty(alturas.size, dtype=bool)
+    cambio[0] = True
+    cambio[1:] = (grupos[1:] != grupos[:-1]) | (dias[1:] != dias[:-1])
+    inicios = np.flatnonzero(cambio)
+    conteos = np.diff(np.append(inicios, alturas.size))
+
+    sumas = np.add.reduceat(alturas, inicios)
+    medias = sumas / conteos
+    desvios = alturas - np.repeat(medias, conteos)
+    desviaciones = np.sqrt(np.add.reduceat(desvios ** 2, inicios) / conteos)
+
+    resultado = {
+        'grupo': grupos[inicios],
+        'dia': dias[inicios],
+        'num_mediciones': conteos,
+        'media': medias,
+        'desviacion': desviaciones,
+    }
+    # Percentiles con interpolación lineal (igual que np.percentile) dentro de cada celda
+    for p in PERCENTILES:
+        posicion = (conteos - 1) * (p / 100.0)
+        bajo = np.floor(posicion).astype(np.int64)
+        alto = np.minimum(bajo + 1, conteos - 1)
+        fraccion = posicion - bajo
+        resultado[f'p{p}'] = (
+            alturas[inicios + bajo] * (1 - fraccion) + alturas[inicios + alto] * fraccion
+        )
+    return resultado
+
+
+def _filas_resumen(estadisticas):
+    for i in range(len(estadisticas['grupo'])):
+        yield ResumenGrupo(
+            grupo=int(estadisticas['grupo'][i]),
+            dia=int(estadisticas['dia'][i]),
+            num_mediciones=int(estadisticas['num_mediciones'][i]),
+            media=float(estadisticas['media'][i]),
+            mediana=float(estadisticas['p50'][i]),
+            desviacion=float(estadisticas['desviacion'][i]),
+            percentil_10=float(estadisticas['p10'][i]),
+            percentil_25=float(estadisticas['p25'][i]),
+            percentil_75=float(estadisticas['p75'][i]),
+            percentil_90=float(estadisticas['p90'][i]),
+        )
+
+
+def _datos_mediciones(mediciones):
+    filas = columnas_enteras(mediciones, 'estudiante__grupo', 'dia', altura_centesimas())
+    return filas[:, 0], filas[:, 1], centimetros(filas[:, 2])
+
+
+def reconstruir_resumen_grupos(grupos=None):
+    """
+    Recalcula por completo el resumen (de todos los grupos o de los indicados).
+    Retorna el número de celdas (grupo, día) guardadas.
+    """
+    resumenes = ResumenGrupo.objects.all()
+    if grupos is not None:
+        resumenes = resumenes.filter(grupo__in=grupos)
+
+    # Todas las mediciones de los grupos, cortadas de la instantánea columnar
+    grupos_fila, dias, alturas = obtener_instantanea().filas_grupos(grupos)
+    filas = list(_filas_resumen(calcular_estadisticas(grupos_fila, dias, alturas_cm(alturas))))
+    with transaction.atomic():
+        resumenes.delete()
+        ResumenGrupo.objects.bulk_create(filas, batch_size=500)
+    invalidar('grupos')
+    return len(filas)
+
+
+def actualizar_celda(grupo, dia):
+    """
+    Recalcula una sola celda (grupo, día); la elimina si ya no tiene mediciones.
+
+    Se recalcula con la fila de la celda bloqueada: si dos escrituras del mismo
+    grupo y día se confirman a la vez, la segunda espera a la primera y lee sus
+    mediciones, así la última en guardar nunca deja una estadística vieja.
+    """
+    with transaction.atomic():
+        celda, _ = ResumenGrupo.objects.select_for_update().get_or_create(
+            grupo=grupo, dia=dia, defaults={campo: 0 for campo in CAMPOS_ESTADISTICAS},
+        )
+        mediciones = MedicionPlantas.objects.filter(estudiante__grupo=grupo, dia=dia)
+        estadisticas = calcular_estadisticas(*_datos_mediciones(mediciones))
+
+        if len(estadisticas['grupo']) == 0:
+            celda.delete()
+        else:
+            fila = next(_filas_resumen(estadisticas))
+            for campo in CAMPOS_ESTADISTICAS:
+                setattr(celda, campo, getattr(fila, campo))
+            celda.save(update_fields=CAMPOS_ESTADISTICAS)
+    invalidar('grupos')
+
+
+def obtener_curvas_grupos():
+    """
+    Curvas por grupo listas para el dashboard: {grupo: [filas por día]}.
+    Se sirven desde la caché hasta que cambie alguna celda.
+    """
+    def calcular():
+        curvas = {}
+        for fila in ResumenGrupo.objects.values('grupo', 'dia', *CAMPOS_ESTADISTICAS):
+            curvas.setdefault(fila['grupo'], []).append(fila)
+        return curvas
+    return obtener_o_calcular('grupos', 'curvas', calcular)
+
+
+def generar_grafica_grupos(curvas, etiquetas=None):
+    """
+    Curva media de cada grupo con la banda entre los percentiles 25 y 75.
+    ``etiquetas`` ({clave: texto}) reemplaza la leyenda "Grupo N" (p. ej. para grupos archivados).
+    """
+    etiquetas = etiquetas or {}
+    plt.figure(figsize=(10, 6))
+    for grupo, filas in sorted(curvas.items()):
+        dias = [fila['dia'] for fila in filas]
+        linea, = plt.plot(dias, [fila['media'] for fila in filas], marker='o', linewidth=2,
+                          label=etiquetas.get(grupo, f'Grupo {grupo}'))
+        plt.fill_between(
+            dias,
+            [fila['percentil_25'] for fila in filas],
+            [fila['percentil_75'] for fila in filas],
+            color=linea.get_color(), alpha=0.15,
+        )
+
+    plt.xlabel('Día', fontsize=12)
+    plt.ylabel('Altura media (cm)', fontsize=12)
+    plt.title('Crecimiento promedio por grupo (banda: percentiles 25-75)', fontsize=14, fontweight='bold')
+    plt.grid(True, alpha=0.3)
+    plt.legend(fontsize=10)
+
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+    plt.close()
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def obtener_grafica_grupos():
+    return obtener_o_calcular('grupos', 'grafica', lambda: generar_grafica_grupos(obtener_curvas_grupos()))
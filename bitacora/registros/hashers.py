@@ -0,0 +1,30 @@
+"""
+Cifrado de contraseñas con parámetros ajustables.
+
+Con BITACORA_HASHER=argon2 (ver bitacora/configuracion.py) las contraseñas
+nuevas se cifran con Argon2id usando REGISTROS_ARGON2. Con los valores por
+defecto (19 MiB, 2 pasadas, recomendación de OWASP) verificar una contraseña
+toma unos milisegundos de CPU. Con PBKDF2 y sus 1.000.000 de iteraciones son
+cientos: al inicio de clase, con 30 o 40 estudiantes entrando a la vez,
+esa es la diferencia entre una cola de segundos y una de medio minuto.
+
+Los hashes PBKDF2 existentes siguen siendo válidos. Django los recifra con
+el hasher preferido la próxima vez que el usuario inicia sesión, y lo mismo
+pasa si se cambian los parámetros de Argon2.
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher
+
+
+def _parametro(nombre, defecto):
+    return getattr(settings, 'REGISTROS_ARGON2', {}).get(nombre, defecto)
+
+
+class Argon2Ajustado(Argon2PasswordHasher):
+    """Argon2id con costo de tiempo, memoria y paralelismo tomados de REGISTROS_ARGON2."""
+
+    # Mismo nombre de algoritmo: los hashes incluyen sus parámetros y cualquier
+    # Argon2PasswordHasher los verifica
+    time_cost = _parametro('tiempo', 2)
+    memory_cost = _parametro('memoria_kib', 19 * 1024)
+    parallelism = _parametro('paralelismo', 1)
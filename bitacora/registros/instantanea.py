@@ -0,0 +1,493 @@
+"""
+Instantánea columnar de las mediciones para los análisis.
+
+En lugar de reconstruir arrays de NumPy desde el ORM en cada vista (un objeto
+Decimal por medición), los análisis leen tres columnas compactas:
+
+- estudiante (int64), dia (int32), altura (float32), ordenadas por estudiante y día
+
+más un índice por estudiante (ids, grupos e inicios: la serie del estudiante
+``ids[i]`` es ``[inicios[i], inicios[i + 1])``). Las columnas se reparten en
+bloques de ESTUDIANTES_POR_BLOQUE ids consecutivos; cada bloque es un
+directorio de archivos .npy en REGISTROS_DIRECTORIO_INSTANTANEA que cada
+proceso abre con ``mmap_mode='r'``: todos los workers comparten una sola copia
+en la caché de páginas del sistema operativo. Una generación es la lista de
+directorios de sus bloques (archivo ACTUAL): publicar una nueva reescribe
+solo los bloques de los estudiantes que cambiaron y reutiliza los demás.
+
+Frescura: cada escritura de mediciones o estudiantes (señales y servicio de
+eliminación) incrementa, al confirmar la transacción, el contador de versión
+del espacio de caché "instantanea", anota qué estudiantes cambiaron en esa
+versión y encola la tarea actualizar_instantanea (una sola pendiente a la
+vez), que publica la generación nueva desde el worker. Mientras tanto las
+lecturas usan la última generación publicada y releen de la base de datos
+solo las series anotadas; si falta alguna anotación (caché reiniciada o
+demasiados cambios) leen todas las mediciones.
+
+El contador y su anotación se actualizan bajo un bloqueo de archivo:
+``cache.incr`` no es atómico en todos los backends (FileBasedCache lee y vuelve
+a escribir) y dos escrituras simultáneas podrían recibir la misma versión, con
+lo que la segunda anotación borraría la primera.
+
+El contador debe ser común a todos los procesos: con una caché local de cada
+proceso (locmem) un worker no vería las escrituras de los demás y seguiría
+usando su generación vieja, así que en ese caso no se publica nada y las
+lecturas van siempre a la base de datos.
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+from .cache import PREFIJO, TIMEOUT_DATOS, obtener_cache, siguiente_version, version
+from .models import MedicionPlantas
+from .numerico import altura_centesimas, centimetros, columnas_enteras
+from .routers import alias_primario
+from .tareas import encolar, encolar_periodica
+
+try:
+    import fcntl
+except ImportError:  # Windows: basta el bloqueo entre hilos del proceso
+    fcntl = None
+
+ESPACIO = 'instantanea'
+
+# Tarea del worker que publica las generaciones (registrada en tareas.py)
+TAREA = 'actualizar_instantanea'
+
+COLUMNAS = ('estudiante', 'dia', 'altura')
+INDICE = ('ids', 'grupos', 'inicios')
+
+# Estudiantes (ids consecutivos) por bloque: una escritura solo reescribe su bloque
+ESTUDIANTES_POR_BLOQUE = 128
+
+ARCHIVO_ACTUAL = 'ACTUAL'
+ARCHIVO_BLOQUEO = '.bloqueo'
+ARCHIVO_BLOQUEO_CAMBIOS = '.bloqueo-cambios'
+PREFIJO_TEMPORAL = '.nueva-'
+
+# Con más versiones pendientes que esto se reconstruye completa en lugar de por partes
+MAX_VERSIONES_INCREMENTAL = 500
+
+# Generaciones anteriores que se conservan (otros procesos pueden tenerlas abiertas)
+GENERACIONES_CONSERVADAS = 2
+
+# Publicaciones seguidas de una misma tarea si siguen llegando escrituras mientras publica
+MAX_PUBLICACIONES = 10
+
+# Mientras la generación publicada vaya atrasada, las lecturas vuelven a encolar
+# la tarea como mucho con esta frecuencia (por si una escritura llegó justo
+# cuando la anterior terminaba y su encolado se descartó como repetido)
+INTERVALO_REENCOLAR = timedelta(seconds=30)
+
+_lock = threading.Lock()
+_lock_cambios = threading.Lock()
+_actual = None
+# {directorio: columnas mapeadas} de los bloques de la última generación abierta
+_abiertos = {}
+
+
+class Instantanea:
+    """Series de una generación de la instantánea, repartidas por bloques de estudiantes."""
+
+    def __init__(self, version_datos, bloques, archivos=None):
+        self.version = version_datos
+        # {bloque: columnas}; las de una generación publicada están mapeadas en memoria
+        self.bloques = dict(sorted(bloques.items()))
+        # {bloque: directorio} si es una generación publicada, None si se armó en memoria
+        self.archivos = archivos
+        self.ids = _concatenar([columnas['ids'] for columnas in self.bloques.values()], np.int64)
+        self.grupos = _concatenar([columnas['grupos'] for columnas in self.bloques.values()], np.int32)
+
+    @property
+    def num_mediciones(self):
+        return sum(len(columnas['dia']) for columnas in self.bloques.values())
+
+    def conteos(self):
+        """Número de mediciones de cada estudiante de ``ids``."""
+        return _concatenar([np.diff(columnas['inicios']) for columnas in self.bloques.values()], np.int64)
+
+    def _ubicar(self, estudiante_id):
+        """(columnas del bloque, inicio, fin) de la serie del estudiante, o None si no tiene mediciones."""
+        columnas = self.bloques.get(int(estudiante_id) // ESTUDIANTES_POR_BLOQUE)
+        if columnas is None:
+            return None
+        i = int(np.searchsorted(columnas['ids'], estudiante_id))
+        if i < len(columnas['ids']) and columnas['ids'][i] == estudiante_id:
+            return columnas, columnas['inicios'][i], columnas['inicios'][i + 1]
+        return None
+
+    def serie(self, estudiante_id):
+        """(dias, alturas) del estudiante, como vistas de solo lectura; vacías si no tiene mediciones."""
+        ubicacion = self._ubicar(estudiante_id)
+        if ubicacion is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+        columnas, inicio, fin = ubicacion
+        return columnas['dia'][inicio:fin], columnas['altura'][inicio:fin]
+
+    def series(self, estudiante_ids):
+        """Genera (estudiante_id, dias, alturas) para cada estudiante con mediciones."""
+        for estudiante_id in estudiante_ids:
+            ubicacion = self._ubicar(estudiante_id)
+            if ubicacion is not None:
+                columnas, inicio, fin = ubicacion
+                yield estudiante_id, columnas['dia'][inicio:fin], columnas['altura'][inicio:fin]
+
+    def filas_grupos(self, grupos=None):
+        """Arrays paralelos (grupos, dias, alturas) de todas las mediciones, o de los grupos indicados."""
+        bloques = self.bloques.values()
+        grupo_fila = _concatenar([np.repeat(c['grupos'], np.diff(c['inicios'])) for c in bloques], np.int32)
+        dias = _concatenar([c['dia'] for c in bloques], np.int32)
+        alturas = _concatenar([c['altura'] for c in bloques], np.float32)
+        if grupos is None:
+            return grupo_fila, dias, alturas
+        mascara = np.isin(grupo_fila, list(grupos))
+        return grupo_fila[mascara], dias[mascara], alturas[mascara]
+
+
+def _concatenar(partes, dtype):
+    return np.concatenate(partes) if partes else np.empty(0, dtype=dtype)
+
+
+def alturas_cm(alturas):
+    """Alturas en float64 con los dos decimales del campo (el float32 introduce ruido en el último dígito)."""
+    return np.round(np.asarray(alturas, dtype=np.float64), 2)
+
+
+def cache_compartida():
+    """Si el contador de versión lo ven todos los procesos (ver la nota del módulo)."""
+    return not isinstance(obtener_cache(), (LocMemCache, DummyCache))
+
+
+# ===== REGISTRO DE CAMBIOS =====
+
+def _clave_cambios(version_datos):
+    return f'{PREFIJO}:{ESPACIO}:cambios:{version_datos}'
+
+
+def registrar_cambios(estudiante_ids):
+    """
+    Anota, al confirmar la transacción, que las series de estos estudiantes
+    cambiaron y encola la publicación de la generación nueva.
+    """
+    estudiante_ids = sorted({int(pk) for pk in estudiante_ids if pk is not None})
+    if not estudiante_ids or not cache_compartida():
+        return
+
+    def registrar():
+        with _bloqueo(ARCHIVO_BLOQUEO_CAMBIOS, _lock_cambios):
+            cache = obtener_cache()
+            clave_cambios = _clave_cambios(siguiente_version(ESPACIO))
+            # Se agrega a lo anotado, por si otro proceso recibió la misma versión
+            anteriores = cache.get(clave_cambios) or []
+            cache.set(clave_cambios, sorted({*anteriores, *estudiante_ids}), TIMEOUT_DATOS)
+        # Si ya hay una pendiente, esa publicará también estos cambios
+        encolar(TAREA, clave=TAREA)
+    transaction.on_commit(registrar)
+
+
+def _cambios_entre(desde, hasta):
+    """Estudiantes que cambiaron entre dos versiones, o None si no se puede saber."""
+    if not desde < hasta <= desde + MAX_VERSIONES_INCREMENTAL:
+        return None
+    claves = [_clave_cambios(v) for v in range(desde + 1, hasta + 1)]
+    encontrados = obtener_cache().get_many(claves)
+    if len(encontrados) < len(claves):
+        return None
+    return sorted(set().union(*encontrados.values()))
+
+
+# ===== CONSTRUCCIÓN =====
+
+def directorio_instantanea():
+    directorio = Path(settings.REGISTROS_DIRECTORIO_INSTANTANEA)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def _leer_mediciones(estudiante_ids=None):
+    """Columnas e índice leídos de la base de datos (de todas o de algunas series)."""
+    # Siempre del primario: una réplica atrasada dejaría la instantánea vieja con la versión nueva
+    mediciones = MedicionPlantas.objects.using(alias_primario())
+    if estudiante_ids is not None:
+        mediciones = mediciones.filter(estudiante_id__in=estudiante_ids)
+    filas = columnas_enteras(
+        mediciones.order_by('estudiante_id', 'dia'), 'estudiante_id', 'estudiante__grupo', 'dia', altura_centesimas(),
+    )
+    n = len(filas)
+    estudiante = filas[:, 0]
+    grupo = filas[:, 1].astype(np.int32)
+    columnas = {
+        'estudiante': estudiante,
+        'dia': filas[:, 2].astype(np.int32),
+        'altura': centimetros(filas[:, 3]).astype(np.float32),
+    }
+    ids, primeras = np.unique(estudiante, return_index=True)
+    columnas.update({
+        'ids': ids,
+        'grupos': grupo[primeras],
+        'inicios': np.append(primeras, n).astype(np.int64),
+    })
+    return columnas
+
+
+def _partir(columnas):
+    """Reparte columnas ordenadas por estudiante en {bloque: columnas del bloque}."""
+    ids, inicios = columnas['ids'], columnas['inicios']
+    if len(ids) == 0:
+        return {}
+    numeros = ids // ESTUDIANTES_POR_BLOQUE
+    limites = [0, *(np.flatnonzero(np.diff(numeros)) + 1).tolist(), len(ids)]
+    bloques = {}
+    for primero, ultimo in zip(limites[:-1], limites[1:]):
+        desde, hasta = inicios[primero], inicios[ultimo]
+        bloques[int(numeros[primero])] = {
+            **{nombre: columnas[nombre][desde:hasta] for nombre in COLUMNAS},
+            'ids': ids[primero:ultimo],
+            'grupos': columnas['grupos'][primero:ultimo],
+            'inicios': inicios[primero:ultimo + 1] - desde,
+        }
+    return bloques
+
+
+def _vacio():
+    return {
+        'estudiante': np.empty(0, dtype=np.int64), 'dia': np.empty(0, dtype=np.int32),
+        'altura': np.empty(0, dtype=np.float32), 'ids': np.empty(0, dtype=np.int64),
+        'grupos': np.empty(0, dtype=np.int32), 'inicios': np.zeros(1, dtype=np.int64),
+    }
+
+
+def _combinar(base, cambiados, nuevas):
+    """Reemplaza en las columnas ``base`` las series de los estudiantes ``cambiados`` por ``nuevas``."""
+    cambiados = np.asarray(cambiados, dtype=np.int64)
+    conservar_filas = ~np.isin(base['estudiante'], cambiados)
+    conservar_ids = ~np.isin(base['ids'], cambiados)
+
+    estudiante = np.concatenate([base['estudiante'][conservar_filas], nuevas['estudiante']])
+    # Cada serie está entera en una de las dos partes: un orden estable por estudiante
+    # mantiene el orden por día dentro de cada serie
+    orden = np.argsort(estudiante, kind='stable')
+    columnas = {
+        'estudiante': estudiante[orden],
+        'dia': np.concatenate([base['dia'][conservar_filas], nuevas['dia']])[orden],
+        'altura': np.concatenate([base['altura'][conservar_filas], nuevas['altura']])[orden],
+    }
+
+    ids = np.concatenate([base['ids'][conservar_ids], nuevas['ids']])
+    orden_ids = np.argsort(ids, kind='stable')
+    conteos = np.concatenate([np.diff(base['inicios'])[conservar_ids], np.diff(nuevas['inicios'])])[orden_ids]
+    columnas.update({
+        'ids': ids[orden_ids],
+        'grupos': np.concatenate([base['grupos'][conservar_ids], nuevas['grupos']])[orden_ids],
+        'inicios': np.concatenate([[0], np.cumsum(conteos)]).astype(np.int64),
+    })
+    return columnas
+
+
+def _bloques_cambiados(base, cambiados):
+    """
+    Bloques de ``base`` que contienen a los estudiantes ``cambiados``, con sus
+    series releídas de la base de datos: {bloque: columnas, o None si quedó vacío}.
+    """
+    cambiados = np.asarray(cambiados, dtype=np.int64)
+    nuevas = _partir(_leer_mediciones(cambiados.tolist()))
+    numeros = cambiados // ESTUDIANTES_POR_BLOQUE
+    bloques = {}
+    for bloque in np.unique(numeros).tolist():
+        columnas = _combinar(
+            base.bloques.get(bloque, _vacio()), cambiados[numeros == bloque], nuevas.get(bloque, _vacio()),
+        )
+        bloques[bloque] = columnas if len(columnas['ids']) else None
+    return bloques
+
+
+def _al_dia(base, version_datos):
+    """Instantánea de ``version_datos`` armada en memoria a partir de la generación ``base``."""
+    cambiados = _cambios_entre(base.version, version_datos) if base is not None else None
+    if cambiados is None:
+        return Instantanea(version_datos, _partir(_leer_mediciones()))
+    bloques = dict(base.bloques)
+    for bloque, columnas in _bloques_cambiados(base, cambiados).items():
+        if columnas is None:
+            bloques.pop(bloque, None)
+        else:
+            bloques[bloque] = columnas
+    return Instantanea(version_datos, bloques)
+
+
+# ===== PUBLICACIÓN =====
+
+def _guardar_bloque(directorio, bloque, columnas):
+    """Escribe un bloque en un directorio nuevo y retorna su nombre."""
+    temporal = Path(tempfile.mkdtemp(dir=directorio, prefix=PREFIJO_TEMPORAL))
+    for nombre, valores in columnas.items():
+        np.save(temporal / f'{nombre}.npy', np.ascontiguousarray(valores))
+    nombre = f'b{bloque}-{temporal.name[len(PREFIJO_TEMPORAL):]}'
+    os.rename(temporal, directorio / nombre)
+    return nombre
+
+
+def _escribir_json(ruta, datos):
+    """Reemplaza ``ruta`` de forma atómica."""
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, prefix=PREFIJO_TEMPORAL, suffix='.json')
+    with os.fdopen(descriptor, 'w') as archivo:
+        json.dump(datos, archivo)
+    os.replace(temporal, ruta)
+
+
+def _publicar(version_datos, base=None):
+    """
+    Publica la generación de ``version_datos`` y la marca como actual:
+    reescribe solo los bloques que cambiaron desde la generación publicada
+    ``base``, o todos si no se conocen los cambios. Requiere el bloqueo.
+    """
+    directorio = directorio_instantanea()
+    cambiados = _cambios_entre(base.version, version_datos) if base is not None else None
+    if cambiados is None:
+        archivos, bloques = {}, _partir(_leer_mediciones())
+    else:
+        archivos, bloques = dict(base.archivos), _bloques_cambiados(base, cambiados)
+    for bloque, columnas in bloques.items():
+        if columnas is None:
+            archivos.pop(bloque, None)
+        else:
+            archivos[bloque] = _guardar_bloque(directorio, bloque, columnas)
+
+    publicada = {'version': version_datos, 'bloques': {str(bloque): nombre for bloque, nombre in archivos.items()}}
+    # Una copia por generación para saber qué bloques siguen en uso al limpiar
+    _escribir_json(directorio / f'g{version_datos}-{os.getpid()}.json', publicada)
+    _escribir_json(directorio / ARCHIVO_ACTUAL, publicada)
+    _limpiar_generaciones(directorio)
+    return _abrir(publicada)
+
+
+def _limpiar_generaciones(directorio):
+    """
+    Borra las generaciones anteriores a las conservadas, los bloques que ya
+    ninguna usa y los restos de publicaciones interrumpidas. Requiere el bloqueo.
+    """
+    generaciones = sorted(directorio.glob('g*.json'), key=lambda ruta: ruta.stat().st_mtime_ns)
+    conservadas = generaciones[-(GENERACIONES_CONSERVADAS + 1):]
+    en_uso = set()
+    for ruta in conservadas:
+        en_uso.update(json.loads(ruta.read_text())['bloques'].values())
+    for ruta in generaciones[:-len(conservadas)]:
+        ruta.unlink(missing_ok=True)
+
+    # En Linux/macOS borrar un archivo mapeado no afecta a quien ya lo tiene abierto
+    for ruta in directorio.iterdir():
+        # Solo se publica con el bloqueo tomado: un temporal que quede es de un proceso que murió
+        huerfano = ruta.name.startswith(PREFIJO_TEMPORAL)
+        if huerfano or (ruta.name.startswith('b') and ruta.name not in en_uso):
+            if ruta.is_dir():
+                shutil.rmtree(ruta, ignore_errors=True)
+            else:
+                ruta.unlink(missing_ok=True)
+
+
+def _leer_actual():
+    try:
+        return json.loads((directorio_instantanea() / ARCHIVO_ACTUAL).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _abrir(publicada):
+    global _abiertos
+    directorio = directorio_instantanea()
+    archivos = {int(bloque): nombre for bloque, nombre in publicada['bloques'].items()}
+    # Los bloques que no cambiaron desde la última generación abierta ya están mapeados
+    abiertos = {
+        nombre: _abiertos.get(nombre) or {
+            columna: np.load(directorio / nombre / f'{columna}.npy', mmap_mode='r') for columna in (*COLUMNAS, *INDICE)
+        }
+        for nombre in archivos.values()
+    }
+    _abiertos = abiertos
+    return Instantanea(publicada['version'], {bloque: abiertos[nombre] for bloque, nombre in archivos.items()}, archivos)
+
+
+def _abrir_publicada():
+    publicada = _leer_actual()
+    if publicada is None:
+        return None
+    try:
+        return _abrir(publicada)
+    except FileNotFoundError:
+        # Entre leer ACTUAL y abrir los bloques se publicó otra y se limpiaron los viejos
+        return None
+
+
+@contextmanager
+def _bloqueo(nombre=ARCHIVO_BLOQUEO, cerrojo=_lock):
+    with cerrojo, open(directorio_instantanea() / nombre, 'w') as archivo:
+        if fcntl is not None:
+            fcntl.flock(archivo, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+
+def obtener_instantanea():
+    """
+    Instantánea al día con la última escritura confirmada. Normalmente solo
+    cuesta leer el contador de versión de la caché; nunca escribe en disco.
+    """
+    global _actual
+    version_datos = version(ESPACIO)
+    if not cache_compartida():
+        return Instantanea(version_datos, _partir(_leer_mediciones()))
+    if _actual is not None and _actual.version == version_datos:
+        return _actual
+
+    publicada = _abrir_publicada()
+    if publicada is not None and publicada.version >= version_datos:
+        _actual = publicada
+    else:
+        # La generación nueva la publica el worker; mientras tanto se releen solo las series que cambiaron
+        encolar_periodica(INTERVALO_REENCOLAR, TAREA)
+        _actual = _al_dia(publicada, version_datos)
+    return _actual
+
+
+def publicar_pendientes():
+    """
+    Publica generaciones hasta alcanzar la versión actual (tarea
+    actualizar_instantanea). Retorna la versión publicada.
+    """
+    global _actual
+    with _bloqueo():
+        publicada = _abrir_publicada()
+        for _ in range(MAX_PUBLICACIONES):
+            version_datos = version(ESPACIO)
+            if publicada is not None and publicada.version >= version_datos:
+                break
+            publicada = _publicar(version_datos, publicada)
+        _actual = publicada
+    return {'version': publicada.version if publicada is not None else None}
+
+
+def reconstruir_completa():
+    """
+    Relee todas las mediciones y publica una versión nueva (tras importaciones
+    masivas con bulk_create, que no disparan señales). Retorna la instantánea.
+    """
+    global _actual
+    with _bloqueo(ARCHIVO_BLOQUEO_CAMBIOS, _lock_cambios):
+        version_datos = siguiente_version(ESPACIO)
+    with _bloqueo():
+        _actual = _publicar(version_datos)
+    return _actual
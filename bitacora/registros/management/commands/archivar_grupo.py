@@ -0,0 +1,71 @@
+"""
+Management command para el cierre de semestre de un grupo
+Uso: python manage.py archivar_grupo <grupo> [--semestre 2026-1] [--sin-fotos] [--conservar-usuarios] [--confirmar]
+
+Exporta los estudiantes, mediciones, regresiones y fotografías del grupo al
+archivo histórico (Parquet si pyarrow está instalado, NPZ comprimido si no),
+lo registra como ArchivoGrupo y lo elimina de las tablas activas. Las
+imágenes se borran del disco en segundo plano.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from registros.archivo import archivar_y_purgar_grupo, pyarrow_disponible, semestre_actual
+from registros.models import Estudiante, MedicionPlantas, RegistroFotografico
+
+
+class Command(BaseCommand):
+    help = 'Archiva un grupo en formato columnar y lo elimina de las tablas activas (cierre de semestre)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('grupo', type=int, help='Número del grupo')
+        parser.add_argument(
+            '--semestre',
+            help='Etiqueta del semestre (default: el semestre en curso, p. ej. 2026-1)',
+        )
+        parser.add_argument(
+            '--sin-fotos',
+            action='store_true',
+            help='No incluye las fotografías en el archivo',
+        )
+        parser.add_argument(
+            '--conservar-usuarios',
+            action='store_true',
+            help='No desactiva las cuentas de usuario de los estudiantes',
+        )
+        parser.add_argument(
+            '--confirmar',
+            action='store_true',
+            help='Archiva y elimina el grupo (sin esta opción solo se muestra qué se haría)',
+        )
+
+    def handle(self, *args, **options):
+        grupo = options['grupo']
+        semestre = options['semestre'] or semestre_actual()
+        num_estudiantes = Estudiante.objects.filter(grupo=grupo).count()
+        if not num_estudiantes:
+            raise CommandError(f'El grupo {grupo} no tiene estudiantes')
+        num_mediciones = MedicionPlantas.objects.filter(estudiante__grupo=grupo).count()
+        num_fotos = RegistroFotografico.objects.filter(estudiante__grupo=grupo).count()
+        self.stdout.write(
+            f'Grupo {grupo} ({semestre}): {num_estudiantes} estudiantes, '
+            f'{num_mediciones} mediciones, {num_fotos} fotografías'
+        )
+        self.stdout.write(f'Formato: {"Parquet" if pyarrow_disponible() else "NPZ comprimido"}')
+
+        if not options['confirmar']:
+            self.stdout.write(self.style.WARNING('No se archivó nada. Usa --confirmar para archivar y purgar el grupo.'))
+            return
+
+        archivo, resultado = archivar_y_purgar_grupo(
+            grupo,
+            semestre=semestre,
+            incluir_fotos=not options['sin_fotos'],
+            desactivar_usuarios=not options['conservar_usuarios'],
+        )
+        self.stdout.write(self.style.SUCCESS(f'✓ Archivado en {archivo.ruta} ({archivo.tamano / 1024:.1f} KB)'))
+        self.stdout.write(
+            f'Eliminados: {resultado["estudiantes"]} estudiantes, {resultado["mediciones"]} mediciones, '
+            f'{resultado["registros_fotograficos"]} registros fotográficos'
+        )
+        self.stdout.write(f'Imágenes encoladas para borrar: {resultado["archivos"]}')
+        if 'usuarios_desactivados' in resultado:
+            self.stdout.write(f'Usuarios desactivados: {resultado["usuarios_desactivados"]}')
@@ -0,0 +1,88 @@
+"""
+Management command para auditar las mediciones en busca de valores atípicos
+Uso: python manage.py auditar_mediciones [--umbral Z] [--grupo N] [--marcar]
+
+Calcula con una sola consulta y de forma vectorizada el residuo studentizado
+de cada medición respecto a la recta de su estudiante, y lista las que
+superan el umbral (errores típicos: 155 en lugar de 15.5).
+"""
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from registros.anomalias import UMBRAL_Z, puntuaciones_z
+from registros.cache import espacio_estudiante, invalidar
+from registros.models import Estudiante, MedicionPlantas
+from registros.numerico import altura_centesimas, centimetros, columnas_enteras, texto_centimetros
+
+# Mediciones por UPDATE al marcar
+TAMANO_LOTE = 500
+
+
+class Command(BaseCommand):
+    help = 'Busca mediciones atípicas en toda la tabla usando puntuaciones z por estudiante'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--umbral',
+            type=float,
+            default=UMBRAL_Z,
+            help=f'Valor absoluto de z a partir del cual una medición es atípica (default: {UMBRAL_Z})',
+        )
+        parser.add_argument(
+            '--grupo',
+            type=int,
+            help='Limita la auditoría a un grupo',
+        )
+        parser.add_argument(
+            '--marcar',
+            action='store_true',
+            help='Marca como atípicas las mediciones detectadas (nunca quita marcas confirmadas al registrar)',
+        )
+
+    def handle(self, *args, **options):
+        mediciones = MedicionPlantas.objects.order_by('estudiante_id', 'dia')
+        if options['grupo'] is not None:
+            mediciones = mediciones.filter(estudiante__grupo=options['grupo'])
+        filas = columnas_enteras(mediciones, 'id', 'estudiante_id', 'dia', altura_centesimas(), 'atipica')
+
+        if not len(filas):
+            self.stdout.write(self.style.WARNING('No hay mediciones para auditar'))
+            return
+
+        ids, estudiantes, dias, alturas, marcadas = filas.T
+        marcadas = marcadas.astype(bool)
+        z = puntuaciones_z(estudiantes, dias, centimetros(alturas))
+        atipicas = np.abs(np.nan_to_num(z)) > options['umbral']
+        nombres = dict(
+            Estudiante.objects.filter(pk__in=np.unique(estudiantes[atipicas]).tolist()).values_list('pk', 'nombre')
+        )
+
+        self.stdout.write('=' * 80)
+        self.stdout.write(self.style.WARNING(f'MEDICIONES ATÍPICAS (|z| > {options["umbral"]})'))
+        self.stdout.write('=' * 80)
+        for i in np.flatnonzero(atipicas):
+            self.stdout.write(
+                f'  • {nombres.get(estudiantes[i])} — día {dias[i]}: {texto_centimetros(alturas[i])} cm (z = {z[i]:+.1f})'
+                f'{" [ya marcada]" if marcadas[i] else ""}'
+            )
+
+        total = int(atipicas.sum())
+        sin_evaluar = int(np.isnan(z).sum())
+        self.stdout.write(f'\nRevisadas: {len(filas)} | Atípicas: {total} | Sin datos suficientes: {sin_evaluar}')
+
+        if options['marcar']:
+            # Solo se agregan marcas: las que el usuario confirmó al registrar se
+            # respetan aunque la auditoría no las detecte. Se sube la versión para
+            # que un formulario de edición abierto no pise la marca (bloqueo optimista)
+            por_marcar = atipicas & ~marcadas
+            nuevas = ids[por_marcar].tolist()
+            actualizadas = 0
+            for inicio in range(0, len(nuevas), TAMANO_LOTE):
+                actualizadas += MedicionPlantas.objects.filter(
+                    pk__in=nuevas[inicio:inicio + TAMANO_LOTE], atipica=False,
+                ).update(atipica=True, version=F('version') + 1)
+            if actualizadas:
+                # update() no envía señales: las listas y análisis en caché mostrarían las marcas viejas
+                afectados = np.unique(estudiantes[por_marcar]).tolist()
+                invalidar('dashboard', *[espacio_estudiante(pk) for pk in afectados])
+            self.stdout.write(self.style.SUCCESS(f'✓ {actualizadas} mediciones marcadas'))
@@ -0,0 +1,129 @@
+"""
+Management command para medir el costo por fila de leer las mediciones
+Uso: python manage.py benchmark_lectura [--repeticiones N] [--sinteticas N]
+
+Compara las formas de llevar (día, altura) de la base de datos a NumPy:
+
+- objetos:    instancias del modelo y float(m.altura) (como se hacía antes)
+- decimal:    values_list('dia', 'altura') y float() de cada Decimal
+- centesimas: la base de datos entrega la altura como entero en centésimas
+              y las filas pasan a NumPy en una sola llamada (registros/numerico.py)
+- instantanea: columnas ya mapeadas en memoria (registros/instantanea.py)
+
+Con --sinteticas se insertan N mediciones temporales dentro de una
+transacción que se deshace al terminar.
+"""
+import time
+from decimal import Decimal
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from registros.instantanea import obtener_instantanea
+from registros.models import Estudiante, MedicionPlantas
+from registros.numerico import altura_centesimas, centimetros, columnas_enteras
+
+DIAS_POR_ESTUDIANTE = 100
+
+
+def por_objetos():
+    mediciones = list(MedicionPlantas.objects.all())
+    return (
+        np.array([float(m.dia) for m in mediciones]),
+        np.array([float(m.altura) for m in mediciones]),
+    )
+
+
+def por_decimal():
+    filas = list(MedicionPlantas.objects.values_list('dia', 'altura'))
+    return (
+        np.array([float(dia) for dia, _ in filas]),
+        np.array([float(altura) for _, altura in filas]),
+    )
+
+
+def por_centesimas():
+    filas = columnas_enteras(MedicionPlantas.objects.all(), 'dia', altura_centesimas())
+    return filas[:, 0].astype(np.float64), centimetros(filas[:, 1])
+
+
+def por_instantanea():
+    _, dias, alturas = obtener_instantanea().filas_grupos()
+    return dias.astype(np.float64), alturas.astype(np.float64)
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo por fila de leer día y altura de las mediciones con cada método'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5, help='Se reporta la mejor de N (default: 5)')
+        parser.add_argument(
+            '--sinteticas',
+            type=int,
+            default=0,
+            help='Inserta N mediciones temporales (se deshacen al terminar)',
+        )
+
+    def insertar_sinteticas(self, total):
+        rng = np.random.default_rng(7)
+        num_estudiantes = -(-total // DIAS_POR_ESTUDIANTE)
+        estudiantes = Estudiante.objects.bulk_create([
+            Estudiante(nombre=f'Benchmark {i}', correo_institucional=f'benchmark{i}@benchmark.invalid', grupo=9999)
+            for i in range(num_estudiantes)
+        ])
+        # MySQL no retorna los ids de bulk_create
+        ids = list(Estudiante.objects.filter(grupo=9999).values_list('pk', flat=True))
+        MedicionPlantas.objects.bulk_create((
+            MedicionPlantas(
+                estudiante_id=ids[i // DIAS_POR_ESTUDIANTE],
+                dia=i % DIAS_POR_ESTUDIANTE + 1,
+                altura=Decimal(f'{rng.uniform(0, 80):.2f}'),
+            )
+            for i in range(total)
+        ), batch_size=1000)
+        return len(estudiantes)
+
+    def medir(self, funcion, repeticiones):
+        mejor = float('inf')
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            resultado = funcion()
+            mejor = min(mejor, time.perf_counter() - inicio)
+        return mejor, resultado
+
+    def handle(self, *args, **options):
+        metodos = [('objetos', por_objetos), ('decimal', por_decimal), ('centesimas', por_centesimas)]
+
+        with transaction.atomic():
+            if options['sinteticas']:
+                self.insertar_sinteticas(options['sinteticas'])
+            else:
+                # La instantánea solo ve datos confirmados: con filas temporales no es comparable
+                metodos.append(('instantanea', por_instantanea))
+
+            filas = MedicionPlantas.objects.count()
+            if not filas:
+                self.stdout.write(self.style.WARNING('No hay mediciones. Usa --sinteticas N.'))
+                return
+
+            self.stdout.write(self.style.SUCCESS('=== Benchmark de lectura de mediciones ==='))
+            self.stdout.write(f'Filas: {filas} | mejor de {options["repeticiones"]} repeticiones')
+
+            referencia = None
+            base = None
+            for nombre, funcion in metodos:
+                segundos, (dias, alturas) = self.medir(funcion, options['repeticiones'])
+                por_fila = segundos / filas * 1e6
+                base = base or por_fila
+                # Mismo multiconjunto de valores que el método de referencia (el orden puede variar)
+                valores = np.sort(np.round(alturas, 2))
+                referencia = valores if referencia is None else referencia
+                exacto = np.array_equal(valores, referencia)
+                self.stdout.write(
+                    f'  {nombre:12} {segundos * 1000:9.2f} ms  {por_fila:7.3f} µs/fila  '
+                    f'x{base / por_fila:5.1f}  {"✓" if exacto else "✗ valores distintos"}'
+                )
+
+            # No deja rastro de las filas temporales
+            transaction.set_rollback(True)
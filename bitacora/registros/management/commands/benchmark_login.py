@@ -0,0 +1,88 @@
+"""
+Management command para medir cuántos inicios de sesión atiende un worker
+Uso: python manage.py benchmark_login [--repeticiones N] [--estudiantes N] [--workers N]
+
+Mide el costo de un inicio de sesión con cada hasher:
+
+- pbkdf2:  PBKDF2PasswordHasher de Django (el perfil por defecto)
+- argon2:  registros.hashers.Argon2Ajustado con REGISTROS_ARGON2 (si
+           argon2-cffi está instalado)
+- login:   LoginForm.is_valid() completo con la configuración actual
+           (PASSWORD_HASHERS), como en login_view: consulta del usuario y
+           verificación de la contraseña. El usuario se crea dentro de una
+           transacción que se deshace al terminar.
+- rechazo: un intento rechazado por el límite de fallos (registros/acceso.py),
+           que no llega a cifrar nada
+
+Con --estudiantes y --workers estima cuánto tarda en entrar un salón completo.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from registros.acceso import bloqueado
+from registros.forms import LoginForm
+from registros.hashers import Argon2Ajustado
+
+CONTRASENA = 'benchmark-Clave-2024'
+
+
+class Command(BaseCommand):
+    help = 'Mide los inicios de sesión por segundo que atiende un worker con cada hasher'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=10, help='Verificaciones por método (default: 10)')
+        parser.add_argument('--estudiantes', type=int, default=40, help='Tamaño del salón (default: 40)')
+        parser.add_argument('--workers', type=int, default=2, help='Procesos del servidor (default: 2)')
+
+    def medir(self, funcion, repeticiones):
+        funcion()  # Calentamiento (carga de bibliotecas, consultas preparadas)
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            funcion()
+        return (time.perf_counter() - inicio) / repeticiones
+
+    def metodos(self):
+        for nombre, hasher in (('pbkdf2', PBKDF2PasswordHasher()), ('argon2', Argon2Ajustado())):
+            try:
+                codificada = hasher.encode(CONTRASENA, hasher.salt())
+            except ValueError:
+                # Biblioteca no instalada
+                self.stdout.write(self.style.WARNING(f'  {nombre:8} no disponible (falta la biblioteca)'))
+                continue
+            yield nombre, lambda hasher=hasher, codificada=codificada: hasher.verify(CONTRASENA, codificada)
+
+        usuario = User.objects.create(username='benchmark_login', password=make_password(CONTRASENA))
+        datos = {'username': usuario.username, 'password': CONTRASENA}
+
+        def iniciar_sesion():
+            form = LoginForm(None, data=datos)
+            assert form.is_valid(), form.errors
+        yield 'login', iniciar_sesion
+
+        solicitud = RequestFactory().post('/login/', datos, REMOTE_ADDR='192.0.2.1')
+        yield 'rechazo', lambda: bloqueado(solicitud, usuario.username)
+
+    def handle(self, *args, **options):
+        repeticiones = options['repeticiones']
+        estudiantes, workers = options['estudiantes'], options['workers']
+
+        self.stdout.write(self.style.SUCCESS('=== Benchmark de inicio de sesión ==='))
+        self.stdout.write(f'Hasher preferido: {settings.PASSWORD_HASHERS[0]}')
+        self.stdout.write(f'Salón de {estudiantes} estudiantes, {workers} workers, {repeticiones} repeticiones')
+
+        with transaction.atomic():
+            for nombre, funcion in self.metodos():
+                segundos = self.medir(funcion, repeticiones)
+                salon = segundos * estudiantes / workers
+                self.stdout.write(
+                    f'  {nombre:8} {segundos * 1000:9.2f} ms  {1 / segundos:9.1f} por segundo y worker  '
+                    f'salón completo en {salon:6.2f} s'
+                )
+            # No deja rastro del usuario temporal
+            transaction.set_rollback(True)
@@ -0,0 +1,83 @@
+"""
+Management command para medir el tiempo de ajuste de los modelos de crecimiento
+Uso: python manage.py benchmark_modelos [--estudiantes N] [--dias N] [--datos-reales]
+
+El objetivo es que seleccionar_modelo tarde menos de 1 ms por estudiante.
+"""
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from registros.models import MedicionPlantas
+from registros.modelos_crecimiento import seleccionar_modelo
+
+LIMITE_US = 1000
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de ajuste y selección de modelos de crecimiento por estudiante'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudiantes', type=int, default=500, help='Series sintéticas a ajustar (default: 500)')
+        parser.add_argument('--dias', type=int, default=20, help='Mediciones por serie sintética (default: 20)')
+        parser.add_argument(
+            '--datos-reales',
+            action='store_true',
+            help='Usa las mediciones de la base de datos en lugar de series sintéticas',
+        )
+
+    def series_sinteticas(self, estudiantes, dias):
+        # Mismo modelo que generar_datos_prueba: germinación lenta los primeros 3 días
+        rng = np.random.default_rng(42)
+        x = np.arange(1, dias + 1, dtype=float)
+        factor = np.where(x <= 3, 0.3, 1.0)
+        for _ in range(estudiantes):
+            base = rng.uniform(1.2, 2.2)
+            y = rng.uniform(2.0, 3.0) + base * x * factor + rng.normal(0, 0.5, dias)
+            yield x, np.maximum(y, 0.1)
+
+    def series_reales(self):
+        series = {}
+        filas = MedicionPlantas.objects.order_by('estudiante_id', 'dia').values_list('estudiante_id', 'dia', 'altura')
+        for estudiante_id, dia, altura in filas:
+            series.setdefault(estudiante_id, ([], []))
+            series[estudiante_id][0].append(float(dia))
+            series[estudiante_id][1].append(float(altura))
+        for dias, alturas in series.values():
+            if len(dias) >= 2:
+                yield np.array(dias), np.array(alturas)
+
+    def handle(self, *args, **options):
+        if options['datos_reales']:
+            series = list(self.series_reales())
+        else:
+            series = list(self.series_sinteticas(options['estudiantes'], options['dias']))
+
+        if not series:
+            self.stdout.write(self.style.WARNING('No hay series para ajustar.'))
+            return
+
+        # Calentamiento (importaciones y cachés internas de NumPy)
+        for x, y in series[:10]:
+            seleccionar_modelo(x, y)
+
+        tiempos = np.empty(len(series))
+        elegidos = {}
+        for i, (x, y) in enumerate(series):
+            inicio = time.perf_counter()
+            seleccion = seleccionar_modelo(x, y)
+            tiempos[i] = (time.perf_counter() - inicio) * 1e6
+            elegidos[seleccion['seleccionado']] = elegidos.get(seleccion['seleccionado'], 0) + 1
+
+        self.stdout.write(self.style.SUCCESS('=== Benchmark de modelos de crecimiento ==='))
+        self.stdout.write(f'Series ajustadas: {len(series)}')
+        self.stdout.write(f'Media: {tiempos.mean():.0f} µs | Mediana: {np.median(tiempos):.0f} µs | '
+                          f'P95: {np.percentile(tiempos, 95):.0f} µs')
+        for modelo, cantidad in sorted(elegidos.items(), key=lambda item: -item[1]):
+            self.stdout.write(f'  {modelo:12} {cantidad}')
+
+        if np.median(tiempos) < LIMITE_US:
+            self.stdout.write(self.style.SUCCESS(f'✓ Por debajo de {LIMITE_US} µs por estudiante'))
+        else:
+            self.stdout.write(self.style.ERROR(f'✗ Supera {LIMITE_US} µs por estudiante'))
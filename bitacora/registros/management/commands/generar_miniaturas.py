@@ -0,0 +1,36 @@
+"""
+Management command para generar las miniaturas de los registros fotográficos
+Uso: python manage.py generar_miniaturas [--todas]
+
+Las fotos nuevas reciben su miniatura automáticamente (tarea
+generar_miniatura); este comando sirve para las subidas antes de que
+existieran las miniaturas. Encola una tarea por registro.
+"""
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from registros.models import RegistroFotografico
+from registros.tareas import encolar
+
+
+class Command(BaseCommand):
+    help = 'Encola la generación de miniaturas de los registros fotográficos que no la tienen'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--todas',
+            action='store_true',
+            help='Regenera también las miniaturas existentes',
+        )
+
+    def handle(self, *args, **options):
+        registros = RegistroFotografico.objects.exclude(imagen='')
+        if not options['todas']:
+            registros = registros.filter(miniatura='')
+        ids = list(registros.values_list('pk', flat=True))
+
+        with transaction.atomic():
+            for registro_id in ids:
+                encolar('generar_miniatura', {'registro_id': registro_id})
+
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(ids)} miniaturas encoladas'))
@@ -0,0 +1,76 @@
+"""
+Management command que ejecuta las tareas en segundo plano
+Uso: python manage.py procesar_tareas [--una-vez] [--lote N] [--intervalo S] [--tarea NOMBRE ...]
+
+Se pueden lanzar varios procesos en paralelo (en una o varias máquinas):
+cada uno reclama tareas distintas con SELECT ... FOR UPDATE SKIP LOCKED.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from registros.escritura import purgar_solicitudes
+from registros.subidas import purgar_subidas
+from registros.tareas import procesar_pendientes, purgar_sesiones, purgar_terminadas, recuperar_abandonadas
+
+# Cada cuántas vueltas del bucle se hace el mantenimiento de la cola
+VUELTAS_MANTENIMIENTO = 100
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas en segundo plano encoladas en la base de datos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--una-vez',
+            action='store_true',
+            help='Procesa las tareas pendientes y termina (útil en cron)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=10,
+            help='Tareas que se reclaman en cada consulta (default: 10)',
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=float,
+            default=2.0,
+            help='Segundos de espera cuando la cola está vacía (default: 2)',
+        )
+        parser.add_argument(
+            '--tarea',
+            action='append',
+            dest='tareas',
+            help='Procesa solo las tareas con este nombre (se puede repetir)',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Worker de tareas iniciado'))
+        total = 0
+        vueltas = 0
+        try:
+            while True:
+                if vueltas % VUELTAS_MANTENIMIENTO == 0:
+                    recuperadas = recuperar_abandonadas()
+                    if recuperadas:
+                        self.stdout.write(self.style.WARNING(f'⚠ {recuperadas} tareas abandonadas devueltas a la cola'))
+                    purgar_terminadas()
+                    purgar_solicitudes()
+                    purgar_sesiones()
+                    purgar_subidas()
+                vueltas += 1
+
+                procesadas = procesar_pendientes(options['lote'], options['tareas'])
+                total += procesadas
+                if procesadas:
+                    self.stdout.write(f'✓ {procesadas} tareas procesadas ({total} en total)')
+                    continue
+                if options['una_vez']:
+                    break
+                # Conexiones persistentes: se cierran si caducaron mientras se espera
+                close_old_connections()
+                time.sleep(options['intervalo'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'✓ Worker detenido ({total} tareas procesadas)'))
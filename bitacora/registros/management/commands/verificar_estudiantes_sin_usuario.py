@@ -1,7 +1,11 @@
+import csv
+import time
+
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand
-from django.contrib.auth.models import User
+from registros.cuentas import crear_usuarios_para_estudiantes
 from registros.models import Estudiante
-from django.db import transaction
+from registros.tareas import encolar
 
 
 class Command(BaseCommand):
@@ -19,26 +23,49 @@ class Command(BaseCommand):
             default='temporal123',
             help='Contraseña para los usuarios creados automáticamente (default: temporal123)'
         )
+        parser.add_argument(
+            '--en-segundo-plano',
+            action='store_true',
+            help='Encola la creación de usuarios como tarea en lugar de ejecutarla aquí'
+        )
+        parser.add_argument(
+            '--contrasenas-aleatorias',
+            action='store_true',
+            help='Genera una contraseña distinta para cada usuario (se guardan en --salida)'
+        )
+        parser.add_argument(
+            '--salida',
+            type=str,
+            default='usuarios_creados.csv',
+            help='Archivo CSV con usuario y contraseña cuando se usan contraseñas aleatorias'
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            help='Procesos para cifrar las contraseñas (default: uno por CPU)'
+        )
 
     def handle(self, *args, **kwargs):
         crear_usuarios = kwargs.get('crear_usuarios', False)
         password_default = kwargs.get('password', 'temporal123')
+        en_segundo_plano = kwargs.get('en_segundo_plano', False)
+        aleatorias = kwargs.get('contrasenas_aleatorias', False)
         
-        # Buscar estudiantes sin usuario
-        estudiantes_sin_usuario = Estudiante.objects.filter(usuario__isnull=True)
+        # Buscar estudiantes sin usuario (una sola consulta)
+        estudiantes_sin_usuario = list(Estudiante.objects.filter(usuario__isnull=True))
         
         self.stdout.write('=' * 80)
         self.stdout.write(self.style.WARNING('ESTUDIANTES SIN USUARIO ASOCIADO'))
         self.stdout.write('=' * 80)
         
-        if not estudiantes_sin_usuario.exists():
+        if not estudiantes_sin_usuario:
             self.stdout.write(
                 self.style.SUCCESS('\n✓ Todos los estudiantes tienen un usuario asociado\n')
             )
             return
         
         self.stdout.write(
-            self.style.WARNING(f'\n⚠ Encontrados {estudiantes_sin_usuario.count()} estudiantes sin usuario:\n')
+            self.style.WARNING(f'\n⚠ Encontrados {len(estudiantes_sin_usuario)} estudiantes sin usuario:\n')
         )
         
         for estudiante in estudiantes_sin_usuario:
@@ -65,54 +92,52 @@ class Command(BaseCommand):
         self.stdout.write('=' * 80)
         self.stdout.write(self.style.WARNING('CREANDO USUARIOS AUTOMÁTICAMENTE'))
         self.stdout.write('=' * 80)
-        self.stdout.write(f'Contraseña para todos: {password_default}\n')
+        if aleatorias:
+            self.stdout.write(f'Contraseñas aleatorias, se guardarán en {kwargs["salida"]}\n')
+        else:
+            self.stdout.write(f'Contraseña para todos: {password_default}\n')
         
-        creados = 0
-        errores = 0
+        if en_segundo_plano:
+            if aleatorias:
+                self.stdout.write(self.style.ERROR('✗ Las contraseñas aleatorias no se pueden generar en segundo plano'))
+                return
+            tarea = encolar(
+                # Se encola la contraseña ya cifrada: la cola no guarda contraseñas en claro
+                'crear_usuarios_estudiantes', {'password_hash': make_password(password_default)},
+                clave='crear_usuarios_estudiantes',
+            )
+            self.stdout.write(self.style.SUCCESS(f'✓ Creación encolada como tarea #{tarea.pk} (ver procesar_tareas)'))
+            return
         
-        for estudiante in estudiantes_sin_usuario:
-            try:
-                with transaction.atomic():
-                    # Generar nombre de usuario desde el nombre
-                    nombre_base = estudiante.nombre.lower().replace(' ', '_')
-                    username = nombre_base
-                    
-                    # Si el username ya existe, agregar número
-                    contador = 1
-                    while User.objects.filter(username=username).exists():
-                        username = f"{nombre_base}{contador}"
-                        contador += 1
-                    
-                    # Crear el usuario
-                    user = User.objects.create_user(
-                        username=username,
-                        email=estudiante.correo_institucional,
-                        password=password_default,
-                        first_name=estudiante.nombre.split()[0] if estudiante.nombre.split() else estudiante.nombre,
-                        last_name=' '.join(estudiante.nombre.split()[1:]) if len(estudiante.nombre.split()) > 1 else ''
-                    )
-                    
-                    # Asociar con el estudiante
-                    estudiante.usuario = user
-                    estudiante.save()
-                    
-                    creados += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(f'✓ Usuario creado: {username:30} → {estudiante.nombre}')
-                    )
-                    
-            except Exception as e:
-                errores += 1
-                self.stdout.write(
-                    self.style.ERROR(f'✗ Error creando usuario para {estudiante.nombre}: {e}')
-                )
+        inicio = time.perf_counter()
+        resultado = crear_usuarios_para_estudiantes(
+            password=password_default, aleatorias=aleatorias, procesos=kwargs.get('procesos'),
+        )
+        duracion = time.perf_counter() - inicio
+        for username, nombre, _ in resultado['creados']:
+            self.stdout.write(
+                self.style.SUCCESS(f'✓ Usuario creado: {username:30} → {nombre}')
+            )
+        for nombre, error in resultado['errores']:
+            self.stdout.write(
+                self.style.ERROR(f'✗ Error creando usuario para {nombre}: {error}')
+            )
+        creados = len(resultado['creados'])
+        errores = len(resultado['errores'])
         
         self.stdout.write('\n' + '=' * 80)
-        self.stdout.write(self.style.SUCCESS(f'✓ {creados} usuarios creados exitosamente'))
+        self.stdout.write(self.style.SUCCESS(f'✓ {creados} usuarios creados exitosamente en {duracion:.2f} s'))
         if errores > 0:
             self.stdout.write(self.style.ERROR(f'✗ {errores} errores'))
         self.stdout.write('=' * 80)
         
-        if creados > 0:
+        if creados > 0 and aleatorias:
+            with open(kwargs['salida'], 'w', newline='', encoding='utf-8') as archivo:
+                writer = csv.writer(archivo)
+                writer.writerow(['Usuario', 'Estudiante', 'Contraseña'])
+                writer.writerows(resultado['creados'])
+            self.stdout.write(self.style.WARNING(f'\n⚠ IMPORTANTE: Las contraseñas están en {kwargs["salida"]}; entrégalas y borra el archivo.'))
+            self.stdout.write(self.style.WARNING('Los estudiantes deben cambiarla al iniciar sesión.\n'))
+        elif creados > 0:
             self.stdout.write(self.style.WARNING('\n⚠ IMPORTANTE: Todos los usuarios tienen la contraseña: ' + password_default))
             self.stdout.write(self.style.WARNING('Los estudiantes deben cambiarla al iniciar sesión.\n'))
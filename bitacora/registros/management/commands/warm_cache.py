@@ -0,0 +1,81 @@
+"""
+Management command para precalcular la caché de análisis
+Uso: python manage.py warm_cache [--graficas] [--grupo N] [--instantanea] [--resumen-grupos] [--resumen-estudiantes]
+
+Conviene ejecutarlo después de un despliegue o de una importación masiva,
+para que el primer acceso al dashboard no tenga que calcular todo.
+"""
+from django.core.management.base import BaseCommand
+from registros.models import Estudiante
+from registros.analisis import obtener_grafica, obtener_regresion, precalcular_resumenes
+from registros.grupos import obtener_curvas_grupos, reconstruir_resumen_grupos
+from registros.instantanea import reconstruir_completa
+from registros.prediccion import reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Precalcula en caché los datos del dashboard y de regresión de cada estudiante'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--graficas',
+            action='store_true',
+            help='También genera y guarda las gráficas de regresión (más lento)',
+        )
+        parser.add_argument(
+            '--grupo',
+            type=int,
+            help='Limita el precálculo a un grupo',
+        )
+        parser.add_argument(
+            '--instantanea',
+            action='store_true',
+            help='Reconstruye desde cero la instantánea columnar de análisis (tras importaciones masivas)',
+        )
+        parser.add_argument(
+            '--resumen-grupos',
+            action='store_true',
+            help='Reconstruye el resumen materializado por grupo y día (tras importaciones masivas)',
+        )
+        parser.add_argument(
+            '--resumen-estudiantes',
+            action='store_true',
+            help='Recalcula las estadísticas suficientes de predicción de cada estudiante',
+        )
+
+    def handle(self, *args, **options):
+        # El resumen por grupo se calcula desde la instantánea: primero hay que tenerla al día
+        if options['instantanea'] or options['resumen_grupos']:
+            instantanea = reconstruir_completa()
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Instantánea reconstruida ({instantanea.num_mediciones} mediciones, '
+                f'{len(instantanea.ids)} estudiantes)'
+            ))
+
+        if options['resumen_grupos']:
+            grupos = [options['grupo']] if options['grupo'] is not None else None
+            celdas = reconstruir_resumen_grupos(grupos)
+            obtener_curvas_grupos()
+            self.stdout.write(self.style.SUCCESS(f'✓ Resumen por grupo reconstruido ({celdas} celdas grupo/día)'))
+
+        estudiantes = Estudiante.objects.all()
+        if options['grupo'] is not None:
+            estudiantes = estudiantes.filter(grupo=options['grupo'])
+        estudiantes = list(estudiantes)
+
+        if options['resumen_estudiantes']:
+            total = reconstruir_resumenes([estudiante.id for estudiante in estudiantes])
+            self.stdout.write(self.style.SUCCESS(f'✓ Estadísticas de predicción recalculadas ({total} estudiantes)'))
+
+        self.stdout.write(f'Precalculando resúmenes de {len(estudiantes)} estudiantes...')
+        resumenes = precalcular_resumenes(estudiante.id for estudiante in estudiantes)
+        analizables = [e for e in estudiantes if resumenes[e.id]['puede_analizar']]
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(resumenes)} resúmenes del dashboard en caché'))
+
+        for estudiante in analizables:
+            datos = obtener_regresion(estudiante.id)
+            if options['graficas']:
+                obtener_grafica(estudiante, datos)
+
+        detalle = ' y gráficas' if options['graficas'] else ''
+        self.stdout.write(self.style.SUCCESS(f'✓ {len(analizables)} regresiones{detalle} en caché'))
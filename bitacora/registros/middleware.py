@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+
+from .estaticos import indexar_estaticos
+from .routers import registrando_escrituras, replica_disponible
+
+COOKIE_PRIMARIO = 'bitacora_primario'
+SAL_PRIMARIO = 'registros.primario'
+
+
+class FijarPrimarioMiddleware:
+    """
+    Garantiza que un usuario vea sus propias escrituras aunque la réplica vaya
+    atrasada: tras escribir, sus lecturas van al primario durante unos segundos.
+
+    El estado viaja en una cookie firmada (no en la sesión) para no añadir
+    escrituras a django_session.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_disponible():
+            return self.get_response(request)
+
+        segundos = settings.REPLICA_FIJAR_PRIMARIO_SEGUNDOS
+        request.primario_fijado = request.get_signed_cookie(
+            COOKIE_PRIMARIO, default=None, salt=SAL_PRIMARIO, max_age=segundos
+        ) is not None
+
+        with registrando_escrituras() as hubo_escritura:
+            response = self.get_response(request)
+            if hubo_escritura():
+                response.set_signed_cookie(
+                    COOKIE_PRIMARIO, '1', salt=SAL_PRIMARIO, max_age=segundos,
+                    httponly=True, samesite='Lax',
+                )
+        return response
+
+
+# Un año: los nombres con hash cambian cuando cambia el contenido
+MAX_AGE_INMUTABLE = 60 * 60 * 24 * 365
+# Archivos sin hash (p. ej. referenciados desde fuera de las plantillas)
+MAX_AGE_SIN_HASH = 60
+
+
+class EstaticosMiddleware:
+    """
+    Sirve los archivos de STATIC_ROOT sin pasar por las vistas, al estilo de
+    WhiteNoise: índice en memoria construido al arrancar, variantes .br/.gz
+    precomprimidas por collectstatic (registros/estaticos.py), ETag y
+    Cache-Control inmutable para los nombres con hash.
+
+    En desarrollo (REGISTROS_SERVIR_ESTATICOS falso, por defecto con DEBUG)
+    se desactiva y los sirve django.contrib.staticfiles desde cada app.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REGISTROS_SERVIR_ESTATICOS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.archivos = indexar_estaticos(settings.STATIC_ROOT, settings.STATIC_URL)
+
+    def __call__(self, request):
+        archivo = self.archivos.get(request.path_info)
+        if archivo is None or request.method not in ('GET', 'HEAD'):
+            return self.get_response(request)
+        return self.servir(request, archivo)
+
+    def servir(self, request, archivo):
+        aceptadas = {
+            parte.split(';')[0].strip() for parte in request.META.get('HTTP_ACCEPT_ENCODING', '').split(',')
+        }
+        codificacion = next(
+            (c for c in ('br', 'gzip') if c in aceptadas and c in archivo.variantes), 'identity'
+        )
+        ruta, tamano = archivo.variantes[codificacion]
+        etag = f'"{archivo.etag}-{codificacion}"'
+
+        if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+            response = HttpResponseNotModified()
+        elif request.method == 'HEAD':
+            response = HttpResponse(content_type=archivo.tipo)
+            response['Content-Length'] = tamano
+        else:
+            response = FileResponse(open(ruta, 'rb'), content_type=archivo.tipo)
+        if codificacion != 'identity' and response.status_code == 200:
+            response['Content-Encoding'] = codificacion
+
+        response['ETag'] = etag
+        response['Last-Modified'] = archivo.ultima_modificacion
+        if archivo.inmutable:
+            response['Cache-Control'] = f'public, max-age={MAX_AGE_INMUTABLE}, immutable'
+        else:
+            response['Cache-Control'] = f'public, max-age={MAX_AGE_SIN_HASH}'
+        if len(archivo.variantes) > 1:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def poblar_resumen_grupos(apps, schema_editor):
+    """Materializa el resumen por grupo y día para las mediciones existentes."""
+    from registros.grupos import calcular_estadisticas
+
+    MedicionPlantas = apps.get_model('registros', 'MedicionPlantas')
+    ResumenGrupo = apps.get_model('registros', 'ResumenGrupo')
+
+    filas = list(MedicionPlantas.objects.values_list('estudiante__grupo', 'dia', 'altura'))
+    if not filas:
+        return
+    grupos, dias, alturas = zip(*filas)
+    estadisticas = calcular_estadisticas(grupos, dias, [float(altura) for altura in alturas])
+    ResumenGrupo.objects.bulk_create([
+        ResumenGrupo(
+            grupo=int(estadisticas['grupo'][i]),
+            dia=int(estadisticas['dia'][i]),
+            num_mediciones=int(estadisticas['num_mediciones'][i]),
+            media=float(estadisticas['media'][i]),
+            mediana=float(estadisticas['p50'][i]),
+            desviacion=float(estadisticas['desviacion'][i]),
+            percentil_10=float(estadisticas['p10'][i]),
+            percentil_25=float(estadisticas['p25'][i]),
+            percentil_75=float(estadisticas['p75'][i]),
+            percentil_90=float(estadisticas['p90'][i]),
+        )
+        for i in range(len(estadisticas['grupo']))
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registros', '0005_estudiante_usuario'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='estudiante',
+            name='usuario',
+            field=models.OneToOneField(blank=True, help_text='Usuario que puede iniciar sesión con esta cuenta de estudiante', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='estudiante', to=settings.AUTH_USER_MODEL, verbose_name='Usuario asociado'),
+        ),
+        migrations.CreateModel(
+            name='ResumenGrupo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grupo', models.IntegerField(verbose_name='Grupo/Curso')),
+                ('dia', models.IntegerField(verbose_name='Día de medición')),
+                ('num_mediciones', models.PositiveIntegerField(verbose_name='Número de mediciones')),
+                ('media', models.FloatField(verbose_name='Media (cm)')),
+                ('mediana', models.FloatField(verbose_name='Mediana (cm)')),
+                ('desviacion', models.FloatField(verbose_name='Desviación estándar (cm)')),
+                ('percentil_10', models.FloatField(verbose_name='Percentil 10 (cm)')),
+                ('percentil_25', models.FloatField(verbose_name='Percentil 25 (cm)')),
+                ('percentil_75', models.FloatField(verbose_name='Percentil 75 (cm)')),
+                ('percentil_90', models.FloatField(verbose_name='Percentil 90 (cm)')),
+                ('actualizado', models.DateTimeField(auto_now=True, verbose_name='Actualizado')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Grupo',
+                'verbose_name_plural': 'Resúmenes de Grupos',
+                'ordering': ['grupo', 'dia'],
+                'unique_together': {('grupo', 'dia')},
+            },
+        ),
+        migrations.RunPython(poblar_resumen_grupos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, FloatField, Sum
+from django.db.models.functions import Cast
+
+
+def poblar_resumen_estudiantes(apps, schema_editor):
+    """Calcula las estadísticas suficientes de cada estudiante con una consulta agregada."""
+    MedicionPlantas = apps.get_model('registros', 'MedicionPlantas')
+    ResumenEstudiante = apps.get_model('registros', 'ResumenEstudiante')
+
+    x = Cast('dia', FloatField())
+    y = Cast('altura', FloatField())
+    filas = MedicionPlantas.objects.values('estudiante_id').order_by().annotate(
+        total=Count('id'),
+        sx=Sum(x), sy=Sum(y), sxx=Sum(x * x), sxy=Sum(x * y), syy=Sum(y * y),
+    )
+    ResumenEstudiante.objects.bulk_create([
+        ResumenEstudiante(
+            estudiante_id=fila['estudiante_id'], n=fila['total'],
+            suma_x=fila['sx'], suma_y=fila['sy'], suma_xx=fila['sxx'],
+            suma_xy=fila['sxy'], suma_yy=fila['syy'],
+        )
+        for fila in filas
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registros', '0006_resumengrupo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenEstudiante',
+            fields=[
+                ('estudiante', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen', serialize=False, to='registros.estudiante', verbose_name='Estudiante')),
+                ('n', models.PositiveIntegerField(default=0, verbose_name='Número de mediciones')),
+                ('suma_x', models.FloatField(default=0, verbose_name='Σ día')),
+                ('suma_y', models.FloatField(default=0, verbose_name='Σ altura')),
+                ('suma_xx', models.FloatField(default=0, verbose_name='Σ día²')),
+                ('suma_xy', models.FloatField(default=0, verbose_name='Σ día·altura')),
+                ('suma_yy', models.FloatField(default=0, verbose_name='Σ altura²')),
+                ('actualizado', models.DateTimeField(auto_now=True, verbose_name='Actualizado')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Estudiante',
+                'verbose_name_plural': 'Resúmenes de Estudiantes',
+            },
+        ),
+        migrations.RunPython(poblar_resumen_estudiantes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registros', '0007_resumenestudiante'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicionplantas',
+            name='atipica',
+            field=models.BooleanField(default=False, help_text='El valor se alejaba mucho de la tendencia del estudiante y fue confirmado al registrarlo', verbose_name='Atípica'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:11
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def poblar_estado_estudiantes(apps, schema_editor):
+    """Completa última medición y número de fotos, y crea el resumen de quien no lo tenga."""
+    Estudiante = apps.get_model('registros', 'Estudiante')
+    MedicionPlantas = apps.get_model('registros', 'MedicionPlantas')
+    RegistroFotografico = apps.get_model('registros', 'RegistroFotografico')
+    ResumenEstudiante = apps.get_model('registros', 'ResumenEstudiante')
+
+    ultima = MedicionPlantas.objects.filter(estudiante_id=OuterRef('pk')).order_by('-dia')
+    fotos = (
+        RegistroFotografico.objects
+        .filter(estudiante_id=OuterRef('pk'), medicion__isnull=False)
+        .order_by().values('estudiante_id')
+        .annotate(total=Count('id')).values('total')
+    )
+    filas = Estudiante.objects.annotate(
+        dia_final=Subquery(ultima.values('dia')[:1]),
+        altura_final=Subquery(ultima.values('altura')[:1]),
+        fotos=Coalesce(Subquery(fotos), 0),
+    ).values('pk', 'dia_final', 'altura_final', 'fotos')
+
+    existentes = ResumenEstudiante.objects.in_bulk()
+    nuevos = []
+    for fila in filas:
+        resumen = existentes.get(fila['pk'])
+        if resumen is None:
+            resumen = ResumenEstudiante(estudiante_id=fila['pk'])
+            nuevos.append(resumen)
+        resumen.ultimo_dia = fila['dia_final']
+        resumen.ultima_altura = float(fila['altura_final']) if fila['altura_final'] is not None else None
+        resumen.fotos_count = fila['fotos']
+    ResumenEstudiante.objects.bulk_update(
+        existentes.values(), ['ultimo_dia', 'ultima_altura', 'fotos_count'], batch_size=500,
+    )
+    ResumenEstudiante.objects.bulk_create(nuevos, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registros', '0008_medicionplantas_atipica'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumenestudiante',
+            name='fotos_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Fotografías'),
+        ),
+        migrations.AddField(
+            model_name='resumenestudiante',
+            name='ultima_altura',
+            field=models.FloatField(blank=True, null=True, verbose_name='Última altura (cm)'),
+        ),
+        migrations.AddField(
+            model_name='resumenestudiante',
+            name='ultimo_dia',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Último día medido'),
+        ),
+        migrations.RunPython(poblar_estado_estudiantes, migrations.RunPython.noop),
+    ]
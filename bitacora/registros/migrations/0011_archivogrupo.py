@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registros', '0010_tarea'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoGrupo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('grupo', models.IntegerField(verbose_name='Grupo/Curso')),
+                ('semestre', models.CharField(max_length=20, verbose_name='Semestre')),
+                ('formato', models.CharField(choices=[('npz', 'NumPy comprimido (.npz)'), ('parquet', 'Parquet')], max_length=10, verbose_name='Formato')),
+                ('ruta', models.CharField(max_length=255, unique=True, verbose_name='Ruta')),
+                ('num_estudiantes', models.PositiveIntegerField(verbose_name='Estudiantes')),
+                ('num_mediciones', models.PositiveIntegerField(verbose_name='Mediciones')),
+                ('num_fotos', models.PositiveIntegerField(default=0, verbose_name='Fotografías')),
+                ('tamano', models.PositiveBigIntegerField(default=0, verbose_name='Tamaño (bytes)')),
+                ('creado', models.DateTimeField(auto_now_add=True, verbose_name='Archivado')),
+            ],
+            options={
+                'verbose_name': 'Archivo de Grupo',
+                'verbose_name_plural': 'Archivos de Grupos',
+                'ordering': ['-semestre', 'grupo'],
+            },
+        ),
+    ]
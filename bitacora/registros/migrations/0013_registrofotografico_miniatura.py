@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('registros', '0012_medicion_version_solicitudidempotente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registrofotografico',
+            name='miniatura',
+            field=models.ImageField(blank=True, editable=False, upload_to='registro_fotografico/miniaturas/', verbose_name='Miniatura'),
+        ),
+    ]
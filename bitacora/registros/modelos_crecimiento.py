@@ -0,0 +1,299 @@
+"""
+Modelos de crecimiento alternativos a la recta de mínimos cuadrados.
+
+MinCuad ajusta solo una recta, pero el crecimiento del frijol tiene una fase de
+germinación lenta (ver generar_datos_prueba) y a veces datos mal digitados.
+Aquí se ajustan, con NumPy vectorizado y sin bucles por punto:
+
+- lineal: mínimos cuadrados ordinarios (equivalente a MinCuad)
+- segmentado: dos rectas continuas con detección del punto de quiebre
+- logistico y gompertz: curvas sigmoides con asíntota K
+- huber y theil_sen: rectas robustas frente a valores atípicos
+
+``seleccionar_modelo`` elige uno por estudiante: compara los modelos
+estructurales con AICc (solo abandona la recta cuando la mejora es clara) y,
+si el elegido deja residuos atípicos, lo reemplaza por una recta robusta.
+"""
+import numpy as np
+
+NOMBRES_MODELOS = {
+    'lineal': 'Lineal',
+    'segmentado': 'Lineal segmentado',
+    'logistico': 'Logístico',
+    'gompertz': 'Gompertz',
+    'huber': 'Robusto (Huber)',
+    'theil_sen': 'Robusto (Theil–Sen)',
+}
+
+# Número de parámetros libres de cada modelo (para AICc)
+NUM_PARAMETROS = {
+    'lineal': 2, 'huber': 2, 'theil_sen': 2,
+    'logistico': 3, 'gompertz': 3,
+    'segmentado': 4,  # intercepto, dos pendientes y el punto de quiebre
+}
+
+MIN_PUNTOS_NO_LINEAL = 5
+MIN_PUNTOS_SEGMENTO = 3
+
+# Mejora mínima de AICc para preferir un modelo más complejo que la recta
+UMBRAL_AICC = 2.0
+
+# Un residuo mayor a este múltiplo de la escala robusta (MAD) se considera atípico
+UMBRAL_ATIPICO = 5.0
+# Escala mínima (cm): con pocos puntos casi alineados el MAD es diminuto y cualquier
+# error normal de la regla pasaría por atípico
+ESCALA_MINIMA = 0.3
+
+# Rejilla de asíntotas K (múltiplos de la altura máxima) para las curvas sigmoides
+_FACTORES_K = np.geomspace(1.02, 4.0, 48)
+
+
+# ===== MODELOS =====
+
+def _recta(x, y, pesos=None):
+    """Mínimos cuadrados (ponderados si se dan pesos). Retorna (a0, a1)."""
+    if pesos is None:
+        pesos = np.ones_like(x)
+    suma_pesos = pesos.sum()
+    xm = (pesos * x).sum() / suma_pesos
+    ym = (pesos * y).sum() / suma_pesos
+    sxx = (pesos * (x - xm) ** 2).sum()
+    a1 = (pesos * (x - xm) * (y - ym)).sum() / sxx if sxx else 0.0
+    return ym - a1 * xm, a1
+
+
+def _rectas_por_fila(x, Z):
+    """Ajusta una recta z = c0 + c1*x por cada fila de Z (todas a la vez)."""
+    xc = x - x.mean()
+    sxx = (xc ** 2).sum()
+    zm = Z.mean(axis=1)
+    c1 = (Z - zm[:, None]) @ xc / sxx
+    return zm - c1 * x.mean(), c1
+
+
+def ajustar_lineal(x, y):
+    a0, a1 = _recta(x, y)
+    return {'a0': a0, 'a1': a1}
+
+
+def ajustar_huber(x, y, k=1.345, max_iteraciones=20, tolerancia=1e-4):
+    """
+    Regresión de Huber por mínimos cuadrados reponderados (IRLS).
+    Parte de la recta de Theil–Sen y fija la escala con su MAD, así converge
+    en pocas iteraciones.
+    """
+    inicial = ajustar_theil_sen(x, y)
+    a0, a1 = inicial['a0'], inicial['a1']
+    residuos = y - (a0 + a1 * x)
+    escala = 1.4826 * np.median(np.abs(residuos - np.median(residuos)))
+    if escala == 0:
+        return {'a0': a0, 'a1': a1}
+
+    for _ in range(max_iteraciones):
+        absolutos = np.abs(y - (a0 + a1 * x))
+        pesos = np.minimum(1.0, k * escala / np.maximum(absolutos, 1e-12))
+        nuevo_a0, nuevo_a1 = _recta(x, y, pesos)
+        convergio = abs(nuevo_a0 - a0) + abs(nuevo_a1 - a1) < tolerancia * (1 + abs(a0) + abs(a1))
+        a0, a1 = nuevo_a0, nuevo_a1
+        if convergio:
+            break
+    return {'a0': a0, 'a1': a1}
+
+
+def ajustar_theil_sen(x, y):
+    """Pendiente = mediana de las pendientes entre todos los pares de puntos."""
+    i, j = np.triu_indices(len(x), 1)
+    dx = x[j] - x[i]
+    validos = dx != 0
+    a1 = np.median((y[j] - y[i])[validos] / dx[validos]) if validos.any() else 0.0
+    return {'a0': np.median(y - a1 * x), 'a1': a1}
+
+
+def ajustar_segmentado(x, y):
+    """
+    y = a0 + a1*x + a2*max(0, x - t): recta con un quiebre continuo en t.
+    Se prueban todos los quiebres posibles a la vez resolviendo un lote de
+    sistemas 3x3 (ecuaciones normales) con una sola llamada a NumPy.
+    """
+    candidatos = np.unique(x)[MIN_PUNTOS_SEGMENTO - 1:-(MIN_PUNTOS_SEGMENTO - 1)]
+    if candidatos.size == 0:
+        return None
+
+    bisagra = np.maximum(0.0, x[None, :] - candidatos[:, None])
+    X = np.stack(np.broadcast_arrays(np.ones_like(x), x, bisagra), axis=-1)
+    XtX = np.einsum('kni,knj->kij', X, X)
+    Xty = np.einsum('kni,n->ki', X, y)
+    # Los quiebres que dejan el sistema singular se descartan
+    validos = np.abs(np.linalg.det(XtX)) > 1e-9
+    if not validos.any():
+        return None
+    coeficientes = np.linalg.solve(XtX[validos], Xty[validos][..., None])[..., 0]
+    sse = ((y - np.einsum('kni,ki->kn', X[validos], coeficientes)) ** 2).sum(axis=1)
+
+    mejor = np.argmin(sse)
+    a0, a1, a2 = coeficientes[mejor]
+    return {'a0': a0, 'a1': a1, 'a2': a2, 't': candidatos[validos][mejor]}
+
+
+def _ajustar_sigmoide(x, y, linealizar, evaluar):
+    """
+    Para cada K de la rejilla la curva se linealiza (z = c0 + c1*x); todas las
+    rectas se ajustan a la vez y se elige la K con menor error en escala original.
+    """
+    K = y.max() * _FACTORES_K
+    Z = linealizar(K[:, None], y[None, :])
+    c0, c1 = _rectas_por_fila(x, Z)
+    predicciones = evaluar(K[:, None], c0[:, None], c1[:, None], x[None, :])
+    sse = ((y[None, :] - predicciones) ** 2).sum(axis=1)
+    mejor = np.nanargmin(sse)
+    return K[mejor], c0[mejor], c1[mejor]
+
+
+def _logistica(K, c0, c1, x):
+    return K / (1.0 + np.exp(c0 + c1 * x))
+
+
+def _gompertz(K, c0, c1, x):
+    return K * np.exp(-np.exp(c0 + c1 * x))
+
+
+def ajustar_logistico(x, y):
+    """y = K / (1 + exp(-r (x - t0)))"""
+    K, c0, c1 = _ajustar_sigmoide(x, y, lambda K, y: np.log(K / y - 1.0), _logistica)
+    r = -c1
+    return {'K': K, 'r': r, 't0': c0 / r if r else 0.0}
+
+
+def ajustar_gompertz(x, y):
+    """y = K * exp(-b * exp(-r x))"""
+    K, c0, c1 = _ajustar_sigmoide(x, y, lambda K, y: np.log(np.log(K / y)), _gompertz)
+    return {'K': K, 'b': np.exp(c0), 'r': -c1}
+
+
+AJUSTADORES = {
+    'lineal': ajustar_lineal,
+    'segmentado': ajustar_segmentado,
+    'logistico': ajustar_logistico,
+    'gompertz': ajustar_gompertz,
+    'huber': ajustar_huber,
+    'theil_sen': ajustar_theil_sen,
+}
+
+
+def predecir(modelo, parametros, x):
+    """Evalúa un modelo ajustado en los días x."""
+    x = np.asarray(x, dtype=float)
+    p = parametros
+    if modelo in ('lineal', 'huber', 'theil_sen'):
+        return p['a0'] + p['a1'] * x
+    if modelo == 'segmentado':
+        return p['a0'] + p['a1'] * x + p['a2'] * np.maximum(0.0, x - p['t'])
+    if modelo == 'logistico':
+        return p['K'] / (1.0 + np.exp(-p['r'] * (x - p['t0'])))
+    if modelo == 'gompertz':
+        return p['K'] * np.exp(-p['b'] * np.exp(-p['r'] * x))
+    raise ValueError(f'Modelo desconocido: {modelo}')
+
+
+def describir(modelo, parametros):
+    """Ecuación legible del modelo ajustado."""
+    p = parametros
+    if modelo in ('lineal', 'huber', 'theil_sen'):
+        return f"y = {p['a0']:.2f} + {p['a1']:.2f}x"
+    if modelo == 'segmentado':
+        return f"y = {p['a0']:.2f} + {p['a1']:.2f}x + {p['a2']:.2f}·max(0, x − {p['t']:.0f})"
+    if modelo == 'logistico':
+        return f"y = {p['K']:.2f} / (1 + e^(−{p['r']:.3f}(x − {p['t0']:.2f})))"
+    if modelo == 'gompertz':
+        return f"y = {p['K']:.2f}·e^(−{p['b']:.3f}·e^(−{p['r']:.3f}x))"
+    return modelo
+
+
+# ===== SELECCIÓN =====
+
+def _aicc(sse, n, k):
+    if n - k - 1 <= 0:
+        return float('inf')
+    sse = max(sse, 1e-12)
+    return n * np.log(sse / n) + 2 * k + 2 * k * (k + 1) / (n - k - 1)
+
+
+def _evaluar(nombre, parametros, x, y, sst):
+    sse = float(((y - predecir(nombre, parametros, x)) ** 2).sum())
+    return {
+        'modelo': nombre,
+        'nombre': NOMBRES_MODELOS[nombre],
+        'parametros': {clave: float(valor) for clave, valor in parametros.items()},
+        'ecuacion': describir(nombre, parametros),
+        'sse': sse,
+        'r2': 1 - sse / sst if sst else 0.0,
+        'aicc': float(_aicc(sse, len(x), NUM_PARAMETROS[nombre])),
+    }
+
+
+def tiene_atipicos(y, y_estimada):
+    """True si algún residuo supera UMBRAL_ATIPICO veces la escala robusta (MAD, o ESCALA_MINIMA)."""
+    residuos = y - y_estimada
+    desvios = np.abs(residuos - np.median(residuos))
+    escala = 1.4826 * np.median(desvios)
+    return bool((desvios > UMBRAL_ATIPICO * max(escala, ESCALA_MINIMA)).any())
+
+
+def seleccionar_modelo(dias, alturas):
+    """
+    Ajusta los modelos candidatos y elige uno.
+
+    Returns:
+        dict con 'seleccionado' (nombre del modelo), 'motivo' y 'candidatos'
+        (lista de ajustes con parámetros, ecuación, r2 y AICc), o None si hay
+        menos de 2 puntos.
+    """
+    x = np.asarray(dias, dtype=float)
+    y = np.maximum(np.asarray(alturas, dtype=float), 1e-6)
+    n = len(x)
+    if n < 2:
+        return None
+
+    sst = float(((y - y.mean()) ** 2).sum())
+    lineal = ajustar_lineal(x, y)
+    candidatos = {'lineal': _evaluar('lineal', lineal, x, y, sst)}
+
+    if n >= MIN_PUNTOS_NO_LINEAL:
+        for nombre in ('segmentado', 'logistico', 'gompertz'):
+            with np.errstate(all='ignore'):
+                parametros = AJUSTADORES[nombre](x, y)
+            if parametros is not None and all(np.isfinite(v) for v in parametros.values()):
+                candidatos[nombre] = _evaluar(nombre, parametros, x, y, sst)
+
+    # Los atípicos se buscan contra el modelo de menor AICc, para no confundir
+    # la curvatura de la germinación con errores de digitación. Si es la recta,
+    # contra la de Theil–Sen: la de mínimos cuadrados se inclina hacia el error y lo esconde
+    mejor = min(candidatos.values(), key=lambda ajuste: ajuste['aicc'])
+    if mejor['modelo'] == 'lineal':
+        referencia = predecir('theil_sen', ajustar_theil_sen(x, y), x)
+    else:
+        referencia = predecir(mejor['modelo'], mejor['parametros'], x)
+    atipicos = n >= MIN_PUNTOS_NO_LINEAL and tiene_atipicos(y, referencia)
+    if mejor['modelo'] != 'lineal' and candidatos['lineal']['aicc'] - mejor['aicc'] < UMBRAL_AICC:
+        mejor = candidatos['lineal']
+
+    if atipicos:
+        # Con pocos puntos Theil–Sen es más estable; con más, Huber es más eficiente
+        robusto = 'theil_sen' if n < 10 else 'huber'
+        candidatos[robusto] = _evaluar(robusto, AJUSTADORES[robusto](x, y), x, y, sst)
+        seleccionado, motivo = robusto, 'Se detectaron valores atípicos'
+    elif mejor['modelo'] != 'lineal':
+        seleccionado, motivo = mejor['modelo'], 'Menor AICc que la recta'
+    else:
+        seleccionado, motivo = 'lineal', 'La recta explica los datos igual de bien'
+
+    return {
+        'seleccionado': seleccionado,
+        'motivo': motivo,
+        'candidatos': sorted(candidatos.values(), key=lambda ajuste: ajuste['aicc']),
+    }
+
+
+def ajuste_seleccionado(seleccion):
+    """Retorna el ajuste (dict) del modelo elegido en una selección."""
+    return next(a for a in seleccion['candidatos'] if a['modelo'] == seleccion['seleccionado'])
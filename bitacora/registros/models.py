@@ -4,6 +4,22 @@ from django.contrib.auth.models import User
 from decimal import Decimal
 
 
+def relacion_cargada(instancia, campo):
+    """
+    La instancia relacionada por ``campo`` si ya está en memoria (select_related
+    o asignada), sin consultar la base de datos; None si no.
+    """
+    if getattr(type(instancia), campo).is_cached(instancia):
+        return getattr(instancia, campo)
+    return None
+
+
+def _nombre_estudiante(instancia):
+    # En __str__: sin select_related('estudiante') no se hace una consulta por fila
+    estudiante = relacion_cargada(instancia, 'estudiante')
+    return estudiante.nombre if estudiante is not None else f"Estudiante #{instancia.estudiante_id}"
+
+
 class Estudiante(models.Model):
     usuario = models.OneToOneField(
         User,
@@ -25,6 +41,13 @@ class Estudiante(models.Model):
     
     def __str__(self):
         return f"{self.nombre} - Grupo {self.grupo}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Valor cargado de la base de datos, para detectar cambios de grupo al guardar
+        instancia._grupo_cargado = instancia.__dict__.get('grupo')
+        return instancia
 
 
 class MedicionPlantas(models.Model):
@@ -44,6 +67,13 @@ class MedicionPlantas(models.Model):
         validators=[MinValueValidator(Decimal('0'))],
         verbose_name="Altura de la planta (cm)"
     )
+    atipica = models.BooleanField(
+        default=False,
+        verbose_name="Atípica",
+        help_text="El valor se alejaba mucho de la tendencia del estudiante y fue confirmado al registrarlo"
+    )
+    # Bloqueo optimista: cada edición lo incrementa (ver registros/escritura.py)
+    version = models.PositiveIntegerField(default=1, editable=False, verbose_name="Versión")
     fecha_registro = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de registro")
     
     class Meta:
@@ -53,7 +83,60 @@ class MedicionPlantas(models.Model):
         unique_together = ['estudiante', 'dia']  # Un estudiante solo puede tener una medición por día
     
     def __str__(self):
-        return f"Día {self.dia} - {self.estudiante.nombre} - {self.altura} cm"
+        return f"Día {self.dia} - {_nombre_estudiante(self)} - {self.altura} cm"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            # Cualquier edición (vistas o admin) deja obsoletos los formularios abiertos
+            self.version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version'}
+        super().save(*args, **kwargs)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Valores cargados de la base de datos, para actualizar resúmenes al editar
+        instancia._valores_cargados = {
+            campo: instancia.__dict__.get(campo) for campo in ('estudiante_id', 'dia', 'altura')
+        }
+        return instancia
+
+
+class SolicitudIdempotente(models.Model):
+    """
+    Clave de idempotencia de un formulario de mediciones ya procesado. Un
+    reenvío con la misma clave (doble clic, reintento del navegador) se
+    reconoce y no vuelve a escribir la medición ni la fotografía.
+    """
+    clave = models.UUIDField(unique=True, verbose_name="Clave")
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Usuario"
+    )
+    # Sin restricción en la base de datos: el servicio de eliminación borra mediciones sin pasar por el ORM
+    medicion = models.ForeignKey(
+        MedicionPlantas,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Medición"
+    )
+    creada = models.DateTimeField(auto_now_add=True, db_index=True, verbose_name="Creada")
+
+    class Meta:
+        verbose_name = "Solicitud idempotente"
+        verbose_name_plural = "Solicitudes idempotentes"
+
+    def __str__(self):
+        return str(self.clave)
 
 
 class RegistroFotografico(models.Model):
@@ -73,6 +156,13 @@ class RegistroFotografico(models.Model):
         verbose_name="Estudiante"
     )
     imagen = models.ImageField(upload_to='registro_fotografico/', verbose_name="Fotografía")
+    # Derivada de la imagen por la tarea generar_miniatura (listados y admin)
+    miniatura = models.ImageField(
+        upload_to='registro_fotografico/miniaturas/',
+        blank=True,
+        editable=False,
+        verbose_name="Miniatura"
+    )
     fecha = models.DateTimeField(auto_now_add=True, verbose_name="Fecha")
     comentario = models.TextField(blank=True, null=True, verbose_name="Comentario")
     
@@ -82,9 +172,19 @@ class RegistroFotografico(models.Model):
         ordering = ['-fecha']
     
     def __str__(self):
-        if self.medicion:
-            return f"Foto - {self.estudiante.nombre} - Día {self.medicion.dia} - {self.fecha.strftime('%d/%m/%Y')}"
-        return f"Foto - {self.estudiante.nombre} - {self.fecha.strftime('%d/%m/%Y')}"
+        fecha = self.fecha.strftime('%d/%m/%Y')
+        if self.medicion_id is None:
+            return f"Foto - {_nombre_estudiante(self)} - {fecha}"
+        medicion = relacion_cargada(self, 'medicion')
+        dia = f"Día {medicion.dia}" if medicion is not None else f"Medición #{self.medicion_id}"
+        return f"Foto - {_nombre_estudiante(self)} - {dia} - {fecha}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Imagen cargada de la base de datos, para regenerar la miniatura solo si cambia
+        instancia._imagen_cargada = instancia.__dict__.get('imagen')
+        return instancia
     
     def clean(self):
         """
@@ -114,3 +214,192 @@ class RegistroFotografico(models.Model):
             huerfanos.delete()
             
         return count
+
+
+class ResumenGrupo(models.Model):
+    """
+    Estadísticas materializadas de altura por grupo y día.
+    Se actualizan de forma incremental al guardar o eliminar mediciones
+    (ver registros/grupos.py) y alimentan el dashboard de grupos.
+    """
+    grupo = models.IntegerField(verbose_name="Grupo/Curso")
+    dia = models.IntegerField(verbose_name="Día de medición")
+    num_mediciones = models.PositiveIntegerField(verbose_name="Número de mediciones")
+    media = models.FloatField(verbose_name="Media (cm)")
+    mediana = models.FloatField(verbose_name="Mediana (cm)")
+    desviacion = models.FloatField(verbose_name="Desviación estándar (cm)")
+    percentil_10 = models.FloatField(verbose_name="Percentil 10 (cm)")
+    percentil_25 = models.FloatField(verbose_name="Percentil 25 (cm)")
+    percentil_75 = models.FloatField(verbose_name="Percentil 75 (cm)")
+    percentil_90 = models.FloatField(verbose_name="Percentil 90 (cm)")
+    actualizado = models.DateTimeField(auto_now=True, verbose_name="Actualizado")
+    
+    class Meta:
+        verbose_name = "Resumen de Grupo"
+        verbose_name_plural = "Resúmenes de Grupos"
+        ordering = ['grupo', 'dia']
+        unique_together = ['grupo', 'dia']
+    
+    def __str__(self):
+        return f"Grupo {self.grupo} - Día {self.dia} ({self.num_mediciones} mediciones)"
+
+
+class ResumenEstudiante(models.Model):
+    """
+    Estadísticas suficientes de la regresión de cada estudiante
+    (n, Σx, Σy, Σxx, Σxy, Σyy con x = día, y = altura).
+
+    Se mantienen de forma incremental al guardar o eliminar mediciones, así la
+    recta, r² y los intervalos de confianza se obtienen sin leer las mediciones.
+    También guarda el estado más reciente (última medición y número de fotos)
+    que muestra la página de inicio del estudiante.
+    """
+    estudiante = models.OneToOneField(
+        Estudiante,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumen',
+        verbose_name="Estudiante"
+    )
+    n = models.PositiveIntegerField(default=0, verbose_name="Número de mediciones")
+    suma_x = models.FloatField(default=0, verbose_name="Σ día")
+    suma_y = models.FloatField(default=0, verbose_name="Σ altura")
+    suma_xx = models.FloatField(default=0, verbose_name="Σ día²")
+    suma_xy = models.FloatField(default=0, verbose_name="Σ día·altura")
+    suma_yy = models.FloatField(default=0, verbose_name="Σ altura²")
+    ultimo_dia = models.IntegerField(null=True, blank=True, verbose_name="Último día medido")
+    ultima_altura = models.FloatField(null=True, blank=True, verbose_name="Última altura (cm)")
+    fotos_count = models.PositiveIntegerField(default=0, verbose_name="Fotografías")
+    actualizado = models.DateTimeField(auto_now=True, verbose_name="Actualizado")
+    
+    class Meta:
+        verbose_name = "Resumen de Estudiante"
+        verbose_name_plural = "Resúmenes de Estudiantes"
+    
+    def __str__(self):
+        return f"Resumen estudiante {self.estudiante_id} ({self.n} mediciones)"
+
+
+class Tarea(models.Model):
+    """
+    Trabajo en segundo plano guardado en la base de datos (ver registros/tareas.py).
+    El comando procesar_tareas las reclama y ejecuta, sin broker externo.
+    """
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADA = 'completada'
+    FALLIDA = 'fallida'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (COMPLETADA, 'Completada'),
+        (FALLIDA, 'Fallida'),
+    ]
+
+    nombre = models.CharField(max_length=100, verbose_name="Tarea")
+    argumentos = models.JSONField(default=dict, blank=True, verbose_name="Argumentos")
+    # Clave de deduplicación: única solo mientras la tarea está pendiente o en proceso
+    clave = models.CharField(max_length=200, null=True, blank=True, unique=True, verbose_name="Clave de deduplicación")
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE, verbose_name="Estado")
+    intentos = models.PositiveSmallIntegerField(default=0, verbose_name="Intentos")
+    max_intentos = models.PositiveSmallIntegerField(default=3, verbose_name="Máximo de intentos")
+    ejecutar_despues = models.DateTimeField(verbose_name="Ejecutar después de")
+    resultado = models.JSONField(null=True, blank=True, verbose_name="Resultado")
+    error = models.TextField(blank=True, verbose_name="Último error")
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='tareas',
+        verbose_name="Solicitada por"
+    )
+    creada = models.DateTimeField(auto_now_add=True, verbose_name="Creada")
+    iniciada = models.DateTimeField(null=True, blank=True, verbose_name="Iniciada")
+    terminada = models.DateTimeField(null=True, blank=True, verbose_name="Terminada")
+
+    class Meta:
+        verbose_name = "Tarea"
+        verbose_name_plural = "Tareas"
+        ordering = ['-creada']
+        indexes = [
+            models.Index(fields=['estado', 'ejecutar_despues'], name='tarea_pendientes_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nombre} #{self.pk} ({self.get_estado_display()})"
+
+
+class ArchivoGrupo(models.Model):
+    """
+    Grupo de un semestre terminado, exportado a archivos columnares comprimidos
+    (ver registros/archivo.py) y eliminado de las tablas activas.
+    """
+    NPZ = 'npz'
+    PARQUET = 'parquet'
+    FORMATOS = [
+        (NPZ, 'NumPy comprimido (.npz)'),
+        (PARQUET, 'Parquet'),
+    ]
+
+    grupo = models.IntegerField(verbose_name="Grupo/Curso")
+    semestre = models.CharField(max_length=20, verbose_name="Semestre")
+    formato = models.CharField(max_length=10, choices=FORMATOS, verbose_name="Formato")
+    # Directorio relativo a REGISTROS_DIRECTORIO_ARCHIVO
+    ruta = models.CharField(max_length=255, unique=True, verbose_name="Ruta")
+    num_estudiantes = models.PositiveIntegerField(verbose_name="Estudiantes")
+    num_mediciones = models.PositiveIntegerField(verbose_name="Mediciones")
+    num_fotos = models.PositiveIntegerField(default=0, verbose_name="Fotografías")
+    tamano = models.PositiveBigIntegerField(default=0, verbose_name="Tamaño (bytes)")
+    creado = models.DateTimeField(auto_now_add=True, verbose_name="Archivado")
+
+    class Meta:
+        verbose_name = "Archivo de Grupo"
+        verbose_name_plural = "Archivos de Grupos"
+        ordering = ['-semestre', 'grupo']
+
+    def __str__(self):
+        return f"Grupo {self.grupo} - {self.semestre}"
+
+
+class ReporteGrupo(models.Model):
+    """
+    Reporte de fin de periodo de un grupo: un ZIP con el PDF (una página por
+    estudiante con su gráfica, coeficientes, mediciones y miniaturas) y los
+    PNG y CSV sueltos. Lo genera la tarea generar_reporte_grupo (ver
+    registros/reportes.py).
+    """
+    PENDIENTE = 'pendiente'
+    LISTO = 'listo'
+    FALLIDO = 'fallido'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (LISTO, 'Listo'),
+        (FALLIDO, 'Fallido'),
+    ]
+
+    grupo = models.IntegerField(verbose_name="Grupo/Curso")
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE, verbose_name="Estado")
+    # Archivo relativo a REGISTROS_DIRECTORIO_REPORTES
+    ruta = models.CharField(max_length=255, blank=True, verbose_name="Ruta")
+    num_estudiantes = models.PositiveIntegerField(default=0, verbose_name="Estudiantes")
+    tamano = models.PositiveBigIntegerField(default=0, verbose_name="Tamaño (bytes)")
+    error = models.TextField(blank=True, verbose_name="Error")
+    solicitado_por = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='reportes_grupo',
+        verbose_name="Solicitado por"
+    )
+    creado = models.DateTimeField(auto_now_add=True, verbose_name="Solicitado")
+    terminado = models.DateTimeField(null=True, blank=True, verbose_name="Terminado")
+
+    class Meta:
+        verbose_name = "Reporte de Grupo"
+        verbose_name_plural = "Reportes de Grupos"
+        ordering = ['-creado']
+
+    def __str__(self):
+        return f"Reporte grupo {self.grupo} - {self.creado:%d/%m/%Y %H:%M}"
@@ -0,0 +1,45 @@
+"""
+Lectura numérica rápida de las mediciones.
+
+La altura se guarda como DecimalField (exacta en la base de datos), pero
+crear un Decimal por fila y convertirlo con float() domina el costo de los
+análisis. Aquí la base de datos entrega la altura ya escalada a un entero
+en centésimas de centímetro (ROUND(altura * 100)): los drivers devuelven
+enteros nativos, las filas pasan a un array de NumPy en una sola llamada y
+la conversión a centímetros es una división vectorizada. Con dos decimales
+en el campo, la escala es exacta.
+"""
+import numpy as np
+from django.db.models import BigIntegerField, F
+from django.db.models.functions import Cast, Round
+
+# Centésimas de centímetro (decimal_places=2 en MedicionPlantas.altura)
+ESCALA_ALTURA = 100
+
+
+def altura_centesimas(campo='altura'):
+    """Expresión que la base de datos evalúa como la altura en centésimas (entero)."""
+    # ROUND antes de CAST: en SQLite la altura es REAL y el CAST trunca (3.29 * 100 = 328.999...)
+    return Cast(Round(F(campo) * ESCALA_ALTURA), output_field=BigIntegerField())
+
+
+def columnas_enteras(queryset, *campos):
+    """
+    Array int64 de forma (filas, campos) con los valores de ``campos`` (nombres
+    o expresiones enteras), convertido de una vez desde las tuplas del cursor.
+    """
+    filas = list(queryset.values_list(*campos))
+    if not filas:
+        return np.empty((0, len(campos)), dtype=np.int64)
+    return np.array(filas, dtype=np.int64)
+
+
+def centimetros(centesimas):
+    """Centésimas (enteros) a centímetros en float64."""
+    return np.asarray(centesimas, dtype=np.float64) / ESCALA_ALTURA
+
+
+def texto_centimetros(centesimas):
+    """Formatea centésimas como el Decimal original ('15.50'), sin pasar por float."""
+    centesimas = int(centesimas)
+    return f'{centesimas // ESCALA_ALTURA}.{centesimas % ESCALA_ALTURA:02d}'
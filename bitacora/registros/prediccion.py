@@ -0,0 +1,214 @@
+"""
+Predicción de crecimiento a partir de las estadísticas suficientes.
+
+Con n, Σx, Σy, Σxx, Σxy y Σyy (ResumenEstudiante) se obtienen la recta de
+mínimos cuadrados, r², la varianza residual y los intervalos de confianza
+sin volver a leer las mediciones: cada predicción es O(1).
+"""
+import numpy as np
+from django.db.models import Case, Count, F, FloatField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from .models import Estudiante, MedicionPlantas, RegistroFotografico, ResumenEstudiante
+from .routers import alias_primario
+
+MIN_MEDICIONES_PREDICCION = 7
+
+# Valores críticos t de Student (dos colas) para 1..30 grados de libertad
+_TABLA_T = {
+    0.90: [6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812,
+           1.796, 1.782, 1.771, 1.761, 1.753, 1.746, 1.740, 1.734, 1.729, 1.725,
+           1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703, 1.701, 1.699, 1.697],
+    0.95: [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+           2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+           2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042],
+    0.99: [63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169,
+           3.106, 3.055, 3.012, 2.977, 2.947, 2.921, 2.898, 2.878, 2.861, 2.845,
+           2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771, 2.763, 2.756, 2.750],
+}
+_Z = {0.90: 1.6449, 0.95: 1.9600, 0.99: 2.5758}
+
+NIVELES_CONFIANZA = tuple(_TABLA_T)
+
+
+def valor_t(grados_libertad, nivel=0.95):
+    """Valor crítico t; para más de 30 grados usa la expansión de Cornish-Fisher."""
+    if grados_libertad <= 30:
+        return _TABLA_T[nivel][grados_libertad - 1]
+    z = _Z[nivel]
+    g = grados_libertad
+    return z + (z ** 3 + z) / (4 * g) + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * g ** 2)
+
+
+# ===== ESTADÍSTICAS DERIVADAS =====
+
+def coeficientes(resumen):
+    """(a0, a1) de la recta y = a0 + a1*x, o None si no hay datos suficientes."""
+    n = resumen.n
+    denominador = n * resumen.suma_xx - resumen.suma_x ** 2
+    if n < 2 or denominador == 0:
+        return None
+    a1 = (n * resumen.suma_xy - resumen.suma_x * resumen.suma_y) / denominador
+    a0 = (resumen.suma_y - a1 * resumen.suma_x) / n
+    return a0, a1
+
+
+def sumas_centradas(resumen):
+    """(Sxx, Sxy, Syy): sumas de cuadrados respecto a la media."""
+    n = resumen.n
+    sxx = resumen.suma_xx - resumen.suma_x ** 2 / n
+    sxy = resumen.suma_xy - resumen.suma_x * resumen.suma_y / n
+    syy = resumen.suma_yy - resumen.suma_y ** 2 / n
+    return sxx, sxy, syy
+
+
+def suma_cuadrados_residual(resumen):
+    sxx, sxy, syy = sumas_centradas(resumen)
+    return max(syy - sxy ** 2 / sxx, 0.0) if sxx else 0.0
+
+
+def varianza_residual(resumen):
+    """s² = SSE / (n - 2); None con menos de 3 mediciones."""
+    if resumen.n < 3:
+        return None
+    return suma_cuadrados_residual(resumen) / (resumen.n - 2)
+
+
+def coeficiente_determinacion(resumen):
+    sxx, sxy, syy = sumas_centradas(resumen)
+    if not sxx or not syy:
+        return 0.0
+    return sxy ** 2 / (sxx * syy)
+
+
+def predecir(resumen, dias, nivel=0.95):
+    """
+    Predicción lineal con intervalos de confianza para varios días a la vez.
+
+    Returns:
+        dict con 'altura', 'ic_media' (intervalo de la altura esperada) e
+        'ic_prediccion' (intervalo para una nueva medición), como listas.
+    """
+    a0, a1 = coeficientes(resumen)
+    x = np.asarray(dias, dtype=float)
+    altura = a0 + a1 * x
+
+    s2 = varianza_residual(resumen)
+    sxx, _, _ = sumas_centradas(resumen)
+    t = valor_t(resumen.n - 2, nivel)
+    media_x = resumen.suma_x / resumen.n
+    base = 1.0 / resumen.n + (x - media_x) ** 2 / sxx
+    margen_media = t * np.sqrt(s2 * base)
+    margen_prediccion = t * np.sqrt(s2 * (1.0 + base))
+
+    return {
+        'altura': altura.round(4).tolist(),
+        'ic_media': np.column_stack([altura - margen_media, altura + margen_media]).round(4).tolist(),
+        'ic_prediccion': np.column_stack([altura - margen_prediccion, altura + margen_prediccion]).round(4).tolist(),
+    }
+
+
+# ===== MANTENIMIENTO INCREMENTAL =====
+
+def _ultima_medicion(referencia):
+    return MedicionPlantas.objects.filter(estudiante_id=referencia).order_by('-dia')
+
+
+def _conteo_fotos(referencia):
+    fotos = (
+        RegistroFotografico.objects
+        .filter(estudiante_id=referencia, medicion__isnull=False)
+        .order_by().values('estudiante_id')
+        .annotate(total=Count('id')).values('total')
+    )
+    return Coalesce(Subquery(fotos), 0)
+
+
+def _aplicar(estudiante_id, dia, altura, signo, crear=False):
+    x = float(dia)
+    y = float(altura)
+    cambios = {
+        'n': F('n') + signo,
+        'suma_x': F('suma_x') + signo * x,
+        'suma_y': F('suma_y') + signo * y,
+        'suma_xx': F('suma_xx') + signo * x * x,
+        'suma_xy': F('suma_xy') + signo * x * y,
+        'suma_yy': F('suma_yy') + signo * y * y,
+    }
+    if signo > 0:
+        # La última medición solo cambia si el nuevo día es el mayor
+        es_ultima = Q(ultimo_dia__isnull=True) | Q(ultimo_dia__lte=dia)
+        cambios['ultima_altura'] = Case(When(es_ultima, then=Value(y)), default=F('ultima_altura'))
+        cambios['ultimo_dia'] = Case(When(es_ultima, then=Value(int(dia))), default=F('ultimo_dia'))
+
+    actualizados = ResumenEstudiante.objects.filter(pk=estudiante_id).update(**cambios)
+    if not actualizados and crear:
+        # Primer dato del estudiante (o resumen aún no creado): se reconstruye desde las mediciones
+        reconstruir_resumenes([estudiante_id])
+    elif signo < 0:
+        # Se quitó la última medición: se toma la anterior con una subconsulta indexada
+        ultima = _ultima_medicion(OuterRef('pk'))
+        ResumenEstudiante.objects.filter(pk=estudiante_id, ultimo_dia=dia).update(
+            ultimo_dia=Subquery(ultima.values('dia')[:1]),
+            ultima_altura=Subquery(ultima.values('altura')[:1]),
+        )
+
+
+def agregar_medicion(estudiante_id, dia, altura):
+    _aplicar(estudiante_id, dia, altura, 1, crear=True)
+
+
+def quitar_medicion(estudiante_id, dia, altura):
+    _aplicar(estudiante_id, dia, altura, -1)
+
+
+def actualizar_fotos(estudiante_id):
+    ResumenEstudiante.objects.filter(pk=estudiante_id).update(fotos_count=_conteo_fotos(OuterRef('pk')))
+
+
+CAMPOS_RESUMEN = (
+    'n', 'suma_x', 'suma_y', 'suma_xx', 'suma_xy', 'suma_yy',
+    'ultimo_dia', 'ultima_altura', 'fotos_count',
+)
+
+
+def reconstruir_resumenes(estudiante_ids=None):
+    """
+    Recalcula el resumen de cada estudiante con una sola consulta agregada.
+    Lee del primario aunque se llame desde una vista de réplica: el resumen
+    se escribe en el primario y no debe construirse con datos atrasados.
+    """
+    estudiantes = Estudiante.objects.using(alias_primario())
+    if estudiante_ids is not None:
+        estudiantes = estudiantes.filter(pk__in=estudiante_ids)
+
+    x = Cast('mediciones__dia', FloatField())
+    y = Cast('mediciones__altura', FloatField())
+    ultima = _ultima_medicion(OuterRef('pk'))
+    filas = estudiantes.order_by().values('pk').annotate(
+        total=Count('mediciones'),
+        sx=Sum(x), sy=Sum(y), sxx=Sum(x * x), sxy=Sum(x * y), syy=Sum(y * y),
+        dia_final=Subquery(ultima.values('dia')[:1]),
+        altura_final=Subquery(ultima.values('altura')[:1]),
+        fotos=_conteo_fotos(OuterRef('pk')),
+    )
+    resumenes = [
+        ResumenEstudiante(
+            estudiante_id=fila['pk'], n=fila['total'],
+            suma_x=fila['sx'] or 0, suma_y=fila['sy'] or 0, suma_xx=fila['sxx'] or 0,
+            suma_xy=fila['sxy'] or 0, suma_yy=fila['syy'] or 0,
+            ultimo_dia=fila['dia_final'],
+            ultima_altura=float(fila['altura_final']) if fila['altura_final'] is not None else None,
+            fotos_count=fila['fotos'],
+        )
+        for fila in filas
+    ]
+
+    ResumenEstudiante.objects.bulk_create(
+        resumenes,
+        update_conflicts=True,
+        unique_fields=['estudiante'],
+        update_fields=CAMPOS_RESUMEN,
+        batch_size=500,
+    )
+    return len(resumenes)
@@ -0,0 +1,377 @@
+"""
+Reportes de fin de periodo por grupo.
+
+Desde el admin (acción «Generar reporte del grupo» en Estudiantes) se crea un
+ReporteGrupo y se encola la tarea generar_reporte_grupo, que escribe en
+REGISTROS_DIRECTORIO_REPORTES un ZIP con:
+
+- reporte.pdf: portada con el resumen del grupo y una página por estudiante
+  (gráfica de regresión, coeficientes, tabla de mediciones y miniaturas)
+- graficas/<estudiante>.png y mediciones/<estudiante>.csv
+- resumen.csv: una fila por estudiante con sus coeficientes
+
+Lo costoso es matplotlib: el ajuste de los modelos y la gráfica de cada
+estudiante se calculan en paralelo en un pool de procesos (como el cifrado de
+contraseñas en cuentas.py) y el proceso principal solo arma las páginas. Nada
+se acumula en memoria: cada PNG y CSV se escribe en el ZIP en cuanto está
+listo y el PDF se escribe página por página (PdfPages) en un temporal que al
+final se copia al ZIP. El archivo aparece con su nombre definitivo solo cuando
+está completo; se descarga desde el admin (vista reporte_descargar).
+"""
+import csv
+import io
+import logging
+import os
+import re
+import traceback
+import unicodedata
+import zipfile
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import django
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.figure import Figure
+
+from .analisis import MinCuad, calcular_coeficiente_correlacion, generar_grafica_png
+from .models import Estudiante, MedicionPlantas, RegistroFotografico, ReporteGrupo
+from .modelos_crecimiento import ajuste_seleccionado, seleccionar_modelo
+from .numerico import altura_centesimas, centimetros, texto_centimetros
+from .tareas import encolar
+
+logger = logging.getLogger(__name__)
+
+# Tamaño de página (pulgadas)
+A4 = (8.27, 11.69)
+
+# Filas de la tabla de mediciones en la página de un estudiante (todas van en su CSV)
+MAX_FILAS_TABLA = 30
+# Estudiantes por página en la portada
+FILAS_POR_PAGINA_PORTADA = 40
+MAX_MINIATURAS = 6
+
+# Por debajo de este número de estudiantes no compensa arrancar procesos
+MIN_ESTUDIANTES_POOL = 4
+# Análisis enviados al pool y aún sin escribir en el reporte, por proceso
+EN_VUELO_POR_PROCESO = 2
+
+
+def directorio_reportes():
+    directorio = Path(settings.REGISTROS_DIRECTORIO_REPORTES)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def ruta_reporte(reporte):
+    return directorio_reportes() / reporte.ruta
+
+
+def _nombre_archivo(texto, pk):
+    """'José Pérez' -> 'jose_perez-12' (sin acentos ni espacios, único por estudiante)."""
+    base = unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode()
+    base = re.sub(r'[^a-z0-9]+', '_', base.lower()).strip('_') or 'estudiante'
+    return f'{base[:60]}-{pk}'
+
+
+# ===== SOLICITUD =====
+
+def solicitar_reporte(grupo, usuario=None):
+    """
+    Crea el ReporteGrupo y encola su generación. Si el grupo ya tiene un
+    reporte pendiente retorna ese (no se generan dos a la vez).
+    """
+    with transaction.atomic():
+        pendiente = ReporteGrupo.objects.filter(grupo=grupo, estado=ReporteGrupo.PENDIENTE).first()
+        if pendiente is not None:
+            return pendiente, False
+        reporte = ReporteGrupo.objects.create(
+            grupo=grupo,
+            solicitado_por=usuario if usuario is not None and usuario.is_authenticated else None,
+        )
+        encolar('generar_reporte_grupo', {'reporte_id': reporte.pk}, clave=f'reporte_grupo:{grupo}', usuario=usuario)
+    return reporte, True
+
+
+def eliminar_archivo(ruta):
+    if ruta:
+        (directorio_reportes() / ruta).unlink(missing_ok=True)
+
+
+# ===== DATOS =====
+
+def _datos_grupo(grupo):
+    """Estudiantes, mediciones y miniaturas del grupo, con una consulta por tabla."""
+    estudiantes = list(
+        Estudiante.objects.filter(grupo=grupo).order_by('nombre', 'pk')
+        .values_list('pk', 'nombre', 'correo_institucional')
+    )
+    ids = [pk for pk, _, _ in estudiantes]
+    mediciones = defaultdict(list)
+    filas = (
+        MedicionPlantas.objects.filter(estudiante_id__in=ids).order_by('estudiante_id', 'dia')
+        .values_list('estudiante_id', 'dia', altura_centesimas(), 'atipica', 'fecha_registro')
+    )
+    for estudiante_id, *medicion in filas.iterator():
+        mediciones[estudiante_id].append(medicion)
+    fotos = defaultdict(list)
+    miniaturas = (
+        RegistroFotografico.objects.filter(estudiante_id__in=ids, medicion__isnull=False)
+        .exclude(miniatura='').order_by('medicion__dia')
+        .values_list('estudiante_id', 'medicion__dia', 'miniatura')
+    )
+    for estudiante_id, dia, miniatura in miniaturas:
+        fotos[estudiante_id].append((dia, miniatura))
+    return estudiantes, mediciones, fotos
+
+
+# ===== ANÁLISIS EN PARALELO =====
+
+def _inicializar_proceso():
+    # Con el método "spawn" (macOS, Windows) el proceso hijo arranca sin Django configurado
+    if not apps.ready:
+        django.setup()
+
+
+def analizar_estudiante(nombre, dias, alturas):
+    """
+    Coeficientes y gráfica PNG de un estudiante, o None con menos de 2
+    mediciones. Solo recibe y retorna datos simples: corre en el pool.
+    """
+    if len(dias) < 2:
+        return None
+    x = np.asarray(dias, dtype=float)
+    y = np.asarray(alturas, dtype=float)
+    a0, a1 = MinCuad(x, y)
+    r, r2 = calcular_coeficiente_correlacion(x, y, a0, a1)
+    ajuste = ajuste_seleccionado(seleccionar_modelo(x, y))
+    return {
+        'a0': float(a0), 'a1': float(a1), 'r': float(r), 'r2': float(r2),
+        'modelo': ajuste['nombre'], 'ecuacion': ajuste['ecuacion'], 'r2_modelo': float(ajuste['r2']),
+        'grafica': generar_grafica_png(nombre, x, y, a0, a1, ajuste=ajuste),
+    }
+
+
+def _analizar_todos(series, procesos=None):
+    """
+    Itera los análisis de ``series`` ([(nombre, dias, alturas)]) en orden, a
+    medida que el pool los termina.
+
+    pool.map enviaría todas las series de una vez y los resultados (con su PNG)
+    se acumularían mientras el PDF avanza página por página: aquí hay como
+    mucho EN_VUELO_POR_PROCESO análisis por proceso enviados y sin consumir.
+    """
+    if len(series) < MIN_ESTUDIANTES_POOL or procesos == 1:
+        for serie in series:
+            yield analizar_estudiante(*serie)
+        return
+    procesos = procesos or os.cpu_count() or 1
+    restantes = iter(series)
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso) as pool:
+        ventana = deque(
+            pool.submit(analizar_estudiante, *serie)
+            for serie in islice(restantes, EN_VUELO_POR_PROCESO * procesos)
+        )
+        while ventana:
+            analisis = ventana.popleft().result()
+            # El siguiente se envía antes de entregar este: el pool sigue ocupado mientras se arma la página
+            siguiente = next(restantes, None)
+            if siguiente is not None:
+                ventana.append(pool.submit(analizar_estudiante, *siguiente))
+            yield analisis
+
+
+# ===== PÁGINAS DEL PDF =====
+
+def _tabla(figura, posicion, encabezados, filas, tamano_letra=8):
+    eje = figura.add_axes(posicion)
+    eje.axis('off')
+    tabla = eje.table(cellText=filas, colLabels=encabezados, loc='upper center', cellLoc='center', bbox=[0, 0, 1, 1])
+    tabla.auto_set_font_size(False)
+    tabla.set_fontsize(tamano_letra)
+    for (fila, _), celda in tabla.get_celld().items():
+        if fila == 0:
+            celda.set_text_props(fontweight='bold')
+            celda.set_facecolor('#d1e7dd')
+    return tabla
+
+
+def _paginas_portada(grupo, estudiantes, mediciones, generado):
+    filas = []
+    for pk, nombre, _ in estudiantes:
+        serie = mediciones[pk]
+        if serie:
+            inicial, final = serie[0][1], serie[-1][1]
+            filas.append([
+                nombre, len(serie), f'{serie[0][0]} - {serie[-1][0]}',
+                texto_centimetros(inicial), texto_centimetros(final), f'{centimetros(final - inicial):.2f}',
+            ])
+        else:
+            filas.append([nombre, 0, '-', '-', '-', '-'])
+
+    encabezados = ['Estudiante', 'Mediciones', 'Días', 'Inicial (cm)', 'Final (cm)', 'Crecimiento (cm)']
+    for inicio in range(0, max(len(filas), 1), FILAS_POR_PAGINA_PORTADA):
+        figura = Figure(figsize=A4)
+        figura.text(0.5, 0.95, f'Bitácora Científica - Reporte del grupo {grupo}',
+                    ha='center', fontsize=16, fontweight='bold')
+        figura.text(0.5, 0.925, f'{len(estudiantes)} estudiantes · generado el {generado:%d/%m/%Y %H:%M}',
+                    ha='center', fontsize=10, color='#6c757d')
+        pagina = filas[inicio:inicio + FILAS_POR_PAGINA_PORTADA]
+        if pagina:
+            alto = 0.02 * (len(pagina) + 1)
+            _tabla(figura, [0.06, 0.89 - alto, 0.88, alto], encabezados, pagina)
+        yield figura
+
+
+def _leer_miniatura(nombre):
+    from PIL import Image
+
+    try:
+        with default_storage.open(nombre) as archivo:
+            return np.asarray(Image.open(archivo).convert('RGB'))
+    except (OSError, ValueError):
+        return None
+
+
+def _pagina_estudiante(grupo, nombre, correo, serie, analisis, fotos):
+    import matplotlib.image
+
+    figura = Figure(figsize=A4)
+    figura.text(0.06, 0.955, nombre, fontsize=15, fontweight='bold')
+    figura.text(0.06, 0.935, f'Grupo {grupo} · {correo} · {len(serie)} mediciones', fontsize=9, color='#6c757d')
+
+    eje = figura.add_axes([0.06, 0.55, 0.88, 0.37])
+    eje.axis('off')
+    if analisis:
+        eje.imshow(matplotlib.image.imread(io.BytesIO(analisis['grafica']), format='png'))
+        figura.text(0.06, 0.535, '\n'.join([
+            f"Regresión lineal: y = {analisis['a0']:.3f} + {analisis['a1']:.3f}x",
+            f"Correlación: r = {analisis['r']:.3f}    r² = {analisis['r2']:.3f}",
+            f"Modelo de crecimiento: {analisis['modelo']}  ({analisis['ecuacion']})    r² = {analisis['r2_modelo']:.3f}",
+        ]), fontsize=9, va='top', linespacing=1.6)
+    else:
+        eje.text(0.5, 0.5, 'Se necesitan al menos 2 mediciones para el análisis',
+                 ha='center', va='center', fontsize=11, color='#6c757d')
+
+    filas = [
+        [dia, texto_centimetros(centesimas), 'Sí' if atipica else '', timezone.localtime(fecha).strftime('%d/%m/%Y')]
+        for dia, centesimas, atipica, fecha in serie[:MAX_FILAS_TABLA]
+    ]
+    if filas:
+        alto = 0.0145 * (len(filas) + 1)
+        _tabla(figura, [0.06, 0.46 - alto, 0.5, alto], ['Día', 'Altura (cm)', 'Atípica', 'Fecha'], filas, 7)
+        if len(serie) > MAX_FILAS_TABLA:
+            figura.text(0.06, 0.445 - alto, f'... y {len(serie) - MAX_FILAS_TABLA} más (ver mediciones/*.csv)',
+                        fontsize=7, color='#6c757d')
+
+    for indice, (dia, miniatura) in enumerate(fotos[:MAX_MINIATURAS]):
+        imagen = _leer_miniatura(miniatura)
+        if imagen is None:
+            continue
+        eje_foto = figura.add_axes([0.61 + (indice % 2) * 0.17, 0.33 - (indice // 2) * 0.13, 0.15, 0.11])
+        eje_foto.imshow(imagen)
+        eje_foto.set_title(f'Día {dia}', fontsize=7)
+        eje_foto.axis('off')
+    return figura
+
+
+# ===== ARCHIVOS =====
+
+def _csv(encabezados, filas):
+    texto = io.StringIO()
+    escritor = csv.writer(texto)
+    escritor.writerow(encabezados)
+    escritor.writerows(filas)
+    return texto.getvalue()
+
+
+def _fila_resumen(nombre, correo, serie, analisis):
+    fila = [nombre, correo, len(serie)]
+    if serie:
+        fila += [texto_centimetros(serie[0][1]), texto_centimetros(serie[-1][1])]
+    else:
+        fila += ['', '']
+    if analisis:
+        fila += [f"{analisis[campo]:.4f}" for campo in ('a0', 'a1', 'r', 'r2')]
+        fila += [analisis['modelo'], f"{analisis['r2_modelo']:.4f}"]
+    else:
+        fila += [''] * 6
+    return fila
+
+
+def escribir_reporte(destino, grupo, procesos=None):
+    """Escribe el ZIP del reporte del grupo en ``destino``; retorna el número de estudiantes."""
+    estudiantes, mediciones, fotos = _datos_grupo(grupo)
+    series = [
+        (nombre, [m[0] for m in mediciones[pk]], centimetros([m[1] for m in mediciones[pk]]).tolist())
+        for pk, nombre, _ in estudiantes
+    ]
+    temporal_pdf = destino.with_name(destino.name + '.pdf')
+    resumen = []
+    try:
+        with zipfile.ZipFile(destino, 'w', zipfile.ZIP_DEFLATED) as zip_reporte:
+            with PdfPages(temporal_pdf) as pdf:
+                for figura in _paginas_portada(grupo, estudiantes, mediciones, timezone.localtime()):
+                    pdf.savefig(figura)
+                analisis_todos = _analizar_todos(series, procesos)
+                for (pk, nombre, correo), analisis in zip(estudiantes, analisis_todos):
+                    serie = mediciones[pk]
+                    archivo = _nombre_archivo(nombre, pk)
+                    zip_reporte.writestr(f'mediciones/{archivo}.csv', _csv(
+                        ['Día', 'Altura (cm)', 'Atípica', 'Fecha de Registro'],
+                        [
+                            [dia, texto_centimetros(centesimas), 'sí' if atipica else 'no',
+                             timezone.localtime(fecha).strftime('%Y-%m-%d %H:%M:%S')]
+                            for dia, centesimas, atipica, fecha in serie
+                        ],
+                    ))
+                    if analisis:
+                        # Los PNG ya vienen comprimidos
+                        zip_reporte.writestr(f'graficas/{archivo}.png', analisis['grafica'], zipfile.ZIP_STORED)
+                    pdf.savefig(_pagina_estudiante(grupo, nombre, correo, serie, analisis, fotos[pk]))
+                    resumen.append(_fila_resumen(nombre, correo, serie, analisis))
+            zip_reporte.write(temporal_pdf, 'reporte.pdf', zipfile.ZIP_STORED)
+            zip_reporte.writestr('resumen.csv', _csv(
+                ['Estudiante', 'Correo', 'Mediciones', 'Altura inicial (cm)', 'Altura final (cm)',
+                 'a0', 'a1', 'r', 'r2', 'Modelo', 'r2 modelo'],
+                resumen,
+            ))
+    finally:
+        temporal_pdf.unlink(missing_ok=True)
+    return len(estudiantes)
+
+
+def generar_reporte(reporte, procesos=None):
+    """
+    Genera el archivo del ReporteGrupo y lo marca como listo (o fallido, con
+    el error). Lo llama la tarea generar_reporte_grupo.
+    """
+    directorio = directorio_reportes()
+    nombre = f'reporte-grupo-{reporte.grupo}-{timezone.localtime(reporte.creado):%Y%m%d-%H%M}-{reporte.pk}.zip'
+    temporal = directorio / f'.{nombre}.tmp'
+    try:
+        num_estudiantes = escribir_reporte(temporal, reporte.grupo, procesos)
+        os.replace(temporal, directorio / nombre)
+    except Exception:
+        logger.exception('No se pudo generar el reporte del grupo %s', reporte.grupo)
+        temporal.unlink(missing_ok=True)
+        reporte.estado = ReporteGrupo.FALLIDO
+        reporte.error = traceback.format_exc()
+        reporte.terminado = timezone.now()
+        reporte.save(update_fields=['estado', 'error', 'terminado'])
+        return {'error': reporte.error.strip().splitlines()[-1]}
+
+    reporte.estado = ReporteGrupo.LISTO
+    reporte.ruta = nombre
+    reporte.num_estudiantes = num_estudiantes
+    reporte.tamano = (directorio / nombre).stat().st_size
+    reporte.terminado = timezone.now()
+    reporte.save(update_fields=['estado', 'ruta', 'num_estudiantes', 'tamano', 'terminado'])
+    return {'ruta': nombre, 'num_estudiantes': num_estudiantes, 'tamano': reporte.tamano}
@@ -0,0 +1,101 @@
+"""
+Enrutamiento de lecturas hacia la réplica.
+
+Solo se usa la réplica dentro de las vistas marcadas con ``lectura_replica`` y
+solo para los modelos de la app registros; sesiones, usuarios y cualquier
+escritura siguen yendo a la base de datos principal.
+
+Consistencia "leer lo propio": cuando una petición escribe en registros,
+FijarPrimarioMiddleware deja una cookie firmada y durante
+REPLICA_FIJAR_PRIMARIO_SEGUNDOS las lecturas de ese navegador vuelven a ir
+al primario, aunque la réplica todavía no haya recibido el cambio. Las
+escrituras de mantenimiento que no son del usuario (la cola de tareas y los
+resúmenes materializados que se reconstruyen al leer) no fijan el primario.
+
+Para probarlo en local basta con dos archivos SQLite:
+
+    BITACORA_DB_MOTOR=sqlite BITACORA_DB_NAME=primario.sqlite3 \
+    BITACORA_DB_REPLICA_NAME=replica.sqlite3 python manage.py runserver
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+ALIAS_REPLICA = 'replica'
+
+# Modelos cuyas escrituras no cuentan para fijar el primario
+MODELOS_SIN_FIJAR = {'tarea', 'resumenestudiante', 'resumengrupo'}
+
+_leer_de_replica = ContextVar('leer_de_replica', default=False)
+_hubo_escritura = ContextVar('hubo_escritura', default=False)
+
+
+def replica_disponible():
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+def alias_primario():
+    """
+    Alias del primario para lecturas que deben estar al día. A diferencia de
+    ``router.db_for_write`` no marca la petición como escritura.
+    """
+    return DEFAULT_DB_ALIAS
+
+
+@contextmanager
+def usando_replica():
+    """Dirige a la réplica las lecturas de registros dentro del bloque."""
+    token = _leer_de_replica.set(True)
+    try:
+        yield
+    finally:
+        _leer_de_replica.reset(token)
+
+
+def lectura_replica(view_func):
+    """
+    Decorador para vistas de solo lectura (listados, análisis y exportación).
+    Si el usuario escribió hace poco (primario fijado) se lee del primario.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if getattr(request, 'primario_fijado', False):
+            return view_func(request, *args, **kwargs)
+        with usando_replica():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def registrando_escrituras():
+    """Marca si dentro del bloque se escribió en algún modelo de registros."""
+    token = _hubo_escritura.set(False)
+    try:
+        yield lambda: _hubo_escritura.get()
+    finally:
+        _hubo_escritura.reset(token)
+
+
+class ReplicaRouter:
+    app_label = 'registros'
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label == self.app_label and _leer_de_replica.get() and replica_disponible():
+            return ALIAS_REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label == self.app_label and model._meta.model_name not in MODELOS_SIN_FIJAR:
+            _hubo_escritura.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primario y réplica contienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe el esquema por replicación, no por migraciones
+        return db != ALIAS_REPLICA
@@ -0,0 +1,152 @@
+"""
+Señales de la app registros.
+
+Declara qué espacios de caché quedan obsoletos cuando cambia cada modelo y
+mantiene los resúmenes materializados (por estudiante y por grupo) al guardar
+o eliminar mediciones.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import espacio_estudiante, invalida
+from .grupos import actualizar_celda, reconstruir_resumen_grupos
+from .instantanea import registrar_cambios
+from .models import Estudiante, MedicionPlantas, RegistroFotografico, ReporteGrupo, ResumenEstudiante
+from .prediccion import actualizar_fotos, agregar_medicion, quitar_medicion, reconstruir_resumenes
+from .tareas import encolar
+
+
+@invalida(Estudiante)
+def _invalidar_estudiante(estudiante):
+    return [espacio_estudiante(estudiante.pk), 'dashboard', 'estudiantes']
+
+
+@invalida(MedicionPlantas)
+def _invalidar_medicion(medicion):
+    return [espacio_estudiante(medicion.estudiante_id), 'dashboard']
+
+
+@invalida(RegistroFotografico)
+def _invalidar_registro_fotografico(registro):
+    # 'fotos': listado de mediciones con sus fotografías (GET condicional)
+    return [espacio_estudiante(registro.estudiante_id), 'fotos']
+
+
+# ===== ESTADÍSTICAS SUFICIENTES POR ESTUDIANTE =====
+# Deben conectarse antes que actualizar_resumen_grupo, que refresca _valores_cargados.
+
+@receiver(post_save, sender=MedicionPlantas, dispatch_uid='resumen_estudiante_medicion_save')
+def sumar_medicion(sender, instance, created, **kwargs):
+    # Dentro de la misma transacción que la escritura: las sumas nunca quedan a medias
+    cargados = getattr(instance, '_valores_cargados', None)
+    if created:
+        agregar_medicion(instance.estudiante_id, instance.dia, instance.altura)
+    elif cargados and None not in cargados.values():
+        quitar_medicion(cargados['estudiante_id'], cargados['dia'], cargados['altura'])
+        agregar_medicion(instance.estudiante_id, instance.dia, instance.altura)
+    else:
+        # Instancia guardada sin haberse leído de la base de datos: se desconoce el valor anterior
+        reconstruir_resumenes([instance.estudiante_id])
+
+
+@receiver(post_delete, sender=MedicionPlantas, dispatch_uid='resumen_estudiante_medicion_delete')
+def restar_medicion(sender, instance, **kwargs):
+    valores = getattr(instance, '_valores_cargados', None)
+    if not valores or None in valores.values():
+        valores = {'estudiante_id': instance.estudiante_id, 'dia': instance.dia, 'altura': instance.altura}
+    quitar_medicion(valores['estudiante_id'], valores['dia'], valores['altura'])
+
+
+@receiver(post_save, sender=RegistroFotografico, dispatch_uid='resumen_estudiante_foto_save')
+@receiver(post_delete, sender=RegistroFotografico, dispatch_uid='resumen_estudiante_foto_delete')
+def contar_fotos(sender, instance, **kwargs):
+    actualizar_fotos(instance.estudiante_id)
+
+
+@receiver(post_save, sender=Estudiante, dispatch_uid='resumen_estudiante_crear')
+def crear_resumen_estudiante(sender, instance, created, **kwargs):
+    # Así la página de inicio siempre encuentra el resumen, aunque aún no haya mediciones
+    if created:
+        ResumenEstudiante.objects.get_or_create(estudiante=instance)
+
+
+# ===== INSTANTÁNEA DE ANÁLISIS =====
+# También antes que actualizar_resumen_grupo: necesita el estudiante anterior de _valores_cargados.
+
+@receiver(post_save, sender=MedicionPlantas, dispatch_uid='instantanea_medicion_save')
+@receiver(post_delete, sender=MedicionPlantas, dispatch_uid='instantanea_medicion_delete')
+def marcar_serie_medicion(sender, instance, **kwargs):
+    cargados = getattr(instance, '_valores_cargados', None) or {}
+    registrar_cambios([instance.estudiante_id, cargados.get('estudiante_id')])
+
+
+@receiver(post_save, sender=Estudiante, dispatch_uid='instantanea_estudiante_save')
+def marcar_serie_estudiante(sender, instance, created, **kwargs):
+    # El índice de la instantánea guarda el grupo de cada estudiante
+    if not created and getattr(instance, '_grupo_cargado', None) not in (None, instance.grupo):
+        registrar_cambios([instance.pk])
+
+
+@receiver(post_delete, sender=Estudiante, dispatch_uid='instantanea_estudiante_delete')
+def marcar_serie_estudiante_eliminado(sender, instance, **kwargs):
+    registrar_cambios([instance.pk])
+
+
+# ===== MINIATURAS =====
+
+@receiver(post_save, sender=RegistroFotografico, dispatch_uid='miniatura_registro_save')
+def encolar_miniatura(sender, instance, created, **kwargs):
+    nombre = instance.imagen.name
+    if nombre and (created or nombre != getattr(instance, '_imagen_cargada', None)):
+        encolar('generar_miniatura', {'registro_id': instance.pk})
+    instance._imagen_cargada = nombre
+
+
+# ===== REPORTES DE GRUPO =====
+
+@receiver(post_delete, sender=ReporteGrupo, dispatch_uid='reporte_grupo_delete')
+def eliminar_archivo_reporte(sender, instance, **kwargs):
+    from .reportes import eliminar_archivo
+
+    ruta = instance.ruta
+    transaction.on_commit(lambda: eliminar_archivo(ruta))
+
+
+# ===== RESUMEN MATERIALIZADO POR GRUPO =====
+
+def _grupo_de(estudiante_id):
+    return Estudiante.objects.filter(pk=estudiante_id).values_list('grupo', flat=True).first()
+
+
+@receiver(post_save, sender=MedicionPlantas, dispatch_uid='resumen_grupo_medicion_save')
+@receiver(post_delete, sender=MedicionPlantas, dispatch_uid='resumen_grupo_medicion_delete')
+def actualizar_resumen_grupo(sender, instance, **kwargs):
+    celdas = {(instance.estudiante.grupo, instance.dia)}
+
+    # Si la edición cambió el día o el estudiante, la celda anterior también cambia
+    cargados = getattr(instance, '_valores_cargados', None)
+    if cargados and (cargados['dia'], cargados['estudiante_id']) != (instance.dia, instance.estudiante_id):
+        grupo_anterior = (
+            instance.estudiante.grupo if cargados['estudiante_id'] == instance.estudiante_id
+            else _grupo_de(cargados['estudiante_id'])
+        )
+        if grupo_anterior is not None:
+            celdas.add((grupo_anterior, cargados['dia']))
+
+    def aplicar():
+        for grupo, dia in celdas:
+            actualizar_celda(grupo, dia)
+    transaction.on_commit(aplicar)
+    instance._valores_cargados = {
+        'estudiante_id': instance.estudiante_id, 'dia': instance.dia, 'altura': instance.altura,
+    }
+
+
+@receiver(post_save, sender=Estudiante, dispatch_uid='resumen_grupo_estudiante_save')
+def mover_estudiante_de_grupo(sender, instance, created, **kwargs):
+    grupo_anterior = getattr(instance, '_grupo_cargado', None)
+    if not created and grupo_anterior is not None and grupo_anterior != instance.grupo:
+        grupos = [grupo_anterior, instance.grupo]
+        transaction.on_commit(lambda: reconstruir_resumen_grupos(grupos))
+    instance._grupo_cargado = instance.grupo
@@ -406,6 +406,518 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
+    // ========================================
+    // BÚSQUEDA DE ESTUDIANTES (listas grandes)
+    // ========================================
+    // Con muchos estudiantes el servidor solo envía la opción elegida;
+    // el resto se busca al escribir en /api/estudiantes/?q=
+    document.querySelectorAll('select[data-autocompletar]').forEach(select => {
+        const buscador = document.createElement('input');
+        buscador.type = 'search';
+        buscador.className = 'form-control mb-2';
+        buscador.placeholder = 'Buscar por nombre, correo o grupo...';
+        select.parentNode.insertBefore(buscador, select);
+
+        let espera = null;
+        buscador.addEventListener('input', () => {
+            clearTimeout(espera);
+            const texto = buscador.value.trim();
+            if (texto.length < 2) {
+                return;
+            }
+            espera = setTimeout(() => {
+                const url = `${select.dataset.autocompletar}?q=${encodeURIComponent(texto)}`;
+                fetch(url, { headers: { 'Accept': 'application/json' } })
+                    .then(respuesta => respuesta.ok ? respuesta.json() : { resultados: [] })
+                    .then(datos => {
+                        const elegida = select.selectedOptions[0];
+                        // Se conserva la opción elegida y el marcador vacío
+                        Array.from(select.options).forEach(opcion => {
+                            if (opcion.value && opcion !== elegida) {
+                                opcion.remove();
+                            }
+                        });
+                        datos.resultados.forEach(resultado => {
+                            if (elegida && elegida.value === String(resultado.id)) {
+                                return;
+                            }
+                            select.add(new Option(resultado.texto, resultado.id));
+                        });
+                        if (datos.resultados.length && !select.value) {
+                            select.size = Math.min(datos.resultados.length + 1, 8);
+                        }
+                    });
+            }, 250);
+        });
+        select.addEventListener('change', () => {
+            select.size = 0;
+        });
+    });
+
+    // ========================================
+    // DASHBOARD EN VIVO (Server-Sent Events)
+    // ========================================
+    // El servidor envía deltas (medición, foto, resumen) y las tarjetas se
+    // actualizan en su lugar; sin servidor ASGI responde 204 y no se reintenta
+    const contenedorEventos = document.querySelector('[data-eventos-url]');
+    if (contenedorEventos && window.EventSource) {
+        const fuente = new EventSource(contenedorEventos.dataset.eventosUrl);
+        const aviso = contenedorEventos.querySelector('[data-eventos-aviso]');
+        const actividad = contenedorEventos.querySelector('[data-eventos-actividad]');
+        const calidades = { excelente: 'Excelente', bueno: 'Bueno', moderado: 'Moderado' };
+        const mostrarAviso = () => aviso && aviso.classList.remove('d-none');
+
+        const agregarActividad = (texto) => {
+            if (!actividad) {
+                return;
+            }
+            const item = document.createElement('li');
+            item.className = 'list-group-item small';
+            item.textContent = `${new Date().toLocaleTimeString()} · ${texto}`;
+            const lista = actividad.querySelector('ul');
+            lista.prepend(item);
+            while (lista.children.length > 8) {
+                lista.lastElementChild.remove();
+            }
+            actividad.classList.remove('d-none');
+        };
+
+        fuente.addEventListener('resumen', (e) => {
+            const datos = JSON.parse(e.data);
+            const tarjeta = contenedorEventos.querySelector(`[data-estudiante-id="${datos.estudiante_id}"]`);
+            // Estudiante que aún no tenía tarjeta (o que dejó de tener análisis): hace falta recargar
+            if (!tarjeta || !datos.puede_analizar) {
+                mostrarAviso();
+                return;
+            }
+            tarjeta.querySelectorAll('[data-campo]').forEach(celda => {
+                const valor = datos[celda.dataset.campo];
+                if (valor === undefined || valor === null) {
+                    return;
+                }
+                if (celda.dataset.campo === 'calidad_ajuste') {
+                    celda.textContent = calidades[valor] || 'Debil';
+                } else if (celda.dataset.decimales) {
+                    celda.textContent = Number(valor).toFixed(Number(celda.dataset.decimales));
+                } else {
+                    celda.textContent = valor;
+                }
+            });
+            tarjeta.classList.add('border-success');
+            setTimeout(() => tarjeta.classList.remove('border-success'), 3000);
+        });
+
+        fuente.addEventListener('medicion', (e) => {
+            const datos = JSON.parse(e.data);
+            agregarActividad(`${datos.estudiante} (grupo ${datos.grupo}) registró el día ${datos.dia}: ${datos.altura} cm`);
+        });
+
+        fuente.addEventListener('foto', (e) => {
+            const datos = JSON.parse(e.data);
+            agregarActividad(`${datos.estudiante} (grupo ${datos.grupo}) subió la foto del día ${datos.dia}`);
+        });
+
+        fuente.addEventListener('recargar', mostrarAviso);
+    }
+
+    // ========================================
+    // SUBIDAS POR PARTES (tus)
+    // ========================================
+    // Con señal débil la foto se sube en fragmentos de 1 MB: si la conexión se
+    // corta se retoma desde el último byte que recibió el servidor (también
+    // tras recargar la página) y el formulario se envía después solo con el id
+    // de la subida (ver registros/subidas.py).
+    const TAMANO_FRAGMENTO = 1024 * 1024;
+    const MAX_REINTENTOS_FRAGMENTO = 5;
+
+    const tokenCsrf = () => {
+        const cookie = document.cookie.split('; ').find(parte => parte.startsWith('csrftoken='));
+        if (cookie) {
+            return decodeURIComponent(cookie.split('=')[1]);
+        }
+        const campo = document.querySelector('input[name="csrfmiddlewaretoken"]');
+        return campo ? campo.value : '';
+    };
+
+    // Rechazo del servidor que no se arregla reintentando (archivo muy grande, sin permiso...)
+    class ErrorSubidaDefinitivo extends Error {}
+
+    const esperar = (milisegundos) => new Promise(resolver => setTimeout(resolver, milisegundos));
+
+    const subirPorPartes = async (archivo, url, alAvanzar) => {
+        const cabeceras = () => ({ 'Tus-Resumable': '1.0.0', 'X-CSRFToken': tokenCsrf() });
+        const huella = `bitacora-subida:${document.body.dataset.usuario}:${archivo.name}:${archivo.size}:${archivo.lastModified}`;
+        const consultar = async (ubicacion) => {
+            const respuesta = await fetch(ubicacion, {
+                method: 'HEAD', headers: cabeceras(), credentials: 'same-origin', cache: 'no-store',
+            });
+            return respuesta.ok ? Number(respuesta.headers.get('Upload-Offset')) : null;
+        };
+
+        // Una subida de este mismo archivo que quedó a medias se continúa
+        let ubicacion = localStorage.getItem(huella);
+        let desplazamiento = ubicacion ? await consultar(ubicacion) : null;
+        if (desplazamiento === null) {
+            const nombre = btoa(unescape(encodeURIComponent(archivo.name)));
+            const respuesta = await fetch(url, {
+                method: 'POST',
+                headers: {
+                    ...cabeceras(),
+                    'Upload-Length': String(archivo.size),
+                    'Upload-Metadata': `filename ${nombre},filetype ${btoa(archivo.type)}`,
+                },
+                credentials: 'same-origin',
+            });
+            if (respuesta.status !== 201) {
+                throw new ErrorSubidaDefinitivo(await respuesta.text() || `Error ${respuesta.status}`);
+            }
+            ubicacion = respuesta.headers.get('Location');
+            localStorage.setItem(huella, ubicacion);
+            desplazamiento = 0;
+        }
+
+        let fallos = 0;
+        while (desplazamiento < archivo.size) {
+            alAvanzar(desplazamiento / archivo.size);
+            try {
+                const respuesta = await fetch(ubicacion, {
+                    method: 'PATCH',
+                    headers: {
+                        ...cabeceras(),
+                        'Upload-Offset': String(desplazamiento),
+                        'Content-Type': 'application/offset+octet-stream',
+                    },
+                    body: archivo.slice(desplazamiento, desplazamiento + TAMANO_FRAGMENTO),
+                    credentials: 'same-origin',
+                });
+                if (respuesta.status === 204) {
+                    desplazamiento = Number(respuesta.headers.get('Upload-Offset'));
+                    fallos = 0;
+                    continue;
+                }
+                // 409/423 (desfase u otro envío en curso) y 5xx se resuelven reintentando
+                if (respuesta.status < 500 && ![409, 423].includes(respuesta.status)) {
+                    localStorage.removeItem(huella);
+                    throw new ErrorSubidaDefinitivo(await respuesta.text() || `Error ${respuesta.status}`);
+                }
+            } catch (error) {
+                if (error instanceof ErrorSubidaDefinitivo) {
+                    throw error;
+                }
+            }
+            fallos += 1;
+            if (fallos > MAX_REINTENTOS_FRAGMENTO) {
+                throw new TypeError('No se pudo completar la subida');
+            }
+            await esperar(1000 * 2 ** (fallos - 1));
+            // Se retoma desde lo que el servidor realmente guardó
+            const guardado = await consultar(ubicacion).catch(() => null);
+            if (guardado !== null) {
+                desplazamiento = guardado;
+            }
+        }
+        localStorage.removeItem(huella);
+        return ubicacion.split('/').filter(Boolean).pop();
+    };
+
+    const campoImagen = (form) => form.querySelector('input[type="file"][name="imagen"]');
+    const archivoSeleccionado = (form) => {
+        const campo = campoImagen(form);
+        return campo && campo.files.length ? campo.files[0] : null;
+    };
+
+    // Sube la foto elegida y deja en el formulario solo el id de la subida
+    const subirFotoDelFormulario = async (form) => {
+        const campo = campoImagen(form);
+        const boton = form.querySelector('button[type="submit"]');
+        const textoOriginal = boton ? boton.innerHTML : '';
+        try {
+            const subida = await subirPorPartes(campo.files[0], form.dataset.subidaUrl, fraccion => {
+                if (boton) {
+                    boton.innerHTML = `<span class="spinner-border spinner-border-sm me-2"></span>Subiendo foto ${Math.round(fraccion * 100)}%`;
+                }
+            });
+            form.querySelector('input[name="subida"]').value = subida;
+            campo.value = '';
+            campo.required = false;
+        } finally {
+            if (boton) {
+                boton.innerHTML = textoOriginal;
+            }
+        }
+    };
+
+    const avisarErrorSubida = (error) => {
+        Swal.fire({
+            icon: 'error',
+            title: 'No se pudo subir la fotografía',
+            text: error instanceof ErrorSubidaDefinitivo
+                ? error.message
+                : 'Revisa la conexión y vuelve a intentarlo: la subida continuará donde quedó.',
+            confirmButtonColor: '#198754'
+        });
+    };
+
+    // En fase de captura, como el modo sin conexión (que usa estas funciones en su formulario)
+    document.addEventListener('submit', async (e) => {
+        const form = e.target;
+        if (!form.matches('form[data-subida-url]') || !window.fetch || !archivoSeleccionado(form) || !form.checkValidity()) {
+            return;
+        }
+        if (form.matches('[data-sin-conexion]') && colaDisponible) {
+            return;
+        }
+        e.preventDefault();
+        e.stopPropagation();
+        if (form.dataset.enviando) {
+            return;
+        }
+        form.dataset.enviando = '1';
+        try {
+            await subirFotoDelFormulario(form);
+            formChanged = false;
+            form.submit();
+        } catch (error) {
+            avisarErrorSubida(error);
+        } finally {
+            delete form.dataset.enviando;
+        }
+    }, true);
+
+    // ========================================
+    // MODO SIN CONEXIÓN (IndexedDB)
+    // ========================================
+    // En el invernadero la señal va y viene: si el envío del registro de una
+    // medición falla, se guarda en IndexedDB y se envía por lotes al volver la
+    // conexión. Cada medición lleva su clave, así un reenvío nunca la duplica.
+    const cuerpo = document.body;
+    const usuarioActual = cuerpo.dataset.usuario;
+    const urlSincronizar = cuerpo.dataset.sincronizarUrl;
+    const colaDisponible = Boolean(window.indexedDB && usuarioActual && urlSincronizar);
+    const LOTE_SINCRONIZACION = 20;
+
+    if ('serviceWorker' in navigator) {
+        if (cuerpo.dataset.serviceWorker) {
+            navigator.serviceWorker.register(cuerpo.dataset.serviceWorker)
+                .catch(error => console.warn('Service worker no registrado:', error));
+        } else if (navigator.serviceWorker.controller) {
+            // Sin sesión (login): no deben quedar páginas guardadas de otro usuario
+            navigator.serviceWorker.controller.postMessage('cerrar-sesion');
+        }
+    }
+
+    const abrirCola = () => new Promise((resolver, rechazar) => {
+        const apertura = indexedDB.open('bitacora', 1);
+        apertura.onupgradeneeded = () => {
+            apertura.result.createObjectStore('mediciones', { keyPath: 'clave' });
+        };
+        apertura.onsuccess = () => resolver(apertura.result);
+        apertura.onerror = () => rechazar(apertura.error);
+    });
+
+    const usarCola = async (modo, operar) => {
+        const db = await abrirCola();
+        try {
+            return await new Promise((resolver, rechazar) => {
+                const transaccion = db.transaction('mediciones', modo);
+                const resultado = operar(transaccion.objectStore('mediciones'));
+                transaccion.oncomplete = () => resolver(resultado && resultado.result);
+                transaccion.onerror = () => rechazar(transaccion.error);
+                transaccion.onabort = () => rechazar(transaccion.error);
+            });
+        } finally {
+            db.close();
+        }
+    };
+
+    const pendientesDelUsuario = async () => {
+        const todas = await usarCola('readonly', almacen => almacen.getAll());
+        return todas.filter(registro => registro.usuario === usuarioActual);
+    };
+
+    const nuevaClave = () => {
+        if (window.crypto && crypto.randomUUID) {
+            return crypto.randomUUID();
+        }
+        const bytes = crypto.getRandomValues(new Uint8Array(16));
+        bytes[6] = (bytes[6] & 0x0f) | 0x40;
+        bytes[8] = (bytes[8] & 0x3f) | 0x80;
+        const hex = Array.from(bytes, b => b.toString(16).padStart(2, '0')).join('');
+        return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+    };
+
+    let sincronizando = false;
+    const sincronizar = async () => {
+        if (!colaDisponible || sincronizando || !navigator.onLine) {
+            return;
+        }
+        sincronizando = true;
+        let enviadas = 0;
+        const errores = [];
+        try {
+            const pendientes = await pendientesDelUsuario();
+            for (let inicio = 0; inicio < pendientes.length; inicio += LOTE_SINCRONIZACION) {
+                const lote = pendientes.slice(inicio, inicio + LOTE_SINCRONIZACION);
+                const datos = new FormData();
+                datos.append('registros', JSON.stringify(lote.map(registro => ({
+                    clave: registro.clave,
+                    estudiante: registro.estudiante,
+                    dia: registro.dia,
+                    altura: registro.altura,
+                    comentario: registro.comentario,
+                }))));
+                lote.forEach(registro => {
+                    if (registro.foto) {
+                        datos.append(`foto_${registro.clave}`, registro.foto, registro.nombreFoto || 'foto.jpg');
+                    }
+                });
+                const respuesta = await fetch(urlSincronizar, {
+                    method: 'POST',
+                    body: datos,
+                    credentials: 'same-origin',
+                    headers: { 'X-CSRFToken': tokenCsrf(), 'Accept': 'application/json' },
+                });
+                if (!respuesta.ok) {
+                    // Sesión vencida o servidor caído: la cola se conserva para otro intento
+                    break;
+                }
+                const { resultados } = await respuesta.json();
+                const procesadas = [];
+                resultados.forEach(resultado => {
+                    procesadas.push(resultado.clave);
+                    if (resultado.estado === 'error') {
+                        const registro = lote.find(r => r.clave === resultado.clave);
+                        const detalle = Object.values(resultado.errores || {}).flat().join(' ');
+                        errores.push(`Día ${registro ? registro.dia : '?'}: ${detalle}`);
+                    } else {
+                        enviadas += 1;
+                    }
+                });
+                await usarCola('readwrite', almacen => {
+                    procesadas.forEach(clave => almacen.delete(clave));
+                });
+            }
+        } catch (error) {
+            // Sin conexión otra vez: se reintenta con el siguiente evento 'online'
+            console.warn('Sincronización pendiente:', error);
+        } finally {
+            sincronizando = false;
+        }
+
+        if (errores.length) {
+            Swal.fire({
+                icon: 'warning',
+                title: 'Algunas mediciones guardadas sin conexión no se registraron',
+                html: errores.map(texto => `<div>${texto.replace(/</g, '&lt;')}</div>`).join(''),
+                confirmButtonColor: '#198754'
+            });
+        } else if (enviadas) {
+            window.showToast(`${enviadas} medición(es) guardadas sin conexión se enviaron al servidor`);
+        }
+    };
+
+    const encolar = async (form, foto) => {
+        const datos = new FormData(form);
+        const conFoto = foto instanceof Blob && foto.size > 0;
+        await usarCola('readwrite', almacen => almacen.put({
+            clave: nuevaClave(),
+            usuario: usuarioActual,
+            estudiante: datos.get('estudiante'),
+            dia: datos.get('dia'),
+            altura: datos.get('altura'),
+            comentario: datos.get('comentario') || '',
+            foto: conFoto ? foto : null,
+            nombreFoto: conFoto ? foto.name : '',
+            guardada: Date.now(),
+        }));
+
+        form.reset();
+        form.classList.remove('was-validated');
+        const preview = document.getElementById('imagePreview');
+        if (preview) {
+            preview.style.display = 'none';
+        }
+        formChanged = false;
+        Swal.fire({
+            icon: 'info',
+            title: 'Medición guardada en este dispositivo',
+            text: 'No hay conexión: se enviará automáticamente cuando vuelva la señal.',
+            confirmButtonColor: '#198754'
+        });
+
+        if ('serviceWorker' in navigator && window.SyncManager) {
+            navigator.serviceWorker.ready
+                .then(registro => registro.sync.register('sincronizar-mediciones'))
+                .catch(() => null);
+        }
+    };
+
+    if (colaDisponible) {
+        // En fase de captura: antes que los manejadores de doble envío y del spinner
+        document.addEventListener('submit', async (e) => {
+            const form = e.target;
+            if (!form.matches('form[data-sin-conexion]') || !form.checkValidity()) {
+                return;
+            }
+            e.preventDefault();
+            e.stopPropagation();
+            if (form.dataset.enviando) {
+                return;
+            }
+            form.dataset.enviando = '1';
+            const boton = form.querySelector('button[type="submit"]');
+            if (boton) {
+                boton.disabled = true;
+            }
+            const foto = archivoSeleccionado(form);
+            try {
+                if (!navigator.onLine) {
+                    throw new TypeError('Sin conexión');
+                }
+                if (foto) {
+                    await subirFotoDelFormulario(form);
+                }
+                // redirect 'manual': la redirección la sigue el navegador y muestra los mensajes
+                const respuesta = await fetch(form.action || location.href, {
+                    method: 'POST',
+                    body: new FormData(form),
+                    credentials: 'same-origin',
+                    redirect: 'manual',
+                });
+                if (respuesta.type === 'opaqueredirect') {
+                    formChanged = false;
+                    location.href = form.dataset.destino;
+                    return;
+                }
+                // Errores de validación (o confirmación de altura atípica): se reenvía
+                // el formulario de forma normal para que el servidor muestre la página
+                formChanged = false;
+                form.submit();
+            } catch (error) {
+                if (error instanceof ErrorSubidaDefinitivo) {
+                    avisarErrorSubida(error);
+                } else {
+                    await encolar(form, foto);
+                }
+            } finally {
+                delete form.dataset.enviando;
+                if (boton) {
+                    boton.disabled = false;
+                }
+            }
+        }, true);
+
+        sincronizar();
+        window.addEventListener('online', sincronizar);
+        if ('serviceWorker' in navigator) {
+            navigator.serviceWorker.addEventListener('message', (e) => {
+                if (e.data === 'sincronizar-mediciones') {
+                    sincronizar();
+                }
+            });
+        }
+    }
+
     // ========================================
     // NOTIFICACIONES TOAST
     // ========================================
@@ -0,0 +1,208 @@
+"""
+Subidas de fotografías por partes y reanudables (subconjunto de tus 1.0).
+
+Con señal débil, un POST multipart con la foto completa suele cortarse y hay
+que empezar de cero; además Django lo acumula en memoria o en un temporal
+mientras el worker web espera al cliente lento. Aquí el navegador (scripts.js)
+sube la foto en fragmentos pequeños:
+
+1. POST   /api/subidas/        Upload-Length y Upload-Metadata -> 201 + Location
+2. PATCH  /api/subidas/<id>/   Upload-Offset + fragmento       -> 204 + Upload-Offset
+3. HEAD   /api/subidas/<id>/   tras un corte: cuántos bytes tiene el servidor
+4. DELETE /api/subidas/<id>/   cancela la subida
+
+Cuando la subida está completa, el formulario se envía solo con su id (campo
+``subida``) y la tarea ``adjuntar_subida`` crea o actualiza el
+RegistroFotografico en segundo plano.
+
+Almacén: un directorio local (REGISTROS_DIRECTORIO_SUBIDAS) con dos archivos
+por subida, como el filestore de tusd: ``<id>.json`` (longitud, usuario,
+metadatos) y ``<id>.bin`` (los bytes recibidos; su tamaño es el desplazamiento).
+Hace las veces de un almacén de objetos con subidas multiparte: debe estar en
+un disco compartido por los procesos web y los workers de tareas.
+"""
+import base64
+import binascii
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+VERSION_TUS = '1.0.0'
+EXTENSIONES_TUS = 'creation,termination'
+
+# Tamaño máximo de una fotografía y de cada PATCH
+TAMANO_MAXIMO = 20 * 1024 * 1024
+TAMANO_MAXIMO_FRAGMENTO = 5 * 1024 * 1024
+
+# Las subidas abandonadas (sin terminar o nunca adjuntadas) se borran pasado este tiempo
+VIGENCIA_SEGUNDOS = 24 * 60 * 60
+
+# Bloques en que se copia el cuerpo de un PATCH al disco
+BLOQUE_ESCRITURA = 64 * 1024
+
+
+class ErrorSubida(Exception):
+    """Error del protocolo; ``estado`` es el código HTTP con que se responde."""
+
+    def __init__(self, mensaje, estado=400):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def directorio_subidas():
+    directorio = Path(settings.REGISTROS_DIRECTORIO_SUBIDAS)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def _rutas(subida):
+    # El id siempre es un UUID: nunca se arma una ruta con texto del cliente
+    nombre = uuid.UUID(str(subida)).hex
+    directorio = directorio_subidas()
+    return directorio / f'{nombre}.json', directorio / f'{nombre}.bin'
+
+
+def leer_metadatos(cabecera):
+    """Upload-Metadata de tus: pares ``clave valor-base64`` separados por comas."""
+    metadatos = {}
+    for par in filter(None, (parte.strip() for parte in (cabecera or '').split(','))):
+        clave, _, valor = par.partition(' ')
+        try:
+            metadatos[clave] = base64.b64decode(valor, validate=True).decode() if valor else ''
+        except (binascii.Error, UnicodeDecodeError):
+            raise ErrorSubida(f'Upload-Metadata inválido en {clave!r}.')
+    return metadatos
+
+
+# ===== ALMACÉN =====
+
+def crear_subida(usuario_id, longitud, metadatos=None):
+    """Reserva una subida vacía de ``longitud`` bytes y retorna su id (UUID en texto)."""
+    if longitud <= 0:
+        raise ErrorSubida('Upload-Length debe ser mayor que cero.')
+    if longitud > TAMANO_MAXIMO:
+        raise ErrorSubida(f'La fotografía no debe superar {TAMANO_MAXIMO // (1024 * 1024)} MB.', 413)
+    metadatos = metadatos or {}
+    subida = str(uuid.uuid4())
+    ruta_info, ruta_datos = _rutas(subida)
+    ruta_datos.touch()
+    # Primero a un temporal: un HEAD concurrente nunca lee un JSON a medias
+    temporal = ruta_info.with_suffix('.tmp')
+    temporal.write_text(json.dumps({
+        'longitud': longitud,
+        'usuario': usuario_id,
+        'nombre': Path(metadatos.get('filename', '')).name or 'foto.jpg',
+        'tipo': metadatos.get('filetype', ''),
+        'creada': time.time(),
+    }))
+    os.replace(temporal, ruta_info)
+    return subida
+
+
+def obtener_subida(subida, usuario_id=None):
+    """
+    Información de la subida con su ``desplazamiento`` actual, o None si no
+    existe (o es de otro usuario, cuando se indica ``usuario_id``).
+    """
+    try:
+        ruta_info, ruta_datos = _rutas(subida)
+        info = json.loads(ruta_info.read_text())
+        info['desplazamiento'] = ruta_datos.stat().st_size
+    except (ValueError, FileNotFoundError):
+        return None
+    if usuario_id is not None and info['usuario'] != usuario_id:
+        return None
+    info['id'] = str(uuid.UUID(str(subida)))
+    info['completa'] = info['desplazamiento'] == info['longitud']
+    return info
+
+
+@contextmanager
+def _bloqueo(archivo):
+    if fcntl is not None:
+        try:
+            fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise ErrorSubida('Otra solicitud está escribiendo en esta subida.', 423)
+    try:
+        yield
+    finally:
+        if fcntl is not None:
+            fcntl.flock(archivo, fcntl.LOCK_UN)
+
+
+def escribir_fragmento(info, desplazamiento, flujo, tamano):
+    """
+    Agrega al final de la subida ``tamano`` bytes leídos de ``flujo``, que
+    deben empezar en ``desplazamiento``. Si el cliente se corta a la mitad
+    queda lo recibido; retorna el nuevo desplazamiento.
+    """
+    if tamano > TAMANO_MAXIMO_FRAGMENTO:
+        raise ErrorSubida(f'Cada fragmento debe ser de {TAMANO_MAXIMO_FRAGMENTO // (1024 * 1024)} MB o menos.', 413)
+    if desplazamiento + tamano > info['longitud']:
+        raise ErrorSubida('El fragmento supera la longitud declarada de la subida.', 413)
+
+    _, ruta_datos = _rutas(info['id'])
+    with open(ruta_datos, 'ab') as archivo, _bloqueo(archivo):
+        archivo.seek(0, os.SEEK_END)
+        if archivo.tell() != desplazamiento:
+            raise ErrorSubida(f'Upload-Offset no coincide: el servidor tiene {archivo.tell()} bytes.', 409)
+        pendientes = tamano
+        while pendientes:
+            try:
+                bloque = flujo.read(min(BLOQUE_ESCRITURA, pendientes))
+            except OSError:
+                # Conexión cortada (UnreadablePostError): el cliente retoma con HEAD
+                bloque = b''
+            if not bloque:
+                break
+            archivo.write(bloque)
+            pendientes -= len(bloque)
+        archivo.flush()
+        return archivo.tell()
+
+
+def abrir_subida(info):
+    """La subida completa como File de Django, listo para asignar a un ImageField."""
+    _, ruta_datos = _rutas(info['id'])
+    return File(open(ruta_datos, 'rb'), name=info['nombre'])
+
+
+def eliminar_subida(subida):
+    for ruta in _rutas(subida):
+        ruta.unlink(missing_ok=True)
+
+
+def purgar_subidas(vigencia=VIGENCIA_SEGUNDOS):
+    """Borra las subidas sin fragmentos nuevos desde hace ``vigencia`` segundos; retorna cuántas."""
+    limite = time.time() - vigencia
+    borradas = 0
+    for ruta in directorio_subidas().glob('*.bin'):
+        if ruta.stat().st_mtime < limite:
+            eliminar_subida(ruta.stem)
+            borradas += 1
+    return borradas
+
+
+def es_imagen(info):
+    """Comprueba (sin decodificarla entera) que la subida sea una imagen que Pillow reconoce."""
+    from PIL import Image
+
+    with abrir_subida(info) as archivo:
+        try:
+            Image.open(archivo).verify()
+        except Exception:
+            # Pillow lanza excepciones de varios tipos con archivos dañados (igual que ImageField)
+            return False
+    return True
@@ -0,0 +1,367 @@
+"""
+Cola de tareas en segundo plano respaldada por la base de datos.
+
+Las vistas encolan el trabajo lento (borrar archivos, generar gráficas,
+crear cuentas...) con ``encolar()`` y responden de inmediato; el comando
+``procesar_tareas`` lo ejecuta. Se pueden lanzar varios workers: cada uno
+reclama tareas con SELECT ... FOR UPDATE SKIP LOCKED, así nunca ejecutan la
+misma. No requiere broker externo.
+
+Las tareas se declaran con el decorador ``@tarea`` y reciben sus argumentos
+como palabras clave (deben ser serializables a JSON). Con
+REGISTROS_TAREAS_INMEDIATAS (solo para pruebas) se ejecutan al confirmar la
+transacción, dentro del mismo proceso.
+
+Una tarea no corre dentro de una transacción: las largas (reportes, cuentas)
+no deben retener conexiones ni bloqueos durante minutos. Cada tarea abre
+``transaction.atomic()`` solo alrededor de las escrituras que deben ir juntas.
+"""
+import logging
+import traceback
+from datetime import timedelta
+from importlib import import_module
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Estudiante, RegistroFotografico, Tarea
+
+logger = logging.getLogger(__name__)
+
+_registro = {}
+
+# Espera antes de reintentar: RETRASO_REINTENTO * 2^(intentos - 1) segundos
+RETRASO_REINTENTO = 10
+
+# Una tarea "en proceso" más tiempo que esto se considera abandonada (worker caído)
+TIEMPO_MAXIMO_EJECUCION = timedelta(minutes=30)
+
+# Historial que se conserva: las fallidas más tiempo, para poder revisar el error
+RETENCION_COMPLETADAS = timedelta(days=7)
+RETENCION_FALLIDAS = timedelta(days=30)
+
+# Sesiones vencidas por sentencia DELETE: lotes cortos no bloquean django_session
+# mientras un grupo entero inicia sesión al empezar la clase
+SESIONES_POR_LOTE = 1000
+
+# Lado mayor (px) y calidad JPEG de las miniaturas de los registros fotográficos
+TAMANO_MINIATURA = 160
+CALIDAD_MINIATURA = 80
+
+
+def tarea(func=None, *, nombre=None, max_intentos=3, sensibles=()):
+    """
+    Registra una función como tarea. Uso: ``@tarea`` o ``@tarea(max_intentos=5)``.
+
+    ``sensibles``: argumentos (p. ej. hashes de contraseña) que se borran del
+    registro Tarea cuando termina, con éxito o sin más reintentos.
+    """
+    def decorador(func):
+        func.nombre_tarea = nombre or func.__name__
+        func.max_intentos = max_intentos
+        func.sensibles = tuple(sensibles)
+        _registro[func.nombre_tarea] = func
+        return func
+    return decorador(func) if func is not None else decorador
+
+
+def obtener_tarea(nombre):
+    try:
+        return _registro[nombre]
+    except KeyError:
+        raise LookupError(f'No hay ninguna tarea registrada con el nombre {nombre!r}')
+
+
+def ejecucion_inmediata():
+    return getattr(settings, 'REGISTROS_TAREAS_INMEDIATAS', False)
+
+
+def encolar(nombre, argumentos=None, clave=None, usuario=None, retraso=None):
+    """
+    Encola la tarea ``nombre`` y retorna su registro Tarea.
+
+    Args:
+        argumentos: dict con los argumentos de la tarea
+        clave: si ya hay una tarea pendiente o en proceso con esta clave,
+               no se crea otra y se retorna la existente
+        usuario: usuario que la solicita (puede consultar su estado)
+        retraso: timedelta antes de que un worker pueda ejecutarla
+    """
+    func = obtener_tarea(nombre)
+    nueva = Tarea(
+        nombre=nombre,
+        argumentos=argumentos or {},
+        clave=clave,
+        max_intentos=func.max_intentos,
+        ejecutar_despues=timezone.now() + (retraso or timedelta()),
+        usuario=usuario if usuario is not None and usuario.is_authenticated else None,
+    )
+    try:
+        with transaction.atomic():
+            nueva.save()
+    except IntegrityError:
+        existente = Tarea.objects.filter(clave=clave).first()
+        if existente is not None:
+            return existente
+        raise
+
+    if ejecucion_inmediata():
+        transaction.on_commit(lambda: ejecutar(nueva.pk))
+    return nueva
+
+
+def encolar_periodica(intervalo, nombre, argumentos=None, clave=None):
+    """
+    Encola la tarea como mucho una vez cada ``intervalo`` (timedelta) en todo
+    el sitio; útil para mantenimiento disparado desde vistas muy visitadas.
+    """
+    from .cache import obtener_cache
+
+    marca = f'registros:tarea:{clave or nombre}'
+    if obtener_cache().add(marca, 1, timeout=int(intervalo.total_seconds())):
+        return encolar(nombre, argumentos, clave=clave or nombre)
+    return None
+
+
+# ===== EJECUCIÓN =====
+
+def reclamar(limite=10, nombres=None):
+    """Marca como en proceso hasta ``limite`` tareas listas y las retorna."""
+    ahora = timezone.now()
+    with transaction.atomic():
+        listas = (
+            Tarea.objects
+            .select_for_update(skip_locked=True)
+            .filter(estado=Tarea.PENDIENTE, ejecutar_despues__lte=ahora)
+            .order_by('ejecutar_despues', 'id')
+        )
+        if nombres:
+            listas = listas.filter(nombre__in=nombres)
+        tareas = list(listas[:limite])
+        if tareas:
+            Tarea.objects.filter(pk__in=[t.pk for t in tareas]).update(estado=Tarea.EN_PROCESO, iniciada=ahora)
+    return tareas
+
+
+def ejecutar(tarea_id):
+    """Ejecuta una tarea ya reclamada (o pendiente) y registra el resultado o el error."""
+    tarea_obj = Tarea.objects.get(pk=tarea_id)
+    if tarea_obj.estado in (Tarea.COMPLETADA, Tarea.FALLIDA):
+        return tarea_obj
+
+    tarea_obj.intentos += 1
+    tarea_obj.iniciada = tarea_obj.iniciada or timezone.now()
+    try:
+        resultado = obtener_tarea(tarea_obj.nombre)(**tarea_obj.argumentos)
+    except Exception:
+        tarea_obj.error = traceback.format_exc()
+        if tarea_obj.intentos < tarea_obj.max_intentos:
+            tarea_obj.estado = Tarea.PENDIENTE
+            tarea_obj.iniciada = None
+            tarea_obj.ejecutar_despues = timezone.now() + timedelta(
+                seconds=RETRASO_REINTENTO * 2 ** (tarea_obj.intentos - 1)
+            )
+            logger.warning('Tarea %s falló (intento %s), se reintentará', tarea_obj, tarea_obj.intentos)
+        else:
+            tarea_obj.estado = Tarea.FALLIDA
+            tarea_obj.clave = None
+            tarea_obj.terminada = timezone.now()
+            logger.error('Tarea %s falló definitivamente:\n%s', tarea_obj, tarea_obj.error)
+    else:
+        tarea_obj.estado = Tarea.COMPLETADA
+        tarea_obj.resultado = resultado
+        tarea_obj.clave = None
+        tarea_obj.terminada = timezone.now()
+
+    if tarea_obj.terminada is not None:
+        sensibles = getattr(_registro.get(tarea_obj.nombre), 'sensibles', ())
+        tarea_obj.argumentos = {
+            clave: valor for clave, valor in tarea_obj.argumentos.items() if clave not in sensibles
+        }
+    tarea_obj.save(update_fields=[
+        'estado', 'intentos', 'argumentos', 'resultado', 'error', 'clave', 'ejecutar_despues', 'iniciada',
+        'terminada',
+    ])
+    return tarea_obj
+
+
+def recuperar_abandonadas():
+    """Devuelve a la cola las tareas cuyo worker dejó de responder."""
+    limite = timezone.now() - TIEMPO_MAXIMO_EJECUCION
+    return Tarea.objects.filter(estado=Tarea.EN_PROCESO, iniciada__lt=limite).update(
+        estado=Tarea.PENDIENTE, iniciada=None,
+    )
+
+
+def purgar_terminadas(antiguedad=RETENCION_COMPLETADAS, antiguedad_fallidas=RETENCION_FALLIDAS):
+    """Borra el historial de tareas completadas y fallidas que terminaron hace más de su retención."""
+    ahora = timezone.now()
+    return Tarea.objects.filter(
+        Q(estado=Tarea.COMPLETADA, terminada__lt=ahora - antiguedad)
+        | Q(estado=Tarea.FALLIDA, terminada__lt=ahora - antiguedad_fallidas)
+    ).delete()[0]
+
+
+def purgar_sesiones(lote=SESIONES_POR_LOTE):
+    """
+    Borra en lotes las sesiones vencidas de django_session (motores db y
+    cached_db). Con los demás motores (cookies) delega en clear_expired().
+    """
+    almacen = import_module(settings.SESSION_ENGINE).SessionStore
+    if not hasattr(almacen, 'get_model_class'):
+        almacen.clear_expired()
+        return 0
+    modelo = almacen.get_model_class()
+    vencidas = modelo.objects.filter(expire_date__lt=timezone.now())
+    total = 0
+    while True:
+        claves = list(vencidas.values_list('pk', flat=True)[:lote])
+        if not claves:
+            return total
+        total += modelo.objects.filter(pk__in=claves).delete()[0]
+
+
+def procesar_pendientes(limite=10, nombres=None):
+    """Reclama y ejecuta un lote; retorna el número de tareas procesadas."""
+    tareas = reclamar(limite, nombres)
+    for tarea_obj in tareas:
+        ejecutar(tarea_obj.pk)
+    return len(tareas)
+
+
+# ===== TAREAS DE LA APP =====
+
+@tarea
+def eliminar_archivos(nombres):
+    """Borra del almacenamiento los archivos indicados (ignora los que ya no existen)."""
+    eliminados = 0
+    for nombre in nombres:
+        if nombre and default_storage.exists(nombre):
+            default_storage.delete(nombre)
+            eliminados += 1
+    return {'eliminados': eliminados}
+
+
+@tarea
+def limpiar_fotos_huerfanas():
+    """Elimina los registros fotográficos sin medición y encola el borrado de sus imágenes."""
+    from .eliminacion import eliminar_registros_fotograficos
+
+    huerfanos = list(RegistroFotografico.objects.filter(medicion__isnull=True).values_list('pk', flat=True))
+    if not huerfanos:
+        return {'eliminados': 0}
+    return {'eliminados': eliminar_registros_fotograficos(huerfanos)['registros_fotograficos']}
+
+
+@tarea(max_intentos=2)
+def generar_miniatura(registro_id):
+    """Genera la miniatura JPEG de la fotografía del registro y borra la anterior."""
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    registro = RegistroFotografico.objects.filter(pk=registro_id).only('imagen', 'miniatura').first()
+    if registro is None or not registro.imagen:
+        return {'omitida': 'El registro ya no existe'}
+    imagen_original = registro.imagen.name
+    try:
+        with registro.imagen.open('rb') as origen:
+            imagen = ImageOps.exif_transpose(Image.open(origen))
+            imagen.thumbnail((TAMANO_MINIATURA, TAMANO_MINIATURA))
+            salida = BytesIO()
+            imagen.convert('RGB').save(salida, 'JPEG', quality=CALIDAD_MINIATURA, optimize=True)
+    except (FileNotFoundError, UnidentifiedImageError):
+        return {'omitida': 'La imagen no existe o no se puede leer'}
+
+    campo = RegistroFotografico._meta.get_field('miniatura')
+    nombre = default_storage.save(
+        campo.generate_filename(registro, f'{Path(imagen_original).stem}.jpg'), ContentFile(salida.getvalue()),
+    )
+    # Si la imagen cambió (o el registro se borró) mientras tanto, esta miniatura ya no sirve
+    vigente = RegistroFotografico.objects.filter(pk=registro_id, imagen=imagen_original).update(miniatura=nombre)
+    obsoleta = registro.miniatura.name if vigente else nombre
+    if obsoleta and default_storage.exists(obsoleta):
+        default_storage.delete(obsoleta)
+    return {'miniatura': nombre if vigente else None}
+
+
+@tarea
+def adjuntar_subida(subida, medicion_id=None, estudiante_id=None, comentario=''):
+    """
+    Adjunta una subida por partes terminada (registros/subidas.py): como
+    fotografía de la medición ``medicion_id`` o como registro fotográfico
+    nuevo de ``estudiante_id``. La subida se borra al confirmar.
+    """
+    from .escritura import guardar_foto
+    from .models import MedicionPlantas
+    from .subidas import abrir_subida, eliminar_subida, es_imagen, obtener_subida
+
+    info = obtener_subida(subida)
+    if info is None or not info['completa']:
+        return {'omitida': 'La subida no existe o no está completa'}
+    if not es_imagen(info):
+        eliminar_subida(subida)
+        return {'omitida': 'El archivo subido no es una imagen válida'}
+
+    with abrir_subida(info) as archivo, transaction.atomic():
+        if medicion_id is not None:
+            medicion = MedicionPlantas.objects.select_related('foto').filter(pk=medicion_id).first()
+            if medicion is None:
+                registro = None
+            else:
+                registro = guardar_foto(medicion, archivo, comentario, getattr(medicion, 'foto', None))
+        elif Estudiante.objects.filter(pk=estudiante_id).exists():
+            registro = RegistroFotografico.objects.create(
+                estudiante_id=estudiante_id, imagen=archivo, comentario=comentario,
+            )
+        else:
+            registro = None
+        # Si algo falla antes de confirmar, la subida sigue ahí para el reintento
+        transaction.on_commit(lambda: eliminar_subida(subida))
+    if registro is None:
+        return {'omitida': 'La medición o el estudiante ya no existe'}
+    return {'registro_id': registro.pk}
+
+
+@tarea
+def actualizar_instantanea():
+    """Publica la instantánea columnar al día con las escrituras confirmadas (registros/instantanea.py)."""
+    from .instantanea import publicar_pendientes
+    return publicar_pendientes()
+
+
+@tarea
+def precalcular_analisis(estudiante_id):
+    """Regresión, modelos y gráfica del estudiante, listos en caché para la próxima visita."""
+    from .analisis import obtener_grafica, obtener_regresion
+
+    estudiante = Estudiante.objects.filter(pk=estudiante_id).first()
+    if estudiante is None:
+        return {'omitida': 'El estudiante ya no existe'}
+    datos = obtener_regresion(estudiante_id)
+    if datos['num_mediciones'] >= 2:
+        obtener_grafica(estudiante, datos)
+    return {'num_mediciones': datos['num_mediciones']}
+
+
+@tarea(max_intentos=1)
+def generar_reporte_grupo(reporte_id):
+    """ZIP con el reporte de fin de periodo de un grupo (ver registros/reportes.py)."""
+    from .models import ReporteGrupo
+    from .reportes import generar_reporte
+
+    reporte = ReporteGrupo.objects.filter(pk=reporte_id, estado=ReporteGrupo.PENDIENTE).first()
+    if reporte is None:
+        return {'omitida': 'El reporte ya no existe o ya se generó'}
+    return generar_reporte(reporte)
+
+
+@tarea(max_intentos=1, sensibles=('password_hash',))
+def crear_usuarios_estudiantes(password_hash):
+    """Crea y asocia usuarios para los estudiantes que no tienen uno."""
+    from .cuentas import crear_usuarios_para_estudiantes
+    return crear_usuarios_para_estudiantes(password_hash=password_hash)
@@ -0,0 +1,103 @@
+{% load static %}// ========================================
+// SERVICE WORKER - Bitácora Científica
+// ========================================
+// Modo sin conexión para registrar mediciones en el invernadero:
+// - El formulario de registro y los archivos estáticos quedan guardados y se
+//   abren aunque no haya señal (las mediciones se encolan en IndexedDB, ver
+//   scripts.js).
+// - Al volver la conexión (Background Sync) avisa a las páginas abiertas para
+//   que envíen la cola.
+// Se genera desde una plantilla: las URLs con hash cambian en cada despliegue
+// con estáticos nuevos y con ellas este archivo, así el navegador lo actualiza.
+
+const VERSION = '{% static "registros/js/scripts.js" %}';
+const CACHE_PAGINAS = `bitacora-paginas:${VERSION}`;
+const CACHE_RECURSOS = `bitacora-recursos:${VERSION}`;
+const PAGINAS = ['{% url "medicion_crear" %}'];
+const RECURSOS = [
+    '{% static "registros/js/scripts.js" %}',
+    '{% static "registros/css/custom.css" %}',
+];
+
+self.addEventListener('install', (evento) => {
+    evento.waitUntil((async () => {
+        await (await caches.open(CACHE_RECURSOS)).addAll(RECURSOS);
+        // Sin sesión la página redirige al login: se guarda cuando se visite
+        await (await caches.open(CACHE_PAGINAS)).addAll(PAGINAS).catch(() => null);
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', (evento) => {
+    evento.waitUntil((async () => {
+        const vigentes = [CACHE_PAGINAS, CACHE_RECURSOS];
+        for (const nombre of await caches.keys()) {
+            if (nombre.startsWith('bitacora-') && !vigentes.includes(nombre)) {
+                await caches.delete(nombre);
+            }
+        }
+        await self.clients.claim();
+    })());
+});
+
+self.addEventListener('fetch', (evento) => {
+    const solicitud = evento.request;
+    if (solicitud.method !== 'GET') {
+        return;
+    }
+    const url = new URL(solicitud.url);
+
+    // Páginas guardadas: primero la red (datos al día) y, sin señal, la copia
+    if (solicitud.mode === 'navigate' && url.origin === self.location.origin && PAGINAS.includes(url.pathname)) {
+        evento.respondWith((async () => {
+            const cache = await caches.open(CACHE_PAGINAS);
+            try {
+                const respuesta = await fetch(solicitud);
+                if (respuesta.ok && !respuesta.redirected) {
+                    cache.put(url.pathname, respuesta.clone());
+                }
+                return respuesta;
+            } catch (error) {
+                return (await cache.match(url.pathname)) || Response.error();
+            }
+        })());
+        return;
+    }
+
+    // Estilos, scripts y fuentes (propios y de los CDN): la copia guardada, y se
+    // renueva en segundo plano
+    if (['style', 'script', 'font'].includes(solicitud.destination)) {
+        evento.respondWith((async () => {
+            const cache = await caches.open(CACHE_RECURSOS);
+            const guardada = await cache.match(solicitud);
+            const red = fetch(solicitud).then((respuesta) => {
+                if (respuesta.ok || respuesta.type === 'opaque') {
+                    cache.put(solicitud, respuesta.clone());
+                }
+                return respuesta;
+            });
+            if (guardada) {
+                evento.waitUntil(red.catch(() => null));
+                return guardada;
+            }
+            return red;
+        })());
+    }
+});
+
+self.addEventListener('sync', (evento) => {
+    if (evento.tag === 'sincronizar-mediciones') {
+        evento.waitUntil((async () => {
+            for (const cliente of await self.clients.matchAll({ type: 'window' })) {
+                cliente.postMessage('sincronizar-mediciones');
+            }
+        })());
+    }
+});
+
+self.addEventListener('message', (evento) => {
+    // Al cerrar sesión se borran las páginas guardadas (equipos compartidos)
+    if (evento.data === 'cerrar-sesion') {
+        evento.waitUntil(caches.delete(CACHE_PAGINAS));
+    }
+});
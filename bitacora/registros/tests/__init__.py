@@ -0,0 +1,10 @@
+"""
+Pruebas de la app registros.
+
+Se ejecutan con SQLite y Redis simulado, sin servidores externos:
+
+    BITACORA_DB_MOTOR=sqlite BITACORA_CACHE=fakeredis python manage.py test registros
+
+El enrutamiento a la réplica se prueba sin segunda base de datos: se simula
+que existe y se comprueba a qué alias va cada consulta.
+"""
@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from ..acceso import bloqueado, ip_cliente, registrar_exito, registrar_fallo
+from ..cache import obtener_cache
+from .utilidades import sin_manifiesto
+
+
+def solicitud(ip='192.0.2.10', **cabeceras):
+    return RequestFactory().post('/login/', REMOTE_ADDR=ip, **cabeceras)
+
+
+@override_settings(REGISTROS_LOGIN_FALLOS_USUARIO=3, REGISTROS_LOGIN_FALLOS_IP=0, REGISTROS_LOGIN_CABECERA_IP='')
+class LimiteFallosTests(TestCase):
+
+    def setUp(self):
+        obtener_cache().clear()
+
+    def fallar(self, veces, nombre_usuario, request=None):
+        for _ in range(veces):
+            registrar_fallo(request or solicitud(), nombre_usuario)
+
+    def test_limite_por_usuario(self):
+        self.fallar(2, 'Ana')
+        self.assertFalse(bloqueado(solicitud(), 'ana'))
+        # Mayúsculas y espacios cuentan como el mismo usuario
+        self.fallar(1, ' ANA ')
+        self.assertTrue(bloqueado(solicitud(), 'ana'))
+        self.assertTrue(bloqueado(solicitud('198.51.100.7'), 'Ana'))
+        self.assertFalse(bloqueado(solicitud(), 'luis'))
+
+        registrar_exito('ana')
+        self.assertFalse(bloqueado(solicitud(), 'ana'))
+
+    def test_sin_limite_por_ip_un_salon_no_se_bloquea(self):
+        # Todo el salón detrás de la misma IP
+        for numero in range(30):
+            self.fallar(2, f'estudiante{numero}')
+        self.assertFalse(bloqueado(solicitud(), 'estudiante99'))
+
+    @override_settings(REGISTROS_LOGIN_FALLOS_IP=4)
+    def test_limite_por_ip_activado(self):
+        for numero in range(4):
+            self.fallar(1, f'estudiante{numero}')
+        self.assertTrue(bloqueado(solicitud(), 'estudiante99'))
+        self.assertFalse(bloqueado(solicitud('198.51.100.7'), 'estudiante99'))
+
+    @override_settings(REGISTROS_LOGIN_FALLOS_IP=2, REGISTROS_LOGIN_CABECERA_IP='X-Forwarded-For')
+    def test_detras_de_un_proxy_usa_su_cabecera(self):
+        # REMOTE_ADDR es siempre la del proxy; la IP real es la última de X-Forwarded-For
+        atacante = solicitud('10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.5, 198.51.100.20')
+        self.assertEqual(ip_cliente(atacante), '198.51.100.20')
+        self.fallar(2, 'x', atacante)
+        # Lo que el cliente antepone a la cabecera no cambia su contador
+        falsificada = solicitud('10.0.0.1', HTTP_X_FORWARDED_FOR='203.0.113.99, 198.51.100.20')
+        self.assertTrue(bloqueado(falsificada, 'y'))
+        self.assertFalse(bloqueado(solicitud('10.0.0.1', HTTP_X_FORWARDED_FOR='198.51.100.21'), 'y'))
+
+
+@sin_manifiesto
+@override_settings(REGISTROS_LOGIN_FALLOS_USUARIO=2)
+class LoginViewTests(TestCase):
+
+    def setUp(self):
+        obtener_cache().clear()
+        User.objects.create_user('ana', password='clave-larga-123')
+        self.url = reverse('login')
+
+    def entrar(self, contrasena):
+        return self.client.post(self.url, {'username': 'ana', 'password': contrasena})
+
+    def test_bloqueado_no_verifica_la_contrasena(self):
+        with mock.patch('django.contrib.auth.forms.authenticate', wraps=authenticate) as verificar:
+            self.assertEqual(self.entrar('mal').status_code, 200)
+            self.entrar('mal')
+            self.assertEqual(verificar.call_count, 2)
+            # Ni siquiera la contraseña correcta pasa mientras dura el bloqueo
+            respuesta = self.entrar('clave-larga-123')
+        self.assertEqual(respuesta.status_code, 429)
+        self.assertEqual(verificar.call_count, 2)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_exito_reinicia_el_contador(self):
+        self.entrar('mal')
+        self.assertEqual(self.entrar('clave-larga-123').status_code, 302)
+        self.client.logout()
+        self.entrar('mal')
+        self.assertEqual(self.entrar('clave-larga-123').status_code, 302)
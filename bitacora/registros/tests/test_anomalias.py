@@ -0,0 +1,159 @@
+import io
+from decimal import Decimal
+
+import numpy as np
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+
+from ..anomalias import DESVIACION_MINIMA, evaluar_medicion, puntuaciones_z
+from ..cache import espacio_estudiante, obtener_cache, versiones
+from ..forms import MedicionPlantasForm
+from ..models import MedicionPlantas, ResumenEstudiante
+from .utilidades import crear_estudiante
+
+# Recta 2 + 1.5·día con un ruido de ±1 cm, por encima de DESVIACION_MINIMA
+DIAS = [1, 2, 3, 4, 5, 6, 7, 8]
+ALTURAS = [3.4, 5.1, 6.2, 8.3, 8.9, 11.4, 12.2, 14.3]
+
+
+def resumen_de(dias, alturas):
+    x = np.asarray(dias, dtype=float)
+    y = np.asarray(alturas, dtype=float)
+    return ResumenEstudiante(
+        n=len(x), suma_x=x.sum(), suma_y=y.sum(), suma_xx=(x * x).sum(), suma_xy=(x * y).sum(),
+        suma_yy=(y * y).sum(),
+    )
+
+
+class EvaluarMedicionTests(SimpleTestCase):
+
+    def test_medicion_nueva_contra_la_recta(self):
+        a1, a0 = np.polyfit(DIAS, ALTURAS, 1)
+        residuos = np.asarray(ALTURAS) - (a0 + a1 * np.asarray(DIAS))
+        s = max(np.sqrt((residuos ** 2).sum() / (len(DIAS) - 2)), DESVIACION_MINIMA)
+        dias = np.asarray(DIAS, dtype=float)
+        x = 9
+        error = s * np.sqrt(1 + 1 / len(dias) + (x - dias.mean()) ** 2 / ((dias - dias.mean()) ** 2).sum())
+
+        normal = evaluar_medicion(resumen_de(DIAS, ALTURAS), x, 15.5)
+        self.assertAlmostEqual(normal['altura_esperada'], round(a0 + a1 * x, 2))
+        self.assertAlmostEqual(normal['z'], round((15.5 - (a0 + a1 * x)) / error, 2))
+        self.assertFalse(normal['es_atipica'])
+        # El error típico: 155 en lugar de 15.5
+        self.assertTrue(evaluar_medicion(resumen_de(DIAS, ALTURAS), x, 155)['es_atipica'])
+
+    def test_edicion_no_cuenta_el_valor_anterior(self):
+        # La medición del día 4 se guardó como 83 y se corrige a 8.3
+        con_error = resumen_de(DIAS, ALTURAS[:3] + [83] + ALTURAS[4:])
+        sin_el_punto = resumen_de(DIAS[:3] + DIAS[4:], ALTURAS[:3] + ALTURAS[4:])
+        edicion = evaluar_medicion(con_error, 4, 8.3, anterior=(4, 83))
+        self.assertEqual(edicion, evaluar_medicion(sin_el_punto, 4, 8.3))
+        self.assertFalse(edicion['es_atipica'])
+
+    def test_sin_mediciones_suficientes(self):
+        self.assertIsNone(evaluar_medicion(None, 1, 2.0))
+        self.assertIsNone(evaluar_medicion(resumen_de(DIAS[:3], ALTURAS[:3]), 4, 100))
+        # Una edición deja una medición menos con la que comparar
+        self.assertIsNone(evaluar_medicion(resumen_de(DIAS[:4], ALTURAS[:4]), 4, 8.3, anterior=(4, 8.3)))
+
+
+class PuntuacionesZTests(SimpleTestCase):
+
+    def z_sin_el_punto(self, dias, alturas, i):
+        """Residuo studentizado externamente, ajustando la recta sin el punto ``i``."""
+        x = np.asarray(dias, dtype=float)
+        y = np.asarray(alturas, dtype=float)
+        otros = np.arange(len(x)) != i
+        a1, a0 = np.polyfit(x[otros], y[otros], 1)
+        s = np.sqrt(((y[otros] - (a0 + a1 * x[otros])) ** 2).sum() / (len(x) - 3))
+        b1, b0 = np.polyfit(x, y, 1)
+        palanca = 1 / len(x) + (x[i] - x.mean()) ** 2 / ((x - x.mean()) ** 2).sum()
+        return (y[i] - (b0 + b1 * x[i])) / (max(s, DESVIACION_MINIMA) * np.sqrt(1 - palanca))
+
+    def test_coincide_con_el_calculo_sin_el_punto(self):
+        alturas = ALTURAS[:5] + [89.0] + ALTURAS[6:]
+        # Dos estudiantes intercalados: el cálculo se separa por estudiante
+        estudiantes = [1] * len(DIAS) + [2] * 3
+        dias = DIAS + [1, 2, 3]
+        valores = alturas + [2.0, 3.0, 90.0]
+        orden = np.random.default_rng(0).permutation(len(dias))
+
+        z = puntuaciones_z(np.take(estudiantes, orden), np.take(dias, orden), np.take(valores, orden))
+        for posicion, i in enumerate(orden):
+            if estudiantes[i] == 1:
+                self.assertAlmostEqual(z[posicion], self.z_sin_el_punto(DIAS, alturas, i), places=6)
+            else:
+                # Con tres mediciones no se evalúa
+                self.assertTrue(np.isnan(z[posicion]))
+        self.assertGreater(abs(z[list(orden).index(5)]), 4)
+
+    def test_sin_mediciones(self):
+        self.assertEqual(puntuaciones_z([], [], []).size, 0)
+
+
+class ConfirmarAtipicaTests(TestCase):
+
+    def setUp(self):
+        self.estudiante = crear_estudiante()
+        for dia, altura in zip(DIAS, ALTURAS):
+            MedicionPlantas.objects.create(estudiante=self.estudiante, dia=dia, altura=Decimal(str(altura)))
+
+    def formulario(self, instancia=None, **datos):
+        return MedicionPlantasForm(data={'estudiante': self.estudiante.pk, **datos}, instance=instancia)
+
+    def test_atipica_pide_confirmacion(self):
+        form = self.formulario(dia=9, altura='155')
+        self.assertFalse(form.is_valid())
+        self.assertTrue(form.requiere_confirmacion)
+        self.assertIn('altura', form.errors)
+
+        form = self.formulario(dia=9, altura='155', confirmar_atipica='on')
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertTrue(form.save().atipica)
+
+    def test_normal_no_pide_confirmacion(self):
+        form = self.formulario(dia=9, altura='15.50')
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertFalse(form.save().atipica)
+
+    def test_corregir_una_atipica_quita_la_marca(self):
+        medicion = MedicionPlantas.objects.get(estudiante=self.estudiante, dia=4)
+        medicion.altura = Decimal('83')
+        medicion.atipica = True
+        medicion.save()
+
+        # Sin cambiar la altura no se vuelve a preguntar
+        medicion = MedicionPlantas.objects.get(pk=medicion.pk)
+        self.assertTrue(self.formulario(medicion, dia=4, altura='83').is_valid())
+
+        medicion = MedicionPlantas.objects.get(pk=medicion.pk)
+        form = self.formulario(medicion, dia=4, altura='8.30')
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertFalse(form.save().atipica)
+
+
+class AuditarMedicionesTests(TestCase):
+
+    def setUp(self):
+        obtener_cache().clear()
+        self.estudiante = crear_estudiante()
+        for dia, altura in zip(DIAS, ALTURAS[:5] + [89.0] + ALTURAS[6:]):
+            MedicionPlantas.objects.create(estudiante=self.estudiante, dia=dia, altura=Decimal(str(altura)))
+
+    def test_marcar_solo_agrega_e_invalida_la_cache(self):
+        confirmada = MedicionPlantas.objects.get(estudiante=self.estudiante, dia=2)
+        MedicionPlantas.objects.filter(pk=confirmada.pk).update(atipica=True)
+        espacios = [espacio_estudiante(self.estudiante.pk), 'dashboard']
+        antes = versiones(espacios)
+
+        call_command('auditar_mediciones', '--marcar', stdout=io.StringIO())
+        self.assertEqual(
+            set(MedicionPlantas.objects.filter(atipica=True).values_list('dia', flat=True)), {2, 6},
+        )
+        despues = versiones(espacios)
+        for espacio in espacios:
+            self.assertGreater(despues[espacio], antes[espacio])
+
+        # Sin marcas nuevas no se invalida nada
+        call_command('auditar_mediciones', '--marcar', stdout=io.StringIO())
+        self.assertEqual(versiones(espacios), despues)
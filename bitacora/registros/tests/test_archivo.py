@@ -0,0 +1,107 @@
+import tempfile
+import zipfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+
+from .. import archivo as modulo_archivo
+from ..archivo import ARCHIVO_FOTOS, archivar_y_purgar_grupo, filas_estudiantes, serie_estudiante
+from ..models import ArchivoGrupo, Estudiante, MedicionPlantas, RegistroFotografico, ResumenEstudiante
+from .utilidades import crear_estudiante
+
+
+class ArchivarGrupoTests(TestCase):
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.raiz = Path(temporal.name)
+        ajustes = override_settings(REGISTROS_DIRECTORIO_ARCHIVO=self.raiz / 'archivo', MEDIA_ROOT=self.raiz / 'media')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        modulo_archivo._cargar.cache_clear()
+        self.addCleanup(modulo_archivo._cargar.cache_clear)
+
+        self.usuario = User.objects.create_user('ana', password='clave-larga-123')
+        self.ana = crear_estudiante('Ana Torres', grupo=3, usuario=self.usuario)
+        self.luis = crear_estudiante('Luis Gómez', grupo=3)
+        self.otro = crear_estudiante('Eva Ríos', grupo=4)
+        self.filas = {self.ana.pk: [(1, 2.0), (2, 3.25), (4, 6.5)], self.luis.pk: [(1, 1.75), (3, 4.0)]}
+        with self.captureOnCommitCallbacks(execute=True):
+            for estudiante in (self.ana, self.luis):
+                for dia, altura in self.filas[estudiante.pk]:
+                    MedicionPlantas.objects.create(estudiante=estudiante, dia=dia, altura=Decimal(str(altura)))
+            MedicionPlantas.objects.create(estudiante=self.otro, dia=1, altura=Decimal('9.00'))
+            self.foto = self.crear_foto(self.ana, 'ana.jpg')
+        self.resumenes = {
+            pk: ResumenEstudiante.objects.get(estudiante_id=pk) for pk in (self.ana.pk, self.luis.pk)
+        }
+
+    def crear_foto(self, estudiante, nombre):
+        imagen = default_storage.save(f'registro_fotografico/{nombre}', ContentFile(b'jpeg de prueba'))
+        return RegistroFotografico.objects.create(estudiante=estudiante, imagen=imagen)
+
+    def archivar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return archivar_y_purgar_grupo(3, semestre='2026-1', formato=ArchivoGrupo.NPZ)
+
+    def test_ida_y_vuelta_por_npz(self):
+        archivo, resultado = self.archivar()
+
+        self.assertEqual((archivo.num_estudiantes, archivo.num_mediciones, archivo.num_fotos), (2, 5, 1))
+        self.assertEqual(resultado['mediciones'], 5)
+        self.assertEqual(resultado['usuarios_desactivados'], 1)
+        for estudiante in (self.ana, self.luis):
+            dias, alturas, fila = serie_estudiante(archivo, estudiante.pk)
+            self.assertEqual(dias.tolist(), [dia for dia, _ in self.filas[estudiante.pk]])
+            np.testing.assert_allclose(alturas, [altura for _, altura in self.filas[estudiante.pk]])
+            resumen = self.resumenes[estudiante.pk]
+            for campo in ('n', 'suma_x', 'suma_y', 'suma_xx', 'suma_xy', 'suma_yy'):
+                self.assertAlmostEqual(fila[campo], getattr(resumen, campo), msg=campo)
+        self.assertIsNone(serie_estudiante(archivo, self.otro.pk))
+        self.assertEqual(
+            [(fila['id'], fila['nombre'], fila['correo']) for fila in filas_estudiantes(archivo)],
+            [(e.pk, e.nombre, e.correo_institucional) for e in (self.ana, self.luis)],
+        )
+
+        # Las tablas activas solo conservan al otro grupo; la cuenta queda desactivada
+        self.assertEqual(list(Estudiante.objects.values_list('pk', flat=True)), [self.otro.pk])
+        self.assertFalse(MedicionPlantas.objects.filter(estudiante_id__in=self.filas).exists())
+        self.assertFalse(RegistroFotografico.objects.exists())
+        self.usuario.refresh_from_db()
+        self.assertFalse(self.usuario.is_active)
+        with zipfile.ZipFile(self.raiz / 'archivo' / archivo.ruta / ARCHIVO_FOTOS) as fotos:
+            self.assertEqual(fotos.namelist(), [f'{self.ana.pk}/ana.jpg'])
+
+    def test_agrega_las_fotos_subidas_durante_la_copia(self):
+        escribir = modulo_archivo._escribir_fotos
+
+        def escribir_y_subir_otra(directorio, fotos, agregar=False):
+            num_fotos = escribir(directorio, fotos, agregar)
+            if not agregar:
+                # Llega una foto entre la copia y el bloqueo del grupo
+                self.crear_foto(self.luis, 'luis.jpg')
+            return num_fotos
+
+        with mock.patch.object(modulo_archivo, '_escribir_fotos', side_effect=escribir_y_subir_otra) as copia:
+            archivo, _ = self.archivar()
+        self.assertEqual(copia.call_count, 2)
+        self.assertEqual(archivo.num_fotos, 2)
+        with zipfile.ZipFile(self.raiz / 'archivo' / archivo.ruta / ARCHIVO_FOTOS) as fotos:
+            self.assertEqual(sorted(fotos.namelist()), sorted([f'{self.ana.pk}/ana.jpg', f'{self.luis.pk}/luis.jpg']))
+
+    def test_sin_confirmar_no_deja_archivo(self):
+        with mock.patch.object(modulo_archivo, 'eliminar_estudiantes', side_effect=RuntimeError('falla')):
+            with self.assertRaises(RuntimeError):
+                self.archivar()
+        self.assertEqual(list((self.raiz / 'archivo').iterdir()), [])
+        self.assertFalse(ArchivoGrupo.objects.exists())
+        self.assertEqual(MedicionPlantas.objects.filter(estudiante_id__in=self.filas).count(), 5)
+        self.usuario.refresh_from_db()
+        self.assertTrue(self.usuario.is_active)
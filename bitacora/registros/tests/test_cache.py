@@ -0,0 +1,85 @@
+import os
+from decimal import Decimal
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from bitacora.configuracion import cache_desde_entorno
+
+from ..cache import (
+    espacio_estudiante, invalidar, obtener_cache, obtener_o_calcular, siguiente_version, version, versiones,
+)
+from ..models import MedicionPlantas
+from .utilidades import crear_estudiante
+
+
+class ConfiguracionCacheTests(SimpleTestCase):
+
+    def test_fakeredis_usa_el_backend_simulado(self):
+        with mock.patch.dict(os.environ, {'BITACORA_CACHE': 'fakeredis'}):
+            caches = cache_desde_entorno(None)
+        self.assertEqual(caches['default']['BACKEND'], 'registros.cache_backends.FakeRedisCache')
+
+    def test_backend_desconocido(self):
+        from django.core.exceptions import ImproperlyConfigured
+
+        with mock.patch.dict(os.environ, {'BITACORA_CACHE': 'memcached'}):
+            with self.assertRaises(ImproperlyConfigured):
+                cache_desde_entorno(None)
+
+
+class EspaciosVersionadosTests(SimpleTestCase):
+
+    def setUp(self):
+        obtener_cache().clear()
+
+    def test_invalidar_incrementa_la_version(self):
+        inicial = version('pruebas')
+        invalidar('pruebas')
+        self.assertEqual(version('pruebas'), inicial + 1)
+        self.assertEqual(siguiente_version('pruebas'), inicial + 2)
+
+    def test_versiones_inicializa_los_espacios_que_faltan(self):
+        resultado = versiones(['uno', 'dos'])
+        self.assertEqual(set(resultado), {'uno', 'dos'})
+        self.assertEqual(resultado['uno'], version('uno'))
+
+    def test_obtener_o_calcular_recalcula_tras_invalidar(self):
+        llamadas = []
+
+        def calcular():
+            llamadas.append(1)
+            return len(llamadas)
+
+        self.assertEqual(obtener_o_calcular('pruebas', 'valor', calcular), 1)
+        self.assertEqual(obtener_o_calcular('pruebas', 'valor', calcular), 1)
+        invalidar('pruebas')
+        self.assertEqual(obtener_o_calcular('pruebas', 'valor', calcular), 2)
+
+    def test_invalidar_un_espacio_no_afecta_a_otro(self):
+        obtener_o_calcular('otro', 'valor', lambda: 'original')
+        invalidar('pruebas')
+        self.assertEqual(obtener_o_calcular('otro', 'valor', lambda: 'nuevo'), 'original')
+
+
+class InvalidacionPorSenalesTests(TestCase):
+
+    def setUp(self):
+        obtener_cache().clear()
+        self.estudiante = crear_estudiante()
+
+    def test_medicion_invalida_al_confirmar(self):
+        espacio = espacio_estudiante(self.estudiante.pk)
+        antes = versiones([espacio, 'dashboard'])
+        with self.captureOnCommitCallbacks(execute=True):
+            MedicionPlantas.objects.create(estudiante=self.estudiante, dia=1, altura=Decimal('3.5'))
+        despues = versiones([espacio, 'dashboard'])
+        self.assertGreater(despues[espacio], antes[espacio])
+        self.assertGreater(despues['dashboard'], antes['dashboard'])
+
+    def test_sin_confirmar_no_invalida(self):
+        espacio = espacio_estudiante(self.estudiante.pk)
+        antes = version(espacio)
+        with self.captureOnCommitCallbacks(execute=False):
+            MedicionPlantas.objects.create(estudiante=self.estudiante, dia=1, altura=Decimal('3.5'))
+        self.assertEqual(version(espacio), antes)
@@ -0,0 +1,107 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib import messages
+from django.contrib.auth.models import User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.http import HttpResponse, HttpResponseRedirect
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from ..cache import espacio_estudiante, invalidar, obtener_cache
+from ..condicional import condicional
+from ..models import MedicionPlantas
+from .utilidades import crear_estudiante, sin_manifiesto
+
+
+class CondicionalTests(TestCase):
+
+    def setUp(self):
+        obtener_cache().clear()
+        self.usuario = User.objects.create_user('profe', first_name='Ana')
+        self.vista = mock.Mock(side_effect=lambda request: HttpResponse('página'))
+        self.vista.__name__ = 'vista'
+
+    def pedir(self, etag=None, vista=None, **extra):
+        request = RequestFactory().get('/pagina/', **({'HTTP_IF_NONE_MATCH': etag} if etag else {}))
+        request.user = self.usuario
+        for nombre, valor in extra.items():
+            setattr(request, nombre, valor)
+        return condicional(['pruebas'])(vista or self.vista)(request)
+
+    def test_revalidar_no_ejecuta_la_vista(self):
+        primera = self.pedir()
+        self.assertEqual(primera.status_code, 200)
+        self.assertIn('private', primera['Cache-Control'])
+        etag = primera['ETag']
+
+        segunda = self.pedir(etag)
+        self.assertEqual(segunda.status_code, 304)
+        self.assertEqual(segunda['ETag'], etag)
+        self.assertEqual(self.vista.call_count, 1)
+
+    def test_escritura_en_el_espacio_cambia_la_etag(self):
+        etag = self.pedir()['ETag']
+        invalidar('otro_espacio')
+        self.assertEqual(self.pedir(etag).status_code, 304)
+
+        invalidar('pruebas')
+        respuesta = self.pedir(etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta['ETag'], etag)
+        self.assertEqual(self.vista.call_count, 2)
+
+    def test_mensajes_pendientes_no_validan(self):
+        etag = self.pedir()['ETag']
+        request = RequestFactory().get('/pagina/')
+        pendientes = CookieStorage(request)
+        pendientes.add(messages.SUCCESS, 'Medición guardada')
+
+        respuesta = self.pedir(etag, _messages=pendientes)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse(respuesta.has_header('ETag'))
+        self.assertEqual(self.vista.call_count, 2)
+
+    def test_respuestas_que_no_son_200_no_llevan_etag(self):
+        redireccion = mock.Mock(side_effect=lambda request: HttpResponseRedirect('/login/'))
+        redireccion.__name__ = 'redireccion'
+        respuesta = self.pedir(vista=redireccion)
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertFalse(respuesta.has_header('ETag'))
+
+
+@sin_manifiesto
+class ListadoCondicionalTests(TestCase):
+    """El listado de un estudiante depende solo del espacio de su estudiante."""
+
+    def setUp(self):
+        obtener_cache().clear()
+        usuario = User.objects.create_user('ana', password='clave-larga-123')
+        self.ana = crear_estudiante('Ana Torres', usuario=usuario)
+        self.luis = crear_estudiante('Luis Gómez')
+        self.client.force_login(usuario)
+
+    def test_solo_las_escrituras_propias_cambian_la_etag(self):
+        url = reverse('medicion_listar')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MedicionPlantas.objects.create(estudiante=self.luis, dia=1, altura=Decimal('2.00'))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            MedicionPlantas.objects.create(estudiante=self.ana, dia=1, altura=Decimal('2.50'))
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertContains(respuesta, '2,50')
+        self.assertNotEqual(respuesta['ETag'], etag)
+
+    def test_espacio_del_estudiante(self):
+        # El listado del estudiante se invalida con su espacio, no con el del dashboard
+        url = reverse('medicion_listar')
+        etag = self.client.get(url)['ETag']
+        invalidar('dashboard', 'fotos')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        invalidar(espacio_estudiante(self.ana.pk))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
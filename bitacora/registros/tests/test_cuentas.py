@@ -0,0 +1,95 @@
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from ..cuentas import asociar_por_correo, crear_usuarios_para_estudiantes
+from ..models import Estudiante
+from .utilidades import crear_estudiante
+
+
+class CrearUsuariosTests(TestCase):
+
+    def usuario_de(self, estudiante):
+        estudiante.refresh_from_db()
+        return estudiante.usuario
+
+    def test_colisiones_como_las_compara_la_base_de_datos(self):
+        User.objects.create_user('maria_lopez')
+        maria = crear_estudiante('María López')
+        luis = crear_estudiante('Luis Gómez')
+        otro_luis = crear_estudiante('Luis Gómez')
+
+        resultado = crear_usuarios_para_estudiantes(password='clave-comun-123', procesos=1)
+        self.assertEqual(resultado['errores'], [])
+        # 'maría_lópez' chocaría con 'maria_lopez' en un índice sin acentos ni mayúsculas
+        self.assertEqual(self.usuario_de(maria).username, 'maría_lópez1')
+        self.assertEqual(
+            [self.usuario_de(luis).username, self.usuario_de(otro_luis).username], ['luis_gómez', 'luis_gómez1'],
+        )
+        self.assertEqual(
+            [fila[:2] for fila in resultado['creados']],
+            [['maría_lópez1', 'María López'], ['luis_gómez', 'Luis Gómez'], ['luis_gómez1', 'Luis Gómez']],
+        )
+        usuario = self.usuario_de(maria)
+        self.assertEqual(
+            (usuario.first_name, usuario.last_name, usuario.email), ('María', 'López', maria.correo_institucional),
+        )
+        self.assertTrue(usuario.check_password('clave-comun-123'))
+        # Una segunda pasada no encuentra estudiantes sin usuario
+        self.assertEqual(crear_usuarios_para_estudiantes(password='otra'), {'creados': [], 'errores': []})
+
+    def test_hash_se_guarda_tal_cual(self):
+        estudiantes = [crear_estudiante(nombre) for nombre in ('Ana Torres', 'Eva Ríos')]
+        cifrada = make_password('desde-la-tarea')
+        resultado = crear_usuarios_para_estudiantes(password_hash=cifrada)
+        for estudiante in estudiantes:
+            self.assertEqual(self.usuario_de(estudiante).password, cifrada)
+        # La contraseña en claro nunca pasa por la función
+        self.assertEqual([fila[2] for fila in resultado['creados']], [None, None])
+
+    def test_contrasenas_aleatorias(self):
+        estudiantes = [crear_estudiante(f'Estudiante {i}') for i in range(3)]
+        resultado = crear_usuarios_para_estudiantes(aleatorias=True, procesos=1)
+        contrasenas = [fila[2] for fila in resultado['creados']]
+        self.assertEqual(len(set(contrasenas)), 3)
+        for estudiante, contrasena in zip(estudiantes, contrasenas):
+            usuario = self.usuario_de(estudiante)
+            self.assertTrue(check_password(contrasena, usuario.password))
+            self.assertNotEqual(usuario.password, contrasena)
+
+    def test_nombre_vacio(self):
+        vacio = crear_estudiante('')
+        resultado = crear_usuarios_para_estudiantes(password='clave-comun-123', procesos=1)
+        self.assertEqual(resultado, {'creados': [], 'errores': [['', 'El nombre está vacío']]})
+        self.assertIsNone(self.usuario_de(vacio))
+
+
+class AsociarPorCorreoTests(TestCase):
+
+    def test_asocia_solo_los_correos_sin_ambiguedad(self):
+        ana = crear_estudiante('Ana Torres')
+        libre = User.objects.create_user('ana.t', email=ana.correo_institucional)
+
+        # Dos usuarios libres con el mismo correo
+        eva = crear_estudiante('Eva Ríos')
+        for username in ('eva1', 'eva2'):
+            User.objects.create_user(username, email=eva.correo_institucional)
+
+        # El único usuario con el correo ya es de otro estudiante
+        ocupado = User.objects.create_user('luis', email='luis@ejemplo.edu.co')
+        crear_estudiante('Luis Gómez', usuario=ocupado)
+        luis_sin_cuenta = Estudiante.objects.create(
+            nombre='Luis G.', grupo=1, correo_institucional='luis@ejemplo.edu.co',
+        )
+
+        resultado = asociar_por_correo()
+        self.assertEqual(resultado['asociados'], [['Ana Torres', 'ana.t']])
+        self.assertEqual(resultado['ambiguos'], [['Eva Ríos', eva.correo_institucional]])
+        self.assertEqual(resultado['no_encontrados'], [['Luis G.', 'luis@ejemplo.edu.co']])
+
+        ana.refresh_from_db()
+        eva.refresh_from_db()
+        luis_sin_cuenta.refresh_from_db()
+        self.assertEqual(ana.usuario, libre)
+        self.assertIsNone(eva.usuario)
+        self.assertIsNone(luis_sin_cuenta.usuario)
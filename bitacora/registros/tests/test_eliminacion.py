@@ -0,0 +1,90 @@
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.test import TestCase
+
+from ..eliminacion import eliminar_estudiantes, eliminar_mediciones
+from ..models import MedicionPlantas, RegistroFotografico, ResumenEstudiante, ResumenGrupo, Tarea
+from .utilidades import crear_estudiante
+
+
+class EliminacionTests(TestCase):
+
+    def setUp(self):
+        self.ana = crear_estudiante('Ana Torres', grupo=1)
+        self.luis = crear_estudiante('Luis Gómez', grupo=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            for estudiante, filas in ((self.ana, ((1, '2.00'), (2, '3.50'), (3, '4.10'))),
+                                      (self.luis, ((1, '2.60'), (2, '4.00')))):
+                for dia, altura in filas:
+                    medicion = MedicionPlantas.objects.create(estudiante=estudiante, dia=dia, altura=Decimal(altura))
+                    RegistroFotografico.objects.create(
+                        medicion=medicion, estudiante=estudiante,
+                        imagen=f'registro_fotografico/{estudiante.pk}-{dia}.jpg',
+                        miniatura=f'registro_fotografico/miniaturas/{estudiante.pk}-{dia}.jpg',
+                    )
+        # Sin las tareas que encolaron las altas
+        Tarea.objects.all().delete()
+
+    def archivos_encolados(self):
+        tareas = Tarea.objects.filter(nombre='eliminar_archivos')
+        return [nombre for argumentos in tareas.values_list('argumentos', flat=True) for nombre in argumentos['nombres']]
+
+    def assertResumenesCoinciden(self):
+        for estudiante in (self.ana, self.luis):
+            mediciones = MedicionPlantas.objects.filter(estudiante=estudiante)
+            resumen = ResumenEstudiante.objects.filter(estudiante=estudiante).first()
+            if resumen is None:
+                self.assertFalse(mediciones.exists())
+                continue
+            self.assertEqual(resumen.n, mediciones.count())
+            self.assertEqual(resumen.fotos_count, RegistroFotografico.objects.filter(estudiante=estudiante).count())
+            self.assertAlmostEqual(resumen.suma_y, sum(float(m.altura) for m in mediciones))
+
+        esperadas = {}
+        for grupo, dia, altura in MedicionPlantas.objects.values_list('estudiante__grupo', 'dia', 'altura'):
+            esperadas.setdefault((grupo, dia), []).append(float(altura))
+        celdas = {(fila.grupo, fila.dia): fila for fila in ResumenGrupo.objects.all()}
+        self.assertEqual(set(celdas), set(esperadas))
+        for celda, valores in esperadas.items():
+            self.assertEqual(celdas[celda].num_mediciones, len(valores), celda)
+            self.assertAlmostEqual(celdas[celda].media, np.mean(valores), msg=celda)
+
+    def test_eliminar_estudiante_no_deja_huerfanos(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = eliminar_estudiantes([self.ana.pk])
+
+        self.assertEqual(resultado, {'registros_fotograficos': 3, 'mediciones': 3, 'estudiantes': 1, 'archivos': 6})
+        self.assertFalse(MedicionPlantas.objects.filter(estudiante_id=self.ana.pk).exists())
+        self.assertFalse(RegistroFotografico.objects.filter(estudiante_id=self.ana.pk).exists())
+        self.assertFalse(ResumenEstudiante.objects.filter(estudiante_id=self.ana.pk).exists())
+        self.assertEqual(sorted(self.archivos_encolados()), sorted(
+            nombre for dia in (1, 2, 3) for nombre in (
+                f'registro_fotografico/{self.ana.pk}-{dia}.jpg',
+                f'registro_fotografico/miniaturas/{self.ana.pk}-{dia}.jpg',
+            )
+        ))
+        # El grupo queda solo con las mediciones de Luis
+        self.assertResumenesCoinciden()
+
+    def test_eliminar_mediciones_reconstruye_los_resumenes(self):
+        mediciones = MedicionPlantas.objects.filter(estudiante=self.ana, dia__in=[2, 3])
+        with self.captureOnCommitCallbacks(execute=True):
+            resultado = eliminar_mediciones(mediciones.values_list('pk', flat=True))
+
+        self.assertEqual(resultado, {'registros_fotograficos': 2, 'mediciones': 2, 'archivos': 4})
+        self.assertEqual(len(self.archivos_encolados()), 4)
+        self.assertEqual(ResumenEstudiante.objects.get(estudiante=self.ana).ultimo_dia, 1)
+        self.assertResumenesCoinciden()
+
+    def test_sin_confirmar_no_encola_nada(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                eliminar_estudiantes([self.ana.pk])
+                raise RuntimeError('se revierte')
+
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Tarea.objects.exists())
+        self.assertEqual(MedicionPlantas.objects.filter(estudiante=self.ana).count(), 3)
+        self.assertEqual(RegistroFotografico.objects.filter(estudiante=self.ana).count(), 3)
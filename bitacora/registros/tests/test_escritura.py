@@ -0,0 +1,96 @@
+import uuid
+from decimal import Decimal
+from types import SimpleNamespace
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..cache import obtener_cache
+from ..escritura import _sql_upsert
+from ..models import MedicionPlantas
+from .utilidades import crear_estudiante, sin_manifiesto
+
+
+@sin_manifiesto
+class EscrituraIdempotenteTests(TestCase):
+
+    def setUp(self):
+        obtener_cache().clear()
+        self.admin = User.objects.create_user('profesora', password='clave-segura-1', is_staff=True)
+        self.estudiante = crear_estudiante()
+        self.client.force_login(self.admin)
+
+    def datos(self, **extra):
+        return {
+            'estudiante': self.estudiante.pk, 'dia': 1, 'altura': '3.50', 'confirmar_atipica': 'on',
+            'clave_idempotencia': str(uuid.uuid4()), **extra,
+        }
+
+    def mensajes(self, response):
+        return [str(mensaje) for mensaje in response.context['messages']]
+
+    def test_reenviar_el_registro_no_duplica(self):
+        datos = self.datos()
+        primera = self.client.post(reverse('medicion_crear'), datos)
+        segunda = self.client.post(reverse('medicion_crear'), datos, follow=True)
+        self.assertEqual(primera.status_code, 302)
+        self.assertEqual(MedicionPlantas.objects.filter(estudiante=self.estudiante).count(), 1)
+        self.assertIn('Esta medición ya se había registrado.', self.mensajes(segunda))
+
+    def test_editar_con_la_version_actual(self):
+        medicion = MedicionPlantas.objects.create(estudiante=self.estudiante, dia=1, altura=Decimal('3.50'))
+        datos = self.datos(altura='4.00', version=medicion.version)
+        response = self.client.post(reverse('medicion_editar', args=[medicion.pk]), datos)
+        self.assertRedirects(response, reverse('medicion_listar'), fetch_redirect_response=False)
+        medicion.refresh_from_db()
+        self.assertEqual(medicion.altura, Decimal('4.00'))
+        self.assertEqual(medicion.version, 2)
+
+        # El mismo envío otra vez no vuelve a escribir
+        self.client.post(reverse('medicion_editar', args=[medicion.pk]), datos)
+        medicion.refresh_from_db()
+        self.assertEqual(medicion.version, 2)
+
+    def test_version_vieja_es_conflicto(self):
+        medicion = MedicionPlantas.objects.create(estudiante=self.estudiante, dia=1, altura=Decimal('3.50'))
+        version_mostrada = medicion.version
+        # Otra persona guarda mientras tanto
+        otra = MedicionPlantas.objects.get(pk=medicion.pk)
+        otra.altura = Decimal('3.75')
+        otra.save()
+
+        response = self.client.post(
+            reverse('medicion_editar', args=[medicion.pk]), self.datos(altura='4.00', version=version_mostrada),
+        )
+        self.assertRedirects(response, reverse('medicion_editar', args=[medicion.pk]), fetch_redirect_response=False)
+        medicion.refresh_from_db()
+        self.assertEqual(medicion.altura, Decimal('3.75'))
+
+    def test_sin_version_es_conflicto(self):
+        medicion = MedicionPlantas.objects.create(estudiante=self.estudiante, dia=1, altura=Decimal('3.50'))
+        response = self.client.post(reverse('medicion_editar', args=[medicion.pk]), self.datos(altura='4.00'))
+        self.assertRedirects(response, reverse('medicion_editar', args=[medicion.pk]), fetch_redirect_response=False)
+        medicion.refresh_from_db()
+        self.assertEqual(medicion.altura, Decimal('3.50'))
+
+
+class SqlUpsertTests(SimpleTestCase):
+
+    def mysql(self, version, mariadb=False):
+        return SimpleNamespace(
+            vendor='mysql', mysql_version=version, mysql_is_mariadb=mariadb,
+            ops=SimpleNamespace(quote_name=lambda nombre: f'`{nombre}`'),
+        )
+
+    def test_mysql_reciente_usa_alias_de_fila(self):
+        sql = _sql_upsert(self.mysql((8, 0, 36)), 2)
+        self.assertIn(') AS nueva ON DUPLICATE KEY UPDATE `altura` = nueva.`altura`, `atipica` = nueva.`atipica`', sql)
+        self.assertNotIn('VALUES(', sql)
+        self.assertEqual(sql.count('(%s, '), 2)
+
+    def test_mariadb_y_mysql_anterior_usan_values(self):
+        for conexion in (self.mysql((8, 0, 18)), self.mysql((10, 11, 6), mariadb=True)):
+            sql = _sql_upsert(conexion, 1)
+            self.assertIn('ON DUPLICATE KEY UPDATE `altura` = VALUES(`altura`)', sql)
+            self.assertNotIn(' AS nueva ', sql)
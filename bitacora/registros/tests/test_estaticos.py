@@ -0,0 +1,74 @@
+import gzip
+import os
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from .. import estaticos
+from ..estaticos import comprimir_archivo, minificar_css, minificar_js
+
+
+# Sin rcssmin/rjsmin aunque estén instalados: se prueba el minificador propio
+@mock.patch.dict(sys.modules, {'rcssmin': None, 'rjsmin': None})
+class MinificarTests(SimpleTestCase):
+
+    def test_css_quita_comentarios_y_espacios(self):
+        css = '/* Encabezado */\n.tarjeta > h2 ,\n.tarjeta p {\n    color: #333 ;\n    margin: 0 auto;\n}\n'
+        self.assertEqual(minificar_css(css), '.tarjeta>h2,.tarjeta p{color: #333;margin: 0 auto}')
+
+    def test_css_conserva_las_cadenas(self):
+        css = (
+            '.aviso::before {\n  content: "  ; }  /* no es comentario */ ";\n}\n'
+            ".fondo { background: url('fotos/mi  planta.png') ; font-family: 'Open Sans' , serif; }\n"
+        )
+        self.assertEqual(minificar_css(css), (
+            '.aviso::before{content: "  ; }  /* no es comentario */ "}'
+            ".fondo{background: url('fotos/mi  planta.png');font-family: 'Open Sans',serif}"
+        ))
+        self.assertEqual(minificar_css(r'a { content: "\"  ;" }'), r'a{content: "\"  ;"}')
+
+    def test_js_respeta_las_plantillas(self):
+        js = 'function f() {\n    // comentario\n    return `\n    <p>  hola  </p>\n    `;\n}\n'
+        self.assertEqual(minificar_js(js), 'function f() {\nreturn `\n    <p>  hola  </p>\n    `;\n}\n')
+
+
+class ComprimirArchivoTests(SimpleTestCase):
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.directorio = Path(temporal.name)
+        # Sin brotli: solo la variante .gz, esté o no instalado
+        sin_brotli = mock.patch.object(estaticos, '_comprimir_brotli', return_value=None)
+        sin_brotli.start()
+        self.addCleanup(sin_brotli.stop)
+
+    def test_escribe_gzip_determinista(self):
+        ruta = self.directorio / 'app.css'
+        datos = b'.fila{margin:0 auto;padding:4px}\n' * 200
+        ruta.write_bytes(datos)
+        self.assertEqual(comprimir_archivo(ruta), ['.gz'])
+        variante = self.directorio / 'app.css.gz'
+        comprimido = variante.read_bytes()
+        self.assertEqual(gzip.decompress(comprimido), datos)
+
+        # Mismo contenido, mismos bytes (mtime=0): el ETag de la variante no cambia entre despliegues
+        os.utime(ruta, (0, 0))
+        comprimir_archivo(ruta)
+        self.assertEqual(variante.read_bytes(), comprimido)
+
+    def test_sin_ahorro_borra_la_variante_vieja(self):
+        ruta = self.directorio / 'corto.js'
+        ruta.write_bytes(b'f()')
+        (self.directorio / 'corto.js.gz').write_bytes(b'vieja')
+        self.assertEqual(comprimir_archivo(ruta), [])
+        self.assertFalse((self.directorio / 'corto.js.gz').exists())
+
+    def test_formatos_ya_comprimidos(self):
+        ruta = self.directorio / 'foto.PNG'
+        ruta.write_bytes(b'\0' * 4096)
+        self.assertEqual(comprimir_archivo(ruta), [])
+        self.assertEqual(list(self.directorio.iterdir()), [ruta])
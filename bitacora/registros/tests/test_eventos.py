@@ -0,0 +1,98 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .. import eventos
+from ..eventos import MAX_PENDIENTES, BusLocal
+from .utilidades import crear_estudiante
+
+
+class BusLocalTests(SimpleTestCase):
+
+    def test_entrega_lo_publicado_desde_otro_hilo(self):
+        bus = BusLocal()
+
+        async def escuchar():
+            async with bus.suscribir() as cola:
+                self.assertTrue(bus.hay_suscriptores())
+                # Las vistas síncronas publican desde su propio hilo
+                hilo = threading.Thread(target=bus.publicar, args=({'tipo': 'medicion', 'dia': 3},))
+                hilo.start()
+                hilo.join()
+                return await asyncio.wait_for(cola.get(), 1)
+
+        self.assertEqual(asyncio.run(escuchar()), {'tipo': 'medicion', 'dia': 3})
+        self.assertFalse(bus.hay_suscriptores())
+
+    def test_cola_llena_pide_recargar(self):
+        bus = BusLocal()
+
+        async def escuchar():
+            async with bus.suscribir() as cola:
+                for dia in range(MAX_PENDIENTES + 1):
+                    bus.publicar({'tipo': 'medicion', 'dia': dia})
+                await asyncio.sleep(0)
+                return [cola.get_nowait() for _ in range(cola.qsize())]
+
+        self.assertEqual(asyncio.run(escuchar()), [{'tipo': 'recargar'}])
+
+
+@override_settings(REGISTROS_BUS_EVENTOS='local')
+class EventosDashboardTests(TestCase):
+
+    def setUp(self):
+        bus = mock.patch.object(eventos, '_bus', BusLocal())
+        self.bus = bus.start()
+        self.addCleanup(bus.stop)
+        self.admin = User.objects.create_user('profe', is_staff=True)
+        self.ana = crear_estudiante('Ana Torres', grupo=1, usuario=User.objects.create_user('ana'))
+        self.luis = crear_estudiante('Luis Gómez', grupo=2)
+        self.eventos = [
+            {'tipo': 'medicion', 'estudiante_id': self.luis.pk, 'grupo': 2, 'dia': 1},
+            {'tipo': 'medicion', 'estudiante_id': self.ana.pk, 'grupo': 1, 'dia': 2},
+        ]
+
+    async def recibidos(self, usuario, parametros=None):
+        """Publica los eventos de prueba y retorna los que llegan por el flujo de ``usuario``."""
+        await self.async_client.aforce_login(usuario)
+        respuesta = await self.async_client.get(
+            reverse('eventos_dashboard'), parametros or {}, headers={'Accept-Encoding': 'gzip'},
+        )
+        self.assertEqual(respuesta['Content-Type'], 'text/event-stream')
+        # Sin comprimir: GZipMiddleware retendría los eventos en su búfer
+        self.assertEqual(respuesta['Content-Encoding'], 'identity')
+        flujo = aiter(respuesta.streaming_content)
+        try:
+            self.assertEqual(await anext(flujo), b'retry: 5000\n\n')
+            for evento in self.eventos:
+                self.bus.publicar(evento)
+            # Marca de fin: los administradores sin filtro la reciben con todo lo anterior
+            self.bus.publicar({'tipo': 'recargar'})
+            llegados = []
+            while True:
+                mensaje = await asyncio.wait_for(anext(flujo), 1)
+                evento = json.loads(mensaje.decode().split('data: ', 1)[1])
+                if evento['tipo'] == 'recargar':
+                    return llegados
+                llegados.append(evento)
+        finally:
+            await flujo.aclose()
+            # streaming_content envuelve al generador de la vista sin cerrarlo; se cierra aquí para
+            # que suelte la suscripción dentro del bucle de la prueba
+            await respuesta._iterator.aclose()
+
+    async def test_administrador_ve_todo_o_un_grupo(self):
+        self.assertEqual(await self.recibidos(self.admin), self.eventos)
+        self.assertEqual(await self.recibidos(self.admin, {'grupo': '2'}), self.eventos[:1])
+
+    async def test_estudiante_solo_ve_lo_suyo(self):
+        self.assertEqual(await self.recibidos(self.ana.usuario), self.eventos[1:])
+
+    def test_wsgi_responde_204(self):
+        self.client.force_login(self.admin)
+        self.assertEqual(self.client.get(reverse('eventos_dashboard')).status_code, 204)
@@ -0,0 +1,92 @@
+from decimal import Decimal
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase
+
+from ..grupos import PERCENTILES, calcular_estadisticas
+from ..models import MedicionPlantas, ResumenGrupo
+from .utilidades import crear_estudiante
+
+
+class CalcularEstadisticasTests(SimpleTestCase):
+
+    def test_coincide_con_numpy_en_cada_celda(self):
+        rng = np.random.default_rng(7)
+        grupos = rng.integers(1, 4, size=300)
+        dias = rng.integers(1, 6, size=300)
+        alturas = rng.uniform(0, 40, size=300).round(2)
+
+        estadisticas = calcular_estadisticas(grupos, dias, alturas)
+        celdas = sorted(set(zip(grupos.tolist(), dias.tolist())))
+        self.assertEqual(list(zip(estadisticas['grupo'].tolist(), estadisticas['dia'].tolist())), celdas)
+        for i, (grupo, dia) in enumerate(celdas):
+            valores = alturas[(grupos == grupo) & (dias == dia)]
+            self.assertEqual(estadisticas['num_mediciones'][i], len(valores))
+            self.assertAlmostEqual(estadisticas['media'][i], valores.mean())
+            # Desviación poblacional (ddof=0)
+            self.assertAlmostEqual(estadisticas['desviacion'][i], np.std(valores))
+            for p in PERCENTILES:
+                self.assertAlmostEqual(estadisticas[f'p{p}'][i], np.percentile(valores, p), msg=f'p{p}')
+
+    def test_celda_de_una_medicion_y_sin_datos(self):
+        estadisticas = calcular_estadisticas([2], [5], [7.5])
+        self.assertEqual(estadisticas['desviacion'].tolist(), [0.0])
+        self.assertEqual(estadisticas['p90'].tolist(), [7.5])
+        self.assertEqual(len(calcular_estadisticas([], [], [])['grupo']), 0)
+
+
+class ResumenGrupoTests(TestCase):
+    """Cada escritura mantiene las celdas (grupo, día) iguales a recalcularlas desde cero."""
+
+    def setUp(self):
+        self.ana = crear_estudiante('Ana Torres', grupo=1)
+        self.luis = crear_estudiante('Luis Gómez', grupo=1)
+        self.eva = crear_estudiante('Eva Ríos', grupo=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            for estudiante, filas in ((self.ana, ((1, '2.00'), (2, '3.50'))), (self.luis, ((1, '2.60'), (2, '4.10'))),
+                                      (self.eva, ((1, '1.90'),))):
+                for dia, altura in filas:
+                    MedicionPlantas.objects.create(estudiante=estudiante, dia=dia, altura=Decimal(altura))
+
+    def escribir(self, funcion):
+        with self.captureOnCommitCallbacks(execute=True):
+            funcion()
+
+    def assertCeldasCoinciden(self):
+        esperadas = {}
+        for grupo, dia, altura in MedicionPlantas.objects.values_list('estudiante__grupo', 'dia', 'altura'):
+            esperadas.setdefault((grupo, dia), []).append(float(altura))
+        celdas = {(fila.grupo, fila.dia): fila for fila in ResumenGrupo.objects.all()}
+        self.assertEqual(set(celdas), set(esperadas))
+        for celda, valores in esperadas.items():
+            fila = celdas[celda]
+            self.assertEqual(fila.num_mediciones, len(valores), celda)
+            self.assertAlmostEqual(fila.media, np.mean(valores), msg=celda)
+            self.assertAlmostEqual(fila.mediana, np.median(valores), msg=celda)
+            self.assertAlmostEqual(fila.desviacion, np.std(valores), msg=celda)
+            self.assertAlmostEqual(fila.percentil_90, np.percentile(valores, 90), msg=celda)
+
+    def test_altas(self):
+        self.assertCeldasCoinciden()
+
+    def test_editar_altura_y_dia(self):
+        medicion = MedicionPlantas.objects.get(estudiante=self.ana, dia=2)
+        medicion.altura = Decimal('3.90')
+        self.escribir(medicion.save)
+        self.assertCeldasCoinciden()
+
+        medicion = MedicionPlantas.objects.get(pk=medicion.pk)
+        medicion.dia = 3
+        self.escribir(medicion.save)
+        self.assertCeldasCoinciden()
+
+    def test_mover_a_otro_grupo(self):
+        medicion = MedicionPlantas.objects.get(estudiante=self.luis, dia=2)
+        medicion.estudiante = self.eva
+        self.escribir(medicion.save)
+        self.assertCeldasCoinciden()
+
+    def test_eliminar_vacia_la_celda(self):
+        self.escribir(MedicionPlantas.objects.get(estudiante=self.eva, dia=1).delete)
+        self.assertCeldasCoinciden()
+        self.assertFalse(ResumenGrupo.objects.filter(grupo=2).exists())
@@ -0,0 +1,207 @@
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .. import instantanea
+from ..cache import version
+from ..instantanea import (
+    ESPACIO, PREFIJO_TEMPORAL, TAREA, _combinar, alturas_cm, obtener_instantanea, publicar_pendientes,
+    reconstruir_completa,
+)
+from ..models import MedicionPlantas, Tarea
+from ..tareas import procesar_pendientes
+from .utilidades import crear_estudiante
+
+
+def columnas(series):
+    """Columnas de la instantánea a partir de {estudiante: (grupo, [(dia, altura), ...])}."""
+    estudiante, dia, altura, grupos, inicios = [], [], [], [], [0]
+    for estudiante_id, (grupo, filas) in sorted(series.items()):
+        for d, a in filas:
+            estudiante.append(estudiante_id)
+            dia.append(d)
+            altura.append(a)
+        grupos.append(grupo)
+        inicios.append(len(dia))
+    return {
+        'estudiante': np.array(estudiante, dtype=np.int64), 'dia': np.array(dia, dtype=np.int32),
+        'altura': np.array(altura, dtype=np.float32), 'ids': np.array(sorted(series), dtype=np.int64),
+        'grupos': np.array(grupos, dtype=np.int32), 'inicios': np.array(inicios, dtype=np.int64),
+    }
+
+
+class CombinarTests(SimpleTestCase):
+
+    def test_reemplaza_quita_y_agrega_series(self):
+        base = columnas({1: (1, [(1, 2.0), (2, 3.0)]), 2: (1, [(1, 4.0)]), 3: (2, [(5, 9.0)])})
+        # El 2 cambió, el 3 se quedó sin mediciones y el 4 es nuevo
+        nuevas = columnas({2: (1, [(1, 4.5), (3, 6.0)]), 4: (2, [(2, 1.0)])})
+        resultado = _combinar(base, [2, 3, 4], nuevas)
+        esperado = columnas({1: (1, [(1, 2.0), (2, 3.0)]), 2: (1, [(1, 4.5), (3, 6.0)]), 4: (2, [(2, 1.0)])})
+        for nombre, valores in esperado.items():
+            np.testing.assert_array_equal(resultado[nombre], valores, err_msg=nombre)
+
+
+class InstantaneaTests(TestCase):
+    """Lo que la instantánea entrega debe coincidir siempre con la base de datos."""
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.directorio = Path(temporal.name) / 'instantanea'
+        # Caché en disco: compartida entre procesos, como en producción
+        ajustes = override_settings(REGISTROS_DIRECTORIO_INSTANTANEA=self.directorio, CACHES={'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(Path(temporal.name) / 'cache'),
+        }})
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        # Un estudiante por bloque (así se ve qué bloques se reescriben) y sin generación abierta
+        for nombre, valor in (('ESTUDIANTES_POR_BLOQUE', 1), ('_actual', None), ('_abiertos', {})):
+            parche = mock.patch.object(instantanea, nombre, valor)
+            parche.start()
+            self.addCleanup(parche.stop)
+
+        self.ana = crear_estudiante('Ana Torres', grupo=1)
+        self.luis = crear_estudiante('Luis Gómez', grupo=1)
+        self.eva = crear_estudiante('Eva Ríos', grupo=2)
+        with self.captureOnCommitCallbacks(execute=True):
+            for estudiante, filas in ((self.ana, ((1, '2.00'), (3, '4.50'))), (self.luis, ((2, '3.10'),)),
+                                      (self.eva, ((1, '1.25'), (4, '6.75')))):
+                for dia, altura in filas:
+                    MedicionPlantas.objects.create(estudiante=estudiante, dia=dia, altura=Decimal(altura))
+        self.publicada = reconstruir_completa()
+        Tarea.objects.all().delete()
+
+    def escribir(self, funcion):
+        with self.captureOnCommitCallbacks(execute=True):
+            funcion()
+
+    def leer_mediciones(self):
+        return mock.patch.object(instantanea, '_leer_mediciones', wraps=instantanea._leer_mediciones)
+
+    def assertCoincide(self, actual):
+        filas = {}
+        for estudiante_id, dia, altura in MedicionPlantas.objects.order_by('estudiante_id', 'dia').values_list(
+                'estudiante_id', 'dia', 'altura'):
+            filas.setdefault(estudiante_id, []).append((dia, float(altura)))
+        self.assertEqual(actual.ids.tolist(), sorted(filas))
+        self.assertEqual(actual.conteos().tolist(), [len(filas[pk]) for pk in sorted(filas)])
+        self.assertEqual(actual.num_mediciones, MedicionPlantas.objects.count())
+        for pk in (self.ana.pk, self.luis.pk, self.eva.pk):
+            dias, alturas = actual.serie(pk)
+            esperado = filas.get(pk, [])
+            self.assertEqual(dias.tolist(), [dia for dia, _ in esperado])
+            np.testing.assert_allclose(alturas_cm(alturas), [altura for _, altura in esperado])
+
+    def crear(self):
+        MedicionPlantas.objects.create(estudiante=self.luis, dia=6, altura=Decimal('5.40'))
+
+    def editar(self):
+        medicion = MedicionPlantas.objects.get(estudiante=self.ana, dia=3)
+        medicion.altura = Decimal('4.80')
+        medicion.save()
+
+    def eliminar(self):
+        MedicionPlantas.objects.get(estudiante=self.eva, dia=1).delete()
+
+    def mover(self):
+        medicion = MedicionPlantas.objects.get(estudiante=self.ana, dia=3)
+        medicion.estudiante = self.eva
+        medicion.save()
+
+    def test_lecturas_al_dia_sin_publicar(self):
+        for cambio in (self.crear, self.editar, self.eliminar, self.mover):
+            self.escribir(cambio)
+            self.assertCoincide(obtener_instantanea())
+        # Las lecturas no publican: la generación en disco sigue siendo la inicial
+        self.assertEqual(instantanea._leer_actual()['version'], self.publicada.version)
+
+    def test_el_worker_publica_la_generacion_nueva(self):
+        self.escribir(self.crear)
+        self.escribir(self.mover)
+        # Una sola tarea pendiente para todas las escrituras
+        self.assertEqual(Tarea.objects.filter(nombre=TAREA, estado=Tarea.PENDIENTE).count(), 1)
+
+        self.assertEqual(procesar_pendientes(nombres=[TAREA]), 1)
+        publicada = obtener_instantanea()
+        self.assertEqual(publicada.version, version(ESPACIO))
+        self.assertEqual(instantanea._leer_actual()['version'], version(ESPACIO))
+        self.assertIsNotNone(publicada.archivos)
+        self.assertCoincide(publicada)
+
+    def test_publicacion_incremental_reescribe_solo_los_bloques_cambiados(self):
+        self.escribir(self.editar)
+        with self.leer_mediciones() as leer:
+            publicar_pendientes()
+        leer.assert_called_once_with([self.ana.pk])
+
+        publicada = obtener_instantanea()
+        self.assertNotEqual(publicada.archivos[self.ana.pk], self.publicada.archivos[self.ana.pk])
+        for estudiante in (self.luis, self.eva):
+            self.assertEqual(publicada.archivos[estudiante.pk], self.publicada.archivos[estudiante.pk])
+        self.assertCoincide(publicada)
+
+    def test_estudiante_sin_mediciones_sale_de_la_instantanea(self):
+        self.escribir(lambda: MedicionPlantas.objects.filter(estudiante=self.luis).get().delete())
+        publicar_pendientes()
+        publicada = obtener_instantanea()
+        self.assertNotIn(self.luis.pk, publicada.archivos)
+        self.assertCoincide(publicada)
+
+    def test_registro_de_cambios_vencido_relee_todo(self):
+        self.escribir(self.editar)
+        instantanea.obtener_cache().delete(instantanea._clave_cambios(version(ESPACIO)))
+        with self.leer_mediciones() as leer:
+            self.assertCoincide(obtener_instantanea())
+            publicar_pendientes()
+        self.assertEqual(leer.call_args_list, [mock.call(), mock.call()])
+        self.assertCoincide(obtener_instantanea())
+
+    def test_demasiadas_versiones_pendientes_relee_todo(self):
+        self.escribir(self.crear)
+        self.escribir(self.eliminar)
+        with mock.patch.object(instantanea, 'MAX_VERSIONES_INCREMENTAL', 1), self.leer_mediciones() as leer:
+            publicar_pendientes()
+        leer.assert_called_once_with()
+        self.assertCoincide(obtener_instantanea())
+
+    def test_reconstruir_completa_incluye_lo_importado_sin_senales(self):
+        MedicionPlantas.objects.bulk_create([
+            MedicionPlantas(estudiante=self.luis, dia=dia, altura=Decimal('3.00') + dia) for dia in (7, 8)
+        ])
+        version_anterior = version(ESPACIO)
+        reconstruida = reconstruir_completa()
+        self.assertGreater(reconstruida.version, version_anterior)
+        self.assertCoincide(reconstruida)
+        self.assertCoincide(obtener_instantanea())
+
+    def test_limpia_generaciones_viejas_y_publicaciones_interrumpidas(self):
+        (self.directorio / f'{PREFIJO_TEMPORAL}abc').mkdir()
+        (self.directorio / f'{PREFIJO_TEMPORAL}def.json').write_text('{}')
+        medicion = MedicionPlantas.objects.get(estudiante=self.ana, dia=3)
+        for altura in ('4.60', '4.70', '4.80', '4.90'):
+            medicion.altura = Decimal(altura)
+            self.escribir(medicion.save)
+            publicar_pendientes()
+
+        nombres = {ruta.name for ruta in self.directorio.iterdir()}
+        self.assertFalse([nombre for nombre in nombres if nombre.startswith(PREFIJO_TEMPORAL)])
+        generaciones = [nombre for nombre in nombres if nombre.startswith('g')]
+        self.assertEqual(len(generaciones), instantanea.GENERACIONES_CONSERVADAS + 1)
+        # Del bloque que cambió en cada publicación solo quedan las versiones en uso
+        bloques_ana = [nombre for nombre in nombres if nombre.startswith(f'b{self.ana.pk}-')]
+        self.assertEqual(len(bloques_ana), instantanea.GENERACIONES_CONSERVADAS + 1)
+        self.assertCoincide(obtener_instantanea())
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    def test_cache_local_lee_de_la_base_de_datos(self):
+        generacion = instantanea._leer_actual()
+        self.escribir(self.crear)
+        self.assertFalse(Tarea.objects.filter(nombre=TAREA).exists())
+        self.assertCoincide(obtener_instantanea())
+        self.assertEqual(instantanea._leer_actual(), generacion)
@@ -0,0 +1,63 @@
+import numpy as np
+from django.test import SimpleTestCase
+
+from ..modelos_crecimiento import (
+    UMBRAL_AICC, ajustar_huber, ajustar_theil_sen, ajuste_seleccionado, seleccionar_modelo,
+)
+
+DIAS = np.arange(1, 15, dtype=float)
+# Ruido fijo de ±0.3 cm (repetible)
+RUIDO = np.random.default_rng(3).normal(0, 0.3, size=len(DIAS))
+
+
+class SeleccionarModeloTests(SimpleTestCase):
+
+    def candidatos(self, seleccion):
+        return {ajuste['modelo'] for ajuste in seleccion['candidatos']}
+
+    def test_datos_lineales_eligen_la_recta(self):
+        seleccion = seleccionar_modelo(DIAS, 1.5 + 0.8 * DIAS + RUIDO)
+        self.assertEqual(seleccion['seleccionado'], 'lineal')
+        ajuste = ajuste_seleccionado(seleccion)
+        self.assertAlmostEqual(ajuste['parametros']['a1'], 0.8, delta=0.1)
+        self.assertGreater(ajuste['r2'], 0.98)
+
+    def test_sigmoide_con_arranque_lento(self):
+        # Germinación lenta, crecimiento rápido y meseta cerca de 20 cm
+        alturas = 20 / (1 + np.exp(-0.9 * (DIAS - 7))) + RUIDO * 0.3
+        seleccion = seleccionar_modelo(DIAS, alturas)
+        self.assertIn(seleccion['seleccionado'], {'logistico', 'gompertz', 'segmentado'})
+        self.assertEqual(seleccion['motivo'], 'Menor AICc que la recta')
+        # La curva gana a la recta por más del umbral
+        aicc = {ajuste['modelo']: ajuste['aicc'] for ajuste in seleccion['candidatos']}
+        self.assertGreater(aicc['lineal'] - aicc[seleccion['seleccionado']], UMBRAL_AICC)
+        self.assertEqual(seleccion['candidatos'][0]['modelo'], seleccion['seleccionado'])
+
+    def test_error_de_digitacion_elige_un_ajuste_robusto(self):
+        alturas = 1.5 + 0.8 * DIAS + RUIDO
+        alturas[6] = 155  # 15.5 sin el punto decimal
+        seleccion = seleccionar_modelo(DIAS, alturas)
+        self.assertEqual(seleccion['motivo'], 'Se detectaron valores atípicos')
+        self.assertIn(seleccion['seleccionado'], {'theil_sen', 'huber'})
+        # La pendiente robusta no se deja arrastrar por el atípico
+        self.assertAlmostEqual(ajuste_seleccionado(seleccion)['parametros']['a1'], 0.8, delta=0.15)
+
+        pocos = seleccionar_modelo(DIAS[:8], alturas[:8])
+        self.assertEqual(pocos['seleccionado'], 'theil_sen')
+
+    def test_con_menos_de_cinco_puntos_solo_la_recta(self):
+        seleccion = seleccionar_modelo([1, 2, 3, 4], [1.0, 1.1, 5.0, 9.0])
+        self.assertEqual(self.candidatos(seleccion), {'lineal'})
+        self.assertEqual(seleccion['seleccionado'], 'lineal')
+        self.assertIsNone(seleccionar_modelo([1], [2.0]))
+
+
+class AjustesRobustosTests(SimpleTestCase):
+
+    def test_theil_sen_y_huber_ignoran_el_atipico(self):
+        alturas = 2 + 0.5 * DIAS
+        alturas[3] = 60
+        for ajustar in (ajustar_theil_sen, ajustar_huber):
+            parametros = ajustar(DIAS, alturas)
+            self.assertAlmostEqual(parametros['a1'], 0.5, delta=0.05, msg=ajustar.__name__)
+            self.assertAlmostEqual(parametros['a0'], 2, delta=0.3, msg=ajustar.__name__)
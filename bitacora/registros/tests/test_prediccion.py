@@ -0,0 +1,109 @@
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from ..models import MedicionPlantas, ResumenEstudiante
+from ..prediccion import MIN_MEDICIONES_PREDICCION, predecir, valor_t
+from .utilidades import crear_estudiante
+
+DIAS = [1, 2, 3, 5, 6, 8, 9, 11]
+ALTURAS = [1.9, 3.2, 3.8, 6.1, 6.6, 9.4, 9.8, 12.5]
+
+
+def resumen_de(dias, alturas):
+    x = np.asarray(dias, dtype=float)
+    y = np.asarray(alturas, dtype=float)
+    return ResumenEstudiante(
+        n=len(x), suma_x=x.sum(), suma_y=y.sum(), suma_xx=(x * x).sum(), suma_xy=(x * y).sum(),
+        suma_yy=(y * y).sum(),
+    )
+
+
+class ValorTTests(SimpleTestCase):
+
+    def test_tabla_y_aproximacion(self):
+        self.assertEqual(valor_t(1), 12.706)
+        self.assertEqual(valor_t(30), 2.042)
+        self.assertEqual(valor_t(30, 0.99), 2.750)
+        # Más allá de la tabla: t(31) = 2.0395 y t(120) = 1.9799 (dos colas, 95 %)
+        self.assertAlmostEqual(valor_t(31), 2.0395, places=3)
+        self.assertLess(valor_t(31), valor_t(30))
+        self.assertAlmostEqual(valor_t(120), 1.9799, places=3)
+        self.assertAlmostEqual(valor_t(31, 0.90), 1.6955, places=3)
+
+
+class PredecirTests(SimpleTestCase):
+
+    def test_coincide_con_minimos_cuadrados_de_numpy(self):
+        x = np.asarray(DIAS, dtype=float)
+        y = np.asarray(ALTURAS)
+        X = np.column_stack([np.ones_like(x), x])
+        beta, sse, _, _ = np.linalg.lstsq(X, y, rcond=None)
+        s2 = sse[0] / (len(x) - 2)
+        covarianza = s2 * np.linalg.inv(X.T @ X)
+        t = valor_t(len(x) - 2)
+
+        nuevos = np.array([4.0, 12.0, 20.0])
+        X0 = np.column_stack([np.ones_like(nuevos), nuevos])
+        altura = X0 @ beta
+        var_media = np.einsum('ij,jk,ik->i', X0, covarianza, X0)
+        margen_media = t * np.sqrt(var_media)
+        margen_prediccion = t * np.sqrt(var_media + s2)
+
+        resultado = predecir(resumen_de(DIAS, ALTURAS), nuevos.tolist())
+        np.testing.assert_allclose(resultado['altura'], altura, atol=1e-4)
+        np.testing.assert_allclose(
+            resultado['ic_media'], np.column_stack([altura - margen_media, altura + margen_media]), atol=1e-4,
+        )
+        np.testing.assert_allclose(
+            resultado['ic_prediccion'], np.column_stack([altura - margen_prediccion, altura + margen_prediccion]),
+            atol=1e-4,
+        )
+        # El intervalo de predicción siempre es más ancho y crece lejos de los datos
+        anchos = np.diff(resultado['ic_prediccion']).ravel()
+        self.assertTrue((anchos > np.diff(resultado['ic_media']).ravel()).all())
+        self.assertGreater(anchos[2], anchos[0])
+
+
+class ApiPrediccionTests(TestCase):
+
+    def setUp(self):
+        self.url = reverse('api_prediccion')
+        self.ana = crear_estudiante('Ana Torres', usuario=User.objects.create_user('ana'))
+        self.luis = crear_estudiante('Luis Gómez')
+        with self.captureOnCommitCallbacks(execute=True):
+            for dia, altura in zip(DIAS, ALTURAS):
+                MedicionPlantas.objects.create(estudiante=self.ana, dia=dia, altura=Decimal(str(altura)))
+            for dia in range(1, MIN_MEDICIONES_PREDICCION):
+                MedicionPlantas.objects.create(estudiante=self.luis, dia=dia, altura=Decimal(dia))
+
+    def test_administrador_con_varios_estudiantes(self):
+        self.client.force_login(User.objects.create_user('profe', is_staff=True))
+        respuesta = self.client.get(self.url, {'estudiante': f'{self.ana.pk},{self.luis.pk}', 'dia': ['12', '14']})
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        prediccion = datos['predicciones'][str(self.ana.pk)]
+        self.assertEqual(prediccion['num_mediciones'], len(DIAS))
+        self.assertEqual(prediccion['dias'], [12, 14])
+        self.assertEqual(prediccion, {**prediccion, **predecir(resumen_de(DIAS, ALTURAS), [12, 14])})
+        self.assertEqual(datos['errores'], {
+            str(self.luis.pk): f'Se necesitan al menos {MIN_MEDICIONES_PREDICCION} mediciones para predecir.',
+        })
+
+    def test_parametros_invalidos(self):
+        self.client.force_login(User.objects.create_user('profe', is_staff=True))
+        for parametros in ({'estudiante': 'x', 'dia': '3'}, {'estudiante': self.ana.pk, 'dia': '3', 'nivel': '0.8'},
+                           {'estudiante': self.ana.pk}, {'dia': '3'}):
+            self.assertEqual(self.client.get(self.url, parametros).status_code, 400, parametros)
+
+    def test_estudiante_solo_consulta_el_suyo(self):
+        self.client.force_login(self.ana.usuario)
+        propia = self.client.get(self.url, {'dia': '12'})
+        self.assertEqual(list(propia.json()['predicciones']), [str(self.ana.pk)])
+        self.assertEqual(self.client.get(self.url, {'estudiante': self.luis.pk, 'dia': '12'}).status_code, 403)
+
+        self.client.force_login(User.objects.create_user('sin_estudiante'))
+        self.assertEqual(self.client.get(self.url, {'dia': '12'}).status_code, 403)
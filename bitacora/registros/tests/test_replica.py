@@ -0,0 +1,100 @@
+import os
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import router
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from bitacora.configuracion import bases_de_datos_desde_entorno
+
+from ..cache import obtener_cache
+from ..middleware import COOKIE_PRIMARIO
+from ..models import MedicionPlantas, ResumenEstudiante, Tarea
+from ..routers import alias_primario, lectura_replica, registrando_escrituras, usando_replica
+from .utilidades import crear_estudiante, sin_manifiesto
+
+
+class ConfiguracionBasesDeDatosTests(SimpleTestCase):
+
+    def test_sqlite_con_replica(self):
+        variables = {'BITACORA_DB_MOTOR': 'sqlite', 'BITACORA_DB_NAME': 'primario.sqlite3',
+                     'BITACORA_DB_REPLICA_NAME': 'replica.sqlite3'}
+        with mock.patch.dict(os.environ, variables):
+            bases = bases_de_datos_desde_entorno(Path('.'))
+        self.assertEqual(bases['default']['NAME'], 'primario.sqlite3')
+        self.assertEqual(bases['replica']['NAME'], 'replica.sqlite3')
+        self.assertEqual(bases['replica']['TEST'], {'MIRROR': 'default'})
+
+    def test_sin_replica(self):
+        variables = {'BITACORA_DB_MOTOR': 'sqlite', 'BITACORA_DB_NAME': 'primario.sqlite3'}
+        with mock.patch.dict(os.environ, variables):
+            os.environ.pop('BITACORA_DB_REPLICA_NAME', None)
+            bases = bases_de_datos_desde_entorno(Path('.'))
+        self.assertEqual(set(bases), {'default'})
+
+
+@mock.patch('registros.routers.replica_disponible', return_value=True)
+class EnrutamientoTests(SimpleTestCase):
+
+    def test_lecturas_de_registros_van_a_la_replica_solo_dentro_del_bloque(self, _):
+        self.assertEqual(MedicionPlantas.objects.all().db, 'default')
+        with usando_replica():
+            self.assertEqual(MedicionPlantas.objects.all().db, 'replica')
+            # Usuarios y sesiones siempre del primario
+            self.assertEqual(User.objects.all().db, 'default')
+
+    def test_primario_fijado_lee_del_primario(self, _):
+        bases = []
+
+        @lectura_replica
+        def vista(request):
+            bases.append(MedicionPlantas.objects.all().db)
+
+        request = RequestFactory().get('/')
+        vista(request)
+        request.primario_fijado = True
+        vista(request)
+        self.assertEqual(bases, ['replica', 'default'])
+
+    def test_escrituras_de_registros_fijan_el_primario(self, _):
+        with registrando_escrituras() as hubo_escritura:
+            self.assertFalse(hubo_escritura())
+            self.assertEqual(router.db_for_write(MedicionPlantas), 'default')
+            self.assertTrue(hubo_escritura())
+
+    def test_mantenimiento_y_alias_primario_no_fijan(self, _):
+        with registrando_escrituras() as hubo_escritura:
+            self.assertEqual(alias_primario(), 'default')
+            router.db_for_write(Tarea)
+            router.db_for_write(ResumenEstudiante)
+            router.db_for_write(User)
+            self.assertFalse(hubo_escritura())
+
+
+# El middleware actúa como si hubiera réplica; las lecturas siguen en la única base de prueba
+@mock.patch('registros.middleware.replica_disponible', return_value=True)
+@mock.patch('registros.routers.replica_disponible', return_value=False)
+@sin_manifiesto
+class FijarPrimarioTests(TestCase):
+
+    def setUp(self):
+        obtener_cache().clear()
+        self.admin = User.objects.create_user('profesora', password='clave-segura-1', is_staff=True)
+        self.estudiante = crear_estudiante()
+        self.client.force_login(self.admin)
+
+    def test_registrar_medicion_fija_el_primario(self, *_):
+        response = self.client.post(reverse('medicion_crear'), {
+            'estudiante': self.estudiante.pk, 'dia': 1, 'altura': '3.50',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(COOKIE_PRIMARIO, response.cookies)
+
+    def test_mantenimiento_desde_una_lectura_no_fija_el_primario(self, *_):
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        # La visita encoló la limpieza periódica, pero eso no es una escritura del usuario
+        self.assertTrue(Tarea.objects.filter(nombre='limpiar_fotos_huerfanas').exists())
+        self.assertNotIn(COOKIE_PRIMARIO, response.cookies)
@@ -0,0 +1,98 @@
+import csv
+import io
+import tempfile
+import zipfile
+from concurrent.futures import Future
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from .. import reportes
+from ..models import MedicionPlantas
+from ..reportes import EN_VUELO_POR_PROCESO, _analizar_todos, escribir_reporte
+from .utilidades import crear_estudiante
+
+
+class PoolSimulado:
+    """Ejecutor que corre cada análisis al enviarlo y cuenta los envíos."""
+    enviados = 0
+
+    def __init__(self, max_workers=None, initializer=None):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        return False
+
+    def submit(self, funcion, *argumentos):
+        PoolSimulado.enviados += 1
+        futuro = Future()
+        futuro.set_result(funcion(*argumentos))
+        return futuro
+
+
+class AnalizarTodosTests(SimpleTestCase):
+
+    def test_ventana_acotada_y_en_orden(self):
+        series = [(f'Estudiante {i}', [1, 2, 3], [1.0, 2.0 + i, 3.0 + 2 * i]) for i in range(12)]
+        PoolSimulado.enviados = 0
+        with mock.patch.object(reportes, 'ProcessPoolExecutor', PoolSimulado), \
+                mock.patch.object(reportes, 'analizar_estudiante', side_effect=lambda nombre, d, a: nombre):
+            entregados = []
+            for nombre in _analizar_todos(series, procesos=2):
+                entregados.append(nombre)
+                # Enviados sin consumir: nunca más de la ventana
+                self.assertLessEqual(PoolSimulado.enviados - len(entregados), EN_VUELO_POR_PROCESO * 2)
+        self.assertEqual(entregados, [nombre for nombre, _, _ in series])
+        self.assertEqual(PoolSimulado.enviados, len(series))
+
+
+class EscribirReporteTests(TestCase):
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.destino = Path(temporal.name) / 'reporte.zip'
+        self.ana = crear_estudiante('Ana Torres', grupo=5)
+        self.jose = crear_estudiante('José Pérez', grupo=5)
+        crear_estudiante('Eva Ríos', grupo=6)
+        for dia, altura in ((1, '2.00'), (2, '3.00'), (3, '4.00')):
+            MedicionPlantas.objects.create(estudiante=self.ana, dia=dia, altura=Decimal(altura))
+        MedicionPlantas.objects.create(estudiante=self.jose, dia=1, altura=Decimal('1.50'))
+
+    def leer_csv(self, archivo, nombre):
+        return list(csv.reader(io.StringIO(archivo.read(nombre).decode())))
+
+    def test_zip_del_grupo(self):
+        self.assertEqual(escribir_reporte(self.destino, 5, procesos=1), 2)
+        # El PDF temporal no queda junto al ZIP
+        self.assertEqual(list(self.destino.parent.iterdir()), [self.destino])
+
+        with zipfile.ZipFile(self.destino) as archivo:
+            self.assertEqual(sorted(archivo.namelist()), sorted([
+                f'mediciones/ana_torres-{self.ana.pk}.csv',
+                f'mediciones/jose_perez-{self.jose.pk}.csv',
+                # José tiene una sola medición: sin recta ni gráfica
+                f'graficas/ana_torres-{self.ana.pk}.png',
+                'reporte.pdf',
+                'resumen.csv',
+            ]))
+            self.assertTrue(archivo.read('reporte.pdf').startswith(b'%PDF'))
+            mediciones = self.leer_csv(archivo, f'mediciones/ana_torres-{self.ana.pk}.csv')
+            resumen = self.leer_csv(archivo, 'resumen.csv')
+
+        self.assertEqual(
+            [fila[:3] for fila in mediciones[1:]], [['1', '2.00', 'no'], ['2', '3.00', 'no'], ['3', '4.00', 'no']],
+        )
+        self.assertEqual(
+            resumen[0][:5], ['Estudiante', 'Correo', 'Mediciones', 'Altura inicial (cm)', 'Altura final (cm)'],
+        )
+        ana, jose = resumen[1:]
+        self.assertEqual(ana[:5], ['Ana Torres', self.ana.correo_institucional, '3', '2.00', '4.00'])
+        # Recta exacta: 1 + 1·día
+        self.assertEqual(ana[5:9], ['1.0000', '1.0000', '1.0000', '1.0000'])
+        self.assertEqual(jose, ['José Pérez', self.jose.correo_institucional, '1', '1.50', '1.50'] + [''] * 6)
@@ -0,0 +1,93 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import MedicionPlantas, ResumenEstudiante
+from ..routers import alias_primario
+from .utilidades import crear_estudiante, sin_manifiesto
+
+
+class ResumenEstudianteTests(TestCase):
+    """Las sumas que se mantienen al escribir deben coincidir con recalcularlas desde las mediciones."""
+
+    def setUp(self):
+        self.ana = crear_estudiante('Ana Torres')
+        self.luis = crear_estudiante('Luis Gómez')
+        for dia, altura in ((1, '2.00'), (3, '4.50'), (5, '7.25')):
+            MedicionPlantas.objects.create(estudiante=self.ana, dia=dia, altura=Decimal(altura))
+
+    def assertResumenCoincide(self, estudiante):
+        resumen = ResumenEstudiante.objects.get(pk=estudiante.pk)
+        filas = list(MedicionPlantas.objects.filter(estudiante=estudiante).order_by('dia').values_list('dia', 'altura'))
+        x = [float(dia) for dia, _ in filas]
+        y = [float(altura) for _, altura in filas]
+        self.assertEqual(resumen.n, len(filas))
+        for campo, esperado in (
+            ('suma_x', sum(x)), ('suma_y', sum(y)), ('suma_xx', sum(v * v for v in x)),
+            ('suma_xy', sum(a * b for a, b in zip(x, y))), ('suma_yy', sum(v * v for v in y)),
+        ):
+            self.assertAlmostEqual(getattr(resumen, campo), esperado, places=6, msg=campo)
+        self.assertEqual(resumen.ultimo_dia, filas[-1][0] if filas else None)
+        if filas:
+            self.assertAlmostEqual(resumen.ultima_altura, y[-1], places=6)
+        else:
+            self.assertIsNone(resumen.ultima_altura)
+
+    def test_altas(self):
+        self.assertResumenCoincide(self.ana)
+        self.assertResumenCoincide(self.luis)
+
+    def test_editar_altura_y_dia(self):
+        medicion = MedicionPlantas.objects.get(estudiante=self.ana, dia=5)
+        medicion.altura = Decimal('6.80')
+        medicion.save()
+        self.assertResumenCoincide(self.ana)
+
+        medicion = MedicionPlantas.objects.get(estudiante=self.ana, dia=5)
+        medicion.dia = 2
+        medicion.save()
+        self.assertResumenCoincide(self.ana)
+
+    def test_mover_a_otro_estudiante(self):
+        medicion = MedicionPlantas.objects.get(estudiante=self.ana, dia=5)
+        medicion.estudiante = self.luis
+        medicion.save()
+        self.assertResumenCoincide(self.ana)
+        self.assertResumenCoincide(self.luis)
+
+    def test_eliminar(self):
+        MedicionPlantas.objects.get(estudiante=self.ana, dia=5).delete()
+        self.assertResumenCoincide(self.ana)
+        MedicionPlantas.objects.get(estudiante=self.ana, dia=1).delete()
+        MedicionPlantas.objects.get(estudiante=self.ana, dia=3).delete()
+        self.assertResumenCoincide(self.ana)
+
+
+@sin_manifiesto
+class InicioEstudianteTests(TestCase):
+
+    def setUp(self):
+        self.usuario = User.objects.create_user('ana_torres', password='clave-segura-1')
+        self.estudiante = crear_estudiante(usuario=self.usuario)
+        MedicionPlantas.objects.create(estudiante=self.estudiante, dia=1, altura=Decimal('2.00'))
+        MedicionPlantas.objects.create(estudiante=self.estudiante, dia=4, altura=Decimal('5.00'))
+        self.client.force_login(self.usuario)
+
+    def test_reconstruye_el_resumen_que_falta(self):
+        ResumenEstudiante.objects.filter(pk=self.estudiante.pk).delete()
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['resumen'].n, 2)
+        self.assertTrue(ResumenEstudiante.objects.filter(pk=self.estudiante.pk).exists())
+
+    def test_lee_el_resumen_reconstruido_del_primario(self):
+        # Una réplica atrasada aún no tiene la fila recién creada: se relee del primario
+        ResumenEstudiante.objects.filter(pk=self.estudiante.pk).delete()
+        with mock.patch('registros.views.alias_primario', wraps=alias_primario) as primario:
+            response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['resumen'].n, 2)
+        primario.assert_called()
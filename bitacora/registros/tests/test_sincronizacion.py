@@ -0,0 +1,76 @@
+import json
+import tempfile
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..cache import obtener_cache
+from ..models import MedicionPlantas, RegistroFotografico, ResumenEstudiante
+from ..views import MAX_REGISTROS_SINCRONIZACION
+from .utilidades import crear_estudiante, imagen_png
+
+
+class SincronizarMedicionesTests(TestCase):
+
+    def setUp(self):
+        obtener_cache().clear()
+        self.usuario = User.objects.create_user('ana_torres', password='clave-segura-1')
+        self.estudiante = crear_estudiante(usuario=self.usuario)
+        self.otro = crear_estudiante('Luis Gómez')
+        self.client.force_login(self.usuario)
+        self.url = reverse('api_sincronizar_mediciones')
+
+    def registro(self, dia, altura, estudiante=None):
+        return {
+            'clave': str(uuid.uuid4()), 'estudiante': (estudiante or self.estudiante).pk,
+            'dia': dia, 'altura': altura, 'comentario': '',
+        }
+
+    def sincronizar(self, registros, **archivos):
+        response = self.client.post(self.url, {'registros': json.dumps(registros), **archivos})
+        self.assertEqual(response.status_code, 200)
+        return {resultado['clave']: resultado for resultado in response.json()['resultados']}
+
+    def test_lote_y_reenvio_idempotente(self):
+        registros = [self.registro(1, '2.00'), self.registro(2, '2.60')]
+        resultados = self.sincronizar(registros)
+        self.assertEqual({r['estado'] for r in resultados.values()}, {'creada'})
+        self.assertEqual(MedicionPlantas.objects.filter(estudiante=self.estudiante).count(), 2)
+
+        # La conexión se cortó antes de la respuesta: el navegador reenvía el mismo lote
+        resultados = self.sincronizar(registros)
+        self.assertEqual({r['estado'] for r in resultados.values()}, {'repetida'})
+        self.assertEqual(MedicionPlantas.objects.filter(estudiante=self.estudiante).count(), 2)
+        self.assertEqual(ResumenEstudiante.objects.get(pk=self.estudiante.pk).n, 2)
+
+    def test_mismo_dia_con_otra_clave_actualiza(self):
+        self.sincronizar([self.registro(1, '2.00')])
+        registro = self.registro(1, '2.40')
+        resultados = self.sincronizar([registro])
+        self.assertEqual(resultados[registro['clave']]['estado'], 'actualizada')
+        self.assertEqual(MedicionPlantas.objects.get(estudiante=self.estudiante, dia=1).altura, Decimal('2.40'))
+
+    def test_rechaza_estudiantes_ajenos_y_datos_invalidos(self):
+        ajeno, invalido, valido = self.registro(1, '2.00', self.otro), self.registro(0, '2.00'), self.registro(1, '2.00')
+        resultados = self.sincronizar([ajeno, invalido, valido])
+        self.assertEqual(resultados[ajeno['clave']]['estado'], 'error')
+        self.assertIn('estudiante', resultados[ajeno['clave']]['errores'])
+        self.assertIn('dia', resultados[invalido['clave']]['errores'])
+        self.assertEqual(resultados[valido['clave']]['estado'], 'creada')
+        self.assertFalse(MedicionPlantas.objects.filter(estudiante=self.otro).exists())
+
+    def test_fotografia_del_registro(self):
+        registro = self.registro(1, '2.00')
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+            self.sincronizar([registro], **{f'foto_{registro["clave"]}': imagen_png()})
+            medicion = MedicionPlantas.objects.get(estudiante=self.estudiante, dia=1)
+            self.assertTrue(RegistroFotografico.objects.filter(medicion=medicion).exists())
+
+    def test_solicitudes_invalidas(self):
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        self.assertEqual(self.client.post(self.url, {'registros': 'no es json'}).status_code, 400)
+        demasiados = [self.registro(dia, '2.00') for dia in range(1, MAX_REGISTROS_SINCRONIZACION + 2)]
+        self.assertEqual(self.client.post(self.url, {'registros': json.dumps(demasiados)}).status_code, 413)
@@ -0,0 +1,145 @@
+import base64
+import fcntl
+import io
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import subidas
+from ..models import RegistroFotografico
+from ..subidas import TAMANO_MAXIMO, VERSION_TUS, escribir_fragmento, obtener_subida
+from ..tareas import adjuntar_subida
+from .utilidades import crear_estudiante, imagen_png
+
+
+class SubidasTests(TestCase):
+
+    def setUp(self):
+        temporal = tempfile.TemporaryDirectory()
+        self.addCleanup(temporal.cleanup)
+        self.raiz = Path(temporal.name)
+        ajustes = override_settings(REGISTROS_DIRECTORIO_SUBIDAS=self.raiz / 'subidas', MEDIA_ROOT=self.raiz / 'media')
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+        self.usuario = User.objects.create_user('ana', password='clave-larga-123')
+        self.estudiante = crear_estudiante(usuario=self.usuario)
+        self.client.force_login(self.usuario)
+        self.foto = imagen_png().read()
+
+    def crear(self, longitud, nombre='planta.png'):
+        metadatos = f'filename {base64.b64encode(nombre.encode()).decode()}'
+        return self.client.post(
+            reverse('api_subidas'), HTTP_TUS_RESUMABLE=VERSION_TUS, HTTP_UPLOAD_LENGTH=str(longitud),
+            HTTP_UPLOAD_METADATA=metadatos,
+        )
+
+    def subida_de(self, respuesta):
+        self.assertEqual(respuesta.status_code, 201)
+        return respuesta['Location'].rstrip('/').rsplit('/', 1)[-1]
+
+    def enviar(self, subida, desplazamiento, datos):
+        return self.client.generic(
+            'PATCH', reverse('api_subida', args=[subida]), datos, content_type='application/offset+octet-stream',
+            HTTP_TUS_RESUMABLE=VERSION_TUS, HTTP_UPLOAD_OFFSET=str(desplazamiento),
+        )
+
+    def consultar(self, subida):
+        return self.client.head(reverse('api_subida', args=[subida]))
+
+    def test_subida_en_dos_fragmentos(self):
+        subida = self.subida_de(self.crear(len(self.foto)))
+        mitad = len(self.foto) // 2
+        respuesta = self.enviar(subida, 0, self.foto[:mitad])
+        self.assertEqual((respuesta.status_code, respuesta['Upload-Offset']), (204, str(mitad)))
+        respuesta = self.enviar(subida, mitad, self.foto[mitad:])
+        self.assertEqual(respuesta['Upload-Offset'], str(len(self.foto)))
+
+        info = obtener_subida(subida, self.usuario.pk)
+        self.assertTrue(info['completa'])
+        self.assertEqual(info['nombre'], 'planta.png')
+        # Otro usuario no la ve
+        self.assertIsNone(obtener_subida(subida, self.usuario.pk + 1))
+
+    def test_limites_de_tamano(self):
+        self.assertEqual(self.crear(0).status_code, 400)
+        self.assertEqual(self.crear(TAMANO_MAXIMO + 1).status_code, 413)
+
+        subida = self.subida_de(self.crear(10))
+        self.assertEqual(self.enviar(subida, 0, b'x' * 11).status_code, 413)
+        with mock.patch.object(subidas, 'TAMANO_MAXIMO_FRAGMENTO', 4):
+            self.assertEqual(self.enviar(subida, 0, b'x' * 5).status_code, 413)
+            self.assertEqual(self.enviar(subida, 0, b'x' * 4).status_code, 204)
+        self.assertEqual(self.consultar(subida)['Upload-Offset'], '4')
+
+    def test_desplazamiento_equivocado(self):
+        subida = self.subida_de(self.crear(len(self.foto)))
+        self.enviar(subida, 0, self.foto[:10])
+        # Un reintento del mismo fragmento no lo duplica
+        respuesta = self.enviar(subida, 0, self.foto[:10])
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(self.consultar(subida)['Upload-Offset'], '10')
+
+    def test_retomar_tras_un_corte(self):
+        subida = self.subida_de(self.crear(len(self.foto)))
+
+        class Cortado(io.BytesIO):
+            def read(self, tamano=-1):
+                if self.tell() >= 20:
+                    raise OSError('conexión cortada')
+                return super().read(min(tamano, 20 - self.tell()))
+
+        info = obtener_subida(subida, self.usuario.pk)
+        self.assertEqual(escribir_fragmento(info, 0, Cortado(self.foto), len(self.foto)), 20)
+
+        respuesta = self.consultar(subida)
+        self.assertEqual((respuesta['Upload-Offset'], respuesta['Upload-Length']), ('20', str(len(self.foto))))
+        self.assertEqual(self.enviar(subida, 20, self.foto[20:]).status_code, 204)
+        self.assertTrue(obtener_subida(subida)['completa'])
+
+    def test_patch_concurrente_recibe_423(self):
+        subida = self.subida_de(self.crear(len(self.foto)))
+        _, ruta_datos = subidas._rutas(subida)
+        with open(ruta_datos, 'ab') as archivo:
+            fcntl.flock(archivo, fcntl.LOCK_EX)
+            try:
+                self.assertEqual(self.enviar(subida, 0, self.foto).status_code, 423)
+            finally:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+        self.assertEqual(self.enviar(subida, 0, self.foto).status_code, 204)
+
+    def test_adjuntar_borra_la_subida_al_confirmar(self):
+        subida = self.subida_de(self.crear(len(self.foto)))
+        self.enviar(subida, 0, self.foto)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            resultado = adjuntar_subida(subida, estudiante_id=self.estudiante.pk, comentario='día 3')
+            # Hasta confirmar, la subida sigue ahí para un reintento
+            self.assertIsNotNone(obtener_subida(subida))
+        registro = RegistroFotografico.objects.get(pk=resultado['registro_id'])
+        self.assertEqual((registro.estudiante, registro.comentario), (self.estudiante, 'día 3'))
+        with registro.imagen.open('rb') as imagen:
+            self.assertEqual(imagen.read(), self.foto)
+
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(obtener_subida(subida))
+
+    def test_adjuntar_rechaza_lo_que_no_es_imagen(self):
+        subida = self.subida_de(self.crear(9, 'foto.jpg'))
+        self.enviar(subida, 0, b'no imagen')
+        self.assertEqual(adjuntar_subida(subida, estudiante_id=self.estudiante.pk), {
+            'omitida': 'El archivo subido no es una imagen válida',
+        })
+        self.assertFalse(RegistroFotografico.objects.exists())
+        self.assertIsNone(obtener_subida(subida))
+
+    def test_adjuntar_subida_incompleta(self):
+        subida = self.subida_de(self.crear(len(self.foto)))
+        self.enviar(subida, 0, self.foto[:10])
+        self.assertIn('omitida', adjuntar_subida(subida, estudiante_id=self.estudiante.pk))
+        self.assertIsNotNone(obtener_subida(subida))
@@ -0,0 +1,148 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import Tarea
+from ..tareas import (
+    RETENCION_COMPLETADAS, RETENCION_FALLIDAS, RETRASO_REINTENTO, TIEMPO_MAXIMO_EJECUCION, encolar, ejecutar,
+    purgar_terminadas, reclamar, recuperar_abandonadas, tarea,
+)
+
+ejecuciones = []
+
+
+@tarea(nombre='prueba_anotar')
+def anotar(valor, secreto=None):
+    ejecuciones.append(valor)
+    return {'valor': valor}
+
+
+@tarea(nombre='prueba_fallar', max_intentos=3, sensibles=('secreto',))
+def fallar(secreto):
+    raise RuntimeError('falla de prueba')
+
+
+class EncolarTests(TestCase):
+
+    def setUp(self):
+        ejecuciones.clear()
+
+    def test_clave_deduplica_mientras_esta_pendiente(self):
+        primera = encolar('prueba_anotar', {'valor': 1}, clave='anotar')
+        self.assertEqual(encolar('prueba_anotar', {'valor': 2}, clave='anotar').pk, primera.pk)
+        self.assertEqual(Tarea.objects.count(), 1)
+
+        # Terminada, la clave queda libre y se puede volver a encolar
+        ejecutar(primera.pk)
+        otra = encolar('prueba_anotar', {'valor': 3}, clave='anotar')
+        self.assertNotEqual(otra.pk, primera.pk)
+        self.assertEqual(Tarea.objects.get(pk=primera.pk).clave, None)
+
+    def test_sin_clave_no_deduplica(self):
+        encolar('prueba_anotar', {'valor': 1})
+        encolar('prueba_anotar', {'valor': 1})
+        self.assertEqual(Tarea.objects.count(), 2)
+
+    def test_tarea_desconocida(self):
+        with self.assertRaises(LookupError):
+            encolar('no_existe')
+
+    @override_settings(REGISTROS_TAREAS_INMEDIATAS=True)
+    def test_inmediatas_se_ejecutan_al_confirmar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            nueva = encolar('prueba_anotar', {'valor': 7})
+            self.assertEqual(ejecuciones, [])
+        self.assertEqual(ejecuciones, [7])
+        self.assertEqual(Tarea.objects.get(pk=nueva.pk).estado, Tarea.COMPLETADA)
+
+    def test_por_defecto_las_ejecuta_el_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            nueva = encolar('prueba_anotar', {'valor': 7})
+        self.assertEqual(ejecuciones, [])
+        self.assertEqual(Tarea.objects.get(pk=nueva.pk).estado, Tarea.PENDIENTE)
+
+
+class EjecutarTests(TestCase):
+
+    def test_reintentos_con_espera_creciente(self):
+        nueva = encolar('prueba_fallar', {'secreto': 'hash'}, clave='fallar')
+        ahora = timezone.now()
+        with mock.patch('registros.tareas.timezone.now', return_value=ahora):
+            for intento in (1, 2):
+                resultado = ejecutar(nueva.pk)
+                self.assertEqual(resultado.estado, Tarea.PENDIENTE)
+                self.assertEqual(resultado.intentos, intento)
+                self.assertEqual(
+                    resultado.ejecutar_despues, ahora + timedelta(seconds=RETRASO_REINTENTO * 2 ** (intento - 1)),
+                )
+                # Mientras se reintenta conserva sus argumentos
+                self.assertEqual(resultado.argumentos, {'secreto': 'hash'})
+
+            resultado = ejecutar(nueva.pk)
+        self.assertEqual(resultado.estado, Tarea.FALLIDA)
+        self.assertEqual(resultado.intentos, 3)
+        self.assertIsNone(resultado.clave)
+        self.assertIn('falla de prueba', resultado.error)
+        # Los argumentos sensibles no quedan en el historial
+        self.assertEqual(Tarea.objects.get(pk=nueva.pk).argumentos, {})
+        # Una tarea terminada no se vuelve a ejecutar
+        self.assertEqual(ejecutar(nueva.pk).intentos, 3)
+
+    def test_completada_guarda_el_resultado(self):
+        nueva = encolar('prueba_anotar', {'valor': 5, 'secreto': 'x'})
+        resultado = ejecutar(nueva.pk)
+        self.assertEqual(resultado.estado, Tarea.COMPLETADA)
+        self.assertEqual(resultado.resultado, {'valor': 5})
+        # prueba_anotar no declara argumentos sensibles
+        self.assertEqual(Tarea.objects.get(pk=nueva.pk).argumentos, {'valor': 5, 'secreto': 'x'})
+
+
+class ColaTests(TestCase):
+
+    def test_reclamar_no_entrega_dos_veces_la_misma(self):
+        for valor in range(3):
+            encolar('prueba_anotar', {'valor': valor})
+        encolar('prueba_anotar', {'valor': 9}, retraso=timedelta(minutes=5))
+
+        primeras = reclamar(limite=2)
+        resto = reclamar(limite=10)
+        self.assertEqual(len(primeras), 2)
+        self.assertEqual(len(resto), 1)
+        self.assertFalse({t.pk for t in primeras} & {t.pk for t in resto})
+        self.assertEqual(reclamar(limite=10), [])
+        self.assertEqual(Tarea.objects.filter(estado=Tarea.EN_PROCESO).count(), 3)
+        # La que tiene retraso sigue esperando su hora
+        self.assertEqual(Tarea.objects.get(estado=Tarea.PENDIENTE).argumentos, {'valor': 9})
+
+    def test_recuperar_abandonadas(self):
+        abandonada = encolar('prueba_anotar', {'valor': 1})
+        activa = encolar('prueba_anotar', {'valor': 2})
+        reclamar()
+        Tarea.objects.filter(pk=abandonada.pk).update(
+            iniciada=timezone.now() - TIEMPO_MAXIMO_EJECUCION - timedelta(minutes=1),
+        )
+        self.assertEqual(recuperar_abandonadas(), 1)
+        self.assertEqual(Tarea.objects.get(pk=abandonada.pk).estado, Tarea.PENDIENTE)
+        self.assertEqual(Tarea.objects.get(pk=activa.pk).estado, Tarea.EN_PROCESO)
+        self.assertEqual([t.pk for t in reclamar()], [abandonada.pk])
+
+    def test_purgar_terminadas_conserva_mas_las_fallidas(self):
+        ahora = timezone.now()
+        terminadas = {
+            'completada_vieja': (Tarea.COMPLETADA, RETENCION_COMPLETADAS + timedelta(days=1)),
+            'completada_reciente': (Tarea.COMPLETADA, timedelta(days=1)),
+            'fallida_reciente': (Tarea.FALLIDA, RETENCION_COMPLETADAS + timedelta(days=1)),
+            'fallida_vieja': (Tarea.FALLIDA, RETENCION_FALLIDAS + timedelta(days=1)),
+        }
+        for nombre, (estado, antiguedad) in terminadas.items():
+            Tarea.objects.create(
+                nombre='prueba_anotar', argumentos={'valor': nombre}, estado=estado,
+                ejecutar_despues=ahora, terminada=ahora - antiguedad,
+            )
+        pendiente = encolar('prueba_anotar', {'valor': 'pendiente'})
+
+        self.assertEqual(purgar_terminadas(), 2)
+        conservadas = {t.argumentos['valor'] for t in Tarea.objects.all()}
+        self.assertEqual(conservadas, {'completada_reciente', 'fallida_reciente', pendiente.argumentos['valor']})
@@ -0,0 +1,27 @@
+"""Datos y ajustes compartidos por las pruebas."""
+import io
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+
+from ..models import Estudiante
+
+# Las páginas se renderizan sin el manifiesto que genera collectstatic
+sin_manifiesto = override_settings(STORAGES={
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+
+def crear_estudiante(nombre='Ana Torres', grupo=1, usuario=None):
+    correo = f'{nombre.lower().replace(" ", ".")}.{Estudiante.objects.count()}@ejemplo.edu.co'
+    return Estudiante.objects.create(nombre=nombre, grupo=grupo, correo_institucional=correo, usuario=usuario)
+
+
+def imagen_png(nombre='planta.png'):
+    from PIL import Image
+
+    salida = io.BytesIO()
+    Image.new('RGB', (4, 4), 'green').save(salida, 'PNG')
+    return SimpleUploadedFile(nombre, salida.getvalue(), content_type='image/png')
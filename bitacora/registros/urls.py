@@ -29,7 +29,25 @@ urlpatterns = [
     
     # URLs de Análisis
     path('analisis/', views.analisis_dashboard, name='analisis_dashboard'),
+    path('analisis/grupos/', views.analisis_grupos, name='analisis_grupos'),
+    path('analisis/eventos/', views.eventos_dashboard, name='eventos_dashboard'),
     path('analisis/<int:estudiante_id>/', views.analisis_regresion, name='analisis_regresion'),
     path('exportar-csv/<int:estudiante_id>/', views.exportar_csv, name='exportar_csv'),
+    
+    # URLs del Archivo Histórico
+    path('archivo/', views.archivo_listar, name='archivo_listar'),
+    path('archivo/<int:pk>/', views.archivo_detalle, name='archivo_detalle'),
+    path('reportes/<int:pk>/descargar/', views.reporte_descargar, name='reporte_descargar'),
+    
+    # API JSON
+    path('api/prediccion/', views.api_prediccion, name='api_prediccion'),
+    path('api/tareas/<int:pk>/', views.api_tarea_estado, name='api_tarea_estado'),
+    path('api/estudiantes/', views.api_estudiantes, name='api_estudiantes'),
+    path('api/mediciones/sincronizar/', views.api_sincronizar_mediciones, name='api_sincronizar_mediciones'),
+    path('api/subidas/', views.api_subidas, name='api_subidas'),
+    path('api/subidas/<uuid:subida>/', views.api_subida, name='api_subida'),
+    
+    # Service worker (modo sin conexión): en la raíz, para que su alcance sea todo el sitio
+    path('sw.js', views.service_worker, name='service_worker'),
 ]
 
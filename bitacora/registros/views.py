@@ -1,19 +1,56 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from django.contrib.auth import login, logout, authenticate
+from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db.models import Q
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from asgiref.sync import sync_to_async
+from datetime import timedelta
 from functools import wraps
-from .models import Estudiante, MedicionPlantas, RegistroFotografico
-from .forms import EstudianteForm, MedicionPlantasForm, RegistroFotograficoForm, RegistroForm, LoginForm
+from .models import (
+    ArchivoGrupo, Estudiante, MedicionPlantas, RegistroFotografico, ReporteGrupo, ResumenEstudiante, Tarea,
+)
+from .routers import alias_primario, lectura_replica
+from .acceso import bloqueado, registrar_exito, registrar_fallo
+from .cache import espacio_estudiante
+from .eventos import obtener_bus
+from .condicional import condicional, ultima_fecha
+from .tareas import encolar, encolar_periodica
+from .eliminacion import eliminar_estudiantes, eliminar_mediciones, eliminar_registros_fotograficos
+from .escritura import (
+    ACTUALIZADA, REPETIDA, ConflictoVersion, clave_de, guardar_edicion, guardar_nueva, programar_adjunto,
+    sincronizar_lote, solicitud_procesada,
+)
+from .subidas import (
+    EXTENSIONES_TUS, TAMANO_MAXIMO, VERSION_TUS, ErrorSubida, crear_subida, eliminar_subida,
+    escribir_fragmento, leer_metadatos, obtener_subida,
+)
+from .instantanea import obtener_instantanea
+from .numerico import altura_centesimas, texto_centimetros
+from .grupos import generar_grafica_grupos, obtener_curvas_grupos, obtener_grafica_grupos
+from .reportes import ruta_reporte
+from .archivo import (
+    filas_estudiantes, obtener_curva_archivo, obtener_grafica_archivo, serie_estudiante,
+)
+from .forms import (
+    EstudianteForm, MedicionPlantasForm, MedicionSincronizadaForm, RegistroFotograficoForm, RegistroForm, LoginForm,
+)
+from .analisis import (
+    MinCuad, calcular_coeficiente_correlacion, generar_grafica, obtener_grafica,
+    obtener_regresion, obtener_resumenes,
+)
+from .anomalias import evaluar_medicion
+from .modelos_crecimiento import ajuste_seleccionado
+from .prediccion import (
+    MIN_MEDICIONES_PREDICCION, NIVELES_CONFIANZA, coeficiente_determinacion,
+    coeficientes, predecir, reconstruir_resumenes, varianza_residual,
+)
 import numpy as np
-import matplotlib
-matplotlib.use('Agg')  # Backend sin interfaz gráfica para servidor
-import matplotlib.pyplot as plt
-import io
-import base64
+import asyncio
 import csv
+import json
 from decimal import Decimal
 
 
@@ -52,6 +89,56 @@ def obtener_estudiante_del_usuario(user):
         return None
 
 
+# ===== GET CONDICIONAL =====
+# Espacios de caché y Last-Modified de las vistas de solo lectura (ver condicional.py)
+
+def _espacios_por_rol(*espacios_admin):
+    """Administradores: los espacios dados; estudiantes: el de su propio estudiante."""
+    def espacios(request, *args, **kwargs):
+        if es_administrador(request.user):
+            return list(espacios_admin)
+        estudiante_usuario = obtener_estudiante_del_usuario(request.user)
+        return [espacio_estudiante(estudiante_usuario.id)] if estudiante_usuario else None
+    return espacios
+
+
+def _espacios_estudiante(request, estudiante_id):
+    """Espacio del análisis de un estudiante, o None si el usuario no puede verlo."""
+    if not es_administrador(request.user):
+        estudiante_usuario = obtener_estudiante_del_usuario(request.user)
+        if estudiante_usuario is None or estudiante_usuario.id != estudiante_id:
+            return None
+    return [espacio_estudiante(estudiante_id)]
+
+
+def _ultima_modificacion_estudiante(request, estudiante_id):
+    return ultima_fecha(
+        MedicionPlantas.objects.filter(estudiante_id=estudiante_id),
+        RegistroFotografico.objects.filter(estudiante_id=estudiante_id),
+    )
+
+
+def _ultima_modificacion_por_rol(request):
+    if es_administrador(request.user):
+        estudiante_id = request.GET.get('estudiante', '')
+        filtro = {'estudiante_id': int(estudiante_id)} if estudiante_id.isdigit() else {}
+    else:
+        estudiante_usuario = obtener_estudiante_del_usuario(request.user)
+        if estudiante_usuario is None:
+            return None
+        filtro = {'estudiante_id': estudiante_usuario.id}
+    return ultima_fecha(MedicionPlantas.objects.filter(**filtro), RegistroFotografico.objects.filter(**filtro))
+
+
+# Cada cuánto se limpian como mucho los registros fotográficos huérfanos
+INTERVALO_LIMPIEZA_HUERFANOS = timedelta(minutes=10)
+
+
+def precalcular_en_segundo_plano(estudiante_id):
+    """Regenera en segundo plano la regresión y la gráfica del estudiante."""
+    encolar('precalcular_analisis', {'estudiante_id': estudiante_id}, clave=f'precalcular_analisis:{estudiante_id}')
+
+
 # ===== VISTAS DE AUTENTICACIÓN =====
 
 def registro_view(request):
@@ -94,16 +181,21 @@ def login_view(request):
     
     if request.method == 'POST':
         form = LoginForm(request, data=request.POST)
+        username = request.POST.get('username', '')
+        # Antes de validar: el formulario es el que verifica la contraseña (lo costoso)
+        if bloqueado(request, username):
+            messages.error(request, 'Demasiados intentos fallidos. Espera unos minutos antes de volver a intentarlo.')
+            return render(request, 'registros/auth/login.html', {'form': LoginForm()}, status=429)
         if form.is_valid():
-            username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(username=username, password=password)
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'¡Bienvenido de nuevo, {user.username}!')
-                next_url = request.GET.get('next', 'index')
-                return redirect(next_url)
+            # is_valid() ya autenticó al usuario: no se verifica la contraseña otra vez
+            user = form.get_user()
+            registrar_exito(username)
+            login(request, user)
+            messages.success(request, f'¡Bienvenido de nuevo, {user.username}!')
+            next_url = request.GET.get('next', 'index')
+            return redirect(next_url)
         else:
+            registrar_fallo(request, username)
             messages.error(request, 'Usuario o contraseña incorrectos.')
     else:
         form = LoginForm()
@@ -133,24 +225,25 @@ def index(request):
 
 # Vista de administrador (la vista original)
 @login_required
+@lectura_replica
 def index_admin(request):
     # Verificar que el usuario es administrador
     if not (request.user.is_superuser or request.user.is_staff):
         messages.warning(request, 'No tienes permisos para acceder a esta sección.')
         return redirect('index')
     
-    # Limpiar registros fotográficos huérfanos antes de contar
-    RegistroFotografico.limpiar_registros_huerfanos()
+    # La limpieza de registros fotográficos huérfanos se hace en segundo plano
+    # (los conteos ya excluyen las fotos sin medición)
+    encolar_periodica(INTERVALO_LIMPIEZA_HUERFANOS, 'limpiar_fotos_huerfanas')
     
     estudiantes_count = Estudiante.objects.count()
-    mediciones_count = MedicionPlantas.objects.count()
     fotos_count = RegistroFotografico.objects.filter(medicion__isnull=False).count()
     
-    # Calcular cuántos estudiantes tienen suficientes mediciones para análisis (>=2)
-    analisis_count = 0
-    for estudiante in Estudiante.objects.all():
-        if MedicionPlantas.objects.filter(estudiante=estudiante).count() >= 2:
-            analisis_count += 1
+    # Conteos de mediciones desde la instantánea: sin recorrer la tabla ni consultar por estudiante
+    instantanea = obtener_instantanea()
+    mediciones_count = instantanea.num_mediciones
+    # Estudiantes con suficientes mediciones para análisis (>=2)
+    analisis_count = int(np.count_nonzero(instantanea.conteos() >= 2))
     
     context = {
         'estudiantes_count': estudiantes_count,
@@ -163,29 +256,49 @@ def index_admin(request):
 
 # Vista de estudiante (nueva)
 @login_required
+@lectura_replica
 def index_estudiante(request):
-    # Obtener el estudiante asociado al usuario
-    estudiante = obtener_estudiante_del_usuario(request.user)
-    
-    # Limpiar registros fotográficos huérfanos antes de contar
-    RegistroFotografico.limpiar_registros_huerfanos()
+    """
+    Página de inicio del estudiante. Todo lo que muestra sale de su
+    ResumenEstudiante, que se mantiene al escribir: una sola consulta.
+    """
+    resumen = (
+        ResumenEstudiante.objects
+        .select_related('estudiante')
+        .filter(estudiante__usuario_id=request.user.pk)
+        .first()
+    )
+    
+    if resumen is None:
+        estudiante = obtener_estudiante_del_usuario(request.user)
+        if estudiante:
+            # Estudiante sin resumen (p. ej. creado antes de existir la tabla): se calcula una vez
+            reconstruir_resumenes([estudiante.pk])
+            # Del primario: la réplica quizá todavía no tiene la fila recién creada
+            resumen = (
+                ResumenEstudiante.objects.using(alias_primario())
+                .select_related('estudiante')
+                .get(pk=estudiante.pk)
+            )
     
-    # Si el usuario tiene un estudiante asociado, mostrar solo sus datos
-    if estudiante:
-        mediciones_count = MedicionPlantas.objects.filter(estudiante=estudiante).count()
-        # Verificar si tiene suficientes mediciones para análisis (>=2)
-        analisis_count = 1 if mediciones_count >= 2 else 0
+    context = {'estudiante': resumen.estudiante if resumen else None}
+    if resumen:
+        recta = coeficientes(resumen)
+        context.update({
+            'resumen': resumen,
+            'mediciones_count': resumen.n,
+            # Verificar si tiene suficientes mediciones para análisis (>=2)
+            'analisis_count': 1 if resumen.n >= 2 else 0,
+            'pendiente': round(recta[1], 2) if recta else None,
+            'r2': round(coeficiente_determinacion(resumen), 3) if recta else None,
+            'puede_predecir': resumen.n >= MIN_MEDICIONES_PREDICCION,
+            'mediciones_faltantes': max(MIN_MEDICIONES_PREDICCION - resumen.n, 0),
+        })
     else:
         # Si no tiene estudiante asociado, mostrar mensaje
-        mediciones_count = 0
-        analisis_count = 0
+        context.update({'mediciones_count': 0, 'analisis_count': 0})
         messages.info(request, 'Tu cuenta aún no está asociada a un estudiante. Contacta al administrador.')
     
-    context = {
-        'mediciones_count': mediciones_count,
-        'analisis_count': analisis_count,
-        'estudiante': estudiante,
-    }
     return render(request, 'registros/index_estudiante.html', context)
 
 
@@ -208,6 +321,7 @@ def estudiante_crear(request):
 
 @login_required
 @requiere_administrador
+@lectura_replica
 def estudiante_listar(request):
     busqueda = request.GET.get('buscar', '')
     estudiantes = Estudiante.objects.all()
@@ -249,7 +363,7 @@ def estudiante_eliminar(request, pk):
     estudiante = get_object_or_404(Estudiante, pk=pk)
     
     if request.method == 'POST':
-        estudiante.delete()
+        eliminar_estudiantes([estudiante.pk])
         messages.success(request, 'Estudiante eliminado exitosamente.')
         return redirect('estudiante_listar')
     
@@ -264,33 +378,39 @@ def medicion_crear(request):
     estudiante_usuario = obtener_estudiante_del_usuario(request.user)
     
     if request.method == 'POST':
-        form = MedicionPlantasForm(request.POST, request.FILES)
+        clave = clave_de(request.POST)
+        if solicitud_procesada(clave):
+            # Reenvío de un formulario ya guardado (doble clic o reintento del navegador)
+            messages.info(request, 'Esta medición ya se había registrado.')
+            return redirect('medicion_listar')
+
+        form = MedicionPlantasForm(request.POST, request.FILES, usuario=request.user)
         if form.is_valid():
-            # Guardar la medición
-            medicion = form.save()
-            
-            # Si hay imagen, crear el registro fotográfico asociado
-            imagen = form.cleaned_data.get('imagen')
-            comentario = form.cleaned_data.get('comentario', '')
-            
-            if imagen:
-                RegistroFotografico.objects.create(
-                    medicion=medicion,  # ← Relación directa
-                    estudiante=medicion.estudiante,
-                    imagen=imagen,
-                    comentario=comentario
-                )
+            medicion, estado = guardar_nueva(form, clave=clave, usuario=request.user)
+            if estado == REPETIDA:
+                messages.info(request, 'Esta medición ya se había registrado.')
+                return redirect('medicion_listar')
+
+            if estado == ACTUALIZADA:
+                messages.info(request, f'Ya había una medición del día {medicion.dia}; se actualizó con estos valores.')
+            if form.cleaned_data.get('imagen'):
                 messages.success(request, 'Medición y fotografía registradas exitosamente.')
+            elif form.cleaned_data.get('subida'):
+                messages.success(request, 'Medición registrada exitosamente. La fotografía aparecerá en unos segundos.')
             else:
                 messages.success(request, 'Medición registrada exitosamente.')
             
+            if medicion.atipica:
+                messages.warning(request, 'La medición quedó marcada como atípica; revisa el valor si notas cambios extraños en el análisis.')
+            precalcular_en_segundo_plano(medicion.estudiante_id)
+            
             return redirect('medicion_listar')
     else:
         # Si es estudiante, preseleccionar su perfil
         if estudiante_usuario:
-            form = MedicionPlantasForm(initial={'estudiante': estudiante_usuario})
+            form = MedicionPlantasForm(initial={'estudiante': estudiante_usuario}, usuario=request.user)
         else:
-            form = MedicionPlantasForm()
+            form = MedicionPlantasForm(usuario=request.user)
     
     context = {
         'form': form, 
@@ -301,6 +421,8 @@ def medicion_crear(request):
 
 
 @login_required
+@lectura_replica
+@condicional(_espacios_por_rol('dashboard', 'fotos'), _ultima_modificacion_por_rol)
 def medicion_listar(request):
     # Obtener el estudiante asociado al usuario si no es administrador
     estudiante_usuario = obtener_estudiante_del_usuario(request.user)
@@ -345,7 +467,7 @@ def medicion_listar(request):
 @login_required
 @login_required
 def medicion_editar(request, pk):
-    medicion = get_object_or_404(MedicionPlantas, pk=pk)
+    medicion = get_object_or_404(MedicionPlantas.objects.select_related('estudiante'), pk=pk)
     
     # VALIDACIÓN DE PERMISOS: Verificar que el estudiante puede editar esta medición
     estudiante_usuario = obtener_estudiante_del_usuario(request.user)
@@ -372,37 +494,47 @@ def medicion_editar(request, pk):
         registro_foto = None
     
     if request.method == 'POST':
-        form = MedicionPlantasForm(request.POST, request.FILES, instance=medicion)
+        clave = clave_de(request.POST)
+        if solicitud_procesada(clave):
+            messages.info(request, 'Estos cambios ya se habían guardado.')
+            return redirect('medicion_listar')
+
+        form = MedicionPlantasForm(request.POST, request.FILES, instance=medicion, usuario=request.user)
         if form.is_valid():
-            # Actualizar la medición
-            medicion = form.save()
-            
-            # Manejar imagen y comentario
             imagen = form.cleaned_data.get('imagen')
-            comentario = form.cleaned_data.get('comentario', '')
-            
-            if registro_foto:
-                # Actualizar registro existente
-                if imagen:
-                    # Eliminar la imagen anterior si existe
-                    if registro_foto.imagen:
-                        registro_foto.imagen.delete(save=False)
-                    registro_foto.imagen = imagen
-                registro_foto.comentario = comentario
-                registro_foto.save()
+            try:
+                medicion, estado = guardar_edicion(
+                    form,
+                    version=form.cleaned_data.get('version'),
+                    clave=clave,
+                    usuario=request.user,
+                    registro=registro_foto,
+                )
+            except ConflictoVersion as conflicto:
+                if conflicto.version_actual is None:
+                    messages.error(request, 'La medición fue eliminada mientras la editabas.')
+                    return redirect('medicion_listar')
+                # Se muestran los valores actuales para que decida si vuelve a aplicar sus cambios
+                messages.error(request, (
+                    'Otra persona modificó esta medición mientras la editabas. '
+                    'Estos son los valores actuales: revisa y vuelve a guardar.'
+                ))
+                return redirect('medicion_editar', pk=pk)
+
+            if estado == REPETIDA:
+                messages.info(request, 'Estos cambios ya se habían guardado.')
+                return redirect('medicion_listar')
+
+            if form.cleaned_data.get('subida'):
+                messages.success(request, 'Medición actualizada exitosamente. La fotografía nueva aparecerá en unos segundos.')
+            elif registro_foto:
                 messages.success(request, 'Medición y fotografía actualizadas exitosamente.')
             elif imagen:
-                # Crear nuevo registro solo si hay imagen
-                RegistroFotografico.objects.create(
-                    medicion=medicion,
-                    estudiante=medicion.estudiante,
-                    imagen=imagen,
-                    comentario=comentario
-                )
                 messages.success(request, 'Medición y fotografía guardadas exitosamente.')
             else:
                 messages.success(request, 'Medición actualizada exitosamente.')
             
+            precalcular_en_segundo_plano(medicion.estudiante_id)
             return redirect('medicion_listar')
     else:
         # Crear el formulario con la instancia de medición
@@ -411,7 +543,7 @@ def medicion_editar(request, pk):
         if registro_foto:
             initial_data['comentario'] = registro_foto.comentario
         
-        form = MedicionPlantasForm(instance=medicion, initial=initial_data)
+        form = MedicionPlantasForm(instance=medicion, initial=initial_data, usuario=request.user)
     
     context = {
         'form': form, 
@@ -443,7 +575,8 @@ def medicion_eliminar(request, pk):
     
     # Si llegó aquí, es administrador o es su propia medición
     if request.method == 'POST':
-        medicion.delete()
+        eliminar_mediciones([medicion.pk])
+        precalcular_en_segundo_plano(medicion.estudiante_id)
         messages.success(request, 'Medición eliminada exitosamente.')
         return redirect('medicion_listar')
     
@@ -455,21 +588,32 @@ def medicion_eliminar(request, pk):
 @login_required
 def registro_fotografico_crear(request):
     if request.method == 'POST':
-        form = RegistroFotograficoForm(request.POST, request.FILES)
+        form = RegistroFotograficoForm(request.POST, request.FILES, usuario=request.user)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'Registro fotográfico guardado exitosamente.')
+            subida = form.cleaned_data.get('subida')
+            if subida:
+                # La foto ya está en el servidor: el registro se crea en segundo plano
+                programar_adjunto(
+                    subida, request.user,
+                    estudiante_id=form.cleaned_data['estudiante'].pk,
+                    comentario=form.cleaned_data.get('comentario'),
+                )
+                messages.success(request, 'Registro fotográfico recibido; aparecerá en la lista en unos segundos.')
+            else:
+                form.save()
+                messages.success(request, 'Registro fotográfico guardado exitosamente.')
             return redirect('registro_fotografico_listar')
     else:
-        form = RegistroFotograficoForm()
+        form = RegistroFotograficoForm(usuario=request.user)
     
     return render(request, 'registros/registro_fotografico_form.html', {'form': form, 'accion': 'Registrar'})
 
 
 @login_required
+@lectura_replica
 def registro_fotografico_listar(request):
-    # Limpiar registros huérfanos automáticamente
-    RegistroFotografico.limpiar_registros_huerfanos()
+    # Limpiar registros huérfanos en segundo plano (la lista ya los excluye)
+    encolar_periodica(INTERVALO_LIMPIEZA_HUERFANOS, 'limpiar_fotos_huerfanas')
     
     # Obtener el estudiante asociado al usuario si no es administrador
     estudiante_usuario = obtener_estudiante_del_usuario(request.user)
@@ -511,73 +655,18 @@ def registro_fotografico_eliminar(request, pk):
     registro = get_object_or_404(RegistroFotografico, pk=pk)
     
     if request.method == 'POST':
-        registro.delete()
+        eliminar_registros_fotograficos([registro.pk])
         messages.success(request, 'Registro fotográfico eliminado exitosamente.')
         return redirect('registro_fotografico_listar')
     
     return render(request, 'registros/registro_fotografico_eliminar.html', {'registro': registro})
 
 
-# ===== FUNCIONES DE ANÁLISIS DE REGRESIÓN =====
-
-def MinCuad(x, y):
-    """
-    Calcula la regresión lineal por el método de mínimos cuadrados.
-    
-    Args:
-        x: array de valores independientes (días)
-        y: array de valores dependientes (alturas)
-    
-    Returns:
-        tuple: (a0, a1) donde y = a0 + a1*x
-    """
-    sumx = 0
-    sumy = 0
-    sumxy = 0
-    sumxx = 0
-    n = len(x)
-    
-    for i in range(len(x)):
-        sumxy += x[i] * y[i]
-        sumxx += x[i] ** 2
-        sumx += x[i]
-        sumy += y[i]
-    
-    a1 = (n * sumxy - sumx * sumy) / (n * sumxx - sumx ** 2)
-    a0 = (sumy - a1 * sumx) / n
-    
-    return a0, a1
-
-
-def calcular_coeficiente_correlacion(x, y, a0, a1):
-    """
-    Calcula el coeficiente de correlación r y r²
-    
-    Args:
-        x: array de valores independientes
-        y: array de valores dependientes
-        a0, a1: coeficientes de la regresión
-    
-    Returns:
-        tuple: (r, r2)
-    """
-    media_y = np.mean(y)
-    y_est = a0 + a1 * x
-    
-    # Coeficiente de correlación
-    num = np.sum((y_est - media_y) ** 2)
-    den = np.sum((y - media_y) ** 2)
-    r = np.sqrt(num / den) if den != 0 else 0
-    
-    # Coeficiente de determinación
-    r2 = 1 - np.sum((y - y_est) ** 2) / den if den != 0 else 0
-    
-    return r, r2
-
-
 # ===== VISTAS DE ANÁLISIS =====
 
 @login_required
+@lectura_replica
+@condicional(_espacios_por_rol('dashboard'), _ultima_modificacion_por_rol)
 def analisis_dashboard(request):
     """
     Vista dashboard para mostrar todos los estudiantes disponibles para análisis
@@ -622,49 +711,17 @@ def analisis_dashboard(request):
     estudiantes_data = []
     estudiantes_sin_datos = []
     
+    # Los resúmenes se leen de la caché; solo los faltantes se calculan (en una consulta)
+    estudiantes = list(estudiantes)
+    resumenes = obtener_resumenes(estudiante.id for estudiante in estudiantes)
+    
     for estudiante in estudiantes:
-        mediciones = MedicionPlantas.objects.filter(estudiante=estudiante).order_by('dia')
-        num_mediciones = mediciones.count()
-        
-        if num_mediciones >= 2:
-            # Calcular estadísticas rápidas
-            dias = np.array([float(m.dia) for m in mediciones])
-            alturas = np.array([float(m.altura) for m in mediciones])
-            
-            a0, a1 = MinCuad(dias, alturas)
-            r, r2 = calcular_coeficiente_correlacion(dias, alturas, a0, a1)
-            
-            # Clasificar calidad de ajuste
-            if r2 > 0.9:
-                calidad_ajuste = 'excelente'
-            elif r2 > 0.7:
-                calidad_ajuste = 'bueno'
-            elif r2 > 0.5:
-                calidad_ajuste = 'moderado'
-            else:
-                calidad_ajuste = 'debil'
-            
-            estudiantes_data.append({
-                'estudiante': estudiante,
-                'num_mediciones': num_mediciones,
-                'dias_registrados': f"{int(dias.min())} - {int(dias.max())}",
-                'dias_transcurridos': int(dias.max()),
-                'altura_inicial': float(alturas[0]),
-                'altura_final': float(alturas[-1]),
-                'crecimiento_total': float(alturas[-1] - alturas[0]),
-                'r2': round(r2, 3),
-                'tiene_buen_ajuste': r2 > 0.7,
-                'calidad_ajuste': calidad_ajuste,
-                'puede_analizar': True
-            })
+        resumen = resumenes[estudiante.id]
+        if resumen['puede_analizar']:
+            estudiantes_data.append({'estudiante': estudiante, **resumen})
         else:
             # Estudiante sin suficientes datos
-            estudiantes_sin_datos.append({
-                'estudiante': estudiante,
-                'num_mediciones': num_mediciones,
-                'puede_analizar': False,
-                'motivo': 'Necesita al menos 2 mediciones' if num_mediciones < 2 else 'Sin datos'
-            })
+            estudiantes_sin_datos.append({'estudiante': estudiante, **resumen})
     
     # Aplicar filtro por calidad de ajuste
     if ajuste_filtro:
@@ -676,9 +733,9 @@ def analisis_dashboard(request):
     elif ordenar == 'grupo':
         estudiantes_data.sort(key=lambda x: x['estudiante'].grupo)
     elif ordenar == 'r2_desc':
-        estudiantes_data.sort(key=lambda x: x['r2'], reverse=True)
+        estudiantes_data.sort(key=lambda x: x['r2_modelo'], reverse=True)
     elif ordenar == 'r2_asc':
-        estudiantes_data.sort(key=lambda x: x['r2'])
+        estudiantes_data.sort(key=lambda x: x['r2_modelo'])
     elif ordenar == 'crecimiento_desc':
         estudiantes_data.sort(key=lambda x: x['crecimiento_total'], reverse=True)
     elif ordenar == 'crecimiento_asc':
@@ -705,11 +762,106 @@ def analisis_dashboard(request):
     return render(request, 'registros/analisis_dashboard.html', context)
 
 
+# Segundos entre latidos (comentarios SSE que mantienen la conexión a través de proxies)
+LATIDO_EVENTOS = 15
+# Pasado este tiempo se cierra la conexión; el navegador se reconecta solo
+DURACION_MAXIMA_EVENTOS = 10 * 60
+
+
+async def _flujo_eventos(acepta):
+    bucle = asyncio.get_running_loop()
+    fin = bucle.time() + DURACION_MAXIMA_EVENTOS
+    async with obtener_bus().suscribir() as cola:
+        # Ya suscrito: lo que se publique desde aquí no se pierde
+        yield 'retry: 5000\n\n'
+        while bucle.time() < fin:
+            try:
+                evento = await asyncio.wait_for(cola.get(), LATIDO_EVENTOS)
+            except asyncio.TimeoutError:
+                yield ': latido\n\n'
+                continue
+            if evento['tipo'] == 'recargar' or acepta(evento):
+                yield f"event: {evento['tipo']}\ndata: {json.dumps(evento)}\n\n"
+
+
+@login_required
+async def eventos_dashboard(request):
+    """
+    Flujo text/event-stream con las mediciones, fotografías y resúmenes nuevos
+    (ver eventos.py). Administradores: todos, o los del grupo ?grupo=N;
+    estudiantes: solo los suyos. Con WSGI responde 204 (el navegador deja de
+    reintentar): cada conexión abierta ocuparía un hilo del servidor.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    
+    user = await request.auser()
+    if es_administrador(user):
+        grupo = request.GET.get('grupo', '')
+        grupo = int(grupo) if grupo.isdigit() else None
+        acepta = lambda evento: grupo is None or evento.get('grupo') == grupo
+    else:
+        estudiante_usuario = await sync_to_async(obtener_estudiante_del_usuario)(user)
+        if estudiante_usuario is None:
+            return HttpResponse(status=204)
+        acepta = lambda evento: evento.get('estudiante_id') == estudiante_usuario.id
+    
+    response = StreamingHttpResponse(_flujo_eventos(acepta), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # GZipMiddleware no comprime si ya hay Content-Encoding: comprimido, cada evento
+    # esperaría en el búfer del compresor en lugar de llegar al navegador
+    response['Content-Encoding'] = 'identity'
+    # nginx: entregar cada evento en cuanto llega, sin acumularlo
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
 @login_required
+@requiere_administrador
+@lectura_replica
+@condicional(['grupos'], _ultima_modificacion_por_rol)
+def analisis_grupos(request):
+    """
+    Dashboard de grupos: curvas de crecimiento agregadas por grupo y día.
+    Se sirve desde el resumen materializado, sin recorrer las mediciones.
+    """
+    curvas = obtener_curvas_grupos()
+    grupo_filtro = request.GET.get('grupo', '')
+    
+    if grupo_filtro:
+        try:
+            grupos_mostrados = {int(grupo_filtro): curvas[int(grupo_filtro)]}
+        except (ValueError, KeyError):
+            grupos_mostrados = {}
+    else:
+        grupos_mostrados = curvas
+    
+    grupos_data = []
+    for grupo, filas in sorted(grupos_mostrados.items()):
+        grupos_data.append({
+            'grupo': grupo,
+            'filas': filas,
+            'dias_registrados': len(filas),
+            'max_estudiantes': max(fila['num_mediciones'] for fila in filas),
+            'media_final': filas[-1]['media'],
+        })
+    
+    context = {
+        'grupos_data': grupos_data,
+        'grupos': sorted(curvas),
+        'grupo_filtro': grupo_filtro,
+        'grafica': obtener_grafica_grupos() if curvas else None,
+    }
+    return render(request, 'registros/analisis_grupos.html', context)
+
+
+@login_required
+@lectura_replica
+@condicional(_espacios_estudiante, _ultima_modificacion_estudiante)
 def analisis_regresion(request, estudiante_id):
     """
     Vista para mostrar el análisis de regresión lineal del crecimiento de plantas
-    con capacidad de predicción temporal (solo visible después de calcular)
+    con capacidad de predicción temporal (calculada con api_prediccion)
     Los estudiantes solo pueden ver su propio análisis.
     """
     estudiante = get_object_or_404(Estudiante, pk=estudiante_id)
@@ -733,8 +885,11 @@ def analisis_regresion(request, estudiante_id):
     # Si llegó aquí, es administrador o es su propio análisis
     mediciones = MedicionPlantas.objects.filter(estudiante=estudiante).order_by('dia')
     
+    # Series y coeficientes (cacheados hasta que cambien las mediciones del estudiante)
+    datos = obtener_regresion(estudiante.id)
+    
     # Verificar que haya suficientes datos para predicción (mínimo 7 mediciones)
-    num_mediciones = mediciones.count()
+    num_mediciones = datos['num_mediciones']
     puede_predecir = num_mediciones >= 7
     
     if num_mediciones < 2:
@@ -742,14 +897,11 @@ def analisis_regresion(request, estudiante_id):
         return redirect('medicion_listar')
     
     # Extraer datos
-    dias = np.array([float(m.dia) for m in mediciones])
-    alturas = np.array([float(m.altura) for m in mediciones])
-    
-    # Calcular regresión lineal
-    a0, a1 = MinCuad(dias, alturas)
-    
-    # Calcular coeficientes de correlación
-    r, r2 = calcular_coeficiente_correlacion(dias, alturas, a0, a1)
+    dias = np.array(datos['dias'])
+    alturas = np.array(datos['alturas'])
+    a0, a1 = datos['a0'], datos['a1']
+    r, r2 = datos['r'], datos['r2']
+    modelo = ajuste_seleccionado(datos['modelos'])
     
     # Variables para predicción
     dia_prediccion = None
@@ -757,75 +909,39 @@ def analisis_regresion(request, estudiante_id):
     dia_maximo = int(dias.max())
     dia_max_permitido = dia_maximo + 5  # Máximo 5 días hacia adelante
     
-    # Procesar predicción si se envió el formulario (POST-Redirect-GET sin parámetros)
-    if request.method == 'POST' and puede_predecir:
+    ic_media = ic_prediccion = None
+    error_prediccion = None
+    
+    # Sin JavaScript el formulario se envía por GET (?dia_prediccion=N); con JavaScript
+    # la página consulta api_prediccion y no se vuelve a renderizar.
+    if 'dia_prediccion' in request.GET and puede_predecir:
         try:
-            dia_prediccion_input = int(request.POST.get('dia_prediccion', 0))
+            dia_prediccion_input = int(request.GET['dia_prediccion'])
             
             # Validaciones
             if dia_prediccion_input <= dia_maximo:
-                messages.warning(request, f'El día a predecir debe ser mayor al último día registrado ({dia_maximo}).')
+                error_prediccion = f'El día a predecir debe ser mayor al último día registrado ({dia_maximo}).'
             elif dia_prediccion_input > dia_max_permitido:
-                messages.warning(request, f'Solo puedes predecir hasta 5 días adelante (día {dia_max_permitido} máximo).')
+                error_prediccion = f'Solo puedes predecir hasta 5 días adelante (día {dia_max_permitido} máximo).'
             else:
-                # Calcular predicción y guardar en sesión
-                altura_pred = float(a0 + a1 * dia_prediccion_input)
-                request.session['prediccion'] = {
-                    'dia': dia_prediccion_input,
-                    'altura': altura_pred,
-                    'estudiante_id': estudiante_id
-                }
-                messages.success(request, f'Predicción calculada exitosamente para el día {dia_prediccion_input}.')
-        except (ValueError, TypeError):
-            messages.error(request, 'Por favor ingresa un número válido para el día a predecir.')
-        
-        # IMPORTANTE: Redirigir después de POST para evitar reenvío del formulario
-        return redirect('analisis_regresion', estudiante_id=estudiante_id)
-    
-    # Recuperar predicción de la sesión (solo si es para este estudiante)
-    if 'prediccion' in request.session:
-        pred_data = request.session['prediccion']
-        if pred_data.get('estudiante_id') == estudiante_id:
-            dia_prediccion = pred_data['dia']
-            altura_prediccion = pred_data['altura']
-        # Limpiar la predicción de la sesión después de mostrarla
-        del request.session['prediccion']
-    
-    # Generar puntos para la línea de regresión
-    dias_linea = np.linspace(dias.min(), dias.max(), 100)
-    alturas_linea = a0 + a1 * dias_linea
-    
-    # Si hay predicción válida, extender la línea
-    if dia_prediccion and altura_prediccion:
-        dias_linea_ext = np.linspace(dias.min(), dia_prediccion, 100)
-        alturas_linea_ext = a0 + a1 * dias_linea_ext
-    
-    # Crear gráfica
-    plt.figure(figsize=(10, 6))
-    plt.scatter(dias, alturas, color='blue', s=100, alpha=0.6, edgecolors='black', label='Datos medidos', zorder=3)
-    plt.plot(dias_linea, alturas_linea, color='red', linewidth=2, label=f'Regresión: y = {a0:.2f} + {a1:.2f}x', zorder=2)
-    
-    # Si hay predicción, mostrarla en la gráfica
+                resumen = ResumenEstudiante.objects.filter(pk=estudiante.id).first()
+                if resumen and resumen.n >= MIN_MEDICIONES_PREDICCION:
+                    prediccion = predecir(resumen, [dia_prediccion_input])
+                    dia_prediccion = dia_prediccion_input
+                    altura_prediccion = prediccion['altura'][0]
+                    ic_media = prediccion['ic_media'][0]
+                    ic_prediccion = prediccion['ic_prediccion'][0]
+        except ValueError:
+            error_prediccion = 'Por favor ingresa un número válido para el día a predecir.'
+    
+    # Crear gráfica (sin predicción se reutiliza la versión cacheada)
     if dia_prediccion and altura_prediccion:
-        plt.plot(dias_linea_ext, alturas_linea_ext, color='red', linewidth=2, linestyle='--', alpha=0.5, zorder=1)
-        plt.scatter([dia_prediccion], [altura_prediccion], color='green', s=150, alpha=0.8, 
-                   edgecolors='black', marker='*', label=f'Predicción día {dia_prediccion}', zorder=4)
-    
-    plt.xlabel('Día', fontsize=12)
-    plt.ylabel('Altura (cm)', fontsize=12)
-    plt.title(f'Análisis de Crecimiento - {estudiante.nombre}', fontsize=14, fontweight='bold')
-    plt.grid(True, alpha=0.3)
-    plt.legend(fontsize=10)
-    
-    # Convertir gráfica a imagen base64
-    buffer = io.BytesIO()
-    plt.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
-    buffer.seek(0)
-    image_png = buffer.getvalue()
-    buffer.close()
-    plt.close()
-    
-    grafica_base64 = base64.b64encode(image_png).decode('utf-8')
+        grafica_base64 = generar_grafica(
+            estudiante.nombre, dias, alturas, a0, a1,
+            dia_prediccion=dia_prediccion, altura_prediccion=altura_prediccion, ajuste=modelo,
+        )
+    else:
+        grafica_base64 = obtener_grafica(estudiante, datos)
     
     # Preparar datos para el template
     context = {
@@ -846,13 +962,399 @@ def analisis_regresion(request, estudiante_id):
         'dia_max_permitido': dia_max_permitido,
         'dia_prediccion': dia_prediccion,
         'altura_prediccion': round(altura_prediccion, 2) if altura_prediccion else None,
+        'ic_media': ic_media,
+        'ic_prediccion': ic_prediccion,
+        'error_prediccion': error_prediccion,
         'porcentaje_progreso': round((num_mediciones / 7) * 100, 2) if num_mediciones < 7 else 100,
+        'modelo': modelo,
+        'modelo_motivo': datos['modelos']['motivo'],
+        'modelos_candidatos': datos['modelos']['candidatos'],
     }
     
     return render(request, 'registros/analisis_regresion.html', context)
 
 
+# ===== VISTAS DEL ARCHIVO HISTÓRICO =====
+
+@login_required
+@requiere_administrador
+def archivo_listar(request):
+    """
+    Grupos de semestres anteriores archivados (solo lectura). Permite comparar
+    sus curvas de crecimiento entre sí y con los grupos actuales.
+    """
+    archivos = list(ArchivoGrupo.objects.all())
+    try:
+        comparar = {int(pk) for pk in request.GET.getlist('comparar')}
+    except ValueError:
+        comparar = set()
+    incluir_actuales = bool(request.GET.get('actuales'))
+    
+    curvas = {}
+    etiquetas = {}
+    for archivo in archivos:
+        if archivo.pk in comparar:
+            clave = f'archivo-{archivo.pk}'
+            curvas[clave] = obtener_curva_archivo(archivo)
+            etiquetas[clave] = str(archivo)
+    if incluir_actuales:
+        for grupo, filas in obtener_curvas_grupos().items():
+            curvas[f'grupo-{grupo}'] = filas
+            etiquetas[f'grupo-{grupo}'] = f'Grupo {grupo} (actual)'
+    
+    context = {
+        'archivos': archivos,
+        'comparar': comparar,
+        'incluir_actuales': incluir_actuales,
+        'grafica': generar_grafica_grupos(curvas, etiquetas) if curvas else None,
+    }
+    return render(request, 'registros/archivo_lista.html', context)
+
+
+@login_required
+@requiere_administrador
+def archivo_detalle(request, pk):
+    """
+    Un grupo archivado: curva del grupo, regresión de cada estudiante y, con
+    ?estudiante=<id>, la serie de ese estudiante leída de las columnas mapeadas.
+    """
+    archivo = get_object_or_404(ArchivoGrupo, pk=pk)
+    estudiantes = filas_estudiantes(archivo)
+    
+    seleccionado = None
+    grafica_estudiante = None
+    estudiante_id = request.GET.get('estudiante', '')
+    if estudiante_id.isdigit():
+        serie = serie_estudiante(archivo, int(estudiante_id))
+        if serie is not None:
+            dias, alturas, seleccionado = serie
+            seleccionado['mediciones'] = list(zip(dias.tolist(), alturas.tolist()))
+            if seleccionado['a0'] is not None:
+                grafica_estudiante = generar_grafica(
+                    seleccionado['nombre'], dias, alturas, seleccionado['a0'], seleccionado['a1'],
+                )
+    
+    context = {
+        'archivo': archivo,
+        'estudiantes': estudiantes,
+        'curva': obtener_curva_archivo(archivo),
+        'grafica': obtener_grafica_archivo(archivo) if archivo.num_mediciones else None,
+        'seleccionado': seleccionado,
+        'grafica_estudiante': grafica_estudiante,
+    }
+    return render(request, 'registros/archivo_detalle.html', context)
+
+
+@login_required
+@requiere_administrador
+def reporte_descargar(request, pk):
+    """Descarga el ZIP de un reporte de grupo terminado (se solicitan desde el admin)."""
+    reporte = get_object_or_404(ReporteGrupo, pk=pk, estado=ReporteGrupo.LISTO)
+    try:
+        archivo = open(ruta_reporte(reporte), 'rb')
+    except FileNotFoundError:
+        raise Http404('El archivo del reporte ya no existe')
+    return FileResponse(archivo, as_attachment=True, filename=reporte.ruta)
+
+
+# Límites de una consulta por lotes a la API de predicción
+MAX_ESTUDIANTES_PREDICCION = 500
+MAX_DIAS_PREDICCION = 100
+
+
+def _enteros_parametro(request, nombre):
+    """Lee ?nombre=1,2&nombre=3 como [1, 2, 3]; lanza ValueError si algún valor no es entero."""
+    valores = []
+    for valor in request.GET.getlist(nombre):
+        valores.extend(int(parte) for parte in valor.split(',') if parte.strip())
+    return valores
+
+
 @login_required
+@lectura_replica
+def api_prediccion(request):
+    """
+    API JSON de predicción con intervalos de confianza.
+    
+    Parámetros GET:
+        estudiante: uno o varios ids (repetido o separado por comas); los
+                    estudiantes solo pueden consultar el suyo y lo usan por defecto
+        dia: uno o varios días a predecir
+        nivel: nivel de confianza (0.90, 0.95 o 0.99; por defecto 0.95)
+    
+    Responde desde ResumenEstudiante, sin leer las mediciones.
+    """
+    try:
+        estudiante_ids = _enteros_parametro(request, 'estudiante')
+        dias = _enteros_parametro(request, 'dia')
+        nivel = float(request.GET.get('nivel', 0.95))
+    except ValueError:
+        return JsonResponse({'error': 'Los parámetros estudiante, dia y nivel deben ser numéricos.'}, status=400)
+    
+    if nivel not in NIVELES_CONFIANZA:
+        return JsonResponse({'error': f'Nivel de confianza no soportado (opciones: {", ".join(map(str, NIVELES_CONFIANZA))}).'}, status=400)
+    if not dias or len(dias) > MAX_DIAS_PREDICCION:
+        return JsonResponse({'error': f'Indica entre 1 y {MAX_DIAS_PREDICCION} días a predecir.'}, status=400)
+    
+    # VALIDACIÓN DE PERMISOS: los estudiantes solo consultan su propia predicción
+    if not (request.user.is_superuser or request.user.is_staff):
+        estudiante_usuario = obtener_estudiante_del_usuario(request.user)
+        if not estudiante_usuario:
+            return JsonResponse({'error': 'Tu cuenta no está asociada a ningún estudiante.'}, status=403)
+        if any(pk != estudiante_usuario.id for pk in estudiante_ids):
+            return JsonResponse({'error': 'No tienes permiso para consultar otros estudiantes.'}, status=403)
+        estudiante_ids = [estudiante_usuario.id]
+    
+    estudiante_ids = list(dict.fromkeys(estudiante_ids))
+    if not estudiante_ids or len(estudiante_ids) > MAX_ESTUDIANTES_PREDICCION:
+        return JsonResponse({'error': f'Indica entre 1 y {MAX_ESTUDIANTES_PREDICCION} estudiantes.'}, status=400)
+    
+    resumenes = ResumenEstudiante.objects.in_bulk(estudiante_ids)
+    predicciones = {}
+    errores = {}
+    for estudiante_id in estudiante_ids:
+        resumen = resumenes.get(estudiante_id)
+        if resumen is None or resumen.n < MIN_MEDICIONES_PREDICCION or coeficientes(resumen) is None:
+            errores[estudiante_id] = f'Se necesitan al menos {MIN_MEDICIONES_PREDICCION} mediciones para predecir.'
+            continue
+        a0, a1 = coeficientes(resumen)
+        predicciones[estudiante_id] = {
+            'num_mediciones': resumen.n,
+            'a0': round(a0, 4),
+            'a1': round(a1, 4),
+            'r2': round(coeficiente_determinacion(resumen), 4),
+            'error_estandar': round(varianza_residual(resumen) ** 0.5, 4),
+            'dias': dias,
+            **predecir(resumen, dias, nivel),
+        }
+    
+    return JsonResponse({'nivel': nivel, 'predicciones': predicciones, 'errores': errores})
+
+
+# Resultados de la búsqueda de estudiantes de los formularios
+MAX_RESULTADOS_BUSQUEDA = 20
+
+
+@login_required
+@lectura_replica
+def api_estudiantes(request):
+    """
+    Búsqueda de estudiantes por nombre, correo o grupo (JSON) para el selector
+    de los formularios cuando hay demasiados para listarlos. Solo administradores.
+    """
+    if not (request.user.is_superuser or request.user.is_staff):
+        return JsonResponse({'error': 'Solo los administradores pueden buscar estudiantes.'}, status=403)
+
+    texto = request.GET.get('q', '').strip()
+    if not texto:
+        return JsonResponse({'resultados': []})
+    filtro = Q(nombre__icontains=texto) | Q(correo_institucional__icontains=texto)
+    if texto.isdigit():
+        filtro |= Q(grupo=int(texto))
+    estudiantes = Estudiante.objects.filter(filtro).only('nombre', 'grupo')[:MAX_RESULTADOS_BUSQUEDA]
+
+    return JsonResponse({'resultados': [{'id': e.pk, 'texto': str(e)} for e in estudiantes]})
+
+
+# Registros por solicitud de sincronización (cada uno puede llevar una fotografía)
+MAX_REGISTROS_SINCRONIZACION = 50
+
+
+@login_required
+def api_sincronizar_mediciones(request):
+    """
+    Recibe en una sola solicitud las mediciones que scripts.js guardó sin
+    conexión. Multipart: el campo 'registros' es una lista JSON de
+    {clave, estudiante, dia, altura, comentario} y la fotografía de cada uno
+    viaja en el archivo 'foto_<clave>'. Se aplican con upsert e idempotencia
+    (escritura.sincronizar_lote): reenviar un lote no duplica nada. Las
+    alturas atípicas se guardan marcadas, porque sin conexión no se pudo
+    pedir confirmación. Responde el estado de cada clave.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método no permitido.'}, status=405)
+    try:
+        registros = json.loads(request.POST.get('registros', ''))
+    except ValueError:
+        registros = None
+    if not isinstance(registros, list) or not all(isinstance(registro, dict) for registro in registros):
+        return JsonResponse({'error': 'El campo registros debe ser una lista JSON.'}, status=400)
+    if len(registros) > MAX_REGISTROS_SINCRONIZACION:
+        return JsonResponse(
+            {'error': f'Máximo {MAX_REGISTROS_SINCRONIZACION} registros por solicitud.'}, status=413,
+        )
+    
+    resultados = []
+    validos = []
+    for registro in registros:
+        form = MedicionSincronizadaForm(registro, {'imagen': request.FILES.get(f'foto_{registro.get("clave")}')})
+        if form.is_valid():
+            validos.append(form.cleaned_data)
+        else:
+            resultados.append({
+                'clave': str(registro.get('clave', '')),
+                'estado': 'error',
+                'errores': {campo: [str(error) for error in errores] for campo, errores in form.errors.items()},
+            })
+    
+    # Permisos y resúmenes (para marcar las atípicas) de todo el lote en dos consultas
+    ids = {datos['estudiante'] for datos in validos}
+    if es_administrador(request.user):
+        permitidos = set(Estudiante.objects.filter(pk__in=ids).values_list('pk', flat=True))
+    else:
+        estudiante_usuario = obtener_estudiante_del_usuario(request.user)
+        permitidos = {estudiante_usuario.id} & ids if estudiante_usuario else set()
+    resumenes = ResumenEstudiante.objects.in_bulk(permitidos)
+    
+    entradas = []
+    for datos in validos:
+        if datos['estudiante'] not in permitidos:
+            resultados.append({
+                'clave': str(datos['clave']),
+                'estado': 'error',
+                'errores': {'estudiante': ['No puedes registrar mediciones de este estudiante.']},
+            })
+            continue
+        evaluacion = evaluar_medicion(resumenes.get(datos['estudiante']), datos['dia'], datos['altura'])
+        entradas.append({
+            'clave': datos['clave'],
+            'estudiante_id': datos['estudiante'],
+            'dia': datos['dia'],
+            'altura': datos['altura'],
+            'atipica': bool(evaluacion and evaluacion['es_atipica']),
+            'imagen': datos['imagen'],
+            'comentario': datos['comentario'],
+        })
+    
+    if entradas:
+        aplicadas = sincronizar_lote(entradas, usuario=request.user)
+        atipicas = {entrada['clave'] for entrada in entradas if entrada['atipica']}
+        for clave, (medicion_id, estado) in aplicadas.items():
+            resultados.append({
+                'clave': str(clave), 'estado': estado, 'medicion_id': medicion_id, 'atipica': clave in atipicas,
+            })
+        for estudiante_id in {entrada['estudiante_id'] for entrada in entradas}:
+            precalcular_en_segundo_plano(estudiante_id)
+    
+    return JsonResponse({'resultados': resultados})
+
+
+# ===== SUBIDAS POR PARTES (tus 1.0) =====
+# Protocolo y almacén en registros/subidas.py
+
+def _respuesta_tus(status=204, **cabeceras):
+    response = HttpResponse(status=status)
+    response['Tus-Resumable'] = VERSION_TUS
+    response['Cache-Control'] = 'no-store'
+    for nombre, valor in cabeceras.items():
+        response[nombre.replace('_', '-')] = str(valor)
+    return response
+
+
+def _error_tus(error):
+    response = _respuesta_tus(error.estado)
+    response.content = str(error)
+    response['Content-Type'] = 'text/plain; charset=utf-8'
+    return response
+
+
+def _entero_cabecera(request, nombre):
+    valor = request.headers.get(nombre, '')
+    if not valor.isdigit():
+        raise ErrorSubida(f'Falta la cabecera {nombre} o no es un entero.')
+    return int(valor)
+
+
+@login_required
+def api_subidas(request):
+    """Crea una subida (POST) o describe el servidor (OPTIONS)."""
+    if request.method == 'OPTIONS':
+        return _respuesta_tus(
+            Tus_Version=VERSION_TUS, Tus_Extension=EXTENSIONES_TUS, Tus_Max_Size=TAMANO_MAXIMO,
+        )
+    if request.method != 'POST':
+        return _respuesta_tus(405)
+    if request.headers.get('Tus-Resumable') != VERSION_TUS:
+        return _respuesta_tus(412, Tus_Version=VERSION_TUS)
+    try:
+        subida = crear_subida(
+            request.user.pk,
+            _entero_cabecera(request, 'Upload-Length'),
+            leer_metadatos(request.headers.get('Upload-Metadata')),
+        )
+    except ErrorSubida as error:
+        return _error_tus(error)
+    return _respuesta_tus(201, Location=reverse('api_subida', args=[subida]))
+
+
+@login_required
+def api_subida(request, subida):
+    """Consulta (HEAD), continúa (PATCH) o cancela (DELETE) una subida propia."""
+    info = obtener_subida(subida, request.user.pk)
+    if info is None:
+        return _respuesta_tus(404)
+    if request.method == 'HEAD':
+        return _respuesta_tus(200, Upload_Offset=info['desplazamiento'], Upload_Length=info['longitud'])
+    if request.headers.get('Tus-Resumable') != VERSION_TUS:
+        return _respuesta_tus(412, Tus_Version=VERSION_TUS)
+    if request.method == 'DELETE':
+        eliminar_subida(subida)
+        return _respuesta_tus(204)
+    if request.method != 'PATCH':
+        return _respuesta_tus(405)
+    if request.content_type != 'application/offset+octet-stream':
+        return _respuesta_tus(415)
+    try:
+        desplazamiento = escribir_fragmento(
+            info,
+            _entero_cabecera(request, 'Upload-Offset'),
+            request,
+            _entero_cabecera(request, 'Content-Length'),
+        )
+    except ErrorSubida as error:
+        return _error_tus(error)
+    return _respuesta_tus(204, Upload_Offset=desplazamiento)
+
+
+def service_worker(request):
+    """
+    Service worker de la app (registros/sw.js). Se sirve desde la raíz para
+    que su alcance cubra todo el sitio, y como plantilla para que conozca las
+    URLs con hash de los archivos estáticos que guarda para usar sin conexión.
+    """
+    response = render(request, 'registros/sw.js', content_type='application/javascript')
+    # El navegador compara el archivo en cada visita para instalar la versión nueva
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@login_required
+def api_tarea_estado(request, pk):
+    """
+    Estado de una tarea en segundo plano (JSON). Los administradores ven
+    cualquier tarea; los demás usuarios solo las que ellos solicitaron.
+    """
+    tareas = Tarea.objects.all()
+    if not (request.user.is_superuser or request.user.is_staff):
+        tareas = tareas.filter(usuario=request.user)
+    tarea = get_object_or_404(tareas, pk=pk)
+    
+    return JsonResponse({
+        'id': tarea.pk,
+        'nombre': tarea.nombre,
+        'estado': tarea.estado,
+        'intentos': tarea.intentos,
+        'max_intentos': tarea.max_intentos,
+        'resultado': tarea.resultado,
+        'error': tarea.error.strip().splitlines()[-1] if tarea.error else None,
+        'creada': tarea.creada.isoformat(),
+        'terminada': tarea.terminada.isoformat() if tarea.terminada else None,
+    })
+
+
+@login_required
+@lectura_replica
+@condicional(_espacios_estudiante, _ultima_modificacion_estudiante)
 def exportar_csv(request, estudiante_id):
     """
     Exporta los datos de mediciones de un estudiante a CSV
@@ -877,7 +1379,10 @@ def exportar_csv(request, estudiante_id):
             return redirect('index')
     
     # Si llegó aquí, es administrador o son sus propios datos
-    mediciones = MedicionPlantas.objects.filter(estudiante=estudiante).order_by('dia')
+    # La fecha de registro no está en la instantánea de análisis: se lee de la tabla, sin crear instancias
+    mediciones = MedicionPlantas.objects.filter(estudiante=estudiante).order_by('dia').values_list(
+        'dia', altura_centesimas(), 'fecha_registro'
+    )
     
     # Crear respuesta HTTP con tipo CSV
     response = HttpResponse(content_type='text/csv')
@@ -887,11 +1392,11 @@ def exportar_csv(request, estudiante_id):
     writer = csv.writer(response)
     writer.writerow(['Día', 'Altura (cm)', 'Fecha de Registro'])
     
-    for medicion in mediciones:
+    for dia, centesimas, fecha_registro in mediciones:
         writer.writerow([
-            medicion.dia,
-            medicion.altura,
-            medicion.fecha_registro.strftime('%Y-%m-%d %H:%M:%S')
+            dia,
+            texto_centimetros(centesimas),
+            fecha_registro.strftime('%Y-%m-%d %H:%M:%S')
         ])
     
     return response